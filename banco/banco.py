@@ -1,6 +1,6 @@
 
-import sqlite3
 import pandas as pd
+from shared.db import conectar
 
 # ============================
 # Função Genérica
@@ -18,7 +18,7 @@ def carregar_tabela(nome_tabela: str, caminho_banco: str) -> pd.DataFrame:
         pd.DataFrame: Dados da tabela ou DataFrame vazio em caso de erro.
     """
     try:
-        with sqlite3.connect(caminho_banco) as conn:
+        with conectar(caminho_banco) as conn:
             return pd.read_sql(f"SELECT * FROM {nome_tabela}", conn)
     except Exception as e:
         print(f"[ERRO] Não foi possível carregar a tabela '{nome_tabela}': {e}")
@@ -15,7 +15,14 @@ Subpacotes
 - metas ........... cadastro e acompanhamento de metas
 """
 
-from . import cadastros, dashboard, dataframes, dre, fechamento, lancamentos, metas
+from shared.lazy_imports import getattr_tardio
+
+# Subpacotes carregados só no primeiro acesso: importar uma página não importa
+# as demais (ex.: Lançamentos não paga plotly/Prophet do Dashboard).
+__getattr__ = getattr_tardio(__name__, {
+    nome: f".{nome}"
+    for nome in ("cadastros", "dashboard", "dataframes", "dre", "fechamento", "lancamentos", "metas")
+})
 
 __all__ = [
     "cadastros",
@@ -2,6 +2,9 @@ import sqlite3
 import pandas as pd
 from typing import Optional, Dict, Any, List, Tuple
 
+from shared.db import faixa_iso
+from shared.saldos_bancos import definir_saldos_dia, saldos_do_dia, sincronizar_bancos
+
 # === Classe Usuário ========================================================================================
 class Usuario:
     def __init__(self, id: int, nome: str, email: str, perfil: str, ativo: int):
@@ -115,8 +118,8 @@ class CaixaRepository:
     def buscar_saldo_por_data(self, data: str):
         with sqlite3.connect(self.caminho_banco) as conn:
             cursor = conn.execute(
-                "SELECT caixa, caixa_2 FROM saldos_caixas WHERE DATE(data)=DATE(?) LIMIT 1",
-                (data,),
+                "SELECT caixa, caixa_2 FROM saldos_caixas WHERE data >= ? AND data < ? LIMIT 1",
+                faixa_iso(data),
             )
             return cursor.fetchone()
 
@@ -131,9 +134,9 @@ class CaixaRepository:
                     UPDATE saldos_caixas
                        SET caixa   = ?,
                            caixa_2 = ?
-                     WHERE DATE(data)=DATE(?)
+                     WHERE data >= ? AND data < ?
                     """,
-                    (float(caixa), float(caixa_2), data),
+                    (float(caixa), float(caixa_2), *faixa_iso(data)),
                 )
                 # Recalcula totais por linha
                 cur.execute(
@@ -141,13 +144,13 @@ class CaixaRepository:
                     UPDATE saldos_caixas
                        SET caixa_total  = COALESCE(caixa,0)   + COALESCE(caixa_vendas,0),
                            caixa2_total = COALESCE(caixa_2,0) + COALESCE(caixa2_dia,0)
-                     WHERE DATE(data)=DATE(?)
+                     WHERE data >= ? AND data < ?
                     """,
-                    (data,),
+                    faixa_iso(data),
                 )
                 row = cur.execute(
-                    "SELECT COALESCE(id, rowid) AS id FROM saldos_caixas WHERE DATE(data)=DATE(?) LIMIT 1",
-                    (data,),
+                    "SELECT COALESCE(id, rowid) AS id FROM saldos_caixas WHERE data >= ? AND data < ? LIMIT 1",
+                    faixa_iso(data),
                 ).fetchone()
                 saldo_id = int(row[0]) if row and row[0] is not None else -1
             else:
@@ -216,28 +219,21 @@ class CorrecaoCaixaRepository:
 
 # === Classe SaldoBancarioRepository ============================================================================
 class SaldoBancarioRepository:
+    _BANCOS = ("banco_1", "banco_2", "banco_3", "banco_4")
+
     def __init__(self, caminho_banco: str):
         self.caminho_banco = caminho_banco
 
     def obter_saldo_por_data(self, data: str) -> Optional[Tuple[float, float, float, float]]:
         with sqlite3.connect(self.caminho_banco) as conn:
-            cursor = conn.execute(
-                "SELECT banco_1, banco_2, banco_3, banco_4 FROM saldos_bancos WHERE data = ?",
-                (data,)
-            )
-            return cursor.fetchone()
+            saldos = saldos_do_dia(conn, data)
+        if not saldos:
+            return None
+        return tuple(saldos.get(b, 0.0) for b in self._BANCOS)
 
     def salvar_saldo(self, data: str, b1: float, b2: float, b3: float, b4: float):
         with sqlite3.connect(self.caminho_banco) as conn:
-            conn.execute("""
-                INSERT INTO saldos_bancos (data, banco_1, banco_2, banco_3, banco_4)
-                VALUES (?, ?, ?, ?, ?)
-                ON CONFLICT(data) DO UPDATE SET
-                    banco_1=excluded.banco_1,
-                    banco_2=excluded.banco_2,
-                    banco_3=excluded.banco_3,
-                    banco_4=excluded.banco_4
-            """, (data, b1, b2, b3, b4))
+            definir_saldos_dia(conn, data, dict(zip(self._BANCOS, (b1, b2, b3, b4))))
             conn.commit()
 
 
@@ -356,10 +352,8 @@ class BancoRepository:
                 "INSERT OR IGNORE INTO bancos_cadastrados (nome) VALUES (?)",
                 (nome_banco,)
             )
-            # garante coluna dinâmica em saldos_bancos
-            cols = pd.read_sql("PRAGMA table_info(saldos_bancos);", conn)["name"].tolist()
-            if nome_banco not in cols:
-                conn.execute(f'ALTER TABLE saldos_bancos ADD COLUMN "{nome_banco}" REAL DEFAULT 0.0;')
+            # registra o banco em saldos_bancos_mov (coluna na view `saldos_bancos`, sem ALTER TABLE)
+            sincronizar_bancos(conn, [nome_banco])
             conn.commit()
 
     def carregar_bancos(self) -> pd.DataFrame:
@@ -26,7 +26,7 @@ import pandas as pd
 import streamlit as st
 
 from repository.movimentacoes_repository import MovimentacoesRepository
-from shared.db import get_conn
+from shared.db import faixa_iso, get_conn
 from utils.utils import formatar_valor
 from .cadastro_classes import CaixaRepository
 
@@ -53,10 +53,10 @@ def _normalizar_snapshot_saldos_caixas(caminho_banco: str, data_iso: str, atuali
                    COALESCE(caixa_vendas,0) AS cv,
                    COALESCE(caixa2_dia,0)   AS c2d
               FROM saldos_caixas
-             WHERE DATE(data)=DATE(?)
+             WHERE data >= ? AND data < ?
              LIMIT 1
             """,
-            (data_iso,),
+            faixa_iso(data_iso),
         ).fetchone()
 
         if not row:
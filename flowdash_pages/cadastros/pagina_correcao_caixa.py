@@ -7,7 +7,8 @@ from utils.utils import formatar_valor
 from .cadastro_classes import CorrecaoCaixaRepository
 from repository.movimentacoes_repository import MovimentacoesRepository
 from shared.ids import uid_correcao_caixa
-from shared.db import get_conn
+from shared.db import faixa_iso, get_conn
+from shared.saldos_bancos import somar_saldo_banco
 
 
 # ------------------------------------------------------------------------------------
@@ -63,7 +64,7 @@ def inserir_mov_bancaria_correcao(
 
 
 # ------------------------------------------------------------------------------------
-# Helpers de DB para snapshots (saldos_caixas/saldos_bancos)
+# Helpers de DB para snapshots (saldos_caixas; bancos via shared.saldos_bancos)
 def _sanitize_col_name(col: str) -> str:
     """Permite letras, números, espaços e _. Demais caracteres são removidos (anti-injeção)."""
     col = (col or "").strip()
@@ -94,7 +95,8 @@ def _init_row_saldos_caixas_if_missing(conn: sqlite3.Connection, data_str: str)
       - caixa2_total ← caixa_2 + caixa2_dia
     Apenas popula colunas que existirem na tabela.
     """
-    cur = conn.execute("SELECT 1 FROM saldos_caixas WHERE date(data)=date(?) LIMIT 1", (data_str,))
+    ini, fim = faixa_iso(data_str)
+    cur = conn.execute("SELECT 1 FROM saldos_caixas WHERE data >= ? AND data < ? LIMIT 1", (ini, fim))
     if cur.fetchone() is not None:
         return  # já existe
 
@@ -103,11 +105,11 @@ def _init_row_saldos_caixas_if_missing(conn: sqlite3.Connection, data_str: str)
         """
         SELECT *
         FROM saldos_caixas
-        WHERE date(data) < date(?)
-        ORDER BY date(data) DESC
+        WHERE data < ?
+        ORDER BY data DESC
         LIMIT 1
         """,
-        (data_str,),
+        (ini,),
     ).fetchone()
 
     cols = _get_table_cols(conn, "saldos_caixas")
@@ -152,6 +154,7 @@ def aplicar_delta_caixa(caminho_banco: str, data_str: str, coluna: str, delta: f
     if coluna not in ("caixa", "caixa_2"):
         raise ValueError("Coluna inválida para saldos_caixas. Use 'caixa' ou 'caixa_2'.")
 
+    ini, fim = faixa_iso(data_str)
     with get_conn(caminho_banco) as conn:
         # Inicializa linha do dia com os saldos do dia anterior
         _init_row_saldos_caixas_if_missing(conn, data_str)
@@ -159,8 +162,8 @@ def aplicar_delta_caixa(caminho_banco: str, data_str: str, coluna: str, delta: f
         # Aplica delta na coluna-alvo
         conn.execute(
             f'UPDATE saldos_caixas SET "{coluna}" = COALESCE("{coluna}", 0) + ? '
-            "WHERE date(data)=date(?)",
-            (float(delta), data_str),
+            "WHERE data >= ? AND data < ?",
+            (float(delta), ini, fim),
         )
 
         # Recalcula totais derivados, se existirem
@@ -168,42 +171,30 @@ def aplicar_delta_caixa(caminho_banco: str, data_str: str, coluna: str, delta: f
             conn.execute(
                 'UPDATE saldos_caixas '
                 'SET "caixa_total" = COALESCE("caixa",0) + COALESCE("caixa_vendas",0) '
-                'WHERE date(data)=date(?)',
-                (data_str,),
+                'WHERE data >= ? AND data < ?',
+                (ini, fim),
             )
 
         if _col_exists(conn, "saldos_caixas", "caixa2_total") and _col_exists(conn, "saldos_caixas", "caixa2_dia"):
             conn.execute(
                 'UPDATE saldos_caixas '
                 'SET "caixa2_total" = COALESCE("caixa_2",0) + COALESCE("caixa2_dia",0) '
-                'WHERE date(data)=date(?)',
-                (data_str,),
+                'WHERE data >= ? AND data < ?',
+                (ini, fim),
             )
 
 
 def aplicar_delta_banco(caminho_banco: str, data_str: str, nome_banco_coluna: str, delta: float) -> None:
     """
-    Soma/subtrai `delta` na coluna do banco em saldos_bancos da data.
-    Usa o texto do select como nome de coluna (deve existir em saldos_bancos).
+    Soma/subtrai `delta` no saldo do banco na data (`saldos_bancos_mov`).
+    Usa o texto do select (nome do banco cadastrado) como identificador do banco.
     """
-    col = _sanitize_col_name(nome_banco_coluna)
-    if not col:
-        raise ValueError("Nome da coluna do banco inválido.")
+    banco = (nome_banco_coluna or "").strip()
+    if not banco:
+        raise ValueError("Nome do banco inválido.")
 
     with get_conn(caminho_banco) as conn:
-        # Se a linha do dia não existir, cria pelo menos a data (sem carry-over aqui)
-        cur = conn.execute("SELECT 1 FROM saldos_bancos WHERE date(data)=date(?) LIMIT 1", (data_str,))
-        if cur.fetchone() is None:
-            conn.execute("INSERT INTO saldos_bancos (data) VALUES (date(?))", (data_str,))
-
-        if not _col_exists(conn, "saldos_bancos", col):
-            raise ValueError(f'A coluna do banco "{col}" não existe em saldos_bancos.')
-
-        conn.execute(
-            f'UPDATE saldos_bancos SET "{col}" = COALESCE("{col}", 0) + ? '
-            "WHERE date(data)=date(?)",
-            (float(delta), data_str),
-        )
+        somar_saldo_banco(conn, data_str, banco, float(delta))
 
 
 # ------------------------------------------------------------------------------------
@@ -272,7 +263,7 @@ def pagina_correcao_caixa(caminho_banco: str):
                 elif dest_norm in ("caixa 2", "caixa2"):
                     aplicar_delta_caixa(caminho_banco, data_str, "caixa_2", float(valor_ajuste))
                 else:
-                    # Banco: usa o nome exibido como nome da coluna em saldos_bancos
+                    # Banco: usa o nome exibido como banco em saldos_bancos_mov
                     aplicar_delta_banco(caminho_banco, data_str, destino_banco, float(valor_ajuste))
             except Exception as e:
                 # Não bloqueia o fluxo (ajuste já foi salvo); mostra erro claro da aplicação do delta
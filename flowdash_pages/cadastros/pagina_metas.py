@@ -66,7 +66,7 @@ def pagina_metas_cadastro(caminho_banco: str):
                 with st.spinner("Consultando o Oráculo..."):
                     try:
                         # 1. Previsão Prophet (Loja Total)
-                        _, _, metricas = criar_grafico_previsao(df_entrada, meses_futuro=1)
+                        _, _, metricas = criar_grafico_previsao(df_entrada, meses_futuro=1, db_path=caminho_banco, aguardar=True)
                         
                         if metricas and metricas.get('otimista', 0) > 0:
                             v_otimista_loja = metricas['otimista']
@@ -3,13 +3,14 @@ Página: Cadastro de Saldos Bancários
 ====================================
 
 Permite somar valores ao saldo de um banco específico na data escolhida, criando
-ou atualizando a linha de `saldos_bancos` (uma linha por data) e registrando a
+ou atualizando a linha (data × banco) de `saldos_bancos_mov` e registrando a
 entrada correspondente em `movimentacoes_bancarias` com observação padronizada,
 usuário e timestamp.
 
 Comportamentos:
-- Garante colunas dinâmicas para todos os bancos cadastrados (ALTER TABLE se faltar).
-- Se já existir linha para a data, soma no campo do banco; senão cria a linha.
+- Se já existir linha para a data e o banco, soma no valor; senão cria a linha
+  (`shared.saldos_bancos`, sem ALTER TABLE por banco).
+- A listagem lê a view `saldos_bancos` (uma coluna por banco).
 - Registra a movimentação bancária (entrada) com:
   - observação: "Cadastro REGISTRO MANUAL DE SALDO BANCÁRIO | Valor R$ X"
   - usuario: nome do usuário logado
@@ -23,19 +24,11 @@ import pandas as pd
 import streamlit as st
 
 from repository.movimentacoes_repository import MovimentacoesRepository
+from shared.saldos_bancos import somar_saldo_banco
 from flowdash_pages.cadastros.cadastro_classes import BancoRepository
 
 
 # ------------------------- helpers internos -------------------------
-def _garantir_colunas_bancos(conn: sqlite3.Connection, bancos: list[str]) -> None:
-    """Garante colunas para todos os bancos na tabela `saldos_bancos` (DEFAULT 0.0)."""
-    cols_info = conn.execute("PRAGMA table_info(saldos_bancos)").fetchall()
-    existentes = {c[1] for c in cols_info}
-    faltantes = [b for b in bancos if b not in existentes]
-    for b in faltantes:
-        conn.execute(f'ALTER TABLE saldos_bancos ADD COLUMN "{b}" REAL DEFAULT 0.0')
-
-
 def _formatar_moeda_br(v: float) -> str:
     """Formata número como moeda BR: R$ 1.234,56 (sem depender de locale)."""
     return f"R$ {float(v):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -162,9 +155,9 @@ def _inserir_mov_bancaria(
     Args:
         caminho_banco: Caminho do SQLite.
         data_: Data no formato 'YYYY-MM-DD'.
-        banco: Nome do banco (coluna em `saldos_bancos`).
+        banco: Nome do banco.
         valor: Valor a registrar (deve ser > 0).
-        referencia_id: rowid de `saldos_bancos` correspondente à data.
+        referencia_id: id da linha (data × banco) em `saldos_bancos_mov`.
         usuario: Nome do usuário logado (se None, não grava).
         data_hora: Timestamp 'YYYY-MM-DD HH:MM:SS' (se None, não grava).
     """
@@ -226,47 +219,8 @@ def pagina_saldos_bancarios(caminho_banco: str) -> None:
     if st.button("💾 Lançar Saldo (somar na mesma data)", use_container_width=True, disabled=(not usuario_atual)):
         try:
             with sqlite3.connect(caminho_banco) as conn:
-                cur = conn.cursor()
-
-                # Garante as colunas para todos os bancos
-                _garantir_colunas_bancos(conn, bancos)
-
-                # Verifica se já existe linha para a data
-                row = cur.execute(
-                    "SELECT rowid FROM saldos_bancos WHERE data = ? LIMIT 1;",
-                    (data_str,)
-                ).fetchone()
-
-                if row:
-                    # UPDATE acumulando na coluna do banco
-                    cur.execute(
-                        f'UPDATE saldos_bancos '
-                        f'SET "{banco_selecionado}" = COALESCE("{banco_selecionado}", 0) + ? '
-                        f'WHERE data = ?;',
-                        (float(valor_digitado), data_str)
-                    )
-                    # Para referência, buscamos o rowid atualizado
-                    referencia_id = cur.execute(
-                        "SELECT rowid FROM saldos_bancos WHERE data = ? LIMIT 1;",
-                        (data_str,),
-                    ).fetchone()
-                    referencia_id = int(referencia_id[0]) if referencia_id else None
-                else:
-                    # INSERT de nova linha com a data; somente a coluna do banco recebe o valor
-                    colunas = ["data"] + bancos
-                    valores = [data_str] + [
-                        float(valor_digitado) if b == banco_selecionado else 0.0
-                        for b in bancos
-                    ]
-                    placeholders = ",".join(["?"] * len(colunas))
-                    colunas_sql = ",".join([f'"{c}"' for c in colunas])
-
-                    cur.execute(
-                        f'INSERT INTO saldos_bancos ({colunas_sql}) VALUES ({placeholders})',
-                        valores
-                    )
-                    referencia_id = int(cur.lastrowid)  # funciona mesmo sem coluna 'id'
-
+                # Soma na linha (data × banco) de `saldos_bancos_mov`; o id serve de referência
+                referencia_id = somar_saldo_banco(conn, data_str, banco_selecionado, float(valor_digitado))
                 conn.commit()
 
             # também lança em movimentacoes_bancarias como ENTRADA, com referência e metadados
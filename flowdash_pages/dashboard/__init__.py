@@ -4,6 +4,8 @@ Página de Dashboard
 
 Renderiza a tela principal de indicadores e gráficos.
 """
-from .dashboard import render_dashboard
+from shared.lazy_imports import getattr_tardio
+
+__getattr__ = getattr_tardio(__name__, {"render_dashboard": ".dashboard:render_dashboard"})
 
 __all__ = ["render_dashboard"]
@@ -6,27 +6,33 @@ from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import streamlit as st
 import sqlite3
 from flowdash_pages.utils_timezone import hoje_br
+from shared.lazy_imports import modulo_tardio
 
 from shared.db import ensure_db_path_or_raise, get_conn
+from shared.data_version import cache_por_tabelas
+from shared.agregados import carregar_vendas_dia, carregar_saidas_dia
 from flowdash_pages.lancamentos.pagina.ui_cards_pagina import render_card_row, render_card_rows
 from flowdash_pages.dataframes import dataframes as df_utils
 from flowdash_pages.dataframes import contas_a_pagar as cap
 from flowdash_pages.dre.dre import (
-    _calc_mes,
+    calc_ano,
+    _linha_mes,
     _listar_anos,
     _load_vars,
     _persist_overrides_to_db,
     _vars_dynamic_overrides,
 )
 from flowdash_pages.finance_logic import _somar_bancos_totais, _ultimo_caixas_ate
-from flowdash_pages.dashboard.prophet_engine import criar_grafico_previsao
+from flowdash_pages.dashboard.prophet_engine import criar_grafico_previsao, previsao_em_andamento
 from flowdash_pages.cadastros.variaveis_dre import get_estoque_atual_estimado
 
+# plotly só carrega quando o primeiro gráfico é montado
+px = modulo_tardio("plotly.express")
+go = modulo_tardio("plotly.graph_objects")
+
 
 # ========================= Helpers gerais =========================
 DATE_COLS = [
@@ -146,6 +152,7 @@ def _resolve_db_path(caminho_banco: Optional[str]) -> str:
         return ensure_db_path_or_raise(None)
 
 
+@cache_por_tabelas(tabelas_de=lambda db_path, name: (name,))
 def _load_table(db_path: str, name: str) -> pd.DataFrame:
     try:
         with get_conn(db_path) as conn:
@@ -173,9 +180,24 @@ def _normalize_df(df: pd.DataFrame) -> pd.DataFrame:
     return df_norm
 
 
+def _load_vendas_dia(db_path: str) -> pd.DataFrame:
+    """Vendas já agregadas por dia (`agg_vendas_dia`); cai na tabela `entrada` se não houver agregado."""
+    df = carregar_vendas_dia(db_path)
+    return df if df is not None else _load_table(db_path, "entrada")
+
+
+def _load_saidas_dia(db_path: str) -> pd.DataFrame:
+    """Saídas já agregadas por dia (`agg_saidas_dia`); cai na tabela `saida` se não houver agregado."""
+    df = carregar_saidas_dia(db_path)
+    return df if df is not None else _load_table(db_path, "saida")
+
+
 def _load_entradas_saidas(db_path: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    df_entrada_raw = _load_table(db_path, "entrada")
-    df_saida_raw = _load_table(db_path, "saida")
+    # Os blocos do dashboard somam Valor por dia/mês/ano/usuário e contam vendas
+    # (soma de `qtd`): os agregados diários dão o mesmo resultado lendo poucas
+    # centenas de linhas.
+    df_entrada_raw = _load_vendas_dia(db_path)
+    df_saida_raw = _load_saidas_dia(db_path)
 
     if df_entrada_raw.empty:
         df_entrada_raw = df_utils.carregar_df_entrada()
@@ -202,13 +224,11 @@ def _load_vars_runtime(db_path: str):
 
 
 def _calc_monthly_metrics(db_path: str, ano: int, vars_dre) -> List[Dict]:
-    metrics: List[Dict] = []
-    for mes in range(1, 13):
-        try:
-            metrics.append(_calc_mes(db_path, ano, mes, vars_dre))
-        except Exception:
-            metrics.append({})
-    return metrics
+    try:
+        df_ano = calc_ano(db_path, ano, vars_dre)
+    except Exception:
+        return [{} for _ in range(12)]
+    return [_linha_mes(df_ano, mes) for mes in range(1, 13)]
 
 
 def _growth_mm(metrics: List[Dict], last_month: int) -> float:
@@ -374,7 +394,7 @@ def build_meta_mes_gauge_dashboard(pct_meta: float, valor_atual: float, valor_me
 def _calc_meta_mes_dashboard(db_path: str) -> Tuple[float, float, float]:
     hoje = hoje_br()
     ano, mes = hoje.year, hoje.month
-    df_ent = _normalize_df(_load_table(db_path, "entrada"))
+    df_ent = _normalize_df(_load_vendas_dia(db_path))
     if df_ent.empty:
         df_ent = _normalize_df(df_utils.carregar_df_entrada())
     valor_atual = float(df_ent[(df_ent["ano"] == ano) & (df_ent["mes"] == mes)]["Valor"].sum())
@@ -494,7 +514,7 @@ def render_metas_resumo_dashboard(db_path: str) -> None:
     inicio_mes = ref_day.replace(day=1)
     coluna_dia = _coluna_dia_dashboard(ref_day)
 
-    df_entrada = _normalize_df(_load_table(db_path, "entrada"))
+    df_entrada = _normalize_df(_load_vendas_dia(db_path))
     if df_entrada.empty:
         df_entrada = _normalize_df(df_utils.carregar_df_entrada())
     df_entrada["UsuarioUpper"] = df_entrada.get("Usuario", "LOJA").astype(str).str.upper()
@@ -828,9 +848,14 @@ def render_chips_principais(
         ]
     )
 
-    # Eficiência
-    n_v_mes = int(df.loc[mask_mes].shape[0])
-    n_v_ano = int(df.loc[mask_ano].shape[0])
+    # Eficiência — com o agregado diário, cada linha junta `qtd` vendas
+    def _n_vendas(mask: pd.Series) -> int:
+        if "qtd" in df.columns:
+            return int(pd.to_numeric(df.loc[mask, "qtd"], errors="coerce").fillna(0).sum())
+        return int(mask.sum())
+
+    n_v_mes = _n_vendas(mask_mes)
+    n_v_ano = _n_vendas(mask_ano)
     tk_mes = (vendas_mes / n_v_mes) if n_v_mes > 0 else 0.0
     tk_ano = (vendas_ano / n_v_ano) if n_v_ano > 0 else 0.0
 
@@ -2063,6 +2088,23 @@ def render_reposicao(df_mercadorias: pd.DataFrame, metrics: List[Dict], ano_repo
 from datetime import datetime
 from calendar import monthrange
 
+def _render_status_previsao(metricas: Dict) -> None:
+    """Data do cálculo da previsão; se um novo ajuste está rodando, recarrega quando terminar."""
+    calculado = str(metricas.get('calculado_em') or '')[:16]
+    if not metricas.get('atualizando'):
+        st.caption(f"Previsão calculada em {calculado}.")
+        return
+    st.caption(f"Previsão calculada em {calculado} · recalculando com os dados novos…")
+    chave = metricas.get('chave_previsao')
+
+    @st.fragment(run_every=5)
+    def _aguardar_previsao():
+        if not previsao_em_andamento(chave):
+            st.rerun()
+
+    _aguardar_previsao()
+
+
 def render_gestao_estoque_otb(db_path: str, metricas_atual: Optional[Dict] = None, df_previsoes: pd.DataFrame = None):
     import json
     # st.markdown("---") # Removido para evitar duplicidade de divisores e conflito visual
@@ -2125,7 +2167,6 @@ def render_gestao_estoque_otb(db_path: str, metricas_atual: Optional[Dict] = Non
     # 3. Cálculo do Orçamento de Compra (Weighted Logic)
     # -------------------------------------------------------------------------
     # Retrieve Global Markup
-    import sqlite3
     markup_global_val = 2.40
     try:
         with get_conn(db_path) as conn:
@@ -2367,7 +2408,7 @@ def render_dashboard(caminho_banco: Optional[str]):
         if not df_entrada.empty:
             with st.spinner("O Oráculo está consultando o Banco Central e prevendo o futuro..."):
                 # Passa o df_entrada BRUTO
-                fig_previsao, dados_futuros, metricas_atual = criar_grafico_previsao(df_entrada, meses_futuro)
+                fig_previsao, dados_futuros, metricas_atual = criar_grafico_previsao(df_entrada, meses_futuro, db_path)
             
             # --- NOVO: Exibir Comparativo do Mês Atual (Realizado vs Meta IA) ---
             if metricas_atual and metricas_atual.get('previsto', 0) > 0:
@@ -2431,6 +2472,8 @@ def render_dashboard(caminho_banco: Optional[str]):
 
             fig_previsao = _apply_simplified_view(fig_previsao, IS_MOBILE)
             st.plotly_chart(fig_previsao, use_container_width=True, config=_plotly_config(simplified=IS_MOBILE))
+            if metricas_atual and metricas_atual.get('calculado_em'):
+                _render_status_previsao(metricas_atual)
 
             # Tabela Detalhada (Transposta)
             st.markdown("##### Detalhamento da Previsão")
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Séries macroeconômicas (BCB/SIDRA) armazenadas localmente
+==========================================================
+
+Os regressores do Prophet (Selic, IPCA, câmbio, IBC-Br, confiança, PMC,
+desemprego, renda) vinham de chamadas síncronas a `bcb.sgs` e `sidrapy` a cada
+ajuste: a previsão dependia do tempo de resposta das APIs do governo e falhava
+offline. Aqui as séries ficam na tabela `macro_series` do próprio banco:
+
+- `atualizar_series()` busca, por série, apenas os meses a partir da última
+  observação gravada (a última é rebuscada, pois costuma ser revisada);
+- `agendar_atualizacao()` faz isso numa thread daemon, no máximo uma vez por
+  `INTERVALO_ATUALIZACAO`, fora do caminho da requisição;
+- `carregar_regressores()` monta o DataFrame mensal lido só do banco.
+
+As fontes são plugáveis: `atualizar_series(db, fontes={...})` aceita qualquer
+`{nome: fn(inicio) -> pd.Series mensal | None}` (ex.: uma fonte falsa em testes).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+from shared.db import conectar
+from shared.lazy_imports import disponivel
+
+# bcb/sidrapy só são importados pela thread de atualização (ver fontes abaixo)
+HAS_BCB = disponivel("bcb")
+HAS_SIDRAPY = disponivel("sidrapy")
+
+FonteMacro = Callable[[pd.Timestamp], Optional[pd.Series]]
+
+CODIGOS_BCB: Dict[str, int] = {
+    'selic': 432,
+    'ipca': 433,
+    'dolar': 1,
+    'pib_mensal': 24363,  # IBC-Br (Proxy do PIB)
+    'confianca': 4393,    # Índice de Confiança
+}
+# nome -> (tabela, variável, classificação)
+TABELAS_SIDRA: Dict[str, tuple] = {
+    'pmc': ("3416", "564", "11046/40311"),
+    'desemprego': ("6381", "4099", None),
+    'renda_media': ("6381", "5932", None),
+}
+SERIES = tuple(CODIGOS_BCB) + tuple(TABELAS_SIDRA)
+
+INICIO_PADRAO = pd.Timestamp("2021-01-01")   # 1ª carga (o Prophet filtra vendas >= 2022)
+INTERVALO_ATUALIZACAO = 12 * 3600            # segundos entre atualizações automáticas
+
+_LOCK = threading.Lock()
+_ULTIMA_TENTATIVA: Dict[str, float] = {}
+_EM_ANDAMENTO: Dict[str, threading.Thread] = {}
+
+
+# ================= FONTES (rede) =================
+def _fonte_bcb(codigo: int) -> FonteMacro:
+    def _buscar(inicio: pd.Timestamp) -> Optional[pd.Series]:
+        if not HAS_BCB:
+            return None
+        from bcb import sgs
+        df = sgs.get({'v': codigo}, start=inicio)
+        return df['v'].resample('MS').mean()
+    return _buscar
+
+
+def _fonte_sidra(table_code: str, variable: str, classification: Optional[str]) -> FonteMacro:
+    def _buscar(inicio: pd.Timestamp) -> Optional[pd.Series]:
+        if not HAS_SIDRAPY:
+            return None
+        import sidrapy
+        kwargs = dict(table_code=table_code, territorial_level="1", ibge_territorial_code="all", variable=variable)
+        if classification:
+            kwargs['classification'] = classification
+        raw = sidrapy.get_table(**kwargs)
+        if raw.empty or 'V' not in raw.columns:
+            return None
+        df = raw.iloc[1:].copy()
+        df['data'] = pd.to_datetime(df['D2C'], format="%Y%m", errors='coerce')
+        df = df.dropna(subset=['data'])
+        s = pd.to_numeric(df.set_index('data')['V'], errors='coerce').resample('MS').mean()
+        return s[s.index >= inicio]
+    return _buscar
+
+
+def fontes_padrao() -> Dict[str, FonteMacro]:
+    """Fontes reais: SGS do Banco Central e SIDRA do IBGE."""
+    fontes: Dict[str, FonteMacro] = {nome: _fonte_bcb(cod) for nome, cod in CODIGOS_BCB.items()}
+    fontes.update({nome: _fonte_sidra(*args) for nome, args in TABELAS_SIDRA.items()})
+    return fontes
+
+
+# ================= ARMAZENAMENTO =================
+def _init_tabela(conn) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS macro_series (
+            serie TEXT NOT NULL,
+            mes TEXT NOT NULL,          -- YYYY-MM-01
+            valor REAL,
+            atualizado_em DATETIME,
+            PRIMARY KEY (serie, mes)
+        );
+    """)
+
+
+def ultimas_observacoes(db_path: str) -> Dict[str, pd.Timestamp]:
+    """{serie: último mês gravado}."""
+    with conectar(db_path) as conn:
+        _init_tabela(conn)
+        rows = conn.execute("SELECT serie, MAX(mes) FROM macro_series GROUP BY serie").fetchall()
+    return {str(s): pd.Timestamp(m) for s, m in rows if m}
+
+
+def atualizar_series(db_path: str, fontes: Optional[Dict[str, FonteMacro]] = None) -> Dict[str, int]:
+    """
+    Busca incrementalmente cada série e grava em `macro_series`.
+    Retorna {serie: meses gravados}; falha de uma fonte não afeta as demais (-1).
+    """
+    fontes = fontes_padrao() if fontes is None else fontes
+    ultimas = ultimas_observacoes(db_path)
+    agora = datetime.now()
+    resultado: Dict[str, int] = {}
+    for nome, fonte in fontes.items():
+        inicio = ultimas.get(nome, INICIO_PADRAO)
+        try:
+            s = fonte(inicio)
+        except Exception as e:
+            print(f"Erro ao atualizar série macro {nome}: {e}")
+            resultado[nome] = -1
+            continue
+        if s is None:
+            resultado[nome] = 0
+            continue
+        s = pd.to_numeric(s, errors='coerce').dropna()
+        s = s[s.index >= inicio]
+        linhas = [(nome, pd.Timestamp(d).strftime('%Y-%m-01'), float(v), agora) for d, v in s.items()]
+        with conectar(db_path) as conn:
+            _init_tabela(conn)
+            conn.executemany(
+                "INSERT OR REPLACE INTO macro_series (serie, mes, valor, atualizado_em) VALUES (?, ?, ?, ?)",
+                linhas,
+            )
+            conn.commit()
+        resultado[nome] = len(linhas)
+    return resultado
+
+
+def agendar_atualizacao(db_path: str, fontes: Optional[Dict[str, FonteMacro]] = None,
+                        intervalo: float = INTERVALO_ATUALIZACAO) -> bool:
+    """
+    Dispara `atualizar_series` numa thread daemon se a última tentativa (neste
+    processo) tiver mais de `intervalo` segundos. Não bloqueia. Retorna True se
+    agendou.
+    """
+    if not db_path:
+        return False
+    with _LOCK:
+        t = _EM_ANDAMENTO.get(db_path)
+        if t is not None and t.is_alive():
+            return False
+        if time.time() - _ULTIMA_TENTATIVA.get(db_path, 0.0) < intervalo:
+            return False
+        _ULTIMA_TENTATIVA[db_path] = time.time()
+
+        def _rodar():
+            try:
+                atualizar_series(db_path, fontes)
+            except Exception as e:
+                print(f"Erro ao atualizar séries macro: {e}")
+
+        t = threading.Thread(target=_rodar, name="flowdash-macro", daemon=True)
+        _EM_ANDAMENTO[db_path] = t
+        t.start()
+    return True
+
+
+def carregar_regressores(db_path: Optional[str], data_inicio: pd.Timestamp, meses_futuro: int) -> pd.DataFrame:
+    """
+    DataFrame mensal (índice MS) com uma coluna por série, lido só do banco, no
+    mesmo formato que o Prophet espera: de `data_inicio - 6 meses` até
+    `hoje + meses_futuro + 6`, com ffill/bfill e zeros onde não há dado.
+    """
+    hoje = pd.Timestamp.now().normalize()
+    data_fim = hoje + pd.DateOffset(months=meses_futuro + 6)
+    start_date = (data_inicio - pd.DateOffset(months=6)).replace(day=1)
+
+    df = pd.DataFrame(columns=list(SERIES), dtype=float)
+    if db_path:
+        try:
+            with conectar(db_path) as conn:
+                _init_tabela(conn)
+                rows = conn.execute(
+                    "SELECT serie, mes, valor FROM macro_series WHERE mes >= ?", (start_date.strftime('%Y-%m-01'),)
+                ).fetchall()
+            if rows:
+                longo = pd.DataFrame(rows, columns=['serie', 'mes', 'valor'])
+                longo['mes'] = pd.to_datetime(longo['mes'])
+                df = longo.pivot(index='mes', columns='serie', values='valor').reindex(columns=list(SERIES))
+        except Exception as e:
+            print(f"Erro ao ler séries macro: {e}")
+
+    inicio_idx = min(start_date, df.index.min()) if len(df.index) else start_date
+    idx_full = pd.date_range(start=inicio_idx, end=data_fim, freq='MS')
+    df = df.reindex(idx_full)
+    return df.ffill().bfill().fillna(0).infer_objects(copy=False)
+
+
+__all__ = [
+    "SERIES",
+    "fontes_padrao",
+    "atualizar_series",
+    "agendar_atualizacao",
+    "carregar_regressores",
+    "ultimas_observacoes",
+]
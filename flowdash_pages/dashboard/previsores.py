@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Backends de previsão mensal (plugáveis)
+=======================================
+
+Todo previsor recebe a série mensal `df_treino[ds, y]`, o horizonte e os
+regressores macro (opcionais) e devolve um DataFrame `ds, yhat, yhat_lower,
+yhat_upper` cobrindo os meses do treino **e** `meses_futuro + 1` meses à
+frente — o mesmo formato que o `prophet_engine` sempre usou.
+
+Backends
+--------
+- ``"prophet"``: Prophet com feriados BR e regressores Selic/IPCA/desemprego.
+  Importa `prophet`/cmdstanpy só quando usado (segundos de import e de ajuste).
+- ``"numpy"``: Holt-Winters aditivo com tendência amortecida (ETS A,Ad,A),
+  parâmetros escolhidos por grade vetorizada em NumPy e intervalos por
+  *bootstrap* dos resíduos centrados; o `yhat` futuro é a mediana dos
+  caminhos (sempre dentro da faixa). Ignora os regressores. Ajusta em
+  milissegundos.
+
+Seleção (por instalação): variável `FLOWDASH_PREVISOR` ou
+`st.secrets["previsao"]["backend"]`; sem configuração usa Prophet se instalado,
+senão NumPy. Novos backends: `registrar_previsor("nome", Classe)`.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, Optional, Protocol, Type
+
+import numpy as np
+import pandas as pd
+
+from shared.lazy_imports import disponivel
+
+HAS_PROPHET = disponivel("prophet")
+INTERVALO_CONFIANCA = 0.80   # mesmo default do Prophet (interval_width)
+
+
+class Previsor(Protocol):
+    nome: str
+    versao: str
+
+    def prever(self, df_treino: pd.DataFrame, meses_futuro: int,
+               regressores_macro: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        ...
+
+
+def _datas_futuras(df_treino: pd.DataFrame, meses_futuro: int) -> pd.DatetimeIndex:
+    return pd.date_range(df_treino['ds'].min(), periods=len(df_treino) + meses_futuro + 1, freq='MS')
+
+
+# ================= PROPHET =================
+class PrevisorProphet:
+    nome = "prophet"
+    versao = "1"
+    regressores_alvo = ('selic', 'ipca', 'desemprego')
+
+    def prever(self, df_treino: pd.DataFrame, meses_futuro: int,
+               regressores_macro: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        from prophet import Prophet  # import tardio: cmdstanpy custa segundos no cold start
+
+        df_prophet = df_treino[['ds', 'y']].copy()
+        if regressores_macro is not None:
+            df_prophet = df_prophet.merge(regressores_macro, left_on='ds', right_index=True, how='left')
+        df_prophet = df_prophet.ffill().bfill().fillna(0).infer_objects(copy=False)
+
+        modelo = Prophet(
+            yearly_seasonality=True,
+            weekly_seasonality=False,
+            daily_seasonality=False,
+            growth='linear',
+            seasonality_prior_scale=20.0
+        )
+        modelo.add_country_holidays(country_name='BR')
+        for reg in self.regressores_alvo:
+            if reg in df_prophet.columns:
+                modelo.add_regressor(reg)
+        modelo.fit(df_prophet)
+
+        futuro = modelo.make_future_dataframe(periods=meses_futuro + 1, freq='MS')
+        if regressores_macro is not None:
+            futuro = futuro.merge(regressores_macro, left_on='ds', right_index=True, how='left')
+        futuro = futuro.ffill().bfill().fillna(0).infer_objects(copy=False)
+
+        previsao = modelo.predict(futuro)
+        return previsao[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].copy()
+
+
+# ================= NUMPY (ETS A,Ad,A) =================
+class PrevisorNumpy:
+    nome = "numpy"
+    versao = "2"
+    periodo = 12
+    simulacoes = 1000
+    semente = 0                  # determinístico: mesma série -> mesma previsão (cache)
+    grade_alpha = (0.1, 0.3, 0.5, 0.7, 0.9)
+    grade_beta = (0.01, 0.05, 0.1, 0.2)
+    grade_gamma = (0.01, 0.1, 0.3)
+    grade_phi = (0.8, 0.9, 0.98)
+
+    def _grade(self, sazonal: bool) -> np.ndarray:
+        gammas = self.grade_gamma if sazonal else (0.0,)
+        g = np.array(np.meshgrid(self.grade_alpha, self.grade_beta, gammas, self.grade_phi, indexing='ij'))
+        return g.reshape(4, -1)
+
+    def _estados_iniciais(self, y: np.ndarray, m: int):
+        if m > 1:
+            nivel = y[:m].mean()
+            tendencia = (y[m:2 * m].mean() - nivel) / m
+            sazonal = y[:m] - nivel
+        else:
+            nivel = y[0]
+            tendencia = (y[-1] - y[0]) / max(len(y) - 1, 1)
+            sazonal = np.zeros(1)
+        return nivel, tendencia, sazonal
+
+    def _filtrar(self, y: np.ndarray, m: int, params: np.ndarray):
+        """Roda a recursão para todas as combinações de parâmetros de uma vez (eixo 0 = combinação)."""
+        alpha, beta, gamma, phi = params
+        n_comb = params.shape[1]
+        l0, b0, s0 = self._estados_iniciais(y, m)
+        nivel = np.full(n_comb, l0)
+        tend = np.full(n_comb, b0)
+        saz = np.tile(s0, (n_comb, 1))
+        ajustado = np.empty((n_comb, len(y)))
+        for t, yt in enumerate(y):
+            s = saz[:, t % m]
+            ajustado[:, t] = nivel + phi * tend + s
+            novo_nivel = alpha * (yt - s) + (1 - alpha) * (nivel + phi * tend)
+            tend = beta * (novo_nivel - nivel) + (1 - beta) * phi * tend
+            saz[:, t % m] = gamma * (yt - novo_nivel) + (1 - gamma) * s
+            nivel = novo_nivel
+        return ajustado, nivel, tend, saz
+
+    def prever(self, df_treino: pd.DataFrame, meses_futuro: int,
+               regressores_macro: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        y = df_treino['y'].to_numpy(dtype=float)
+        n = len(y)
+        h = int(meses_futuro) + 1
+        m = self.periodo if n >= 2 * self.periodo else 1
+
+        params = self._grade(m > 1)
+        ajustado, nivel, tend, saz = self._filtrar(y, m, params)
+        inicio = m if m > 1 else 1   # o 1º ciclo só inicializa os estados
+        sse = ((ajustado[:, inicio:] - y[inicio:]) ** 2).sum(axis=1)
+        k = int(np.argmin(sse))
+        alpha, beta, gamma, phi = params[:, k]
+        residuos = (y - ajustado[k])[inicio:]
+        if residuos.size == 0:
+            residuos = np.zeros(1)
+        residuos = residuos - residuos.mean()   # viés do ajuste não desloca os caminhos
+
+        # caminhos simulados com resíduos reamostrados (vetorizado nas simulações)
+        rng = np.random.default_rng(self.semente)
+        S = self.simulacoes
+        l = np.full(S, nivel[k])
+        b = np.full(S, tend[k])
+        s = np.tile(saz[k], (S, 1))
+        caminhos = np.empty((S, h))
+        for i in range(h):
+            j = (n + i) % m
+            e = rng.choice(residuos, size=S)
+            yt = l + phi * b + s[:, j] + e
+            caminhos[:, i] = yt
+            novo_l = alpha * (yt - s[:, j]) + (1 - alpha) * (l + phi * b)
+            b = beta * (novo_l - l) + (1 - beta) * phi * b
+            s[:, j] = gamma * (yt - novo_l) + (1 - gamma) * s[:, j]
+            l = novo_l
+
+        q = (1 - INTERVALO_CONFIANCA) / 2
+        inf_fut, pontual, sup_fut = np.quantile(caminhos, [q, 0.5, 1 - q], axis=0)
+        dp = residuos.std()
+        z = 1.2815515655446004   # quantil 90% da normal (intervalo de 80% no histórico)
+
+        ds = _datas_futuras(df_treino, meses_futuro)
+        yhat = np.concatenate([ajustado[k], pontual])
+        return pd.DataFrame({
+            'ds': ds,
+            'yhat': yhat,
+            'yhat_lower': np.concatenate([ajustado[k] - z * dp, inf_fut]),
+            'yhat_upper': np.concatenate([ajustado[k] + z * dp, sup_fut]),
+        })
+
+
+# ================= REGISTRO / SELEÇÃO =================
+_REGISTRO: Dict[str, Type] = {
+    PrevisorProphet.nome: PrevisorProphet,
+    PrevisorNumpy.nome: PrevisorNumpy,
+}
+
+
+def registrar_previsor(nome: str, classe: Type) -> None:
+    """Adiciona (ou substitui) um backend pelo nome."""
+    _REGISTRO[str(nome).lower()] = classe
+
+
+def previsores_disponiveis() -> Dict[str, Type]:
+    """Backends registrados e utilizáveis nesta instalação."""
+    return {k: v for k, v in _REGISTRO.items() if k != PrevisorProphet.nome or HAS_PROPHET}
+
+
+def _backend_configurado() -> str:
+    nome = (os.getenv("FLOWDASH_PREVISOR") or "").strip()
+    if not nome:
+        try:
+            import streamlit as st  # import tardio para não quebrar CLI
+            nome = str(dict(st.secrets.get("previsao", {})).get("backend", "") or "").strip()
+        except Exception:
+            nome = ""
+    return nome.lower()
+
+
+def obter_previsor(nome: Optional[str] = None) -> Previsor:
+    """
+    Instancia o backend `nome` (ou o configurado). Prophet pedido mas não
+    instalado cai para NumPy.
+    """
+    nome = (nome or _backend_configurado() or (PrevisorProphet.nome if HAS_PROPHET else PrevisorNumpy.nome)).lower()
+    disponiveis = previsores_disponiveis()
+    if nome not in disponiveis:
+        print(f"AVISO: previsor '{nome}' indisponível; usando '{PrevisorNumpy.nome}'.")
+        nome = PrevisorNumpy.nome
+    return disponiveis[nome]()
+
+
+__all__ = [
+    "Previsor",
+    "PrevisorProphet",
+    "PrevisorNumpy",
+    "registrar_previsor",
+    "previsores_disponiveis",
+    "obter_previsor",
+]
@@ -1,32 +1,22 @@
+from __future__ import annotations
+
 import pandas as pd
 pd.set_option('future.no_silent_downcasting', True)
-import plotly.graph_objects as go
-import streamlit as st
-import sqlite3
+import hashlib
+import json
+import math
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime
-from typing import Tuple, Optional, Dict
-
-# Tenta importar Prophet
-try:
-    from prophet import Prophet
-    HAS_PROPHET = True
-except ImportError:
-    Prophet = None
-    HAS_PROPHET = False
-    print("AVISO: Prophet não instalado. Previsões desativadas.")
-
-# Tenta importar bibliotecas de dados macro
-try:
-    from bcb import sgs
-    HAS_BCB = True
-except ImportError:
-    HAS_BCB = False
-
-try:
-    import sidrapy
-    HAS_SIDRAPY = True
-except ImportError:
-    HAS_SIDRAPY = False
+from typing import Callable, Tuple, Optional, Dict
+from shared.db import conectar, get_db_path
+from flowdash_pages.dashboard.macro_series import agendar_atualizacao, carregar_regressores
+from flowdash_pages.dashboard.previsores import obter_previsor
+from shared.lazy_imports import modulo_tardio
+from shared.schema_cache import garantir_coluna
+
+go = modulo_tardio("plotly.graph_objects")
 
 # ================= HELPER DE BANCO DE DADOS (PERSISTÊNCIA) =================
 def _init_tabela_previsoes(conn):
@@ -47,7 +37,7 @@ def _buscar_previsao_congelada(db_path: str, mes_ref: str) -> Optional[Dict]:
     """Busca se já existe uma meta congelada para aquele mês."""
     if not db_path: return None
     try:
-        with sqlite3.connect(db_path) as conn:
+        with conectar(db_path) as conn:
             _init_tabela_previsoes(conn)
             cursor = conn.cursor()
             cursor.execute("SELECT realista, pessimista, otimista FROM historico_previsoes_ia WHERE mes_referencia = ?", (mes_ref,))
@@ -67,7 +57,7 @@ def _salvar_previsao_congelada(db_path: str, mes_ref: str, dados: Dict):
     """Salva a previsão para não mudar mais."""
     if not db_path: return
     try:
-        with sqlite3.connect(db_path) as conn:
+        with conectar(db_path) as conn:
             _init_tabela_previsoes(conn)
             cursor = conn.cursor()
             cursor.execute("""
@@ -78,114 +68,241 @@ def _salvar_previsao_congelada(db_path: str, mes_ref: str, dados: Dict):
     except Exception as e:
         print(f"Erro ao salvar previsão: {e}")
 
-# ================= LÓGICA MACROECONÔMICA =================
-def _buscar_regressores_macro(data_inicio: pd.Timestamp, meses_futuro: int) -> pd.DataFrame:
+# ================= CACHE PERSISTENTE DE PREVISÕES =================
+# O ajuste (Prophet/Stan) custa segundos. O resultado fica gravado no próprio
+# banco, indexado por uma "impressão digital" da série mensal + horizonte +
+# regressores + backend (nome-versão, ver `previsores`): a próxima visita (mesmo
+# após reiniciar o processo ou limpar o st.cache_data) só refaz o ajuste se
+# algum agregado mensal mudou.
+MAX_PREVISOES_CACHE = 60        # linhas mantidas em cache_previsoes_ia
+TOLERANCIA_MES_PARCIAL = 0.05   # variação do mês corrente que justifica novo ajuste
+
+def _init_tabela_cache_previsoes(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cache_previsoes_ia (
+            chave TEXT PRIMARY KEY,      -- impressão digital (sha256)
+            mes_referencia TEXT,         -- YYYY-MM do cálculo
+            meses_futuro INTEGER,
+            previsao TEXT,               -- JSON: ds, yhat, yhat_lower, yhat_upper
+            historico TEXT,              -- JSON: ds, y (série usada no treino)
+            data_calculo DATETIME,
+            backend TEXT                 -- nome do previsor (fallback "stale" só do mesmo backend)
+        );
+    """)
+    garantir_coluna(conn, "cache_previsoes_ia", "backend")  # bancos com a tabela antiga
+
+def _impressao_digital(df_treino: pd.DataFrame, meses_futuro: int, regressores_macro: Optional[pd.DataFrame],
+                       hoje: pd.Timestamp, modelo: str) -> str:
     """
-    Busca os indicadores macroeconômicos combinados.
+    Chave do cache. Meses fechados entram pelo valor exato (centavos); o mês
+    corrente, ainda parcial, entra em faixas de ~5% (`TOLERANCIA_MES_PARCIAL`):
+    cada venda do dia não refaz o ajuste, só uma variação relevante do mês.
     """
-    hoje = pd.Timestamp.now().normalize()
-    data_fim = hoje + pd.DateOffset(months=meses_futuro + 6)
-    start_date = data_inicio - pd.DateOffset(months=6) # Margem de segurança
-
-    codigos_bcb = {
-        'selic': 432,
-        'ipca': 433,
-        'dolar': 1,
-        'pib_mensal': 24363, # IBC-Br (Proxy do PIB)
-        'confianca': 4393    # Índice de Confiança
-    }
-    
-    try:
-        if HAS_BCB:
-            df_macro = sgs.get(codigos_bcb, start=start_date)
-            df_macro = df_macro.resample('MS').mean()
+    mes_atual = hoje.replace(day=1)
+    serie = []
+    for d, v in zip(df_treino['ds'], df_treino['y']):
+        v = float(v)
+        if d < mes_atual:
+            serie.append([d.strftime('%Y-%m'), round(v, 2)])
         else:
-            raise ImportError("BCB nao instalado")
-    except Exception:
-        idx = pd.date_range(start=start_date, end=hoje, freq='MS')
-        df_macro = pd.DataFrame(index=idx, columns=codigos_bcb.keys())
+            faixa = math.floor(math.log(v, 1 + TOLERANCIA_MES_PARCIAL)) if v > 0 else -1
+            serie.append([d.strftime('%Y-%m'), 'parcial', faixa])
+    h = hashlib.sha256()
+    h.update(json.dumps([modelo, int(meses_futuro), mes_atual.strftime('%Y-%m'), serie]).encode())
+    if regressores_macro is not None and not regressores_macro.empty:
+        reg = regressores_macro.apply(pd.to_numeric, errors='coerce').round(6)
+        h.update(pd.util.hash_pandas_object(reg, index=True).values.tobytes())
+    return h.hexdigest()
+
+def _df_para_json(df: pd.DataFrame) -> str:
+    out = df.copy()
+    out['ds'] = pd.to_datetime(out['ds']).dt.strftime('%Y-%m-%d')
+    return out.to_json(orient='split', index=False)
+
+def _df_de_json(txt: str) -> pd.DataFrame:
+    d = json.loads(txt)
+    df = pd.DataFrame(d['data'], columns=d['columns'])
+    df['ds'] = pd.to_datetime(df['ds'])
+    return df
+
+def _buscar_previsao_cache(db_path: str, chave: str, meses_futuro: Optional[int] = None,
+                           backend: Optional[str] = None
+                           ) -> Optional[Tuple[pd.DataFrame, pd.DataFrame, str, bool]]:
+    """
+    (previsao, historico, data_calculo, exata). Sem entrada para `chave`, e se
+    `meses_futuro` e `backend` forem informados, devolve a mais recente desse
+    horizonte e backend (`exata=False`) — o "stale" do stale-while-revalidate.
+    """
+    if not db_path: return None
+    try:
+        with conectar(db_path) as conn:
+            _init_tabela_cache_previsoes(conn)
+            row = conn.execute(
+                "SELECT previsao, historico, data_calculo FROM cache_previsoes_ia WHERE chave = ?", (chave,)
+            ).fetchone()
+            exata = row is not None
+            if row is None and meses_futuro is not None and backend:
+                row = conn.execute("""
+                    SELECT previsao, historico, data_calculo FROM cache_previsoes_ia
+                     WHERE meses_futuro = ? AND backend = ? ORDER BY data_calculo DESC LIMIT 1
+                """, (int(meses_futuro), backend)).fetchone()
+            if row:
+                return _df_de_json(row[0]), _df_de_json(row[1]), str(row[2] or ""), exata
+    except Exception as e:
+        print(f"Erro ao ler cache de previsão: {e}")
+    return None
+
+def _salvar_previsao_cache(db_path: str, chave: str, mes_ref: str, meses_futuro: int,
+                           previsao: pd.DataFrame, historico: pd.DataFrame, backend: str):
+    if not db_path: return
+    try:
+        with conectar(db_path) as conn:
+            _init_tabela_cache_previsoes(conn)
+            conn.execute("""
+                INSERT OR REPLACE INTO cache_previsoes_ia
+                    (chave, mes_referencia, meses_futuro, previsao, historico, data_calculo, backend)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (chave, mes_ref, int(meses_futuro), _df_para_json(previsao), _df_para_json(historico),
+                  datetime.now(), backend))
+            conn.execute("""
+                DELETE FROM cache_previsoes_ia WHERE chave NOT IN (
+                    SELECT chave FROM cache_previsoes_ia ORDER BY data_calculo DESC LIMIT ?
+                )
+            """, (MAX_PREVISOES_CACHE,))
+            conn.commit()
+    except Exception as e:
+        print(f"Erro ao salvar cache de previsão: {e}")
+
+# ================= TREINO EM SEGUNDO PLANO =================
+# O ajuste roda num ProcessPoolExecutor (Stan fora do processo do Streamlit).
+# Enquanto isso a página mostra a última previsão gravada, com a data do
+# cálculo, e troca pela nova quando ela fica pronta. Sessões simultâneas
+# compartilham o mesmo job por impressão digital (`_EM_ANDAMENTO`).
+MAX_PROCESSOS_PREVISAO = 1
 
-    # Dados do IBGE (Sidrapy)
-    def buscar_sidra(table_code, variable, classification=None):
-        if not HAS_SIDRAPY:
-            return None
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+_EM_ANDAMENTO: Dict[str, Future] = {}
+
+def _job_ajuste(nome_previsor: str, df_treino: pd.DataFrame, meses_futuro: int,
+                regressores_macro: Optional[pd.DataFrame]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Executado no processo filho: só o necessário volta (ds/yhat/limites e o histórico)."""
+    previsao = obter_previsor(nome_previsor).prever(df_treino, meses_futuro, regressores_macro)
+    return previsao[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].copy(), df_treino[['ds', 'y']].copy()
+
+def _pool() -> Optional[ProcessPoolExecutor]:
+    global _POOL
+    if _POOL is None:
         try:
-            if classification:
-                raw = sidrapy.get_table(table_code=table_code, territorial_level="1", ibge_territorial_code="all", variable=variable, classification=classification)
+            # spawn: o processo do Streamlit tem threads; fork herdaria locks travados
+            _POOL = ProcessPoolExecutor(max_workers=MAX_PROCESSOS_PREVISAO,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        except Exception as e:
+            print(f"Pool de previsão indisponível, treinando no processo atual: {e}")
+    return _POOL
+
+def _agendar_ajuste(chave: str, nome_previsor: str, df_treino: pd.DataFrame, meses_futuro: int,
+                    regressores_macro: Optional[pd.DataFrame],
+                    ao_concluir: Callable[[pd.DataFrame, pd.DataFrame], None]) -> Future:
+    """Job único por `chave`; `ao_concluir(previsao, historico)` grava o resultado antes de liberar a chave."""
+    global _POOL
+    with _POOL_LOCK:
+        fut = _EM_ANDAMENTO.get(chave)
+        if fut is not None:
+            return fut
+        pool = _pool()
+        if pool is not None:
+            try:
+                fut = pool.submit(_job_ajuste, nome_previsor, df_treino, meses_futuro, regressores_macro)
+            except Exception as e:  # ex.: pool quebrado por um filho que morreu
+                print(f"Erro ao agendar previsão: {e}")
+                _POOL, fut = None, None
+        if fut is None:
+            fut = Future()
+            try:
+                fut.set_result(_job_ajuste(nome_previsor, df_treino, meses_futuro, regressores_macro))
+            except Exception as e:
+                fut.set_exception(e)
+        _EM_ANDAMENTO[chave] = fut
+
+    def _concluir(f: Future) -> None:
+        try:
+            if f.exception() is None:
+                ao_concluir(*f.result())
             else:
-                raw = sidrapy.get_table(table_code=table_code, territorial_level="1", ibge_territorial_code="all", variable=variable)
-            
-            if not raw.empty and 'V' in raw.columns:
-                df = raw.iloc[1:].copy()
-                df['data'] = pd.to_datetime(df['D2C'], format="%Y%m", errors='coerce')
-                df = df.dropna(subset=['data'])
-                s = df.set_index('data')['V'].astype(float)
-                return s.resample('MS').mean()
-        except:
-            return None
-        return None
-
-    s_pmc = buscar_sidra("3416", "564", "11046/40311")
-    if s_pmc is not None: df_macro['pmc'] = s_pmc
-    else: df_macro['pmc'] = 0
-
-    s_desemprego = buscar_sidra("6381", "4099") 
-    if s_desemprego is not None: df_macro['desemprego'] = s_desemprego
-    else: df_macro['desemprego'] = 0
-
-    s_renda = buscar_sidra("6381", "5932")
-    if s_renda is not None: df_macro['renda_media'] = s_renda
-    else: df_macro['renda_media'] = 0
-
-    # Consolidação
-    idx_full = pd.date_range(start=df_macro.index.min(), end=data_fim, freq='MS')
-    df_macro = df_macro.reindex(idx_full)
-    df_macro = df_macro.ffill().bfill().fillna(0).infer_objects(copy=False)
-    
-    return df_macro
+                print(f"ERRO PROPHET (segundo plano): {f.exception()}")
+        finally:
+            with _POOL_LOCK:
+                if _EM_ANDAMENTO.get(chave) is f:
+                    del _EM_ANDAMENTO[chave]
 
-# ================= MOTOR PROPHET =================
-def _treinar_e_prever_prophet(df_treino, meses_futuro, regressores_macro=None):
-    """Função interna isolada para treinar o modelo."""
-    if df_treino.empty: return None, None
-    
-    data_inicio = df_treino['ds'].min()
-    # Busca macro apenas se não foi passado
-    if regressores_macro is None:
-        regressores_macro = _buscar_regressores_macro(data_inicio, meses_futuro)
-    
-    df_prophet = df_treino.merge(regressores_macro, left_on='ds', right_index=True, how='left')
-    df_prophet = df_prophet.ffill().bfill().fillna(0).infer_objects(copy=False)
-    
-    modelo = Prophet(
-        yearly_seasonality=True, 
-        weekly_seasonality=False, 
-        daily_seasonality=False, 
-        growth='linear',
-        seasonality_prior_scale=20.0
-    )
-    modelo.add_country_holidays(country_name='BR')
-    
-    regressores_alvo = ['selic', 'ipca', 'desemprego']
-    for reg in regressores_alvo:
-        if reg in df_prophet.columns:
-            modelo.add_regressor(reg)
-            
-    modelo.fit(df_prophet)
-    
-    futuro = modelo.make_future_dataframe(periods=meses_futuro + 1, freq='MS')
-    futuro = futuro.merge(regressores_macro, left_on='ds', right_index=True, how='left')
-    futuro = futuro.ffill().bfill().fillna(0).infer_objects(copy=False)
-    
-    previsao = modelo.predict(futuro)
-    return previsao, df_prophet 
+    fut.add_done_callback(_concluir)
+    return fut
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def criar_grafico_previsao(df_vendas_bruto: pd.DataFrame, meses_futuro: int = 12, db_path: str = None) -> Tuple[go.Figure, pd.DataFrame, Dict]:
-    if not HAS_PROPHET:
-        fig = go.Figure()
-        fig.add_annotation(text="Instale 'prophet' (pip install prophet)", showarrow=False, font=dict(color="red"))
-        return fig, pd.DataFrame(), {}
+def previsao_em_andamento(chave: str) -> bool:
+    """True enquanto o job da impressão digital `chave` não terminou."""
+    with _POOL_LOCK:
+        return chave in _EM_ANDAMENTO
+
+def _prever_com_cache(db_path: Optional[str], nome_previsor: str, df_treino: pd.DataFrame, meses_futuro: int,
+                      regressores_macro: Optional[pd.DataFrame], aguardar: bool = False
+                      ) -> Tuple[pd.DataFrame, pd.DataFrame, Dict]:
+    """
+    Retorna (previsao[ds, yhat, yhat_lower, yhat_upper], historico[ds, y], info).
+
+    Com a impressão digital no cache, responde direto. Senão agenda o ajuste em
+    segundo plano e devolve a última previsão gravada do mesmo horizonte
+    (`info['atualizando'] = True`); só espera o job se não houver nenhuma
+    gravada ou se `aguardar=True`.
+    """
+    hoje = pd.Timestamp.now().normalize()
+    previsor = obter_previsor(nome_previsor)
+    chave = _impressao_digital(df_treino, meses_futuro, regressores_macro, hoje, f"{previsor.nome}-{previsor.versao}")
+    chave_job = f"{db_path}:{chave}"
+    salvo = _buscar_previsao_cache(db_path, chave, meses_futuro, previsor.nome)
+    if salvo is not None and salvo[3]:
+        previsao, historico, calculado_em, _ = salvo
+        # o histórico exibido usa sempre os valores atuais (o mês parcial pode ter andado)
+        historico = historico[['ds']].merge(df_treino[['ds', 'y']], on='ds', how='left').fillna(0)
+        return previsao, historico, {'calculado_em': calculado_em, 'atualizando': False, 'chave': chave_job}
+
+    def _gravar(previsao: pd.DataFrame, historico: pd.DataFrame) -> None:
+        _salvar_previsao_cache(db_path, chave, hoje.strftime('%Y-%m'), meses_futuro, previsao, historico,
+                               previsor.nome)
+
+    fut = _agendar_ajuste(chave_job, previsor.nome, df_treino, meses_futuro, regressores_macro, _gravar)
+    if salvo is not None and not aguardar and not fut.done():
+        previsao, _, calculado_em, _ = salvo
+        return previsao, df_treino[['ds', 'y']].copy(), {'calculado_em': calculado_em, 'atualizando': True,
+                                                          'chave': chave_job}
+
+    # cópias: o callback de gravação pode estar serializando os mesmos objetos em outra thread
+    previsao, historico = (df.copy() for df in fut.result())
+    return previsao, historico, {'calculado_em': str(datetime.now()), 'atualizando': False, 'chave': chave_job}
+
+# ================= LÓGICA MACROECONÔMICA =================
+def _buscar_regressores_macro(data_inicio: pd.Timestamp, meses_futuro: int, db_path: str = None) -> pd.DataFrame:
+    """
+    Indicadores macroeconômicos combinados, lidos da tabela local `macro_series`.
+    A atualização pela rede (BCB/SIDRA) roda em segundo plano (ver `macro_series`).
+    """
+    db_path = db_path or get_db_path()
+    agendar_atualizacao(db_path)
+    return carregar_regressores(db_path, data_inicio, meses_futuro)
+
+def criar_grafico_previsao(df_vendas_bruto: pd.DataFrame, meses_futuro: int = 12, db_path: str = None,
+                           aguardar: bool = False) -> Tuple[go.Figure, pd.DataFrame, Dict]:
+    """
+    Gráfico + previsões futuras + métricas do mês atual.
+
+    Sem st.cache_data: o ajuste fica no cache persistente e roda em segundo
+    plano. `metricas['calculado_em']`/`['atualizando']` indicam se a previsão
+    exibida é a última gravada enquanto uma nova é calculada; `aguardar=True`
+    espera o ajuste (inclusive a meta congelada do mês).
+    O backend (Prophet/NumPy) vem da configuração, ver `previsores.obter_previsor`.
+    """
+    db_path = db_path or get_db_path()
+    nome_previsor = obter_previsor().nome
 
     # --- Tratamento Inicial ---
     if df_vendas_bruto.empty: return go.Figure(), pd.DataFrame(), {}
@@ -225,6 +342,12 @@ def criar_grafico_previsao(df_vendas_bruto: pd.DataFrame, meses_futuro: int = 12
     valor_realizado = float(df_real_atual['y'].iloc[0]) if not df_real_atual.empty else 0.0
     metricas_mes_atual['realizado'] = valor_realizado
 
+    # Regressores macro: uma única busca serve aos dois ajustes abaixo
+    try:
+        regressores_macro = _buscar_regressores_macro(df_mensal['ds'].min(), meses_futuro, db_path)
+    except Exception:
+        regressores_macro = None
+
     # Busca a Meta (congelada ou calcula agora com dados passados)
     meta_congelada = _buscar_previsao_congelada(db_path, mes_ref_str)
     
@@ -237,23 +360,27 @@ def criar_grafico_previsao(df_vendas_bruto: pd.DataFrame, meses_futuro: int = 12
         df_treino_passado = df_mensal[df_mensal['ds'] < data_mes_atual].copy()
         
         if len(df_treino_passado) >= 6:
-            try:
-                # Prevemos apenas o próximo passo (mês atual)
-                prev_temp, _ = _treinar_e_prever_prophet(df_treino_passado, 1, None)
+            def _congelar(prev_temp: pd.DataFrame, _hist: pd.DataFrame) -> None:
                 row_prev = prev_temp[prev_temp['ds'] == data_mes_atual]
-                
                 if not row_prev.empty:
-                    dados_save = {
+                    # SALVA NO BANCO PARA SEMPRE
+                    _salvar_previsao_congelada(db_path, mes_ref_str, {
                         'yhat': float(row_prev['yhat'].iloc[0]),
                         'yhat_lower': float(row_prev['yhat_lower'].iloc[0]),
                         'yhat_upper': float(row_prev['yhat_upper'].iloc[0])
-                    }
-                    # SALVA NO BANCO PARA SEMPRE
-                    _salvar_previsao_congelada(db_path, mes_ref_str, dados_save)
-                    
-                    metricas_mes_atual['previsto'] = dados_save['yhat']
-                    metricas_mes_atual['pessimista'] = dados_save['yhat_lower']
-                    metricas_mes_atual['otimista'] = dados_save['yhat_upper']
+                    })
+
+            try:
+                # Prevemos apenas o próximo passo (mês atual), em segundo plano
+                fut = _agendar_ajuste(f"{db_path}:congelada:{mes_ref_str}", nome_previsor, df_treino_passado, 1,
+                                      regressores_macro, _congelar)
+                if aguardar:
+                    prev_temp, _ = fut.result()
+                    row_prev = prev_temp[prev_temp['ds'] == data_mes_atual]
+                    if not row_prev.empty:
+                        metricas_mes_atual['previsto'] = float(row_prev['yhat'].iloc[0])
+                        metricas_mes_atual['pessimista'] = float(row_prev['yhat_lower'].iloc[0])
+                        metricas_mes_atual['otimista'] = float(row_prev['yhat_upper'].iloc[0])
             except Exception as e:
                 metricas_mes_atual['error'] = str(e)
         else:
@@ -266,7 +393,12 @@ def criar_grafico_previsao(df_vendas_bruto: pd.DataFrame, meses_futuro: int = 12
     df_treino_full = df_mensal[df_mensal['ds'] <= data_mes_atual].copy()
     
     try:
-        previsao_full, df_prophet_full = _treinar_e_prever_prophet(df_treino_full, meses_futuro, None)
+        previsao_full, df_prophet_full, info_cache = _prever_com_cache(
+            db_path, nome_previsor, df_treino_full, meses_futuro, regressores_macro, aguardar=aguardar
+        )
+        metricas_mes_atual['calculado_em'] = info_cache['calculado_em']
+        metricas_mes_atual['atualizando'] = info_cache['atualizando']
+        metricas_mes_atual['chave_previsao'] = info_cache['chave']
         
         # --- Montagem do Gráfico ---
         fig = go.Figure()
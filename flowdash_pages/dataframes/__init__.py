@@ -5,6 +5,8 @@ Módulo de DataFrames
 Centraliza carregamento e transformação de DataFrames
 para uso nas páginas do FlowDash.
 """
-from .dataframes import get_dataframe  # ajuste para a função principal que você usa
+from shared.lazy_imports import getattr_tardio
+
+__getattr__ = getattr_tardio(__name__, {"get_dataframe": ".dataframes:get_dataframe"})
 
 __all__ = ["get_dataframe"]
@@ -15,6 +15,7 @@ from dateutil import parser as date_parser
 import pandas as pd
 from pandas.api.types import is_datetime64_dtype
 import streamlit as st
+from shared.db import conectar
 
 # ===================== Descoberta de DB (segura) =====================
 def _ensure_db_path_or_raise(pref: Optional[str] = None) -> str:
@@ -46,9 +47,7 @@ def _ensure_db_path_or_raise(pref: Optional[str] = None) -> str:
 class DB:
     path: str
     def conn(self) -> sqlite3.Connection:
-        cx = sqlite3.connect(self.path)
-        cx.row_factory = sqlite3.Row
-        return cx
+        return conectar(self.path, row_factory=sqlite3.Row)
     def q(self, sql: str, params: tuple = ()) -> pd.DataFrame:
         try:
             with self.conn() as cx:
@@ -9,6 +9,8 @@ from typing import Optional, Tuple, List, Iterable as _Iterable
 import pandas as pd
 import numpy as np
 import streamlit as st
+from shared.db import conectar
+from shared.schema_cache import mapa_colunas
 
 # Páginas específicas já existentes
 from flowdash_pages.dataframes import entradas as page_entradas
@@ -59,7 +61,7 @@ def _connect() -> Optional[sqlite3.Connection]:
         st.caption(str(e))
         return None
     try:
-        return sqlite3.connect(db, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+        return conectar(db, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
     except Exception as e:
         st.error("❌ Erro ao conectar no banco de dados.")
         st.exception(e)
@@ -89,8 +91,7 @@ _LOAN_VALUE_PREFS = ["valor_parcela", "Valor_Parcela", "parcela_valor"]
 _LOAN_PARTS = ["principal", "amortizacao", "amortização", "juros", "multa", "tarifa"]
 
 def _pick_cols(conn: sqlite3.Connection, table: str) -> Optional[Tuple[Optional[str], str, str]]:
-    cols = [r[1] for r in conn.execute(f"PRAGMA table_info('{table}')")]
-    lower = {c.lower(): c for c in cols}
+    lower = mapa_colunas(conn, table)
     def _first(cands: List[str]) -> Optional[str]:
         for c in cands:
             if c.lower() in lower:
@@ -10,6 +10,8 @@ from typing import Optional, List, Tuple
 
 import pandas as pd
 import streamlit as st
+from shared.db import conectar
+from shared.schema_cache import colunas
 
 from flowdash_pages.dataframes.filtros import selecionar_ano, resumo_por_mes
 
@@ -54,7 +56,7 @@ def _connect(db_like: Optional[str]) -> Optional[sqlite3.Connection]:
         st.caption(str(e))
         return None
     try:
-        return sqlite3.connect(db, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+        return conectar(db, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
     except Exception as e:
         st.error("❌ Erro ao conectar no banco (Empréstimos/Financiamentos).")
         st.exception(e)
@@ -78,9 +80,9 @@ def _list_like_loan_objects(conn: sqlite3.Connection) -> List[Tuple[str,str]]:
 
 def _table_cols(conn: sqlite3.Connection, name: str) -> List[str]:
     try:
-        rows = conn.execute(f'PRAGMA table_info("{name}")').fetchall()
-        if rows:
-            return [r[1] for r in rows]
+        cols = colunas(conn, name)
+        if cols:
+            return list(cols)
     except Exception:
         pass
     try:
@@ -9,6 +9,7 @@ from datetime import date
 
 import pandas as pd
 import streamlit as st
+from shared.db import conectar
 
 # ================= Descoberta de DB (segura) =================
 try:
@@ -232,7 +233,7 @@ def render(db_path_pref: Optional[str] = None) -> None:
 
     # Carrega dados
     try:
-        with sqlite3.connect(db_path) as conn:
+        with conectar(db_path) as conn:
             df, table_used = _load_livro_caixa(conn)
     except Exception as e:
         st.error(str(e))
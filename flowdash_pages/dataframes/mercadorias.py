@@ -8,6 +8,7 @@ from typing import Optional
 
 import pandas as pd
 import streamlit as st
+from shared.db import conectar
 
 # ================= Descoberta de DB (segura) =================
 try:
@@ -51,7 +52,7 @@ def _connect(db_like: Optional[str]) -> Optional[sqlite3.Connection]:
         st.caption(str(e))
         return None
     try:
-        return sqlite3.connect(db, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+        return conectar(db, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
     except Exception as e:
         st.error("❌ Erro ao conectar no banco (Mercadorias).")
         st.exception(e)
@@ -8,6 +8,7 @@ from typing import Optional, Iterable
 
 import pandas as pd
 import streamlit as st
+from shared.db import conectar, faixa_iso
 
 from flowdash_pages.dataframes.filtros import (
     selecionar_ano,
@@ -59,7 +60,7 @@ def _connect(db_like: Optional[str]) -> Optional[sqlite3.Connection]:
         st.caption(str(e))
         return None
     try:
-        return sqlite3.connect(db, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+        return conectar(db, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
     except Exception as e:
         st.error("❌ Erro ao conectar no banco (Saídas).")
         st.exception(e)
@@ -262,10 +263,10 @@ def render(df_saidas: pd.DataFrame, caminho_banco: str | None = None) -> None:
         query = f"""
             SELECT *
             FROM "{tabela}"
-            WHERE date(Data) BETWEEN ? AND ?
+            WHERE Data >= ? AND Data < ?
             ORDER BY datetime(Data) ASC
         """
-        df_full = pd.read_sql_query(query, con, params=(str(first_day), str(last_day)))
+        df_full = pd.read_sql_query(query, con, params=faixa_iso(first_day, last_day))
     except Exception as e:
         st.error(f"Falha ao ler do banco '{db_path}': {e}")
         return
@@ -4,6 +4,8 @@ Página DRE (Demonstrativo de Resultados)
 
 Renderiza a tela do DRE, exibindo receitas, despesas e resultado.
 """
-from .dre import render_dre
+from shared.lazy_imports import getattr_tardio
+
+__getattr__ = getattr_tardio(__name__, {"render_dre": ".dre:render_dre"})
 
 __all__ = ["render_dre"]
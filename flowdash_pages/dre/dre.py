@@ -11,10 +11,14 @@ import os
 import math
 import unicodedata
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 from datetime import date
 from utils import formatar_moeda, formatar_percentual
+from shared.data_version import cache_por_tabelas
+from shared.db import conectar, faixa_iso
+from shared.schema_cache import colunas
 import importlib
 
 logger = logging.getLogger(__name__)
@@ -27,6 +31,13 @@ except Exception:
     _avaliar_indicador_externo = None
 
 # ============================== Config de início do DRE ==============================
+# Tabelas lidas pelo cálculo da DRE (dependências do cache por versão de dados)
+TABELAS_DRE = (
+    "entrada", "saida", "mercadorias", "contas_a_pagar_mov", "emprestimos_financiamentos",
+    "fatura_cartao_itens", "movimentacoes_bancarias", "saldos_caixas", "saldos_bancos_mov",
+    "fechamento_caixa", "correcao_caixa", "dre_variaveis",
+)
+
 START_YEAR = 2025
 START_MONTH = 10  # Outubro
 KPI_TITLE = "KPIs"  # título exibido acima dos cards
@@ -140,9 +151,7 @@ class CAP_DB:
     path: str
 
     def conn(self) -> sqlite3.Connection:
-        cx = sqlite3.connect(self.path)
-        cx.row_factory = sqlite3.Row
-        return cx
+        return conectar(self.path, row_factory=sqlite3.Row)
 
     def q(self, sql: str, params: tuple = ()) -> pd.DataFrame:
         try:
@@ -207,10 +216,11 @@ def _cap_loans_totals(df_view: pd.DataFrame) -> Dict[str, float]:
 # ==============================================================================
 # ============================== Helpers ==============================
 def _conn(db_path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    conn.execute("PRAGMA busy_timeout = 5000;")
-    return conn
+    return conectar(
+        db_path,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        pragmas=("foreign_keys = ON", "busy_timeout = 5000"),
+    )
 
 def _ensure_db_path_or_raise(pref: Optional[str] = None) -> str:
     """Resolve caminho do banco de forma resiliente.
@@ -544,7 +554,7 @@ def _sum_saida_by_filters(ini: str, fim: str, categoria: str,
         ("Sub_Categoria",),
         ("Sub_Categorias_saida",),
     ]
-    params: List = [ini, fim, cat_upper]
+    params: List = [*faixa_iso(ini, fim), cat_upper]
     last_sql = ""
     last_params: List = params
 
@@ -559,7 +569,7 @@ def _sum_saida_by_filters(ini: str, fim: str, categoria: str,
         sql = f"""
         SELECT COALESCE(Valor,0) AS valor_saida, {columns_expr}
           FROM saida
-         WHERE date(Data) BETWEEN ? AND ?
+         WHERE Data >= ? AND Data < ?
            AND TRIM(UPPER(COALESCE(Categoria,''))) = ?
            AND COALESCE(Valor,0) > 0;
         """
@@ -922,12 +932,12 @@ class VarsDRE:
     atv_base: float = 0.0       # ativos totais
 
 # ============================== Schema helpers ==============================
-@st.cache_data(show_spinner=False)
 def _table_cols(db_path: str, table: str) -> List[str]:
+    # Sem st.cache_data: o registro de esquema já evita o PRAGMA e, ao contrário
+    # do cache por argumentos, percebe colunas criadas depois (schema_version).
     try:
         with _conn(db_path) as c:
-            rows = c.execute(f"PRAGMA table_info('{table}')").fetchall()
-            return [str(r[1]).lower() for r in rows]
+            return [col.lower() for col in colunas(c, table)]
     except Exception:
         return []
 
@@ -939,7 +949,7 @@ def _find_col(cols_lower: Iterable[str], candidates: Iterable[str]) -> Optional[
     return None
 
 # ============================== Queries (cache) ==============================
-@st.cache_resource(show_spinner=False, ttl=5)
+@cache_por_tabelas("dre_variaveis")
 def _load_vars(db_path: str) -> VarsDRE:
     q = """
     SELECT chave, COALESCE(valor_num, 0) AS v
@@ -974,6 +984,7 @@ def _load_vars(db_path: str) -> VarsDRE:
         atv_base=_safe(d.get("ativos_totais_base")),
     )
 
+@cache_por_tabelas(*TABELAS_DRE)
 def _vars_dynamic_overrides(db_path: str, vars_dre: "VarsDRE") -> "VarsDRE":
     """Recalcula variáveis derivadas com base nos dados atuais, sem depender da tela de cadastro.
 
@@ -1045,10 +1056,15 @@ def _vars_dynamic_overrides(db_path: str, vars_dre: "VarsDRE") -> "VarsDRE":
     except Exception:
         return vars_dre
 
+_ULTIMO_PERSIST: Dict[str, Tuple[float, float, float]] = {}
+
 def _persist_overrides_to_db(db_path: str, vars_dre: "VarsDRE") -> None:
     """Grava em dre_variaveis os derivados recalculados (ativos_totais_base, patrimonio_liquido_base, depreciacao_mensal_padrao).
     Aplica threshold para evitar escrita desnecessária.
     """
+    assinatura = (float(vars_dre.atv_base or 0.0), float(vars_dre.pl_base or 0.0), float(vars_dre.dep_padrao or 0.0))
+    if _ULTIMO_PERSIST.get(os.path.abspath(db_path)) == assinatura:
+        return
     try:
         sql_create = (
             "CREATE TABLE IF NOT EXISTS dre_variaveis (\n"
@@ -1097,10 +1113,11 @@ def _persist_overrides_to_db(db_path: str, vars_dre: "VarsDRE") -> None:
                 if abs(float(novo or 0.0) - float(atual or 0.0)) > eps:
                     _upsert_num(c, chave, float(novo or 0.0), desc)
             c.commit()
+        _ULTIMO_PERSIST[os.path.abspath(db_path)] = assinatura
     except Exception:
         pass
 
-@st.cache_data(show_spinner=False, ttl=60)
+@cache_por_tabelas("entrada")
 def _query_entradas(db_path: str, ini: str, fim: str) -> Tuple[float, float, int]:
     sql = """
     SELECT
@@ -1108,25 +1125,25 @@ def _query_entradas(db_path: str, ini: str, fim: str) -> Tuple[float, float, int
       SUM(COALESCE(Valor,0) - COALESCE(valor_liquido, COALESCE(Valor,0))) AS tx,
       COUNT(*) AS n
     FROM entrada
-    WHERE date(Data) BETWEEN ? AND ?;
+    WHERE Data >= ? AND Data < ?;
     """
     try:
         with _conn(db_path) as c:
-            row = c.execute(sql, (ini, fim)).fetchone()
+            row = c.execute(sql, faixa_iso(ini, fim)).fetchone()
             return _safe(row[0]), _safe(row[1]), int(row[2] or 0)
     except Exception:
         return 0.0, 0.0, 0
 
-@st.cache_data(show_spinner=False, ttl=60)
+@cache_por_tabelas("mercadorias")
 def _query_fretes(db_path: str, ini: str, fim: str) -> float:
     sql = """
     SELECT SUM(COALESCE(Frete_Cobrado,0))
     FROM mercadorias
-    WHERE date(Data) BETWEEN ? AND ?;
+    WHERE Data >= ? AND Data < ?;
     """
     try:
         with _conn(db_path) as c:
-            row = c.execute(sql, (ini, fim)).fetchone()
+            row = c.execute(sql, faixa_iso(ini, fim)).fetchone()
             return _safe(row[0])
     except Exception:
         return 0.0
@@ -1167,7 +1184,7 @@ def compute_total_saida_operacional(ano: int, mes: int, db_path: str) -> float:
 
     def _sum(sql_base: str, extra_params: List[str]) -> float:
         sql = sql_base + exclusion_clause + ";"
-        params = [ini, fim] + list(extra_params) + exclusion_args
+        params = list(faixa_iso(ini, fim)) + list(extra_params) + exclusion_args
         try:
             with _conn(db_path) as c:
                 row = c.execute(sql, params).fetchone()
@@ -1178,14 +1195,14 @@ def compute_total_saida_operacional(ano: int, mes: int, db_path: str) -> float:
     fixos_sql = """
     SELECT SUM(COALESCE(Valor,0))
     FROM saida
-    WHERE date(Data) BETWEEN ? AND ?
+    WHERE Data >= ? AND Data < ?
       AND TRIM(UPPER(COALESCE(Categoria,''))) = 'CUSTOS FIXOS'
     """
 
     extras_sql = """
     SELECT SUM(COALESCE(Valor,0))
     FROM saida
-    WHERE date(Data) BETWEEN ? AND ?
+    WHERE Data >= ? AND Data < ?
       AND TRIM(UPPER(COALESCE(Categoria,''))) IN (?, ?)
       AND TRIM(UPPER(COALESCE(Sub_Categoria,''))) IN (?, ?, ?, ?)
     """
@@ -1206,7 +1223,7 @@ def compute_total_saida_operacional(ano: int, mes: int, db_path: str) -> float:
     return fixos_total + extras_total
 
 
-@st.cache_data(show_spinner=False, ttl=60)
+@cache_por_tabelas("saida")
 def _query_saidas_total(db_path: str, ini: str, fim: str,
                         categoria: str, subcat: str | None = None) -> float:
     def _sum_with_sub(subcol: str) -> float:
@@ -1216,17 +1233,17 @@ def _query_saidas_total(db_path: str, ini: str, fim: str,
             FROM saida
             WHERE UPPER(Categoria)=UPPER(?)
               AND UPPER(COALESCE({subcol},''))=UPPER(?)
-              AND date(Data) BETWEEN ? AND ?;
+              AND Data >= ? AND Data < ?;
             """
-            args = (categoria, subcat, ini, fim)
+            args = (categoria, subcat, *faixa_iso(ini, fim))
         else:
             sql = """
             SELECT SUM(COALESCE(Valor,0))
             FROM saida
             WHERE UPPER(Categoria)=UPPER(?)
-              AND date(Data) BETWEEN ? AND ?;
+              AND Data >= ? AND Data < ?;
             """
-            args = (categoria, ini, fim)
+            args = (categoria, *faixa_iso(ini, fim))
         with _conn(db_path) as c:
             row = c.execute(sql, args).fetchone()
             return _safe(row[0])
@@ -1238,10 +1255,10 @@ def _query_saidas_total(db_path: str, ini: str, fim: str,
         SELECT SUM(COALESCE(Valor,0))
         FROM saida
         WHERE UPPER(COALESCE({subcol},''))=UPPER(?)
-          AND date(Data) BETWEEN ? AND ?;
+          AND Data >= ? AND Data < ?;
         """
         with _conn(db_path) as c:
-            row = c.execute(sql, (subcat, ini, fim)).fetchone()
+            row = c.execute(sql, (subcat, *faixa_iso(ini, fim))).fetchone()
             return _safe(row[0])
 
     try:
@@ -1264,7 +1281,7 @@ def _query_saidas_total(db_path: str, ini: str, fim: str,
     except Exception:
         return 0.0
 
-@st.cache_data(show_spinner=False, ttl=60)
+@cache_por_tabelas("contas_a_pagar_mov")
 def _query_cap_emprestimos(db_path: str, competencia: str) -> float:
     # desembolso de caixa do mês com EMPRESTIMO
     sql = """
@@ -1280,7 +1297,7 @@ def _query_cap_emprestimos(db_path: str, competencia: str) -> float:
     except Exception:
         return 0.0
 
-@st.cache_data(show_spinner=False, ttl=60)
+@cache_por_tabelas("emprestimos_financiamentos", "contas_a_pagar_mov")
 def _query_divida_estoque(db_path: str) -> float:
     """
     Calcula o MESMO 'Saldo devedor de todos empréstimos' da página Contas a Pagar,
@@ -1303,23 +1320,23 @@ def _query_divida_estoque(db_path: str) -> float:
         logger.error("DRE(Dívida Estoque): falha no cálculo (cópia CAP): %s", err)
         return 0.0
 
-@st.cache_data(show_spinner=False, ttl=60)
+@cache_por_tabelas("fatura_cartao_itens")
 def _query_mkt_cartao(db_path: str, ini: str, fim: str) -> float:
     sql = """
     SELECT SUM(COALESCE(valor_parcela, 0))
     FROM fatura_cartao_itens
-    WHERE date(data_compra) BETWEEN ? AND ?
+    WHERE data_compra >= ? AND data_compra < ?
       AND categoria = 'Despesas / Marketing';
     """
     try:
         with _conn(db_path) as c:
-            row = c.execute(sql, (ini, fim)).fetchone()
+            row = c.execute(sql, faixa_iso(ini, fim)).fetchone()
             return _safe(row[0])
     except Exception:
         return 0.0
 
 # ============================== Anos disponíveis ==============================
-@st.cache_data(show_spinner=False)
+@cache_por_tabelas("entrada", "mercadorias", "saida", "contas_a_pagar_mov", "fatura_cartao_itens")
 def _listar_anos(db_path: str) -> List[int]:
     sql_all = """
     SELECT ano FROM (
@@ -1460,94 +1477,264 @@ def _query_juros_reais_mes(db_path: str, competencia: str) -> float:
         return 0.0
             
     return total_juros
-@st.cache_data(show_spinner=False)
-def _calc_mes(db_path: str, ano: int, mes: int, vars_dre: "VarsDRE", _ts: float = 0.0) -> Dict[str, float]:
-    ini, fim, comp = _periodo_ym(ano, mes)
 
-    fat, taxa_maq_rs, n_vendas = _query_entradas(db_path, ini, fim)
-    fretes_rs = _query_fretes(db_path, ini, fim)
-    fixas_rs = _query_saidas_total(db_path, ini, fim, "Custos Fixos")
+# ============================== Cálculo anual (lote) ==============================
+# Colunas de subcategoria aceitas em `saida` (mesma ordem de fallback das queries mensais).
+_SUBCAT_COLS = ("Sub_Categoria", "Sub_Categorias_saida")
 
-    mkt_saida_rs  = _query_saidas_total(db_path, ini, fim, "Despesas", "Marketing")
-    mkt_rs = mkt_saida_rs
 
-    limp_rs = _query_saidas_total(db_path, ini, fim, "Despesas", "Manutenção/Limpeza")
-    emp_rs  = _query_saidas_total(db_path, ini, fim, "Empréstimos e Financiamentos")
+def _sql_upper(text: str) -> str:
+    """Equivalente ao UPPER() do SQLite (apenas ASCII), para comparar com colunas já em caixa alta."""
+    return "".join(ch.upper() if "a" <= ch <= "z" else ch for ch in str(text))
 
-    simples_rs = fat * (vars_dre.simples / 100.0)
-    fundo_rs   = fat * (vars_dre.fundo   / 100.0)
-    sacolas_rs = fat * (vars_dre.sacolas / 100.0)
 
-    # ===== CMV corrigido: faturamento ÷ markup + frete de compra (mercadorias)
-    base_cmv = (fat / vars_dre.markup) if vars_dre.markup > 0 else 0.0
-    cmv_rs   = base_cmv + fretes_rs
+def _nz_div_vec(n, d) -> np.ndarray:
+    """Versão vetorizada de `_nz_div` (0 onde o denominador é 0)."""
+    n = np.asarray(n, dtype=float)
+    d = np.asarray(d, dtype=float)
+    return np.divide(n, d, out=np.zeros(np.broadcast(n, d).shape), where=d != 0)
 
-    saida_imp_maq   = simples_rs + taxa_maq_rs
-    receita_liq     = fat - saida_imp_maq
 
-    # CORREÇÃO: Usa a função que busca tudo no banco
-    competencia_fmt = f"{ano:04d}-{mes:02d}"
-    total_var       = calc_variaveis_total(competencia_fmt, cmv_rs, receita_liq)
-    margem_contrib  = receita_liq - total_var
-    lucro_bruto     = receita_liq - cmv_rs
-
-    # --- NOVO CÁLCULO DE OPEX (alinhado com os chips) ---
-    competencia_mes = f"{ano:04d}-{mes:02d}"
-    custos_fixos_kpi = calc_custos_fixos(competencia_mes)
-    despesas_operacionais_kpi = calc_despesas_operacionais(competencia_mes)
-    total_oper_fixo_extra = _safe(custos_fixos_kpi) + _safe(despesas_operacionais_kpi)
-    # -----------------------------------------------------
-
-    total_cf_emprestimos = total_oper_fixo_extra + emp_rs
-    total_saida_oper     = total_oper_fixo_extra + total_var
-
-    # EBITDA base
-    ebitda_base = margem_contrib - total_oper_fixo_extra
+def _ano_entradas_diarias(c: sqlite3.Connection, ano: int) -> pd.DataFrame:
+    """Faturamento/taxa/qtde por dia, de dez/(ano-1) a dez/ano (base dos meses e do MTD)."""
+    params = (f"{ano - 1:04d}-12-01", f"{ano + 1:04d}-01-01")
+    # Preferência: agregado diário mantido por trigger (shared.agregados).
+    sql_agg = """
+    SELECT dia,
+           SUM(valor) AS fat,
+           SUM(valor - valor_liquido) AS tx,
+           SUM(qtd) AS n
+      FROM agg_vendas_dia
+     WHERE dia >= ? AND dia < ?
+     GROUP BY dia;
+    """
+    try:
+        return pd.read_sql(sql_agg, c, params=params)
+    except Exception:
+        pass
+    sql = """
+    SELECT date(Data) AS dia,
+           SUM(COALESCE(Valor,0)) AS fat,
+           SUM(COALESCE(Valor,0) - COALESCE(valor_liquido, COALESCE(Valor,0))) AS tx,
+           COUNT(*) AS n
+      FROM entrada
+     WHERE Data >= ? AND Data < ?
+     GROUP BY date(Data);
+    """
+    try:
+        return pd.read_sql(sql, c, params=params)
+    except Exception:
+        return pd.DataFrame(columns=["dia", "fat", "tx", "n"])
 
-    # EBIT: apenas depreciação (não usamos amortização)
-    dep_extra = vars_dre.dep_padrao # Depreciação
-    ebit = ebitda_base - dep_extra # Cálculo do EBIT
 
-    # Lucro líquido (simplificado)
-    gasto_emprestimos = emp_rs
-    
-    # --- NOVO: Juros Reais para Regime de Competência ---
-    juros_financeiros = _query_juros_reais_mes(db_path, competencia_mes)
-    lucro_liq = ebit - juros_financeiros
-    resultado_de_caixa = ebit - emp_rs
+def _ano_fretes(c: sqlite3.Connection, ano: int) -> pd.Series:
+    sql = """
+    SELECT CAST(substr(date(Data),6,2) AS INTEGER) AS mes,
+           SUM(COALESCE(Frete_Cobrado,0)) AS fretes
+      FROM mercadorias
+     WHERE Data >= ? AND Data < ?
+     GROUP BY mes;
+    """
+    try:
+        df = pd.read_sql(sql, c, params=(f"{ano:04d}-01-01", f"{ano + 1:04d}-01-01"))
+        return df.set_index("mes")["fretes"].astype(float)
+    except Exception:
+        return pd.Series(dtype=float)
 
-    # KPIs
-    rl = receita_liq
-    mc_ratio = _nz_div(margem_contrib, rl)
-    margem_contrib_pct_val = mc_ratio * 100.0
-    margem_ebitda_pct = _nz_div(ebitda_base, rl)
 
-    break_even_rs = (fixas_rs / (margem_contrib_pct_val / 100.0)) if margem_contrib_pct_val else 0.0
-    break_even_pct = _nz_div(break_even_rs, rl)
+def _ano_saidas(c: sqlite3.Connection, ano: int) -> Tuple[pd.DataFrame, int]:
+    """Saídas do ano agrupadas por mês × categoria × subcategoria(s).
 
-    break_even_financeiro_rs = (total_cf_emprestimos / mc_ratio) if mc_ratio > 0 else 0.0
-    break_even_financeiro_pct = _nz_div(break_even_financeiro_rs, rl)
+    Retorna o DataFrame e a quantidade de colunas de subcategoria presentes
+    (`sub0`, `sub1`, ... com as respectivas versões `subN_u` em caixa alta via SQLite).
+    """
+    try:
+        cols = {str(r[1]) for r in c.execute("PRAGMA table_info(saida)").fetchall()}
+    except Exception:
+        cols = set()
+    subcols = [s for s in _SUBCAT_COLS if s in cols]
+    sub_sel = "".join(
+        f", {s} AS sub{i}, UPPER(COALESCE({s},'')) AS sub{i}_u" for i, s in enumerate(subcols)
+    )
+    group_by = ", ".join(["mes", "Categoria"] + subcols)
+    sql = f"""
+    SELECT CAST(substr(date(Data),6,2) AS INTEGER) AS mes,
+           UPPER(Categoria) AS cat_u,
+           TRIM(UPPER(COALESCE(Categoria,''))) AS cat_tu
+           {sub_sel},
+           SUM(COALESCE(Valor,0)) AS total,
+           SUM(CASE WHEN COALESCE(Valor,0) > 0 THEN Valor ELSE 0 END) AS total_pos
+      FROM saida
+     WHERE Data >= ? AND Data < ?
+     GROUP BY {group_by};
+    """
+    try:
+        df = pd.read_sql(sql, c, params=(f"{ano:04d}-01-01", f"{ano + 1:04d}-01-01"))
+    except Exception:
+        df = pd.DataFrame(columns=["mes", "cat_u", "cat_tu", "total", "total_pos"])
+        subcols = []
+    return df, len(subcols)
+
+
+def _ano_juros_reais(c: sqlite3.Connection, ano: int) -> pd.Series:
+    """Versão anual e vetorizada de `_query_juros_reais_mes` (Tabela Price em forma fechada)."""
+    comps = [f"{ano:04d}-{m:02d}" for m in range(1, 13)]
+    sql = f"""
+    SELECT CAST(substr(m.competencia,6,2) AS INTEGER) AS mes,
+           e.valor_parcela AS pmt,
+           e.taxa_juros_am AS taxa,
+           e.parcelas_total AS n_total,
+           m.parcela_num AS p_atual,
+           e.valor_total AS valor_cadastrado
+      FROM contas_a_pagar_mov m
+      JOIN emprestimos_financiamentos e ON m.emprestimo_id = e.id
+     WHERE m.tipo_obrigacao = 'EMPRESTIMO'
+       AND m.competencia IN ({",".join("?" * len(comps))});
+    """
+    try:
+        df = pd.read_sql(sql, c, params=comps)
+    except Exception as e:
+        logging.error(f"Erro ao calcular juros smart: {e}")
+        return pd.Series(dtype=float)
+    if df.empty:
+        return pd.Series(dtype=float)
+
+    pmt = pd.to_numeric(df["pmt"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    taxa_pct = pd.to_numeric(df["taxa"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    n_total = np.trunc(pd.to_numeric(df["n_total"], errors="coerce").fillna(0.0).to_numpy(dtype=float))
+    p_atual = np.trunc(pd.to_numeric(df["p_atual"], errors="coerce").fillna(0.0).to_numpy(dtype=float))
+    v_cad = pd.to_numeric(df["valor_cadastrado"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    i = taxa_pct / 100.0
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Mesma correção do cálculo mensal: cadastro inflado (principal + juros) → usa o VP das parcelas
+        consistente = (taxa_pct > 0) & (n_total > 0) & (pmt > 0)
+        vp_calculado = np.where(consistente, pmt * ((1 - (1 + i) ** -n_total) / np.where(i > 0, i, 1.0)), np.inf)
+        base = np.where(vp_calculado < v_cad * 0.95, vp_calculado, v_cad)
+
+        # Juros da parcela k = i × saldo após (k-1) prestações = i·VP·(f − (1+i)^(k−1)) / (f − 1)
+        fator = (1 + i) ** n_total
+        valido = (base > 0) & (i > 0) & (n_total > 0) & (p_atual > 0) & ((fator - 1) != 0)
+        juros = np.where(
+            valido,
+            i * base * (fator - (1 + i) ** (p_atual - 1)) / np.where(valido, fator - 1, 1.0),
+            0.0,
+        )
+    juros = np.maximum(np.nan_to_num(juros, nan=0.0, posinf=0.0, neginf=0.0), 0.0)
+    return pd.Series(juros, index=df["mes"].to_numpy()).groupby(level=0).sum()
 
-    margem_seguranca_pct = _nz_div((rl - break_even_rs), rl)
 
-    eficiencia_oper_pct = _nz_div(total_oper_fixo_extra, rl)
-    rel_saida_entrada_pct = _nz_div(total_oper_fixo_extra, fat)
-    emp_pct_sobre_receita = _nz_div(emp_rs, rl) * 100.0
+def _ano_percent_vars(c: sqlite3.Connection) -> Tuple[float, float]:
+    """(sacolas_percent, fundo_promocao_percent) já limitados a 0–100, como em `calc_*_valor`."""
+    out: Dict[str, Optional[float]] = {"sacolas_percent": None, "fundo_promocao_percent": None}
+    for chave in out:
+        try:
+            row = c.execute(
+                "SELECT valor_num FROM dre_variaveis WHERE lower(chave)=lower(?) LIMIT 1",
+                (chave,),
+            ).fetchone()
+            if row and row[0] is not None:
+                out[chave] = float(row[0])
+        except Exception:
+            pass
+    return _clamp_percent(out["sacolas_percent"]), _clamp_percent(out["fundo_promocao_percent"])
 
-    ticket_medio = _nz_div(fat, float(n_vendas)) if n_vendas > 0 else 0.0
 
-    margem_bruta_pct = _nz_div(lucro_bruto, rl)
-    margem_operacional_pct = _nz_div(ebit, rl) # <-- Cálculo correto aqui
-    margem_liquida_pct = _nz_div(lucro_liq, rl)
-    margem_contrib_pct = _nz_div(margem_contrib, rl)
-    custo_fixo_sobre_receita_pct = _nz_div(fixas_rs, rl)
+def calc_ano(db_path: str, ano: int, vars_dre: "VarsDRE", today: Optional[date] = None) -> pd.DataFrame:
+    """Calcula todas as métricas da DRE para os 12 meses de `ano` de uma só vez.
 
-    # === DEBUG EBITDA / OPEX ===
-    opex_esperado = _safe(custos_fixos_kpi) + _safe(despesas_operacionais_kpi)
-    ebitda_esperado = margem_contrib - opex_esperado
-    diferenca = ebitda_esperado - ebitda_base
+    Abre uma única conexão, busca os agregados de entrada/saída/mercadorias/CAP
+    do ano inteiro com GROUP BY por mês e deriva os KPIs de forma vetorizada.
+    Retorna um DataFrame indexado por mês (1..12) com as mesmas chaves de `_calc_mes`
+    (mais `crescimento_mtd_pct`, `custos_fixos_kpi` e `despesas_operacionais_kpi`).
+    O resultado fica em cache até alguma tabela de `TABELAS_DRE` mudar (ou virar o dia).
+    """
+    return _calc_ano_cached(db_path, int(ano), vars_dre, today or date.today())
+
+
+@cache_por_tabelas(*TABELAS_DRE)
+def _calc_ano_cached(db_path: str, ano: int, vars_dre: "VarsDRE", today: date) -> pd.DataFrame:
+    meses = pd.RangeIndex(1, 13, name="mes")
+
+    with _conn(db_path) as c:
+        df_dia = _ano_entradas_diarias(c, ano)
+        fretes = _ano_fretes(c, ano).reindex(meses, fill_value=0.0)
+        df_sai, n_subcols = _ano_saidas(c, ano)
+        juros = _ano_juros_reais(c, ano).reindex(meses, fill_value=0.0)
+        sacolas_pct, fundo_pct = _ano_percent_vars(c)
+
+    # ---- Entradas: matriz 13 × 31 (dez/ano-1, jan..dez) → totais do mês e MTD
+    fat_dia = np.zeros((13, 31))
+    tx_mes = pd.Series(0.0, index=meses)
+    n_mes = pd.Series(0, index=meses, dtype="int64")
+    if not df_dia.empty:
+        dias = pd.to_datetime(df_dia["dia"], errors="coerce")
+        ok = dias.notna()
+        d = df_dia[ok]
+        dias = dias[ok]
+        linha = np.where(dias.dt.year == ano, dias.dt.month, 0).astype(int)
+        np.add.at(fat_dia, (linha, dias.dt.day.to_numpy() - 1), pd.to_numeric(d["fat"], errors="coerce").fillna(0.0).to_numpy())
+        do_ano = linha > 0
+        tx_mes = (
+            pd.Series(pd.to_numeric(d["tx"], errors="coerce").fillna(0.0).to_numpy()[do_ano], index=linha[do_ano])
+            .groupby(level=0).sum().reindex(meses, fill_value=0.0)
+        )
+        n_mes = (
+            pd.Series(pd.to_numeric(d["n"], errors="coerce").fillna(0).to_numpy()[do_ano], index=linha[do_ano])
+            .groupby(level=0).sum().reindex(meses, fill_value=0).astype("int64")
+        )
+    fat_acum = fat_dia.cumsum(axis=1)
+    ultimos = np.array([monthrange(ano - 1, 12)[1]] + [monthrange(ano, m)[1] for m in range(1, 13)])
+    fat_mes = pd.Series(fat_acum[np.arange(1, 13), ultimos[1:] - 1], index=meses)
 
-    # Dívida (estoque) e índice calculado com Ativos Totais em tempo real (independe da outra página)
+    # Crescimento MTD (1º→D do mês vs 1º→D do mês anterior), como `_crescimento_mtd`
+    dia_corte = np.where(
+        (ano == today.year) & (np.arange(1, 13) == today.month), today.day, ultimos[1:]
+    )
+    dia_corte = np.minimum(dia_corte, ultimos[1:])
+    fat_mtd = fat_acum[np.arange(1, 13), dia_corte - 1]
+    fat_mtd_prev = fat_acum[np.arange(0, 12), np.minimum(dia_corte, ultimos[:-1]) - 1]
+    crescimento_mtd = np.where(fat_mtd_prev > 0, _nz_div_vec(fat_mtd - fat_mtd_prev, fat_mtd_prev) * 100.0, 0.0)
+
+    # ---- Saídas: mesmas regras de `_query_saidas_total` e `_sum_saida_by_filters`
+    def _por_mes(mask, col: str = "total") -> pd.Series:
+        if df_sai.empty:
+            return pd.Series(0.0, index=meses)
+        sel = df_sai.loc[mask, ["mes", col]]
+        return pd.to_numeric(sel[col], errors="coerce").fillna(0.0).groupby(sel["mes"]).sum().reindex(meses, fill_value=0.0)
+
+    def _saidas_total(categoria: str, subcat: Optional[str] = None) -> pd.Series:
+        if df_sai.empty:
+            return pd.Series(0.0, index=meses)
+        cat_mask = df_sai["cat_u"] == _sql_upper(categoria)
+        if not subcat:
+            return _por_mes(cat_mask)
+        if n_subcols == 0:
+            return pd.Series(0.0, index=meses)
+        sub_mask = df_sai["sub0_u"] == _sql_upper(subcat)
+        total = _por_mes(cat_mask & sub_mask)
+        only = _por_mes(sub_mask)
+        return total.where(~((total == 0.0) & (only > 0.0)), only)
+
+    def _saidas_por_subcats(categoria: str, subcats: Iterable[str]) -> pd.Series:
+        alvos = {_normalize_subcat(sc) for sc in subcats if sc} - {""}
+        if df_sai.empty or not alvos or n_subcols == 0:
+            return pd.Series(0.0, index=meses)
+        mask = pd.Series(False, index=df_sai.index)
+        for k in range(n_subcols):
+            mask |= df_sai[f"sub{k}"].map(_normalize_subcat).isin(alvos)
+        mask &= df_sai["cat_tu"] == _sql_upper(categoria.strip())
+        return _por_mes(mask, "total_pos")
+
+    fixas = _saidas_total("Custos Fixos")
+    mkt = _saidas_total("Despesas", "Marketing")
+    limp = _saidas_total("Despesas", "Manutenção/Limpeza")
+    emp = _saidas_total("Empréstimos e Financiamentos")
+    variaveis_saida = _saidas_por_subcats("Custos Fixos", SUBCATS_VARIAVEIS)
+    custos_fixos_kpi = _saidas_por_subcats("Custos Fixos", SUBCATS_FIXOS)
+    despesas_oper_kpi = _saidas_por_subcats("Despesas", SUBCATS_DESP_OPER)
+
+    # ---- Estoques (independem do mês): calculados uma única vez
     divida_estoque_rs = _as_reais(_query_divida_estoque(db_path))
     ativos_totais_warning = None
     try:
@@ -1556,97 +1743,131 @@ def _calc_mes(db_path: str, ano: int, mes: int, vars_dre: "VarsDRE", _ts: float
         logger.exception("DRE: falha ao calcular Ativos Totais em tempo real")
         ativos_totais_rt = 0.0
         ativos_totais_warning = f"Não foi possível calcular Ativos Totais em tempo real ({err})."
-
     if not ativos_totais_rt or ativos_totais_rt <= 0:
         warning_msg = "Ativos Totais em tempo real não retornaram valor válido; índice de endividamento será 0 até corrigir os dados de bancos/estoque/imobilizado."
         ativos_totais_warning = warning_msg if not ativos_totais_warning else f"{ativos_totais_warning} {warning_msg}"
-
     indice_endividamento_pct = (divida_estoque_rs / ativos_totais_rt * 100.0) if ativos_totais_rt > 0 else 0.0
 
-    return {
-        # básicos/estruturais
-        "fat": fat,
-        "simples": simples_rs,
-        "taxa_maq": taxa_maq_rs,
-        "saida_imp_maq": saida_imp_maq,
-        "receita_liq": rl,
-        "cmv": cmv_rs,
-        "fretes": fretes_rs,
-        "sacolas": sacolas_rs,
-        "fundo": fundo_rs,
-
-        # resultados operacionais
-        "margem_contrib": margem_contrib,
-        "fixas": fixas_rs,
-        "emp": emp_rs,
-        "mkt": mkt_rs,
-        "limp": limp_rs,
-        "total_cf_emp": total_cf_emprestimos,
-        "total_saida_oper": total_saida_oper,
-        "total_oper_fixo_extra": total_oper_fixo_extra,
-
-        # lucros/caixa
-        "ebitda": ebitda_base,
-        "ebit": ebit,
-        "lucro_liq": lucro_liq,
-        "resultado_caixa": resultado_de_caixa,
-        "lucro_bruto": lucro_bruto,
-        "juros_pagos": juros_financeiros,
-
-        # variáveis auxiliares
-        "total_var": total_var,
-        "n_vendas": n_vendas,
-        "ticket_medio": ticket_medio,
-
-        # margens (CORRIGIDO: Removido * 100.0)
-        "margem_bruta_pct": margem_bruta_pct,
-        "margem_ebitda_pct": margem_ebitda_pct,
-        "margem_operacional_pct": margem_operacional_pct,
-        "margem_liquida_pct": margem_liquida_pct,
-        "margem_contrib_pct": margem_contrib_pct,
-
-        # eficiência/gestão
-        "custo_fixo_sobre_receita_pct": custo_fixo_sobre_receita_pct * 100.0,
-        "break_even_rs": break_even_rs,
-        "break_even_pct": break_even_pct * 100.0,
-        "break_even_financeiro_rs": break_even_financeiro_rs,
-        "break_even_financeiro_pct": break_even_financeiro_pct * 100.0,
-        "margem_seguranca_pct": margem_seguranca_pct * 100.0,
-        "eficiencia_oper_pct": eficiencia_oper_pct * 100.0,
-        "rel_saida_entrada_pct": rel_saida_entrada_pct * 100.0,
-        "emp_pct_sobre_receita": emp_pct_sobre_receita,
-
-        # endividamento (estoque)
-        "divida_estoque": divida_estoque_rs,
-        "indice_endividamento_pct": indice_endividamento_pct,
-        "ativos_totais_rt": ativos_totais_rt,
-        "ativos_totais_warning": ativos_totais_warning,
-
-        # avançados (CORRIGIDO: Removido * 100.0)
-        "dep_extra": dep_extra,
-        "roe_pct": _nz_div(lucro_liq, vars_dre.pl_base) if vars_dre.pl_base > 0 else 0.0,
-        "roi_pct": _nz_div(lucro_liq, vars_dre.inv_base) if vars_dre.inv_base > 0 else 0.0,
-        "roa_pct": _nz_div(lucro_liq, vars_dre.atv_base) if vars_dre.atv_base > 0 else 0.0,
-    }
+    # ---- KPIs (vetorizado; mesmas fórmulas de `_calc_mes`)
+    fat = fat_mes
+    simples_rs = fat * (vars_dre.simples / 100.0)
+    fundo_rs = fat * (vars_dre.fundo / 100.0)
+    sacolas_rs = fat * (vars_dre.sacolas / 100.0)
+    base_cmv = (fat / vars_dre.markup) if vars_dre.markup > 0 else fat * 0.0
+    cmv_rs = base_cmv + fretes
+
+    saida_imp_maq = simples_rs + tx_mes
+    receita_liq = fat - saida_imp_maq
+    rl_pos = receita_liq.clip(lower=0.0)
+    total_var = variaveis_saida + cmv_rs + rl_pos * (sacolas_pct / 100.0) + rl_pos * (fundo_pct / 100.0)
+    margem_contrib = receita_liq - total_var
+    lucro_bruto = receita_liq - cmv_rs
+
+    total_oper_fixo_extra = custos_fixos_kpi + despesas_oper_kpi
+    total_cf_emprestimos = total_oper_fixo_extra + emp
+    total_saida_oper = total_oper_fixo_extra + total_var
+
+    ebitda_base = margem_contrib - total_oper_fixo_extra
+    dep_extra = vars_dre.dep_padrao
+    ebit = ebitda_base - dep_extra
+    lucro_liq = ebit - juros
+    resultado_de_caixa = ebit - emp
+
+    rl = receita_liq
+    mc_ratio = _nz_div_vec(margem_contrib, rl)
+    break_even_rs = _nz_div_vec(fixas, mc_ratio)
+    break_even_fin_rs = np.where(mc_ratio > 0, _nz_div_vec(total_cf_emprestimos, mc_ratio), 0.0)
+
+    out = pd.DataFrame(
+        {
+            # básicos/estruturais
+            "fat": fat,
+            "simples": simples_rs,
+            "taxa_maq": tx_mes,
+            "saida_imp_maq": saida_imp_maq,
+            "receita_liq": rl,
+            "cmv": cmv_rs,
+            "fretes": fretes,
+            "sacolas": sacolas_rs,
+            "fundo": fundo_rs,
+            # resultados operacionais
+            "margem_contrib": margem_contrib,
+            "fixas": fixas,
+            "emp": emp,
+            "mkt": mkt,
+            "limp": limp,
+            "total_cf_emp": total_cf_emprestimos,
+            "total_saida_oper": total_saida_oper,
+            "total_oper_fixo_extra": total_oper_fixo_extra,
+            "custos_fixos_kpi": custos_fixos_kpi,
+            "despesas_operacionais_kpi": despesas_oper_kpi,
+            # lucros/caixa
+            "ebitda": ebitda_base,
+            "ebit": ebit,
+            "lucro_liq": lucro_liq,
+            "resultado_caixa": resultado_de_caixa,
+            "lucro_bruto": lucro_bruto,
+            "juros_pagos": juros,
+            # variáveis auxiliares
+            "total_var": total_var,
+            "n_vendas": n_mes,
+            "ticket_medio": _nz_div_vec(fat, n_mes),
+            "crescimento_mtd_pct": crescimento_mtd,
+            # margens
+            "margem_bruta_pct": _nz_div_vec(lucro_bruto, rl),
+            "margem_ebitda_pct": _nz_div_vec(ebitda_base, rl),
+            "margem_operacional_pct": _nz_div_vec(ebit, rl),
+            "margem_liquida_pct": _nz_div_vec(lucro_liq, rl),
+            "margem_contrib_pct": mc_ratio,
+            # eficiência/gestão
+            "custo_fixo_sobre_receita_pct": _nz_div_vec(fixas, rl) * 100.0,
+            "break_even_rs": break_even_rs,
+            "break_even_pct": _nz_div_vec(break_even_rs, rl) * 100.0,
+            "break_even_financeiro_rs": break_even_fin_rs,
+            "break_even_financeiro_pct": _nz_div_vec(break_even_fin_rs, rl) * 100.0,
+            "margem_seguranca_pct": _nz_div_vec(rl - break_even_rs, rl) * 100.0,
+            "eficiencia_oper_pct": _nz_div_vec(total_oper_fixo_extra, rl) * 100.0,
+            "rel_saida_entrada_pct": _nz_div_vec(total_oper_fixo_extra, fat) * 100.0,
+            "emp_pct_sobre_receita": _nz_div_vec(emp, rl) * 100.0,
+            # endividamento (estoque)
+            "divida_estoque": divida_estoque_rs,
+            "indice_endividamento_pct": indice_endividamento_pct,
+            "ativos_totais_rt": ativos_totais_rt,
+            # avançados
+            "dep_extra": dep_extra,
+            "roe_pct": (lucro_liq / vars_dre.pl_base) if vars_dre.pl_base > 0 else lucro_liq * 0.0,
+            "roi_pct": (lucro_liq / vars_dre.inv_base) if vars_dre.inv_base > 0 else lucro_liq * 0.0,
+            "roa_pct": (lucro_liq / vars_dre.atv_base) if vars_dre.atv_base > 0 else lucro_liq * 0.0,
+        },
+        index=meses,
+    )
+    out["ativos_totais_warning"] = pd.Series([ativos_totais_warning] * len(meses), index=meses, dtype=object)
+    return out
+
+
+def _linha_mes(df_ano: pd.DataFrame, mes: int) -> Dict[str, Any]:
+    """Converte a linha `mes` do resultado de `calc_ano` no dicionário usado pelas telas."""
+    row = df_ano.loc[int(mes)]
+    out: Dict[str, Any] = {}
+    for k, v in row.items():
+        out[k] = v.item() if isinstance(v, np.generic) else v
+    out["n_vendas"] = int(out.get("n_vendas") or 0)
+    return out
+
+
+def _calc_mes(db_path: str, ano: int, mes: int, vars_dre: "VarsDRE", _ts: float = 0.0) -> Dict[str, Any]:
+    """Métricas de um mês — visão fina sobre `calc_ano` (cacheado por ano)."""
+    return _linha_mes(calc_ano(db_path, int(ano), vars_dre), mes)
 
 # ============================== UI / Página ==============================
 def render_dre(caminho_banco: Optional[str]):
-    st.cache_data.clear()
-    # Força limpeza de cache para garantir dados frescos ao trocar de página
-    try:
-        st.cache_data.clear()
-    except Exception:
-        pass
-
+    # Dados frescos vêm do cache por versão (shared.data_version): só o que
+    # depende de tabelas alteradas é recalculado, sem limpar caches globais.
     caminho_banco = _ensure_db_path_or_raise(caminho_banco)
     db_resolved = os.path.abspath(caminho_banco)
     prev = st.session_state.get("db_path")
     if prev != db_resolved:
         st.session_state["db_path"] = db_resolved
-        try:
-            st.cache_data.clear()
-        except Exception:
-            pass
     anos = _listar_anos(caminho_banco)
     ano_atual = int(pd.Timestamp.today().year)
     if ano_atual not in anos:
@@ -1672,15 +1893,6 @@ def render_dre(caminho_banco: Optional[str]):
     if all(v == 0 for v in (vars_dre.simples, vars_dre.fundo, vars_dre.sacolas)) and vars_dre.markup == 0:
         st.info("ℹ️ Configure em: Cadastros › Variáveis do DRE.")
 
-    cache_scope_key = (db_resolved, int(ano), int(mes))
-    last_scope_key = st.session_state.get("_dre_cache_scope_key")
-    if last_scope_key != cache_scope_key:
-        st.session_state["_dre_cache_scope_key"] = cache_scope_key
-        try:
-            st.cache_data.clear()
-        except Exception:
-            pass
-
     _render_kpis_mes_cards(caminho_banco, int(ano), int(mes), vars_dre)
     _render_anual(caminho_banco, int(ano), vars_dre)
 
@@ -1857,7 +2069,7 @@ def _render_kpis_mes_cards(db_path: str, ano: int, mes: int, vars_dre: VarsDRE)
     def _card(title: str, chips: List[str], cls: str) -> str:
         return f'<div class="cap-card {cls}"><div class="cap-title-xl">{title}</div><div class="fd-card-body">{"".join(chips)}</div></div>'
 
-    m = _calc_mes(db_path, ano, mes, vars_dre, _ts=pd.Timestamp.now().timestamp())
+    m = _calc_mes(db_path, ano, mes, vars_dre)
     ativos_totais_warning = (m.get("ativos_totais_warning") or "").strip()
     if ativos_totais_warning:
         st.warning(ativos_totais_warning)
@@ -1880,12 +2092,12 @@ def _render_kpis_mes_cards(db_path: str, ano: int, mes: int, vars_dre: VarsDRE)
     cmv_rs = _safe(m.get("cmv"))
     receita_liq = m.get("receita_liq")
     receita_liq_val = _safe(receita_liq)
-    total_variaveis = calc_variaveis_total(competencia_mes, cmv_rs, receita_liq_val)
+    total_variaveis = m.get("total_var")
     total_variaveis_val = _safe(total_variaveis)
     margem_contrib_r = receita_liq_val - total_variaveis_val
     margem_contrib_pct = (margem_contrib_r / receita_liq_val * 100.0) if receita_liq_val else 0.0
-    custos_fixos_kpi = calc_custos_fixos(competencia_mes)
-    despesas_operacionais_kpi = calc_despesas_operacionais(competencia_mes)
+    custos_fixos_kpi = _safe(m.get("custos_fixos_kpi"))
+    despesas_operacionais_kpi = _safe(m.get("despesas_operacionais_kpi"))
     total_saida_operacional = custos_fixos_kpi + despesas_operacionais_kpi
     logger.debug(
         "total_saida_operacional(%s) | custos_fixos=%.2f | despesas_operacionais=%.2f | total=%.2f",
@@ -2410,16 +2622,13 @@ def _render_anual(db_path: str, ano: int, vars_dre: VarsDRE):
     columns = pd.MultiIndex.from_product([meses, ["Valores R$", "Análise Vertical"]])
     df = pd.DataFrame(index=ordered_rows, columns=columns, dtype=object)
 
+    df_ano = calc_ano(db_path, ano, vars_dre)
     for i, mes in enumerate(range(1, 12 + 1), start=0):
         pre_start = (ano < START_YEAR) or (ano == START_YEAR and mes < START_MONTH)
-        m = _calc_mes(db_path, ano, mes, vars_dre, _ts=pd.Timestamp.now().timestamp())
+        m = _linha_mes(df_ano, mes)
         fat = m["fat"]
         fixas_rs = _safe(m.get("fixas"))
-
-        try:
-            crec_pct = _crescimento_mtd(db_path, ano, mes)
-        except Exception:
-            crec_pct = 0.0
+        crec_pct = _safe(m.get("crescimento_mtd_pct"))
 
         if pre_start:
             for r in ordered_rows:
@@ -6,6 +6,8 @@ Renderiza a tela de fechamento, incluindo saldos bancários,
 caixa físico e caixa 2. Mantém a lógica original, mas separada
 por responsabilidades.
 """
-from .fechamento import pagina_fechamento_caixa
+from shared.lazy_imports import getattr_tardio
+
+__getattr__ = getattr_tardio(__name__, {"pagina_fechamento_caixa": ".fechamento:pagina_fechamento_caixa"})
 
 __all__ = ["pagina_fechamento_caixa"]
@@ -9,6 +9,9 @@ from datetime import date, datetime, timedelta
 import pandas as pd
 import streamlit as st
 from flowdash_pages.utils_timezone import hoje_br
+from shared.db import conectar, faixa_iso
+from shared.saldos_bancos import definir_saldos_dia
+from services.taxas import indice_taxas, resolver_taxas
 
 # ==============================================================================
 # 1. IMPORTS & UTILS
@@ -24,23 +27,13 @@ except Exception:
         except Exception:
             return "R$ 0,00"
 
-# Dependência opcional (Workalendar)
-try:
-    from workalendar.america import BrazilDistritoFederal
-    _HAS_WORKACALENDAR = True
-except Exception:
-    _HAS_WORKACALENDAR = False
-
-
 from flowdash_pages.finance_logic import (
     _read_sql, _carregar_tabela, _norm, _find_col, _parse_date_col,
     _get_bancos_ativos, _sincronizar_colunas_saldos_bancos,
-    _get_saldos_bancos_acumulados, _calcular_saldo_projetado,
     _somar_bancos_totais, _ultimo_caixas_ate,
-    _dinheiro_e_pix_por_data, _cartao_d1_liquido_por_data_liq,
-    _saidas_total_do_dia, _correcoes_caixa_do_dia,
-    _carregar_fechamento_existente, _verificar_fechamento_dia
+    _carregar_fechamento_existente,
 )
+from flowdash_pages.resumo_dia import carregar_resumo_dia
 
 # ========= Componente visual compartilhado =========
 try:
@@ -86,14 +79,14 @@ def _listar_recebimentos_detalhados(conn: sqlite3.Connection, data_ref: date) ->
     """
     Retorna lista de strings com totais líquidos por Banco Destino
     para a data de liquidação informada, ignorando Dinheiro e PIX.
-    Realiza JOIN com taxas_maquinas para encontrar o banco destino.
+    Usa o índice de taxas (`services.taxas.resolver_taxas`) para encontrar o banco destino.
     """
     try:
         # 1. Carrega dados de entrada para o dia (Data_Liq)
         query_vendas = """
             SELECT maquineta, Format_de_Pagamento, Bandeira, Parcelas, valor_liquido, Forma_de_Pagamento
             FROM entrada
-            WHERE DATE(Data_Liq) = DATE(?)
+            WHERE Data_Liq >= ? AND Data_Liq < ?
         """
         # Nota: 'Format_de_Pagamento' pode estar errado na query acima se não existir, 
         # mas vou usar 'Forma_de_Pagamento' que sei que existe pelo schema.
@@ -103,8 +96,8 @@ def _listar_recebimentos_detalhados(conn: sqlite3.Connection, data_ref: date) ->
         df_vendas = pd.read_sql("""
             SELECT maquineta, Forma_de_Pagamento, Bandeira, Parcelas, valor_liquido
             FROM entrada
-            WHERE DATE(Data_Liq) = DATE(?)
-        """, conn, params=(str(data_ref),))
+            WHERE Data_Liq >= ? AND Data_Liq < ?
+        """, conn, params=faixa_iso(data_ref))
 
         if df_vendas.empty:
             return []
@@ -117,32 +110,14 @@ def _listar_recebimentos_detalhados(conn: sqlite3.Connection, data_ref: date) ->
         if df_vendas.empty:
             return []
 
-        # 2. Carrega taxas para mapeamento
-        df_taxas = pd.read_sql("SELECT maquineta, forma_pagamento, bandeira, parcelas, banco_destino FROM taxas_maquinas", conn)
-        
-        if df_taxas.empty:
+        # 2. Banco destino pelo índice em memória de taxas (mesma chave normalizada
+        #    maquineta/forma/bandeira/parcelas, com curingas)
+        if len(indice_taxas(conn)) == 0:
             return ["(Sem taxas cadastradas)"]
 
-        # 3. Normalização para Merge (cópia logic finance_logic.py)
-        df_vendas['k_maq'] = df_vendas['maquineta'].astype(str).str.strip().str.upper()
-        df_vendas['k_forma'] = df_vendas['Forma_de_Pagamento'].astype(str).str.strip().str.upper()
-        df_vendas['k_band'] = df_vendas['Bandeira'].astype(str).str.strip().str.upper()
-        df_vendas['k_parc'] = pd.to_numeric(df_vendas['Parcelas'], errors='coerce').fillna(1).astype(int)
-        
-        df_taxas['k_maq'] = df_taxas['maquineta'].astype(str).str.strip().str.upper()
-        df_taxas['k_forma'] = df_taxas['forma_pagamento'].astype(str).str.strip().str.upper()
-        df_taxas['k_band'] = df_taxas['bandeira'].astype(str).str.strip().str.upper()
-        df_taxas['k_parc'] = pd.to_numeric(df_taxas['parcelas'], errors='coerce').fillna(1).astype(int)
-        
-        # 4. Merge
-        df_merged = pd.merge(
-            df_vendas, 
-            df_taxas[['k_maq', 'k_forma', 'k_band', 'k_parc', 'banco_destino']], 
-            on=['k_maq', 'k_forma', 'k_band', 'k_parc'], 
-            how='left'
-        )
-        
-        # 5. Agrupa e Formata
+        df_merged = resolver_taxas(df_vendas, conn, col_valor=None)
+
+        # 3. Agrupa e Formata
         def _inferir_banco(row):
             # 1. Se o banco já existe, usa ele
             b = row['banco_destino']
@@ -194,39 +169,24 @@ def _listar_recebimentos_detalhados(conn: sqlite3.Connection, data_ref: date) ->
         print(f"Erro ao detalhar recebimentos (Pandas): {e}")
         return []
 
-# ==============================================================================
-# 3. PAGE RENDERER
-# ==============================================================================
-
-def pagina_fechamento_caixa(caminho_banco: str):
-    if "dt_fechamento" not in st.session_state:
-        st.session_state["dt_fechamento"] = hoje_br() # Timezone corrected
-
-    # Feedback Toast (recupera do session_state após rerun)
-    if "fechamento_msg" in st.session_state:
-        msg, icon = st.session_state.pop("fechamento_msg")
-        st.toast(msg, icon=icon)
-
-    # Uso de key='dt_fechamento' gerencia o state automaticamente, evitando o bug do duplo clique
-    data_sel = st.date_input("📅 Data do Fechamento", key="dt_fechamento")
-    st.markdown(f"**🗓️ Fechamento do dia — {data_sel}**")
-
-    
-    conn = sqlite3.connect(caminho_banco)
+def _render_fechamento_dia(conn, caminho_banco: str, data_sel) -> None:
+    """Cards, conferência e gravação do fechamento de `data_sel` (a conexão é do chamador)."""
     _garantir_colunas_fechamento(conn)
     
     bancos_ativos = _get_bancos_ativos(conn)
     _sincronizar_colunas_saldos_bancos(conn, bancos_ativos)
     
-    valor_dinheiro, valor_pix = _dinheiro_e_pix_por_data(caminho_banco, data_sel)
-    total_cartao_liquido = _cartao_d1_liquido_por_data_liq(caminho_banco, data_sel)
-    entradas_total_dia = valor_dinheiro + valor_pix + total_cartao_liquido
-    saidas_total_dia = _saidas_total_do_dia(caminho_banco, data_sel)
-    corr_dia, corr_acum = _correcoes_caixa_do_dia(caminho_banco, data_sel)
+    # Retrato do dia (flowdash_pages.resumo_dia): os mesmos números dos cards de Lançamentos
+    resumo = carregar_resumo_dia(caminho_banco, data_sel)
+    valor_dinheiro, valor_pix = resumo.valor_dinheiro, resumo.valor_pix
+    total_cartao_liquido = resumo.cartao_d1_liquido
+    entradas_total_dia = resumo.entradas_total
+    saidas_total_dia = resumo.total_saidas
+    corr_dia, corr_acum = resumo.correcao_dia, resumo.correcao_acumulada
     
-    sys_caixa, sys_caixa2 = _calcular_saldo_projetado(conn, data_sel)
+    sys_caixa, sys_caixa2 = resumo.caixa_projetado, resumo.caixa2_projetado
     # Alterado: Usa data_sel (hoje) para mostrar saldo acumulado até o momento, igual à pág. Lançamentos.
-    sys_bancos = _get_saldos_bancos_acumulados(conn, data_sel, bancos_ativos)
+    sys_bancos = resumo.saldos_bancos
     
     # [NOVO] Busca detalhamento por banco para o card de entradas
     detalhes_cartao = _listar_recebimentos_detalhados(conn, data_sel)
@@ -234,7 +194,7 @@ def pagina_fechamento_caixa(caminho_banco: str):
     total_bancos = sum(sys_bancos.values())
     saldo_total_consolidado = sys_caixa + sys_caixa2 + total_bancos
     
-    ja_fechado = _verificar_fechamento_dia(conn, data_sel)
+    ja_fechado = resumo.fechado
     
     dados_salvos = None
     # Feedback de Status do Dia (Fechado ou Aberto)
@@ -358,7 +318,7 @@ def pagina_fechamento_caixa(caminho_banco: str):
                     cursor = conn.cursor()
                     cursor.execute("BEGIN TRANSACTION")
                 
-                    cursor.execute("DELETE FROM fechamento_caixa WHERE DATE(data)=DATE(?)", (str(data_sel),))
+                    cursor.execute("DELETE FROM fechamento_caixa WHERE data >= ? AND data < ?", faixa_iso(data_sel))
                 
                     v_b_legado = [0.0] * 4
                     for k, v in real_bancos.items():
@@ -383,19 +343,15 @@ def pagina_fechamento_caixa(caminho_banco: str):
                         real_caixa, real_caixa2
                     ))
                 
-                    cursor.execute("DELETE FROM saldos_caixas WHERE DATE(data)=DATE(?)", (str(data_sel),))
+                    cursor.execute("DELETE FROM saldos_caixas WHERE data >= ? AND data < ?", faixa_iso(data_sel))
                     cursor.execute("""
                         INSERT INTO saldos_caixas (data, caixa, caixa_2, caixa_total, caixa2_total) 
                         VALUES (?, ?, ?, ?, ?)
                     """, (str(data_sel), real_caixa, real_caixa2, real_caixa, real_caixa2))
                     
-                    cursor.execute("DELETE FROM saldos_bancos WHERE DATE(data)=DATE(?)", (str(data_sel),))
-                    cursor.execute("INSERT INTO saldos_bancos (data) VALUES (?)", (str(data_sel),))
-                
-                    # Ajuste: Salva o valor REAL (absoluto) informado pelo usuário, ignorando o delta.
-                    for b_col, val_real in real_bancos.items():
-                        # Garante que o valor gravado seja exatamente o que o usuário conferiu
-                        cursor.execute(f'UPDATE saldos_bancos SET "{b_col}" = ? WHERE DATE(data)=DATE(?)', (float(val_real), str(data_sel)))
+                    # Ajuste: Salva o valor REAL (absoluto) informado pelo usuário, ignorando o delta
+                    # (substitui as linhas do dia em `saldos_bancos_mov`).
+                    definir_saldos_dia(conn, data_sel, real_bancos)
                          
                     conn.commit()
                     # ----------------- FEEDBACK VISUAL -----------------
@@ -409,13 +365,36 @@ def pagina_fechamento_caixa(caminho_banco: str):
                 except Exception as e:
                     conn.rollback()
                     st.toast(f"Erro ao salvar: {e}", icon="❌")
-            
-    conn.close()
+
+
+# ==============================================================================
+# 3. PAGE RENDERER
+# ==============================================================================
+
+def pagina_fechamento_caixa(caminho_banco: str):
+    if "dt_fechamento" not in st.session_state:
+        st.session_state["dt_fechamento"] = hoje_br() # Timezone corrected
+
+    # Feedback Toast (recupera do session_state após rerun)
+    if "fechamento_msg" in st.session_state:
+        msg, icon = st.session_state.pop("fechamento_msg")
+        st.toast(msg, icon=icon)
+
+    # Uso de key='dt_fechamento' gerencia o state automaticamente, evitando o bug do duplo clique
+    data_sel = st.date_input("📅 Data do Fechamento", key="dt_fechamento")
+    st.markdown(f"**🗓️ Fechamento do dia — {data_sel}**")
+
+    
+    conn = conectar(caminho_banco)
+    try:
+        _render_fechamento_dia(conn, caminho_banco, data_sel)
+    finally:
+        conn.close()
 
     # ========================== HISTÓRICO ==========================
     st.markdown("### 📋 Histórico Completo de Fechamentos")
     try:
-        with sqlite3.connect(caminho_banco) as conn:
+        with conectar(caminho_banco) as conn:
             df_fech = _read_sql(
                 conn,
                 """
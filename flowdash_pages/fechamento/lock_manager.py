@@ -1,6 +1,7 @@
-import sqlite3
 from datetime import date
 from flowdash_pages.utils_timezone import hoje_br
+from shared.db import conectar, faixa_iso
+from shared import dias_movimento
 
 def verificar_pendencia_bloqueante(caminho_banco: str) -> str | None:
     """
@@ -11,27 +12,37 @@ def verificar_pendencia_bloqueante(caminho_banco: str) -> str | None:
     """
     hoje = hoje_br()
     
-    # Query unificada: Vendas + Saídas + Correções + Movimentações Bancárias (Caixa 2/Depósitos)
+    # Fallback (banco sem `dias_movimento`): Vendas + Saídas + Correções + Movimentações
+    # Bancárias (Caixa 2/Depósitos). Cada MAX(data) WHERE data < ? é resolvido por index
+    # seek (ver shared.db_schema), em vez de varrer as quatro tabelas aplicando DATE().
     query = """
         SELECT MAX(dia_mov) FROM (
-            SELECT DATE(data) as dia_mov FROM entrada
+            SELECT DATE(MAX(data)) as dia_mov FROM entrada WHERE data < ?1
             UNION ALL
-            SELECT DATE(data) as dia_mov FROM saida
+            SELECT DATE(MAX(data)) as dia_mov FROM saida WHERE data < ?1
             UNION ALL
-            SELECT DATE(data) as dia_mov FROM correcao_caixa
+            SELECT DATE(MAX(data)) as dia_mov FROM correcao_caixa WHERE data < ?1
             UNION ALL
-            SELECT DATE(data) as dia_mov FROM movimentacoes_bancarias
-        ) 
-        WHERE dia_mov < ?
+            SELECT DATE(MAX(data)) as dia_mov FROM movimentacoes_bancarias WHERE data < ?1
+        )
     """
     
     try:
-        with sqlite3.connect(caminho_banco) as conn:
+        with conectar(caminho_banco) as conn:
+            hoje_str = hoje.strftime("%Y-%m-%d")
+
+            # Caminho rápido: `dias_movimento` (shared.dias_movimento), mantido por triggers,
+            # responde "último dia com movimento antes de hoje e se foi fechado" pela chave primária.
+            if dias_movimento.disponivel(conn):
+                ultimo = dias_movimento.ultimo_dia_antes(conn, hoje_str)
+                if ultimo is None or ultimo[1]:
+                    return None
+                return ultimo[0]
+
             cursor = conn.cursor()
             
             # 1. Busca a última data movimentada antes de hoje
             # Passa a data como string 'YYYY-MM-DD' para garantir a comparação correta no SQLite
-            hoje_str = hoje.strftime("%Y-%m-%d")
             cursor.execute(query, (hoje_str,))
             row = cursor.fetchone()
             
@@ -43,8 +54,8 @@ def verificar_pendencia_bloqueante(caminho_banco: str) -> str | None:
             
             # 2. Verifica se essa data específica já consta na tabela de fechamento
             cursor.execute(
-                "SELECT 1 FROM fechamento_caixa WHERE DATE(data) = DATE(?) LIMIT 1", 
-                (ultima_data_ativa,)
+                "SELECT 1 FROM fechamento_caixa WHERE data >= ? AND data < ? LIMIT 1",
+                faixa_iso(ultima_data_ativa)
             )
             is_fechado = cursor.fetchone()
             
@@ -66,11 +77,11 @@ def verificar_se_dia_esta_fechado(caminho_banco: str, data_alvo: date) -> bool:
     Isso impede edições em dias já encerrados.
     """
     try:
-        with sqlite3.connect(caminho_banco) as conn:
+        with conectar(caminho_banco) as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "SELECT 1 FROM fechamento_caixa WHERE DATE(data) = DATE(?) LIMIT 1", 
-                (data_alvo,)
+                "SELECT 1 FROM fechamento_caixa WHERE data >= ? AND data < ? LIMIT 1",
+                faixa_iso(data_alvo)
             )
             return bool(cursor.fetchone())
     except Exception:
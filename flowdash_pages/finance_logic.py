@@ -7,6 +7,18 @@ import math
 import pandas as pd
 from datetime import date, datetime, timedelta
 
+from shared.db import conectar, dia_seguinte_iso, faixa_iso
+from shared.schema_cache import colunas
+from shared import saldo_diario
+from shared.saldos_bancos import sincronizar_bancos
+from shared.saldo_diario import (
+    BANCO_POR_MAQUINETA,
+    CAIXAS,
+    ORIGENS_MOV_ENTRADA_EXCLUIDAS,
+    ORIGENS_MOV_SAIDA_EXCLUIDAS,
+    ORIGENS_VENDA,
+)
+
 # ==============================================================================
 # 1. HELPERS GENÉRICOS DE SQL E DADOS
 # ==============================================================================
@@ -28,7 +40,7 @@ def _read_sql(conn: sqlite3.Connection, query: str, params=None) -> pd.DataFrame
 def _verificar_fechamento_dia(conn: sqlite3.Connection, data_ref: date) -> bool:
     """Verifica se existe fechamento para a data."""
     try:
-        return bool(conn.execute("SELECT 1 FROM fechamento_caixa WHERE DATE(data)=DATE(?)", (str(data_ref),)).fetchone())
+        return bool(conn.execute("SELECT 1 FROM fechamento_caixa WHERE data >= ? AND data < ? LIMIT 1", faixa_iso(data_ref)).fetchone())
     except:
         return False
 
@@ -79,16 +91,9 @@ def _get_bancos_ativos(conn: sqlite3.Connection) -> list[str]:
     return ["Inter", "Bradesco", "InfinitePay"]
 
 def _sincronizar_colunas_saldos_bancos(conn: sqlite3.Connection, bancos: list[str]) -> None:
+    """Registra os bancos em `saldos_bancos_mov` (a view `saldos_bancos` ganha a coluna); sem ALTER TABLE."""
     try:
-        cursor = conn.execute("PRAGMA table_info(saldos_bancos)")
-        cols_existentes = {row[1] for row in cursor.fetchall()}
-        
-        for banco in bancos:
-            if banco not in cols_existentes:
-                try:
-                    conn.execute(f'ALTER TABLE saldos_bancos ADD COLUMN "{banco}" REAL DEFAULT 0.0')
-                except Exception:
-                    pass
+        sincronizar_bancos(conn, bancos)
     except Exception:
         pass
 
@@ -104,7 +109,7 @@ def _somar_entradas_liquidas_banco(conn: sqlite3.Connection, banco_alvo: str, da
     1. Tenta buscar na tabela 'entrada' pela coluna 'banco_destino'.
     2. Se der erro (coluna não existe), busca na tabela 'movimentacoes_bancarias' (fallback).
     """
-    data_iso = data_corte.strftime("%Y-%m-%d")
+    ate = dia_seguinte_iso(data_corte)   # DATE(col) <= corte  ==  col < dia seguinte
     
     # Tentativa 1: Tabela entrada (Ideal)
     try:
@@ -123,9 +128,9 @@ def _somar_entradas_liquidas_banco(conn: sqlite3.Connection, banco_alvo: str, da
                         ELSE NULL 
                     END
                 ) = ? 
-                AND DATE(COALESCE(Data_Liq, Data)) <= DATE(?)
+                AND COALESCE(Data_Liq, Data) < ?
         """
-        cur = conn.execute(query, (banco_alvo, data_iso))
+        cur = conn.execute(query, (banco_alvo, ate))
         val = cur.fetchone()[0]
         return _safe_float(val)
         
@@ -139,9 +144,9 @@ def _somar_entradas_liquidas_banco(conn: sqlite3.Connection, banco_alvo: str, da
                 WHERE banco = ?
                 AND tipo = 'entrada'
                 AND LOWER(COALESCE(origem,'')) IN ('venda', 'entrada', 'pix')
-                AND DATE(data) <= DATE(?)
+                AND data < ?
             """
-            val = conn.execute(q_fallback, (banco_alvo, data_iso)).fetchone()[0]
+            val = conn.execute(q_fallback, (banco_alvo, ate)).fetchone()[0]
             return _safe_float(val)
         except Exception:
             return 0.0
@@ -149,16 +154,16 @@ def _somar_entradas_liquidas_banco(conn: sqlite3.Connection, banco_alvo: str, da
 def _somar_saidas_banco(conn: sqlite3.Connection, banco_alvo: str, data_corte: date) -> float:
     """Soma saídas da tabela 'saida'."""
     try:
-        data_iso = data_corte.strftime("%Y-%m-%d")
-        cols = [r[1] for r in conn.execute("PRAGMA table_info(saida)")]
+        ate = dia_seguinte_iso(data_corte)
+        cols = colunas(conn, "saida")
         # Usa helper para check case-insensitive
         col_banco = _find_col(cols, ["banco", "conta", "banco_saida"])
         
         if not col_banco:
             return 0.0
             
-        query = f"SELECT SUM(valor) FROM saida WHERE {col_banco} = ? AND DATE(data) <= DATE(?)"
-        cur = conn.execute(query, (banco_alvo, data_iso))
+        query = f"SELECT SUM(valor) FROM saida WHERE {col_banco} = ? AND data < ?"
+        cur = conn.execute(query, (banco_alvo, ate))
         val = cur.fetchone()[0]
         return _safe_float(val)
         
@@ -171,7 +176,7 @@ def _somar_movimentacoes_bancarias(conn: sqlite3.Connection, banco_alvo: str, da
     IMPORTANTE: Exclui 'venda', 'entrada' e 'saida' para não duplicar com as funções acima.
     """
     try:
-        data_iso = data_corte.strftime("%Y-%m-%d")
+        ate = dia_seguinte_iso(data_corte)
         
         # ENTRADAS: Ignora o que já contamos como venda (seja na tabela entrada ou no fallback)
         q_in = """
@@ -179,10 +184,10 @@ def _somar_movimentacoes_bancarias(conn: sqlite3.Connection, banco_alvo: str, da
             WHERE 
                 banco = ? 
                 AND tipo = 'entrada'
-                AND DATE(data) <= DATE(?)
+                AND data < ?
                 AND LOWER(COALESCE(origem,'')) NOT IN ('entrada', 'venda', 'saida', 'pix', 'lancamentos') 
         """
-        val_in = conn.execute(q_in, (banco_alvo, data_iso)).fetchone()[0]
+        val_in = conn.execute(q_in, (banco_alvo, ate)).fetchone()[0]
         val_in = _safe_float(val_in)
 
         # SAÍDAS: Ignora o que já veio da tabela saida
@@ -191,10 +196,10 @@ def _somar_movimentacoes_bancarias(conn: sqlite3.Connection, banco_alvo: str, da
             WHERE 
                 banco = ? 
                 AND tipo = 'saida'
-                AND DATE(data) <= DATE(?)
+                AND data < ?
                 AND LOWER(COALESCE(origem,'')) NOT IN ('saida', 'saidas')
         """
-        val_out = conn.execute(q_out, (banco_alvo, data_iso)).fetchone()[0]
+        val_out = conn.execute(q_out, (banco_alvo, ate)).fetchone()[0]
         val_out = _safe_float(val_out)
         
         return _safe_float(val_in - val_out)
@@ -217,10 +222,10 @@ def _get_saldos_bancos_acumulados(conn: sqlite3.Connection, data_ref: date, banc
         query_last_close = """
             SELECT data, bancos_detalhe, banco_1, banco_2, banco_3
             FROM fechamento_caixa 
-            WHERE DATE(data) <= DATE(?) 
+            WHERE data < ?
             ORDER BY data DESC LIMIT 1
         """
-        row_close = conn.execute(query_last_close, (data_iso,)).fetchone()
+        row_close = conn.execute(query_last_close, (dia_seguinte_iso(data_ref),)).fetchone()
         
         data_inicio_calc = date(2000, 1, 1)
 
@@ -269,79 +274,103 @@ def _get_saldos_bancos_acumulados(conn: sqlite3.Connection, data_ref: date, banc
         
         # 2. Delta (Entradas - Saídas + Movimentações)
         # Intervalo: (Data do Fechamento, Data Ref] -> Exclui o dia do fechamento pois já pegamos o saldo final dele
+        # Com `saldo_diario` (shared.saldo_diario): 2 buscas indexadas por banco;
+        # sem ele, uma consulta agrupada por tabela-fonte para todos os bancos.
+        deltas = saldo_diario.delta(conn, "banco", bancos_reais, str_inicio, data_iso)
+        if deltas is None:
+            deltas = _deltas_bancos(conn, str_inicio, data_iso)
         for b in bancos_reais:
-            val_ent = _somar_entradas_liquidas_delta(conn, b, str_inicio, data_iso)
-            val_sai = _somar_saidas_delta(conn, b, str_inicio, data_iso)
-            val_mov = _somar_movimentacoes_delta(conn, b, str_inicio, data_iso)
-            
-            saldos[b] = saldos[b] + val_ent - val_sai + val_mov
+            saldos[b] = saldos[b] + deltas.get(b, 0.0)
 
     except Exception as e:
         print(f"Erro calculo saldos: {e}")
     
     return saldos
 
-# Helpers Internos para Delta (Replicando a lógica de Try/Except com maior robustez)
-def _somar_entradas_liquidas_delta(conn, banco, inicio, fim):
-    try:
-        q = """SELECT SUM(COALESCE(valor_liquido, valor, 0)) FROM entrada
-               WHERE 
-                COALESCE(banco_destino, 
-                    CASE 
-                        WHEN UPPER(maquineta) LIKE '%INFINITE%' THEN 'InfinitePay'
-                        WHEN UPPER(maquineta) LIKE '%INTER%' THEN 'Inter'
-                        WHEN UPPER(maquineta) LIKE '%BRADESCO%' THEN 'Bradesco'
-                        WHEN UPPER(maquineta) LIKE '%PAG%' THEN 'PagBank'
-                        WHEN UPPER(maquineta) LIKE '%MERCADO%' THEN 'Mercado Pago'
-                        WHEN UPPER(maquineta) LIKE '%STONE%' OR UPPER(maquineta) LIKE '%TON%' THEN 'Stone'
-                        ELSE NULL 
-                    END
-                ) = ? 
-                AND DATE(COALESCE(Data_Liq, Data)) > DATE(?)
-                AND DATE(COALESCE(Data_Liq, Data)) <= DATE(?)"""
-        val = conn.execute(q, (banco, inicio, fim)).fetchone()[0]
-        return _safe_float(val)
-    except Exception: # Catch-all para evitar crash se banco_destino nao existir
-        # Fallback Delta
-        try:
-            q_f = """SELECT SUM(valor) FROM movimentacoes_bancarias
-                     WHERE banco = ? AND tipo = 'entrada'
-                     AND LOWER(COALESCE(origem,'')) IN ('venda', 'entrada', 'pix')
-                     AND DATE(data) > DATE(?) AND DATE(data) <= DATE(?)"""
-            val = conn.execute(q_f, (banco, inicio, fim)).fetchone()[0]
-            return _safe_float(val)
-        except Exception:
-            return 0.0
+# Helpers Internos para Delta: uma consulta GROUP BY por tabela-fonte (entrada,
+# saida, movimentacoes_bancarias), independente do número de bancos. Usados
+# quando o banco não tem `saldo_diario`; as regras de fluxo são as mesmas.
 
-def _somar_saidas_delta(conn, banco, inicio, fim):
-    try:
-        cols = [r[1] for r in conn.execute("PRAGMA table_info(saida)")]
-        # Corrigido: Uso de _find_col para achar 'banco' ou 'conta' de forma case-insensitive
-        col = _find_col(cols, ["banco", "conta", "banco_saida"])
-        if not col: return 0.0
-        
-        q = f"SELECT SUM(valor) FROM saida WHERE {col} = ? AND DATE(data) > DATE(?) AND DATE(data) <= DATE(?)"
-        val = conn.execute(q, (banco, inicio, fim)).fetchone()[0]
-        return _safe_float(val)
-    except Exception:
-        return 0.0
+def _banco_da_maquineta(maquineta) -> str | None:
+    m = _norm(maquineta if isinstance(maquineta, str) else "")
+    for padrao, banco in BANCO_POR_MAQUINETA:
+        if padrao in m:
+            return banco
+    return None
+
+
+def _somar_por_banco(df: pd.DataFrame) -> pd.Series:
+    """Soma a coluna 'valor' agrupada por 'banco' (ignora bancos nulos)."""
+    if df.empty:
+        return pd.Series(dtype=float)
+    df = df.dropna(subset=["banco"])
+    return pd.to_numeric(df["valor"], errors="coerce").fillna(0.0).groupby(df["banco"]).sum()
+
+
+def _deltas_bancos(conn, inicio, fim) -> dict[str, float]:
+    """
+    Delta de cada banco em (inicio, fim]: entradas líquidas - saídas + movimentações extras.
+    Datas em texto ISO; a faixa vira [inicio+1, fim+1) (sargável onde não há COALESCE).
+    """
+    ini, fim_ex = dia_seguinte_iso(inicio), dia_seguinte_iso(fim)
+    ph_in = ",".join("?" * len(ORIGENS_MOV_ENTRADA_EXCLUIDAS))
+    ph_out = ",".join("?" * len(ORIGENS_MOV_SAIDA_EXCLUIDAS))
+    ph_venda = ",".join("?" * len(ORIGENS_VENDA))
 
-def _somar_movimentacoes_delta(conn, banco, inicio, fim):
+    # movimentacoes_bancarias: extras (entradas - saídas) e vendas (fallback) numa só passada
     try:
-        qi = """SELECT SUM(valor) FROM movimentacoes_bancarias WHERE banco=? AND tipo='entrada'
-                AND DATE(data)>DATE(?) AND DATE(data)<=DATE(?)
-                AND LOWER(COALESCE(origem,'')) NOT IN ('entrada','venda','saida', 'pix', 'lancamentos')"""
-        vi = conn.execute(qi, (banco, inicio, fim)).fetchone()[0]
-        vi = _safe_float(vi)
-        
-        qo = """SELECT SUM(valor) FROM movimentacoes_bancarias WHERE banco=? AND tipo='saida'
-                AND DATE(data)>DATE(?) AND DATE(data)<=DATE(?)
-                AND LOWER(COALESCE(origem,'')) NOT IN ('saida', 'saidas')"""
-        vo = conn.execute(qo, (banco, inicio, fim)).fetchone()[0]
-        vo = _safe_float(vo)
-        return vi - vo
+        mov = _read_sql(conn, f"""
+            SELECT banco,
+                   SUM(CASE WHEN tipo='entrada' AND LOWER(COALESCE(origem,'')) NOT IN ({ph_in}) THEN valor ELSE 0 END)
+                 - SUM(CASE WHEN tipo='saida' AND LOWER(COALESCE(origem,'')) NOT IN ({ph_out}) THEN valor ELSE 0 END) AS valor,
+                   SUM(CASE WHEN tipo='entrada' AND LOWER(COALESCE(origem,'')) IN ({ph_venda}) THEN valor ELSE 0 END) AS vendas
+              FROM movimentacoes_bancarias
+             WHERE data >= ? AND data < ?
+             GROUP BY banco
+        """, (*ORIGENS_MOV_ENTRADA_EXCLUIDAS, *ORIGENS_MOV_SAIDA_EXCLUIDAS, *ORIGENS_VENDA, ini, fim_ex))
     except Exception:
-        return 0.0
+        mov = pd.DataFrame(columns=["banco", "valor", "vendas"])
+
+    # entrada: agrupa por (banco_destino, maquineta) e resolve o banco em pandas
+    # (poucos grupos); sem a coluna banco_destino, usa as vendas logadas em movimentações.
+    col_bd = _find_col(colunas(conn, "entrada"), ["banco_destino"])
+    if col_bd:
+        try:
+            ent = _read_sql(conn, f"""
+                SELECT {col_bd} AS banco_destino, UPPER(maquineta) AS maquineta,
+                       SUM(COALESCE(valor_liquido, valor, 0)) AS valor
+                  FROM entrada
+                 WHERE COALESCE(Data_Liq, Data) >= ? AND COALESCE(Data_Liq, Data) < ?
+                 GROUP BY {col_bd}, UPPER(maquineta)
+            """, (ini, fim_ex))
+            ent["banco"] = ent["banco_destino"].where(
+                ent["banco_destino"].notna(), ent["maquineta"].map(_banco_da_maquineta)
+            )
+        except Exception:
+            ent = pd.DataFrame(columns=["banco", "valor"])
+    else:
+        ent = mov[["banco", "vendas"]].rename(columns={"vendas": "valor"})
+
+    # saida: coluna do banco varia entre bases (banco/conta/banco_saida)
+    col_sai = _find_col(colunas(conn, "saida"), ["banco", "conta", "banco_saida"])
+    sai = pd.DataFrame(columns=["banco", "valor"])
+    if col_sai:
+        try:
+            sai = _read_sql(conn, f"""
+                SELECT {col_sai} AS banco, SUM(valor) AS valor
+                  FROM saida
+                 WHERE data >= ? AND data < ?
+                 GROUP BY {col_sai}
+            """, (ini, fim_ex))
+        except Exception:
+            pass
+
+    total = (
+        _somar_por_banco(ent)
+        .sub(_somar_por_banco(sai), fill_value=0.0)
+        .add(_somar_por_banco(mov[["banco", "valor"]]), fill_value=0.0)
+    )
+    return {str(b): _safe_float(v) for b, v in total.items()}
 
 # ==============================================================================
 # 4. FUNÇÃO HÍBRIDA DE SOMA (COMPATIBILIDADE DASHBOARD)
@@ -354,7 +383,7 @@ def _somar_bancos_totais(obj: dict | str, *args) -> float | dict:
         caminho_banco = obj
         try:
             data_ref = args[0] if args else date.today()
-            with sqlite3.connect(caminho_banco) as conn:
+            with conectar(caminho_banco) as conn:
                 bancos = _get_bancos_ativos(conn)
                 return _get_saldos_bancos_acumulados(conn, data_ref, bancos)
         except Exception:
@@ -366,14 +395,15 @@ def _somar_bancos_totais(obj: dict | str, *args) -> float | dict:
 # ==============================================================================
 
 def _ultimo_caixas_ate(caminho_banco: str, data_limite: date) -> tuple:
-    with sqlite3.connect(caminho_banco) as conn:
-        row = conn.execute("SELECT caixa_total, caixa2_total, data FROM saldos_caixas WHERE DATE(data)<=DATE(?) ORDER BY data DESC LIMIT 1", (str(data_limite),)).fetchone()
+    with conectar(caminho_banco) as conn:
+        row = conn.execute("SELECT caixa_total, caixa2_total, data FROM saldos_caixas WHERE data < ? ORDER BY data DESC LIMIT 1", (dia_seguinte_iso(data_limite),)).fetchone()
         if row: return (float(row[0] or 0), float(row[1] or 0), pd.to_datetime(row[2]).date() if row[2] else None)
     return (0.0, 0.0, None)
 
 def _calcular_saldo_projetado(conn, data_ref):
-    data_iso = data_ref.strftime("%Y-%m-%d")
-    row = conn.execute("SELECT caixa_total, caixa2_total, data FROM saldos_caixas WHERE DATE(data)<=DATE(?) ORDER BY data DESC LIMIT 1", (data_iso,)).fetchone()
+    # Faixas semiabertas em texto ISO (sargáveis): (snapshot, data_ref] == [snapshot+1, data_ref+1)
+    fim = dia_seguinte_iso(data_ref)
+    row = conn.execute("SELECT caixa_total, caixa2_total, data FROM saldos_caixas WHERE data < ? ORDER BY data DESC LIMIT 1", (fim,)).fetchone()
     saldo_cx, saldo_cx2, inicio = 0.0, 0.0, date(2000,1,1)
     if row:
         saldo_cx, saldo_cx2 = float(row[0] or 0), float(row[1] or 0)
@@ -381,47 +411,28 @@ def _calcular_saldo_projetado(conn, data_ref):
         if snap == data_ref: return saldo_cx, saldo_cx2
         inicio = snap
     
-    si = inicio.strftime("%Y-%m-%d")
-    v_din = conn.execute("SELECT SUM(valor) FROM entrada WHERE UPPER(Forma_de_Pagamento)='DINHEIRO' AND DATE(Data)>DATE(?) AND DATE(Data)<=DATE(?)", (si, data_iso)).fetchone()[0] or 0.0
-    s_cx = conn.execute("SELECT SUM(valor) FROM saida WHERE origem_dinheiro='Caixa' AND DATE(data)>DATE(?) AND DATE(data)<=DATE(?)", (si, data_iso)).fetchone()[0] or 0.0
-    s_cx2 = conn.execute("SELECT SUM(valor) FROM saida WHERE origem_dinheiro='Caixa 2' AND DATE(data)>DATE(?) AND DATE(data)<=DATE(?)", (si, data_iso)).fetchone()[0] or 0.0
+    fluxo = saldo_diario.delta(conn, "caixa", CAIXAS, inicio, data_ref)
+    if fluxo is not None:
+        return saldo_cx + fluxo["Caixa"], saldo_cx2 + fluxo["Caixa 2"]
+
+    si = dia_seguinte_iso(inicio)
+    v_din = conn.execute("SELECT SUM(valor) FROM entrada WHERE UPPER(Forma_de_Pagamento)='DINHEIRO' AND Data >= ? AND Data < ?", (si, fim)).fetchone()[0] or 0.0
+    s_cx = conn.execute("SELECT SUM(valor) FROM saida WHERE origem_dinheiro='Caixa' AND data >= ? AND data < ?", (si, fim)).fetchone()[0] or 0.0
+    s_cx2 = conn.execute("SELECT SUM(valor) FROM saida WHERE origem_dinheiro='Caixa 2' AND data >= ? AND data < ?", (si, fim)).fetchone()[0] or 0.0
     
     def delta_mov(bn):
-        i = conn.execute("SELECT SUM(valor) FROM movimentacoes_bancarias WHERE banco=? AND tipo='entrada' AND DATE(data)>DATE(?) AND DATE(data)<=DATE(?) AND LOWER(COALESCE(origem,'')) NOT IN ('entrada','venda','saida','pix')", (bn, si, data_iso)).fetchone()[0] or 0
-        o = conn.execute("SELECT SUM(valor) FROM movimentacoes_bancarias WHERE banco=? AND tipo='saida' AND DATE(data)>DATE(?) AND DATE(data)<=DATE(?) AND LOWER(COALESCE(origem,'')) != 'saida'", (bn, si, data_iso)).fetchone()[0] or 0
+        i = conn.execute("SELECT SUM(valor) FROM movimentacoes_bancarias WHERE banco=? AND tipo='entrada' AND data >= ? AND data < ? AND LOWER(COALESCE(origem,'')) NOT IN ('entrada','venda','saida','pix')", (bn, si, fim)).fetchone()[0] or 0
+        o = conn.execute("SELECT SUM(valor) FROM movimentacoes_bancarias WHERE banco=? AND tipo='saida' AND data >= ? AND data < ? AND LOWER(COALESCE(origem,'')) != 'saida'", (bn, si, fim)).fetchone()[0] or 0
         return i - o
     
     return saldo_cx + v_din - s_cx + delta_mov('Caixa'), saldo_cx2 - s_cx2 + delta_mov('Caixa 2')
 
-# Helpers de UI
-def _dinheiro_e_pix_por_data(caminho_banco, data_ref):
-    with sqlite3.connect(caminho_banco) as conn:
-        d = str(data_ref)
-        vd = conn.execute("SELECT SUM(valor) FROM entrada WHERE UPPER(Forma_de_Pagamento)='DINHEIRO' AND DATE(Data)=DATE(?)", (d,)).fetchone()[0] or 0
-        vp = conn.execute("SELECT SUM(valor) FROM entrada WHERE UPPER(Forma_de_Pagamento)='PIX' AND DATE(Data)=DATE(?)", (d,)).fetchone()[0] or 0
-        return float(vd), float(vp)
-
-def _cartao_d1_liquido_por_data_liq(caminho_banco, data_liq_ref):
-    with sqlite3.connect(caminho_banco) as conn:
-        return float(conn.execute("SELECT SUM(valor_liquido) FROM entrada WHERE DATE(Data_Liq)=DATE(?) AND UPPER(Forma_de_Pagamento) NOT IN ('DINHEIRO','PIX')", (str(data_liq_ref),)).fetchone()[0] or 0)
-
-def _saidas_total_do_dia(caminho_banco, data_ref):
-    with sqlite3.connect(caminho_banco) as conn:
-        return float(conn.execute("SELECT SUM(valor) FROM saida WHERE DATE(data)=DATE(?)", (str(data_ref),)).fetchone()[0] or 0)
-
-def _correcoes_caixa_do_dia(caminho_banco, data_ref):
-    with sqlite3.connect(caminho_banco) as conn:
-        d = str(data_ref)
-        dia = conn.execute("SELECT correcao FROM fechamento_caixa WHERE DATE(data)=DATE(?)", (d,)).fetchone()
-        acum = conn.execute("SELECT SUM(correcao) FROM fechamento_caixa WHERE DATE(data)<=DATE(?)", (d,)).fetchone()
-        return float(dia[0] if dia else 0), float(acum[0] if acum else 0)
-
 def _carregar_fechamento_existente(conn, data_ref):
     try:
-        df = pd.read_sql("SELECT * FROM fechamento_caixa WHERE DATE(data)=DATE(?)", conn, params=(str(data_ref),))
+        df = pd.read_sql("SELECT * FROM fechamento_caixa WHERE data >= ? AND data < ?", conn, params=faixa_iso(data_ref))
         return df.iloc[0].to_dict() if not df.empty else None
     except: return None
 
 def _verificar_fechamento_dia(conn, data_ref):
-    try: return bool(conn.execute("SELECT 1 FROM fechamento_caixa WHERE DATE(data)=DATE(?)", (str(data_ref),)).fetchone())
+    try: return bool(conn.execute("SELECT 1 FROM fechamento_caixa WHERE data >= ? AND data < ? LIMIT 1", faixa_iso(data_ref)).fetchone())
     except: return False
\ No newline at end of file
@@ -1,3 +1,7 @@
-from . import venda, saida, transferencia, pagina, mercadorias, deposito, caixa2
+from shared.lazy_imports import getattr_tardio
+
+__getattr__ = getattr_tardio(__name__, {
+    nome: f".{nome}" for nome in ("venda", "saida", "transferencia", "pagina", "mercadorias", "deposito", "caixa2")
+})
 
 __all__ = ["venda", "saida", "transferencia", "pagina", "mercadorias", "deposito", "caixa2"]
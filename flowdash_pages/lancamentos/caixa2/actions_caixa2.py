@@ -38,7 +38,7 @@ from __future__ import annotations
 import sqlite3
 from typing import TypedDict, Any, Optional, Tuple
 
-from shared.db import get_conn
+from shared.db import get_conn, faixa_iso
 from services.ledger.service_ledger_infra import log_mov_bancaria, _resolve_usuario
 
 __all__ = [
@@ -139,11 +139,11 @@ def transferir_para_caixa2(
             """
             SELECT id, caixa, caixa_2, caixa_vendas, caixa_total, caixa2_dia, caixa2_total
               FROM saldos_caixas
-             WHERE DATE(data) = DATE(?)
+             WHERE data >= ? AND data < ?
              ORDER BY id DESC
              LIMIT 1
             """,
-            (data_str,),
+            faixa_iso(data_str),
         ).fetchone()
 
         if not row:
@@ -256,11 +256,11 @@ def _ensure_snapshot_do_dia(conn: sqlite3.Connection, data_str: str) -> None:
         """
         SELECT id, caixa, caixa_2, caixa_vendas, caixa_total, caixa2_dia, caixa2_total
           FROM saldos_caixas
-         WHERE DATE(data)=DATE(?)
+         WHERE data >= ? AND data < ?
          ORDER BY id DESC
          LIMIT 1
         """,
-        (data_str,),
+        faixa_iso(data_str),
     ).fetchone()
 
     if not dia:
@@ -269,12 +269,11 @@ def _ensure_snapshot_do_dia(conn: sqlite3.Connection, data_str: str) -> None:
             """
             SELECT caixa_total, caixa2_total
               FROM saldos_caixas
-             WHERE DATE(data) = (
-                SELECT MAX(DATE(data)) FROM saldos_caixas WHERE DATE(data) < DATE(?)
-             )
+             WHERE data < ?
+             ORDER BY data DESC
              LIMIT 1
             """,
-            (data_str,),
+            (faixa_iso(data_str)[0],),
         ).fetchone()
 
         if prev_totais:
@@ -14,7 +14,7 @@ import sqlite3
 import pandas as pd
 import streamlit as st
 
-from .actions_pagina import carregar_resumo_dia
+from flowdash_pages.resumo_dia import carregar_resumo_dia
 from .ui_cards_pagina import render_card_row, render_card_rows, render_card_mercadorias
 from .ui_cards_pagina import render_card_row, render_card_rows, render_card_mercadorias
 from flowdash_pages.utils_timezone import hoje_br
@@ -133,12 +133,12 @@ def render_page(caminho_banco: str, data_default: date | None = None) -> None:
         # st.stop() # Bloqueia o carregamento dos formulários abaixo
     # =================================================================
 
-    # Resumo agregado do dia
-    resumo = carregar_resumo_dia(caminho_banco, data_lanc) or {}
+    # Resumo agregado do dia (ResumoDia: mesmo retrato do Fechamento, cacheado por versão de dados)
+    resumo = carregar_resumo_dia(caminho_banco, data_lanc)
 
     # ----- Resumo do Dia -----
-    total_vendas = float(resumo.get("total_vendas", 0.0))
-    total_saidas = float(resumo.get("total_saidas", 0.0))
+    total_vendas = resumo.total_vendas
+    total_saidas = resumo.total_saidas
     
     # Se for vendedor, esconde a informação de saídas no Resumo
     if is_vendedor:
@@ -156,12 +156,12 @@ def render_page(caminho_banco: str, data_default: date | None = None) -> None:
     # Ocultar para perfil vendedor
     if not is_vendedor:
         # 1) Caixa e Caixa 2 — EXIBIÇÃO com "saldo projetado" (acumulado real)
-        from flowdash_pages.fechamento.fechamento import _ultimo_caixas_ate
-        disp_caixa, disp_caixa2, disp_ref = _ultimo_caixas_ate(caminho_banco, data_lanc)
+        disp_caixa, disp_caixa2 = resumo.ultimo_caixa, resumo.ultimo_caixa2
+        disp_ref = date.fromisoformat(resumo.ultimo_caixa_data) if resumo.ultimo_caixa_data else None
 
         # 2) Bancos (Inter, InfinitePay, Bradesco) com tolerância a chaves variantes
         # 2) Bancos (Dinâmico: itera sobre todos os bancos encontrados)
-        saldos_bancos = resumo.get("saldos_bancos") or {}
+        saldos_bancos = resumo.saldos_bancos
         lista_bancos = []
         
         # Itera sobre chaves ordenadas alfabeticamente
@@ -183,15 +183,15 @@ def render_page(caminho_banco: str, data_default: date | None = None) -> None:
     # Ocultar para perfil vendedor
     if not is_vendedor:
         # 1) P/ Caixa 2 (número)
-        transf_caixa2_total = float(resumo.get("transf_caixa2_total", 0.0))
+        transf_caixa2_total = resumo.transf_caixa2_total
 
         # 2) Depósitos (lista)
         dep_lin: list[str] = []
-        for b, v in (resumo.get("depositos_list") or []):
+        for b, v in resumo.depositos_list:
             dep_lin.append(f"{_brl(v)} → {b or '—'}")
 
         # 3) Transferência entre bancos — TABELA real (Valor | Saída | Entrada)
-        trf_raw = resumo.get("transf_bancos_list") or []  # List[Tuple[origem, destino, valor]]
+        trf_raw = list(resumo.transf_bancos_list)  # List[Tuple[origem, destino, valor]]
         if trf_raw:
             try:
                 trf_df = pd.DataFrame(trf_raw, columns=["Saída", "Entrada", "Valor"])
@@ -227,7 +227,7 @@ def render_page(caminho_banco: str, data_default: date | None = None) -> None:
         )
 
     # ----- Mercadorias -----
-    render_card_mercadorias(resumo.get("compras_list") or [], resumo.get("receb_list") or [])
+    render_card_mercadorias(list(resumo.compras_list), list(resumo.receb_list))
 
     # ----- Ações (subpáginas) -----
     if not bloqueio_pendencia and not dia_esta_fechado:
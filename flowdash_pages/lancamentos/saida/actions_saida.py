@@ -23,7 +23,7 @@ from typing import TypedDict, Optional, Callable, Tuple
 from datetime import date
 import pandas as pd
 
-from shared.db import get_conn
+from shared.db import faixa_iso, get_conn
 from services.ledger import LedgerService
 
 from repository.cartoes_repository import (
@@ -408,9 +408,10 @@ def _garantir_saldo_inicial_automatico(caminho_banco: str, data_iso: str) -> Non
     Verifica se existe saldo para a data. Se não, rola o saldo do dia anterior.
     Isso evita que o primeiro lançamento do dia zere o saldo incorretamente.
     """
+    ini, fim = faixa_iso(data_iso)
     with get_conn(caminho_banco) as conn:
         # 1) Verifica existência
-        cur = conn.execute("SELECT 1 FROM saldos_caixas WHERE DATE(data) = DATE(?) LIMIT 1", (data_iso,))
+        cur = conn.execute("SELECT 1 FROM saldos_caixas WHERE data >= ? AND data < ? LIMIT 1", (ini, fim))
         if cur.fetchone():
             return
 
@@ -419,11 +420,11 @@ def _garantir_saldo_inicial_automatico(caminho_banco: str, data_iso: str) -> Non
             """
             SELECT caixa_total, caixa2_total
             FROM saldos_caixas
-            WHERE DATE(data) < DATE(?)
+            WHERE data < ?
             ORDER BY data DESC
             LIMIT 1
             """,
-            (data_iso,)
+            (ini,)
         )
         row = cur.fetchone()
         
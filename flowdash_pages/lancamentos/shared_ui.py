@@ -11,7 +11,7 @@ from __future__ import annotations
 import re
 import sqlite3
 from typing import Optional, Any
-from datetime import date, timedelta
+from datetime import date
 
 import pandas as pd
 import streamlit as st
@@ -35,7 +35,10 @@ except Exception:
             return f"R$ {n:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 from shared.db import get_conn
+from shared.calendario_util import somar_dias_uteis
+from services.taxas import indice_taxas
 from shared.ids import uid_venda_liquidacao
+from shared.saldos_bancos import somar_saldo_banco
 from repository.movimentacoes_repository import MovimentacoesRepository
 
 
@@ -148,28 +151,12 @@ DIAS_COMPENSACAO = {
 
 def proximo_dia_util_br(data_base: date, dias: int) -> date:
     """
-    Retorna a próxima data útil no Brasil (considera fins de semana e, se possível, feriados).
+    Retorna a data `dias` dias úteis após `data_base` (BR-DF: fins de semana e feriados).
 
-    Fallback:
-        Se a biblioteca de feriados não estiver disponível, considera apenas fins de semana.
+    Consulta O(1) no calendário pré-calculado de `shared.calendario_util`
+    (sem Workalendar, considera apenas fins de semana).
     """
-    try:
-        from workalendar.america import BrazilDistritoFederal
-        cal = BrazilDistritoFederal()
-        d, add = data_base, 0
-        while add < dias:
-            d += timedelta(days=1)
-            if cal.is_working_day(d):
-                add += 1
-        return d
-    except Exception:
-        # fallback: considera apenas fins de semana
-        d, add = data_base, 0
-        while add < dias:
-            d += timedelta(days=1)
-            if d.weekday() < 5:
-                add += 1
-        return d
+    return somar_dias_uteis(data_base, dias)
 
 def inserir_mov_liquidacao_venda(
     caminho_banco: str,
@@ -256,54 +243,11 @@ def obter_banco_destino(
     Obtém banco destino (tabela `taxas_maquinas`) de acordo com forma, maquineta, bandeira e parcelas.
 
     Notas:
-        - Matching **case-insensitive** para `forma_pagamento` via `UPPER(...)`.
+        - Consulta o índice em memória (`services.taxas.indice_taxas`), sem SELECT por chamada.
+        - Matching **case-insensitive** para `forma_pagamento`.
         - Tenta variação para LINK_PAGAMENTO utilizando CRÉDITO como fallback.
     """
-    formas_try = [forma]
-    if forma == "LINK_PAGAMENTO":
-        formas_try.append("CRÉDITO")
-
-    with get_conn(caminho_banco) as conn:
-        # match preciso por bandeira e parcelas (case-insensitive na forma)
-        for f in formas_try:
-            row = conn.execute(
-                """
-                SELECT banco_destino FROM taxas_maquinas
-                WHERE UPPER(forma_pagamento)=? AND maquineta=? AND bandeira=? AND parcelas=?
-                LIMIT 1
-                """,
-                (f.upper(), maquineta or "", bandeira or "", int(parcelas or 1))
-            ).fetchone()
-            if row and row[0]:
-                return row[0]
-
-        # fallback por maquineta (sem filtrar bandeira/parcelas), ainda case-insensitive na forma
-        for f in formas_try:
-            row = conn.execute(
-                """
-                SELECT banco_destino FROM taxas_maquinas
-                WHERE UPPER(forma_pagamento)=? AND maquineta=?
-                  AND banco_destino IS NOT NULL AND TRIM(banco_destino)<>'' 
-                LIMIT 1
-                """,
-                (f.upper(), maquineta or "")
-            ).fetchone()
-            if row and row[0]:
-                return row[0]
-
-        # último fallback: qualquer registro da maquineta com banco_destino definido
-        row = conn.execute(
-            """
-            SELECT banco_destino FROM taxas_maquinas
-            WHERE maquineta=? AND banco_destino IS NOT NULL AND TRIM(banco_destino)<>'' 
-            LIMIT 1
-            """,
-            (maquineta or "",)
-        ).fetchone()
-        if row and row[0]:
-            return row[0]
-
-    return None
+    return indice_taxas(caminho_banco).banco_destino(forma, maquineta, bandeira, parcelas)
 
 
 # ==========================================
@@ -341,31 +285,19 @@ def canonicalizar_banco(caminho_banco: str, nome_banco: str) -> Optional[str]:
         return aliases[alvo]
     return None
 
-def _date_col_name(conn: sqlite3.Connection, table: str) -> str:
-    """Descobre o nome da coluna de data ('data' ou 'Data') em uma tabela (com validação do nome)."""
-    table_safe = _validate_table_name(table)
-    cols = [r[1] for r in conn.execute(f'PRAGMA table_info("{table_safe}");').fetchall()]
-    for cand in ("data", "Data"):
-        if cand in cols:
-            return cand
-    return "data"  # fallback
-
 def upsert_saldos_bancos(caminho_banco: str, data_str: str, banco_nome: str, valor: float) -> None:
     """
-    Soma `valor` na coluna do banco `banco_nome` na linha da data `data_str`.
+    Soma `valor` no saldo do banco `banco_nome` na data `data_str`.
 
     Regras:
-        - Garante que a coluna exista (`REAL NOT NULL DEFAULT 0.0`).
-        - Cria a linha da data se necessário (ou soma se já existir).
-        - Usa COALESCE para evitar `NULL`.
-        - Funciona com coluna `data` OU `Data`.
+        - O banco precisa estar em `bancos_cadastrados`.
+        - Uma linha por dia × banco em `saldos_bancos_mov` (UPSERT via
+          `shared.saldos_bancos`), sem ALTER TABLE por banco novo.
     """
     if not valor or valor <= 0:
         return
 
     with get_conn(caminho_banco) as conn:
-        cur = conn.cursor()
-
         try:
             nomes_cadastrados = pd.read_sql("SELECT nome FROM bancos_cadastrados", conn)["nome"].astype(str).tolist()
         except Exception:
@@ -373,35 +305,7 @@ def upsert_saldos_bancos(caminho_banco: str, data_str: str, banco_nome: str, val
         if banco_nome not in nomes_cadastrados:
             raise ValueError(f"Banco '{banco_nome}' não está registrado em bancos_cadastrados.")
 
-        cols_info = cur.execute('PRAGMA table_info("saldos_bancos");').fetchall()
-        existentes = {c[1] for c in cols_info}
-        if banco_nome not in existentes:
-            cur.execute(f'ALTER TABLE saldos_bancos ADD COLUMN "{banco_nome}" REAL NOT NULL DEFAULT 0.0')
-            conn.commit()
-            cols_info = cur.execute('PRAGMA table_info("saldos_bancos");').fetchall()
-            existentes = {c[1] for c in cols_info}
-
-        date_col = _date_col_name(conn, "saldos_bancos")
-
-        row = cur.execute(f'SELECT rowid FROM saldos_bancos WHERE "{date_col}"=? LIMIT 1;', (data_str,)).fetchone()
-        if row:
-            cur.execute(
-                f'UPDATE saldos_bancos SET "{banco_nome}" = COALESCE("{banco_nome}", 0.0) + ? '
-                f'WHERE "{date_col}" = ?;',
-                (float(valor), data_str)
-            )
-        else:
-            colnames = [c[1] for c in cols_info]
-            outras = [c for c in colnames if c != date_col]
-            placeholders = ",".join(["?"] * (1 + len(outras)))
-            cols_sql = f'"{date_col}",' + ",".join(f'"{c}"' for c in outras)
-            valores = [data_str] + [0.0] * len(outras)
-            if banco_nome in outras:
-                valores[1 + outras.index(banco_nome)] = float(valor)
-            else:
-                raise RuntimeError(f"Coluna '{banco_nome}' não encontrada após criação em saldos_bancos.")
-            cur.execute(f'INSERT INTO saldos_bancos ({cols_sql}) VALUES ({placeholders});', valores)
-
+        somar_saldo_banco(conn, data_str, banco_nome, float(valor))
         conn.commit()
 
 
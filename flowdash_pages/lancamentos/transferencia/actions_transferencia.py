@@ -8,9 +8,9 @@ Fluxo:
         - SAÍDA no banco de ORIGEM  (tipo='saida',   origem='transferencia')
         - ENTRADA no banco de DESTINO (tipo='entrada', origem='transferencia')
        As linhas ficam pareadas por `referencia_id` (cross-link).
-    3) Atualiza `saldos_bancos` no dia:
-        - decrementa coluna do banco de ORIGEM
-        - incrementa coluna do banco de DESTINO
+    3) Atualiza o saldo do dia por banco (`saldos_bancos_mov`):
+        - decrementa o banco de ORIGEM
+        - incrementa o banco de DESTINO
 
 Observação:
     - O texto salvo em `observacao` segue o padrão **sem TX**:
@@ -27,6 +27,7 @@ import pandas as pd
 
 from repository.movimentacoes_repository import MovimentacoesRepository
 from shared.db import get_conn
+from shared.saldos_bancos import somar_saldo_banco
 from utils.utils import coerce_data, formatar_moeda
 from flowdash_pages.cadastros.cadastro_classes import BancoRepository
 from flowdash_pages.lancamentos.shared_ui import canonicalizar_banco, upsert_saldos_bancos
@@ -84,56 +85,19 @@ def _ensure_cols_movs(caminho_banco: str) -> None:
 
 
 def _decrementar_saldos_bancos(caminho_banco: str, data_str: str, banco_nome: str, valor: float) -> None:
-    """Decrementa `valor` no banco `banco_nome` em `saldos_bancos` na data `data_str`.
+    """Decrementa `valor` no banco `banco_nome` na data `data_str` (`saldos_bancos_mov`).
 
     Args:
         caminho_banco: Caminho do arquivo SQLite.
         data_str: Data em "YYYY-MM-DD".
-        banco_nome: Coluna do banco.
+        banco_nome: Nome do banco.
         valor: Valor a decrementar (ignorado se ≤ 0).
     """
     if not valor or valor <= 0:
         return
 
     with get_conn(caminho_banco) as conn:
-        cur = conn.cursor()
-
-        # Garante coluna do banco
-        cols_info = cur.execute("PRAGMA table_info(saldos_bancos);").fetchall()
-        existentes = {c[1] for c in cols_info}
-        if banco_nome not in existentes:
-            cur.execute(f'ALTER TABLE saldos_bancos ADD COLUMN "{banco_nome}" REAL NOT NULL DEFAULT 0.0')
-            conn.commit()
-            cols_info = cur.execute("PRAGMA table_info(saldos_bancos);").fetchall()
-
-        # Coluna de data
-        cols = [r[1] for r in cols_info]
-        date_col = "data" if "data" in cols else ("Data" if "Data" in cols else "data")
-
-        # Atualiza a linha do dia ou insere nova
-        row = cur.execute(
-            f'SELECT rowid FROM saldos_bancos WHERE "{date_col}"=? LIMIT 1;',
-            (data_str,),
-        ).fetchone()
-
-        if row:
-            cur.execute(
-                f'UPDATE saldos_bancos '
-                f'SET "{banco_nome}" = COALESCE("{banco_nome}", 0.0) - ? '
-                f'WHERE "{date_col}" = ?;',
-                (float(valor), data_str),
-            )
-        else:
-            colnames = [c[1] for c in cols_info]
-            outras = [c for c in colnames if c != date_col]
-            placeholders = ",".join(["?"] * (1 + len(outras)))
-            cols_sql = f'"{date_col}",' + ",".join(f'"{c}"' for c in outras)
-            valores = [data_str] + [0.0] * len(outras)
-            if banco_nome in outras:
-                idx = 1 + outras.index(banco_nome)
-                valores[idx] = -float(valor)
-            cur.execute(f'INSERT INTO saldos_bancos ({cols_sql}) VALUES ({placeholders});', valores)
-
+        somar_saldo_banco(conn, data_str, banco_nome, -float(valor))
         conn.commit()
 
 
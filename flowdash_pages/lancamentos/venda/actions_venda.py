@@ -23,9 +23,11 @@ from __future__ import annotations
 from typing import Optional, Tuple, Any
 import pandas as pd
 import sqlite3
-from datetime import datetime, timedelta, date
+from datetime import datetime
 
+from shared.calendario_util import data_liquidacao
 from shared.db import get_conn
+from services.taxas import indice_taxas
 from flowdash_pages.lancamentos.shared_ui import (
     obter_banco_destino,   # só este
 )
@@ -76,18 +78,11 @@ def _descobrir_taxa_e_banco(
     if forma_up in ["DÉBITO", "CREDITO", "CRÉDITO", "LINK_PAGAMENTO"]:
         # normaliza 'CREDITO' -> 'CRÉDITO' se vier sem acento
         forma_norm = "CRÉDITO" if forma_up in ("CREDITO", "CRÉDITO") else forma_up
-        formas = _formas_equivalentes(forma_norm)
-        placeholders = ",".join(["?"] * len(formas))
-        with get_conn(db_like) as conn:
-            row = conn.execute(
-                f"""
-                SELECT taxa_percentual, banco_destino FROM taxas_maquinas
-                WHERE UPPER(forma_pagamento) IN ({placeholders})
-                  AND maquineta=? AND bandeira=? AND parcelas=?
-                LIMIT 1
-                """,
-                [f.upper() for f in formas] + [maquineta, bandeira, int(parcelas or 1)],
-            ).fetchone()
+        indice = indice_taxas(db_like)
+        row = next(
+            (r for f in _formas_equivalentes(forma_norm) if (r := indice.exata(f, maquineta, bandeira, parcelas))),
+            None,
+        )
         if row:
             taxa = float(row[0] or 0.0)
             banco_destino = row[1] or None
@@ -96,16 +91,7 @@ def _descobrir_taxa_e_banco(
 
     elif forma_up == "PIX":
         if (modo_pix or "") == "Via maquineta":
-            with get_conn(db_like) as conn:
-                row = conn.execute(
-                    """
-                    SELECT taxa_percentual, banco_destino FROM taxas_maquinas
-                    WHERE UPPER(forma_pagamento)='PIX'
-                      AND maquineta=? AND bandeira='' AND parcelas=1
-                    LIMIT 1
-                    """,
-                    (maquineta,),
-                ).fetchone()
+            row = indice_taxas(db_like).exata("PIX", maquineta, "", 1)
             taxa = float(row[0] or 0.0) if row else 0.0
             banco_destino = (row[1] if row and row[1] else None) or obter_banco_destino(
                 db_like, "PIX", maquineta, "", 1
@@ -133,33 +119,9 @@ def _descobrir_taxa_e_banco(
 
 # ------------------ Fallback de liquidação se o service exigir ------------------ #
 
-def _is_working_day_br(df: date) -> bool:
-    """Tenta calendário BR-DF; se não houver, usa seg-sex."""
-    try:
-        from workalendar.registry import registry
-        cal_cls = registry.get("BR-DF")
-        if cal_cls:
-            cal = cal_cls()
-            return bool(cal.is_working_day(df))
-    except Exception:
-        pass
-    return df.weekday() < 5  # fallback: seg-sex
-
-
-def _next_working_day_br(df: date) -> date:
-    while not _is_working_day_br(df):
-        df += timedelta(days=1)
-    return df
-
-
 def _calc_data_liq_fallback(data_venda_str: str, forma_up: str) -> str:
     """Regra: Dinheiro/PIX = D; Débito/Crédito/Link = D+1 útil (BR-DF)."""
-    dv = pd.to_datetime(data_venda_str).date()
-    if forma_up in ("DINHEIRO", "PIX"):
-        liq = dv
-    else:
-        liq = _next_working_day_br(dv + timedelta(days=1))
-    return liq.isoformat()
+    return data_liquidacao(data_venda_str, forma_up)
 
 
 # ------------------ Chamadas ao service (com e sem data_liq) ------------------ #
@@ -73,9 +73,7 @@ def render_venda(state) -> None:
             
             # 🔄 força recarregar o Resumo do Dia / cards
             st.session_state["_resumo_dirty"] = time.time()
-
-            # ✅ limpa caches
-            st.cache_data.clear()
+            # (caches por versão de dados se invalidam sozinhos: ver shared.data_version)
 
             st.rerun()
         else:
@@ -33,7 +33,11 @@ import sqlite3
 
 import pandas as pd
 import streamlit as st
-import plotly.graph_objects as go
+from shared.lazy_imports import modulo_tardio
+from shared.db import conectar
+from shared.schema_cache import mapa_colunas
+
+go = modulo_tardio("plotly.graph_objects")
 
 try:
     from utils.utils import formatar_moeda as _fmt
@@ -191,8 +195,7 @@ def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
     return cur.fetchone() is not None
 
 def _pick_cols(conn: sqlite3.Connection, table: str) -> Optional[Tuple[Optional[str], str, str]]:
-    cols = [r[1] for r in conn.execute(f"PRAGMA table_info('{table}')")]
-    lower = {c.lower(): c for c in cols}
+    lower = mapa_colunas(conn, table)
     def _first(cands: List[str]) -> Optional[str]:
         for c in cands:
             if c.lower() in lower: return lower[c.lower()]
@@ -203,7 +206,7 @@ def _pick_cols(conn: sqlite3.Connection, table: str) -> Optional[Tuple[Optional[
 
 def _load_df_entrada_from_db(db_path: str) -> pd.DataFrame:
     try:
-        conn = sqlite3.connect(db_path)
+        conn = conectar(db_path)
     except Exception:
         return pd.DataFrame(columns=["Usuario","Data","Valor"])
     try:
@@ -230,7 +233,7 @@ def _load_df_metas_from_db(db_path: str) -> pd.DataFrame:
     Normaliza `mes` para 'YYYY-MM' quando existir.
     """
     try:
-        conn = sqlite3.connect(db_path)
+        conn = conectar(db_path)
     except Exception:
         return pd.DataFrame()
     try:
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+flowdash_pages.resumo_dia
+=========================
+
+**Retrato do dia** (`ResumoDia`): todos os números de uma data usados pelos
+cards de Lançamentos e pelo Fechamento de Caixa, lidos numa conexão só.
+
+Antes cada card fazia sua consulta (vendas, saídas, caixa 2, depósitos,
+`SELECT *` em mercadorias para compras e recebimentos) e os helpers do
+fechamento (`_dinheiro_e_pix_por_data`, `_cartao_d1_liquido_por_data_liq`,
+...) abriam uma conexão por SUM. Aqui são duas consultas com CTE:
+
+1. totais (uma linha): vendas por forma, cartão líquido por `Data_Liq`,
+   saídas, linha de `saldos_caixas`, transferências p/ Caixa 2, fechamento e
+   correções;
+2. listas do dia: depósitos, transferências banco→banco (pareadas),
+   compras e recebimentos de mercadorias.
+
+Os saldos acumulados (bancos e caixa projetado) vêm de `finance_logic` na
+mesma conexão — leituras indexadas quando o banco tem `saldo_diario`.
+
+O resultado é imutável e cacheado por (arquivo, data, versão das tabelas
+lidas) via `shared.data_version.cache_por_tabelas`: reruns do Streamlit sem
+lançamento novo não tocam o banco.
+
+Uso
+---
+    from flowdash_pages.resumo_dia import carregar_resumo_dia
+
+    r = carregar_resumo_dia(caminho_banco, data_lanc)
+    r.total_vendas, r.entradas_total, r.saldos_bancos.get("Inter", 0.0)
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import date
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from shared.data_version import cache_por_tabelas
+from shared.db import DataLike, conectar, data_iso, dia_seguinte_iso
+from shared.schema_cache import mapa_colunas, tem_tabela
+from flowdash_pages.finance_logic import (
+    _calcular_saldo_projetado,
+    _get_bancos_ativos,
+    _get_saldos_bancos_acumulados,
+)
+
+# Formas de pagamento somadas como "venda" no card de Lançamentos (variações).
+FORMAS_VENDA = (
+    "DINHEIRO", "PIX",
+    "DÉBITO", "DEBITO",
+    "CRÉDITO", "CREDITO",
+    "LINK_PAGAMENTO", "LINK PAGAMENTO", "LINK-DE-PAGAMENTO", "LINK DE PAGAMENTO",
+)
+
+# Tabelas lidas (dependências do cache por versão de dados)
+TABELAS_RESUMO = (
+    "entrada", "saida", "saldos_caixas", "movimentacoes_bancarias",
+    "mercadorias", "fechamento_caixa", "bancos",
+)
+
+Item3 = Tuple[str, str, float]
+
+
+@dataclass(frozen=True)
+class ResumoDia:
+    """Números de um dia (`data` = 'YYYY-MM-DD'). Imutável: a instância é compartilhada pelo cache."""
+    data: str
+    # Entradas
+    total_vendas: float = 0.0           # formas de venda, por `Data`
+    valor_dinheiro: float = 0.0
+    valor_pix: float = 0.0
+    cartao_d1_liquido: float = 0.0      # líquido das vendas em cartão que liquidam no dia (`Data_Liq`)
+    # Saídas
+    total_saidas: float = 0.0
+    # Caixas: linha de `saldos_caixas` do dia e último registro <= dia
+    caixa_total: float = 0.0
+    caixa2_total: float = 0.0
+    tem_snapshot: bool = False
+    ultimo_caixa: float = 0.0
+    ultimo_caixa2: float = 0.0
+    ultimo_caixa_data: Optional[str] = None
+    caixa_projetado: float = 0.0        # último registro + fluxo até o dia
+    caixa2_projetado: float = 0.0
+    # Transferências e mercadorias do dia
+    transf_caixa2_total: float = 0.0
+    depositos_list: Tuple[Tuple[str, float], ...] = ()
+    transf_bancos_list: Tuple[Item3, ...] = ()      # (origem, destino, valor)
+    compras_list: Tuple[Item3, ...] = ()            # (coleção, fornecedor, valor)
+    receb_list: Tuple[Item3, ...] = ()
+    # Bancos (acumulado <= dia)
+    saldos_bancos: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+    # Fechamento
+    fechado: bool = False
+    correcao_dia: float = 0.0
+    correcao_acumulada: float = 0.0
+
+    @property
+    def entradas_total(self) -> float:
+        """Dinheiro + Pix + cartão D-1 líquido (card "Entradas" do fechamento)."""
+        return self.valor_dinheiro + self.valor_pix + self.cartao_d1_liquido
+
+
+# ===================== SQL =====================
+
+def _literais(valores) -> str:
+    return ", ".join("'" + str(v).replace("'", "''") + "'" for v in valores)
+
+
+def _col(conn: sqlite3.Connection, tabela: str, *candidatas: str) -> Optional[str]:
+    cols = mapa_colunas(conn, tabela)
+    for c in candidatas:
+        if c.lower() in cols:
+            return f'"{cols[c.lower()]}"'
+    return None
+
+
+def _chave_dedupe(conn: sqlite3.Connection) -> str:
+    """Chave de deduplicação das movimentações: `trans_uid` quando a coluna existe, senão `id`."""
+    uid = _col(conn, "movimentacoes_bancarias", "trans_uid")
+    return f"COALESCE({uid}, CAST(id AS TEXT))" if uid else "CAST(id AS TEXT)"
+
+
+def _sql_totais(conn: sqlite3.Connection) -> str:
+    """Uma linha com todos os totais do dia; tabelas/colunas ausentes viram zero."""
+    ctes = {
+        "vendas": "SELECT 0.0 AS total, 0.0 AS dinheiro, 0.0 AS pix, 0.0 AS cartao",
+        "saidas": "SELECT 0.0 AS total",
+        "transf_caixa2": "SELECT 0.0 AS total",
+        "fech": "SELECT 0 AS fechado, 0.0 AS correcao, 0.0 AS correcao_acum",
+    }
+    caixas = "SELECT NULL AS caixa_total, NULL AS caixa2_total, NULL AS data"
+
+    if tem_tabela(conn, "entrada"):
+        data_liq = _col(conn, "entrada", "Data_Liq")
+        liquido = _col(conn, "entrada", "valor_liquido")
+        cartao = "0.0"
+        if data_liq and liquido:
+            cartao = f"""(SELECT TOTAL({liquido}) FROM entrada
+                     WHERE {data_liq} >= :ini AND {data_liq} < :fim
+                       AND UPPER(Forma_de_Pagamento) NOT IN ('DINHEIRO', 'PIX'))"""
+        ctes["vendas"] = f"""
+            SELECT TOTAL(CASE WHEN UPPER(COALESCE(Forma_de_Pagamento, '')) IN ({_literais(FORMAS_VENDA)})
+                              THEN CAST(Valor AS REAL) END) AS total,
+                   TOTAL(CASE WHEN UPPER(Forma_de_Pagamento) = 'DINHEIRO' THEN Valor END) AS dinheiro,
+                   TOTAL(CASE WHEN UPPER(Forma_de_Pagamento) = 'PIX' THEN Valor END) AS pix,
+                   {cartao} AS cartao
+              FROM entrada
+             WHERE Data >= :ini AND Data < :fim"""
+    if tem_tabela(conn, "saida"):
+        ctes["saidas"] = "SELECT TOTAL(valor) AS total FROM saida WHERE data >= :ini AND data < :fim"
+    if tem_tabela(conn, "movimentacoes_bancarias"):
+        # dedupe por trans_uid/id (mesma regra do card "P/ Caixa 2")
+        ctes["transf_caixa2"] = f"""
+            SELECT TOTAL(m.valor) AS total
+              FROM movimentacoes_bancarias m
+              JOIN (SELECT MAX(id) AS id FROM movimentacoes_bancarias
+                     WHERE data >= :ini AND data < :fim AND origem = 'transferencia_caixa'
+                     GROUP BY {_chave_dedupe(conn)}) d ON d.id = m.id"""
+    if tem_tabela(conn, "fechamento_caixa"):
+        corr = _col(conn, "fechamento_caixa", "correcao")
+        if corr:
+            ctes["fech"] = f"""
+                SELECT TOTAL(data >= :ini) > 0 AS fechado,
+                       TOTAL(CASE WHEN data >= :ini THEN {corr} END) AS correcao,
+                       TOTAL({corr}) AS correcao_acum
+                  FROM fechamento_caixa WHERE data < :fim"""
+        else:
+            ctes["fech"] = """
+                SELECT EXISTS (SELECT 1 FROM fechamento_caixa WHERE data >= :ini AND data < :fim) AS fechado,
+                       0.0 AS correcao, 0.0 AS correcao_acum"""
+    if tem_tabela(conn, "saldos_caixas"):
+        caixas = """
+            SELECT caixa_total, caixa2_total, data FROM saldos_caixas
+             WHERE data < :fim ORDER BY data DESC LIMIT 1"""
+
+    corpo = ",\n".join(f"{nome} AS ({sql})" for nome, sql in ctes.items())
+    return f"""
+        WITH {corpo},
+        caixas AS ({caixas})
+        SELECT v.total, v.dinheiro, v.pix, v.cartao, s.total, t.total,
+               f.fechado, f.correcao, f.correcao_acum,
+               cx.caixa_total, cx.caixa2_total, cx.data
+          FROM vendas v, saidas s, transf_caixa2 t, fech f
+          LEFT JOIN caixas cx ON 1
+    """
+
+
+def _sql_listas(conn: sqlite3.Connection) -> Optional[str]:
+    """(secao, ordem, a, b, valor) das listas do dia; secao 1=depósito, 2=transf. bancos, 3=compra, 4=recebimento."""
+    ctes: List[str] = []
+    partes: List[str] = []
+    if tem_tabela(conn, "movimentacoes_bancarias"):
+        ctes.append(f"""
+            dep AS (
+                SELECT MAX(id) AS id FROM movimentacoes_bancarias
+                 WHERE data >= :ini AND data < :fim AND origem = 'deposito'
+                 GROUP BY {_chave_dedupe(conn)}
+            )""")
+        # Chave de pareamento: MIN(id, referencia_id) > token TX= na observação > trans_uid > id
+        # (cada critério só entra se a coluna existir)
+        ref = _col(conn, "movimentacoes_bancarias", "referencia_id")
+        obs = _col(conn, "movimentacoes_bancarias", "observacao")
+        uid = _col(conn, "movimentacoes_bancarias", "trans_uid")
+        ordem = f"CASE WHEN {ref} IS NOT NULL AND {ref} > 0 THEN MIN(id, {ref}) ELSE id END" if ref else "id"
+        casos = []
+        if ref:
+            casos.append(f"WHEN {ref} IS NOT NULL AND {ref} > 0 THEN CAST(MIN(id, {ref}) AS TEXT)")
+        if obs:
+            casos.append(f"WHEN instr(COALESCE({obs}, ''), 'TX=') > 0 THEN substr({obs}, instr({obs}, 'TX=') + 3, 36)")
+        if uid:
+            casos.append(f"WHEN {uid} IS NOT NULL AND TRIM({uid}) <> '' THEN {uid}")
+        tx = f"CASE {' '.join(casos)} ELSE CAST(id AS TEXT) END" if casos else "CAST(id AS TEXT)"
+        ctes.append(f"""
+            trf AS (
+                SELECT banco, tipo, valor, {ordem} AS ordem, {tx} AS tx
+                  FROM movimentacoes_bancarias
+                 WHERE origem = 'transferencia' AND data >= :ini AND data < :fim
+            )""")
+        partes.append("""
+            SELECT 1, m.id, m.banco, NULL, m.valor
+              FROM movimentacoes_bancarias m JOIN dep ON dep.id = m.id""")
+        partes.append("""
+            SELECT 2, MIN(ordem),
+                   MAX(CASE WHEN tipo = 'saida' THEN banco END),
+                   MAX(CASE WHEN tipo = 'entrada' THEN banco END),
+                   ABS(COALESCE(MAX(CASE WHEN tipo = 'entrada' THEN valor END),
+                                MAX(CASE WHEN tipo = 'saida' THEN valor END)))
+              FROM trf GROUP BY tx""")
+    if tem_tabela(conn, "mercadorias"):
+        colecao = _col(conn, "mercadorias", "Colecao", "Coleção") or "NULL"
+        fornecedor = _col(conn, "mercadorias", "Fornecedor") or "NULL"
+        v_merc = _col(conn, "mercadorias", "Valor_Mercadoria", "Valor da Mercadoria") or "NULL"
+        v_receb = _col(conn, "mercadorias", "Valor_Recebido") or "NULL"
+        if _col(conn, "mercadorias", "Data"):
+            partes.append(f"""
+                SELECT 3, rowid, {colecao}, {fornecedor}, {v_merc}
+                  FROM mercadorias WHERE Data >= :ini AND Data < :fim""")
+        if _col(conn, "mercadorias", "Recebimento"):
+            partes.append(f"""
+                SELECT 4, rowid, {colecao}, {fornecedor}, COALESCE({v_receb}, {v_merc})
+                  FROM mercadorias WHERE Recebimento >= :ini AND Recebimento < :fim""")
+    if not partes:
+        return None
+    com = ("WITH " + ",".join(ctes)) if ctes else ""
+    return f"{com}\nSELECT * FROM ({' UNION ALL '.join(partes)}) ORDER BY 1, 2"
+
+
+# ===================== API =====================
+
+def _num(v: Any) -> float:
+    try:
+        return float(v or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _txt(v: Any) -> str:
+    return "" if v is None else str(v).strip()
+
+
+def resumo_dia_conn(conn: sqlite3.Connection, data_ref: DataLike) -> ResumoDia:
+    """Monta o `ResumoDia` numa conexão já aberta (sem cache; só SELECT)."""
+    dia = data_iso(data_ref)
+    params = {"ini": dia, "fim": dia_seguinte_iso(dia)}
+
+    (vendas, dinheiro, pix, cartao, saidas, transf_cx2,
+     fechado, corr_dia, corr_acum, cx, cx2, cx_data) = conn.execute(_sql_totais(conn), params).fetchone()
+    ultimo_data = str(cx_data)[:10] if cx_data else None
+
+    listas: Dict[int, list] = {1: [], 2: [], 3: [], 4: []}
+    sql_listas = _sql_listas(conn)
+    if sql_listas:
+        for secao, _ordem, a, b, valor in conn.execute(sql_listas, params):
+            if secao == 1:
+                listas[1].append((_txt(a), _num(valor)))
+            else:
+                listas[secao].append((_txt(a), _txt(b), _num(valor)))
+
+    data_d = date.fromisoformat(dia)
+    saldos_bancos = _get_saldos_bancos_acumulados(conn, data_d, _get_bancos_ativos(conn))
+    try:
+        proj_cx, proj_cx2 = _calcular_saldo_projetado(conn, data_d)
+    except (sqlite3.Error, ValueError):
+        proj_cx, proj_cx2 = _num(cx), _num(cx2)
+
+    return ResumoDia(
+        data=dia,
+        total_vendas=_num(vendas),
+        valor_dinheiro=_num(dinheiro),
+        valor_pix=_num(pix),
+        cartao_d1_liquido=_num(cartao),
+        total_saidas=_num(saidas),
+        caixa_total=_num(cx) if ultimo_data == dia else 0.0,
+        caixa2_total=_num(cx2) if ultimo_data == dia else 0.0,
+        tem_snapshot=ultimo_data == dia,
+        ultimo_caixa=_num(cx),
+        ultimo_caixa2=_num(cx2),
+        ultimo_caixa_data=ultimo_data,
+        caixa_projetado=_num(proj_cx),
+        caixa2_projetado=_num(proj_cx2),
+        transf_caixa2_total=_num(transf_cx2),
+        depositos_list=tuple(listas[1]),
+        transf_bancos_list=tuple(listas[2]),
+        compras_list=tuple(listas[3]),
+        receb_list=tuple(listas[4]),
+        saldos_bancos=MappingProxyType({str(k): _num(v) for k, v in saldos_bancos.items()}),
+        fechado=bool(fechado),
+        correcao_dia=_num(corr_dia),
+        correcao_acumulada=_num(corr_acum),
+    )
+
+
+@cache_por_tabelas(*TABELAS_RESUMO, maxsize=64)
+def _resumo_dia_cache(db_path: str, dia: str) -> ResumoDia:
+    with conectar(db_path) as conn:
+        return resumo_dia_conn(conn, dia)
+
+
+def carregar_resumo_dia(db_path: str, data_ref: DataLike) -> ResumoDia:
+    """`ResumoDia` da data; cacheado até alguma tabela lida mudar."""
+    return _resumo_dia_cache(db_path, data_iso(data_ref))
+
+
+__all__ = [
+    "FORMAS_VENDA",
+    "TABELAS_RESUMO",
+    "ResumoDia",
+    "resumo_dia_conn",
+    "carregar_resumo_dia",
+]
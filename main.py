@@ -42,7 +42,7 @@ import os
 import pathlib
 import sqlite3
 import time
-from datetime import datetime, timezone, timedelta
+from datetime import timedelta
 from typing import Callable, Optional
 
 import streamlit as st
@@ -67,8 +67,9 @@ from shared.db_from_dropbox_api import ensure_local_db_api
 from shared.dropbox_config import load_dropbox_settings, mask_token
 
 # SDK com refresh token (pull/push)
-from shared.dbx_io import enviar_db_local, baixar_db_para_local
-from shared.dropbox_client import get_dbx  # para ler metadata (SDK)
+from shared.dbx_io import baixar_db_para_local
+from shared.sync_worker import obter_servico_sync, exibir_status_sidebar
+from shared.db_schema import aplicar_migracoes
 
 from shared.branding import sidebar_brand, page_header, login_brand
 
@@ -372,6 +373,8 @@ _effective_force = FORCE_DOWNLOAD_CFG
 _caminho_banco, _db_origem = ensure_db_available(
     str(_effective_token), str(_effective_path), _effective_force, _DROPBOX_DISABLED
 )
+# Índices/migrações idempotentes (1x por arquivo; refeito se o pull trocar o arquivo)
+aplicar_migracoes(_caminho_banco)
 
 
 # -----------------------------------------------------------------------------
@@ -379,55 +382,32 @@ _caminho_banco, _db_origem = ensure_db_available(
 # -----------------------------------------------------------------------------
 _PULL_THROTTLE_SECONDS = 60  # mínimo entre checagens remotas
 
-def _auto_pull_if_remote_newer() -> None:
-    """Sincroniza do Dropbox para local se remoto estiver mais novo."""
+def _servico_sync():
+    """Serviço de sync em background (um por processo); None sem Dropbox."""
     if _db_origem != "Dropbox" or _DROPBOX_DISABLED:
-        return
-
-    # throttle global
-    if not _throttle("_pull_last_check_ts", _PULL_THROTTLE_SECONDS):
-        return
-
-    # Força download se flag ligada
-    if _effective_force:
-        try:
-            baixar_db_para_local()
-            st.session_state["_main_db_last_pull_ts"] = float(datetime.now(tz=timezone.utc).timestamp())
-            st.toast("☁️ Main: banco atualizado (forçado) do Dropbox.", icon="🔄")
-            st.cache_data.clear()
-        except Exception as e:
-            st.warning(f"Main: não foi possível baixar DB remoto (forçado): {e}")
-        return
-
-    # Comparação por metadata (SDK)
+        return None
     try:
-        dbx = get_dbx()
-        meta = dbx.files_get_metadata(_effective_path)
-        remote_dt = getattr(meta, "server_modified", None)
-        if not remote_dt:
-            return
-        # normaliza para UTC
-        if remote_dt.tzinfo is None:
-            remote_ts = remote_dt.replace(tzinfo=timezone.utc).timestamp()
-        else:
-            remote_ts = remote_dt.astimezone(timezone.utc).timestamp()
+        return obter_servico_sync(_caminho_banco)
     except Exception:
+        return None
+
+
+def _auto_pull_if_remote_newer() -> None:
+    """Agenda o pull no serviço de sync (não bloqueia) e avisa quando o banco foi trocado."""
+    servico = _servico_sync()
+    if servico is None:
         return
 
-    try:
-        local_ts = os.path.getmtime(_caminho_banco)
-    except Exception:
-        local_ts = 0.0
-    last_pull = float(st.session_state.get("_main_db_last_pull_ts") or 0.0)
+    # throttle global
+    if _throttle("_pull_last_check_ts", _PULL_THROTTLE_SECONDS):
+        servico.solicitar_pull(forcar=_effective_force)
 
-    if remote_ts > max(local_ts, last_pull):
-        try:
-            baixar_db_para_local()
-            st.session_state["_main_db_last_pull_ts"] = remote_ts
-            st.toast("☁️ Main: banco atualizado do Dropbox.", icon="🔄")
-            st.cache_data.clear()
-        except Exception as e:
-            st.warning(f"Main: não foi possível baixar DB remoto (refresh): {e}")
+    # O worker já invalidou caches e reaplicou migrações; aqui só o aviso.
+    geracao = servico.status().pulls_com_mudanca
+    vista = st.session_state.get("_main_sync_geracao")
+    if vista is not None and geracao > vista:
+        st.toast("☁️ Main: banco atualizado do Dropbox.", icon="🔄")
+    st.session_state["_main_sync_geracao"] = geracao
 
 
 _auto_pull_if_remote_newer()
@@ -454,21 +434,10 @@ st.caption(f"🗃️ Banco em uso: **{_db_origem}**")
 # Auto PUSH (definido ANTES do bloco de login para evitar NameError)
 # -----------------------------------------------------------------------------
 def _auto_push_if_local_changed() -> None:
-    """Envia DB local para o Dropbox se detectado mtime maior que último push."""
-    if _db_origem != "Dropbox" or _DROPBOX_DISABLED:
-        return
-    try:
-        mtime = os.path.getmtime(_caminho_banco)
-    except Exception:
-        return
-    last_sent = float(st.session_state.get("_main_db_last_push_ts") or 0.0)
-    if mtime > (last_sent + 0.1):
-        try:
-            enviar_db_local()
-            st.session_state["_main_db_last_push_ts"] = mtime
-            st.toast("☁️ Main: banco sincronizado com o Dropbox.", icon="✅")
-        except Exception as e:
-            st.warning(f"Main: falha ao enviar DB ao Dropbox (refresh): {e}")
+    """Agenda o envio do DB local (o serviço agrupa gravações seguidas num único upload)."""
+    servico = _servico_sync()
+    if servico is not None:
+        servico.solicitar_push()
 
 
 # -----------------------------------------------------------------------------
@@ -653,6 +622,7 @@ if st.sidebar.button("🚪 Sair", use_container_width=True):
     st.session_state.usuario_logado = None
     st.rerun()
 
+exibir_status_sidebar(_servico_sync())
 st.sidebar.markdown("---")
 st.sidebar.markdown("## 🧭 Menu de Navegação")
 for title in ["📊 Dashboard", "📉 DRE", "🧾 Lançamentos", "💼 Fechamento de Caixa", "🎯 Metas"]:
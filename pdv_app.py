@@ -10,23 +10,25 @@ import hmac
 import importlib
 import os
 import pathlib
-import shutil
 import sqlite3
 import sys
-from datetime import date, timedelta, datetime, timezone
+from datetime import date, timedelta, datetime
 from types import SimpleNamespace
 from typing import Dict, List, Optional, Tuple, Callable
 
-import plotly.graph_objects as go
 import streamlit as st
 import pandas as pd
 
+from shared.lazy_imports import modulo_tardio
 from utils.pin_utils import validar_pin
 from shared.branding import sidebar_brand, page_header, login_brand
 from shared.db_from_dropbox_api import ensure_local_db_api
 from shared.dropbox_config import load_dropbox_settings, mask_token  # noqa: F401
-from shared.dbx_io import enviar_db_local, baixar_db_para_local
-from shared.dropbox_client import get_dbx, download_bytes
+from shared.dbx_io import baixar_db_para_local
+from shared.sync_worker import obter_servico_sync, exibir_status_sidebar
+from shared.db_schema import aplicar_migracoes
+
+go = modulo_tardio("plotly.graph_objects")  # só o gauge de metas usa; não pesa no 1º render da venda
 
 # ------------------------- Config inicial -------------------------
 st.set_page_config(page_title="FlowDash PDV", layout="wide")
@@ -148,49 +150,32 @@ _effective_path = DROPBOX_PATH_CFG
 _effective_force = FORCE_DOWNLOAD_CFG
 DB_PATH, DB_ORIG = ensure_db_available(_effective_token, _effective_path, _effective_force)
 st.session_state.setdefault("caminho_banco", DB_PATH)
+aplicar_migracoes(DB_PATH)
 
 # ------------------------- Sync -------------------------
 _PULL_THROTTLE_SECONDS = 45
+def _servico_sync():
+    if DB_ORIG != "Dropbox" or _DROPBOX_DISABLED: return None
+    try: return obter_servico_sync(DB_PATH)
+    except Exception: return None
+
 def _auto_pull_if_remote_newer() -> None:
-    if DB_ORIG != "Dropbox" or _DROPBOX_DISABLED: return
-    if not _throttle("_pdv_pull_check", _PULL_THROTTLE_SECONDS): return
-    try:
-        dbx = get_dbx(); meta = dbx.files_get_metadata(_effective_path)
-        remote_dt = getattr(meta, "server_modified", None)
-        if not remote_dt: return
-        if remote_dt.tzinfo is None: remote_dt = remote_dt.replace(tzinfo=timezone.utc)
-        remote_ts = remote_dt.timestamp()
-    except Exception:
-        return
-    try: local_ts = os.path.getmtime(DB_PATH)
-    except Exception: local_ts = 0.0
-    last_pull = float(st.session_state.get("_pdv_db_last_pull_ts") or 0.0)
-    if remote_ts > max(local_ts, last_pull):
-        try:
-            data = download_bytes(dbx, _effective_path)
-            tmp = DB_PATH + ".tmp"
-            with open(tmp, "wb") as f: f.write(data)
-            shutil.move(tmp, DB_PATH)
-            st.session_state["_pdv_db_last_pull_ts"] = remote_ts
-            st.toast("☁️ PDV: banco atualizado.", icon="🔄")
-            st.cache_data.clear()
-        except Exception as e:
-            st.warning(f"PDV: falha no pull refresh: {e}")
+    servico = _servico_sync()
+    if servico is None: return
+    if _throttle("_pdv_pull_check", _PULL_THROTTLE_SECONDS):
+        servico.solicitar_pull()  # roda no worker; a página não espera o Dropbox
+    geracao = servico.status().pulls_com_mudanca
+    vista = st.session_state.get("_pdv_sync_geracao")
+    if vista is not None and geracao > vista:
+        st.toast("☁️ PDV: banco atualizado.", icon="🔄")
+    st.session_state["_pdv_sync_geracao"] = geracao
 
 def _auto_push_if_local_changed() -> None:
-    if DB_ORIG != "Dropbox" or _DROPBOX_DISABLED: return
-    try: mtime = os.path.getmtime(DB_PATH)
-    except Exception: return
-    last_sent = float(st.session_state.get("_pdv_db_last_push_ts") or 0.0)
-    if mtime > (last_sent + 0.1):
-        try:
-            enviar_db_local()
-            st.session_state["_pdv_db_last_push_ts"] = mtime
-            st.toast("☁️ PDV sincronizado.", icon="✅")
-        except Exception as e:
-            st.warning(f"PDV: falha no push: {e}")
+    servico = _servico_sync()
+    if servico is not None: servico.solicitar_push()
 
 _auto_pull_if_remote_newer()
+exibir_status_sidebar(_servico_sync())
 
 # ------------------------- Estilo -------------------------
 st.markdown(
@@ -224,7 +209,10 @@ def _entrada_date_bounds() -> Tuple[date, date]:
     today = date.today()
     try:
         with _conn() as conn:
-            row = conn.execute("SELECT MIN(date(Data)), MAX(date(Data)) FROM entrada").fetchone()
+            # MIN e MAX em subconsultas separadas: cada um sai de uma ponta de idx_entrada_data_cov
+            row = conn.execute(
+                "SELECT date((SELECT MIN(Data) FROM entrada)), date((SELECT MAX(Data) FROM entrada))"
+            ).fetchone()
             if not row or not row[0]: return (today, today)
             from datetime import datetime as _dt
             dmin = _dt.strptime(row[0], "%Y-%m-%d").date()
@@ -291,12 +279,25 @@ def _metas_loja_vigente(conn: sqlite3.Connection, ref_day: date) -> Tuple[float,
     return (meta_dia, semanal, mensal, ouro, prata, bronze)
 
 def _valores_loja(conn: sqlite3.Connection, ref_day: date) -> Tuple[float,float,float]:
+    inicio_sem, inicio_mes = _inicio_semana(ref_day), ref_day.replace(day=1)
+    # Agregado diário (shared.agregados): só os dias do período, sem varrer o histórico.
+    try:
+        row = conn.execute(
+            """SELECT COALESCE(SUM(CASE WHEN dia = ?1 THEN valor END), 0),
+                      COALESCE(SUM(CASE WHEN dia >= ?2 THEN valor END), 0),
+                      COALESCE(SUM(CASE WHEN dia >= ?3 THEN valor END), 0)
+                 FROM agg_vendas_dia
+                WHERE dia >= MIN(?2, ?3) AND dia <= ?1 AND UPPER(usuario) != 'LOJA'""",
+            (ref_day.isoformat(), inicio_sem.isoformat(), inicio_mes.isoformat()),
+        ).fetchone()
+        return float(row[0]), float(row[1]), float(row[2])
+    except sqlite3.Error:
+        pass
     df_e = pd.read_sql("SELECT COALESCE(Usuario,'') AS Usuario, Data, Valor FROM entrada;", conn)
     if df_e.empty: return (0,0,0)
     df_e["UsuarioUpper"] = df_e["Usuario"].astype(str).str.upper()
     df_e["Data"] = pd.to_datetime(df_e["Data"], errors="coerce")
     df = df_e[df_e["UsuarioUpper"] != "LOJA"].copy()
-    inicio_sem, inicio_mes = _inicio_semana(ref_day), ref_day.replace(day=1)
     m_dia = (df["Data"].dt.date == ref_day)
     m_sem = (df["Data"].dt.date >= inicio_sem) & (df["Data"].dt.date <= ref_day)
     m_mes = (df["Data"].dt.date >= inicio_mes) & (df["Data"].dt.date <= ref_day)
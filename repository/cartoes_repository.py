@@ -31,6 +31,7 @@ Dependências
 
 import sqlite3
 from typing import Optional, Tuple, List
+from shared.db import conectar
 
 
 class CartoesRepository:
@@ -48,11 +49,7 @@ class CartoesRepository:
         Abre conexão SQLite com PRAGMAs de confiabilidade/performance
         adequados ao app (WAL, busy_timeout, foreign_keys).
         """
-        conn = sqlite3.connect(self.db_path, timeout=30)
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA busy_timeout=30000;")
-        conn.execute("PRAGMA foreign_keys=ON;")
-        return conn
+        return conectar(self.db_path, timeout=30, pragmas=("journal_mode=WAL", "busy_timeout=30000", "foreign_keys=ON"))
 
     def _validar_conf(self, vencimento_dia: int, dias_fechamento: int) -> None:
         """
@@ -34,6 +34,7 @@ Dependências
 import sqlite3
 import pandas as pd
 from typing import Optional, List, Tuple
+from shared.db import conectar
 
 
 class CategoriasRepository:
@@ -52,11 +53,7 @@ class CategoriasRepository:
         """
         Abre conexão SQLite configurada com PRAGMAs de confiabilidade/performance.
         """
-        conn = sqlite3.connect(self.db_path, timeout=30)
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA busy_timeout=30000;")
-        conn.execute("PRAGMA foreign_keys=ON;")
-        return conn
+        return conectar(self.db_path, timeout=30, pragmas=("journal_mode=WAL", "busy_timeout=30000", "foreign_keys=ON"))
 
     def _ensure_schema(self) -> None:
         """
@@ -35,6 +35,7 @@ from typing import Any, Optional
 import sqlite3
 
 from utils.utils import resolve_db_path
+from shared.db import conectar
 from repository.contas_a_pagar_mov_repository.types import (
     ALLOWED_TIPOS,
     ALLOWED_CATEGORIAS,
@@ -59,17 +60,13 @@ class BaseRepo(object):
         - detect_types para DATE/DATETIME
         - row_factory para acesso por nome de coluna
         """
-        conn = sqlite3.connect(
+        return conectar(
             self.db_path,
             timeout=30,
             detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            row_factory=sqlite3.Row,
+            pragmas=("journal_mode=WAL", "busy_timeout=30000", "foreign_keys=ON", "synchronous=NORMAL"),
         )
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA busy_timeout=30000;")
-        conn.execute("PRAGMA foreign_keys=ON;")
-        conn.execute("PRAGMA synchronous=NORMAL;")
-        conn.row_factory = sqlite3.Row
-        return conn
 
     # ------------------ helpers internos ------------------
 
@@ -4,6 +4,7 @@ import sqlite3
 import hashlib
 from typing import Optional, Dict, Any
 from utils.utils import resolve_db_path
+from shared.db import conectar
 
 
 class MovimentacoesRepository:
@@ -25,17 +26,13 @@ class MovimentacoesRepository:
         (WAL, busy timeout, foreign keys, synchronous NORMAL)
         e parsing de tipos (DATE/DATETIME).
         """
-        conn = sqlite3.connect(
+        return conectar(
             self.db_path,
             timeout=30,
             detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            row_factory=sqlite3.Row,
+            pragmas=("journal_mode=WAL", "busy_timeout=30000", "foreign_keys=ON", "synchronous=NORMAL"),
         )
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA busy_timeout=30000;")
-        conn.execute("PRAGMA foreign_keys=ON;")
-        conn.execute("PRAGMA synchronous=NORMAL;")
-        conn.row_factory = sqlite3.Row
-        return conn
 
     def _colunas_existentes(self, conn: sqlite3.Connection) -> set:
         rows = conn.execute("PRAGMA table_info(movimentacoes_bancarias);").fetchall()
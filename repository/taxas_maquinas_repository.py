@@ -19,6 +19,7 @@ Detalhes técnicos
 - Operações somente leitura (não altera dados).
 - Conexão SQLite via helper `get_conn` (shared.db).
 - Comparações **case-insensitive** para `forma_pagamento` usando UPPER.
+- Taxa e `banco_destino` saem do índice em memória `services.taxas.indice_taxas`.
 - Retorno resiliente: listas vazias ou `None` em caso de falha.
 
 Dependências
@@ -26,12 +27,14 @@ Dependências
 - pandas
 - typing (Iterable, List, Optional, Tuple)
 - shared.db.get_conn
+- services.taxas.indice_taxas
 """
 
 from typing import Iterable, List, Optional, Tuple
 import pandas as pd
 
 from shared.db import get_conn
+from services.taxas import indice_taxas
 
 
 class TaxasMaquinasRepository:
@@ -118,23 +121,10 @@ class TaxasMaquinasRepository:
         """
         if not forma or not maquineta:
             return 0.0, None
-        forma_u = forma.upper()
-        with get_conn(self.caminho_banco) as conn:
-            row = conn.execute(
-                """
-                SELECT taxa_percentual, banco_destino
-                  FROM taxas_maquinas
-                 WHERE UPPER(forma_pagamento)=?
-                   AND maquineta=?
-                   AND bandeira=?
-                   AND parcelas=?
-                 LIMIT 1
-                """,
-                (forma_u, maquineta, bandeira or "", int(parcelas or 1)),
-            ).fetchone()
-        if not row:
+        regra = indice_taxas(self.caminho_banco).exata(forma, maquineta, bandeira, parcelas)
+        if not regra:
             return 0.0, None
-        return float(row[0] or 0.0), (row[1] or None)
+        return float(regra[0] or 0.0), (regra[1] or None)
 
     def descobrir_banco_destino(
         self,
@@ -154,56 +144,7 @@ class TaxasMaquinasRepository:
         if not forma or not maquineta:
             return None
 
-        formas_try = [forma.upper()]
-        if forma.upper() == "LINK_PAGAMENTO":
-            formas_try.append("CRÉDITO")
-
-        with get_conn(self.caminho_banco) as conn:
-            # 1) exato
-            for f in formas_try:
-                row = conn.execute(
-                    """
-                    SELECT banco_destino FROM taxas_maquinas
-                     WHERE UPPER(forma_pagamento)=?
-                       AND maquineta=?
-                       AND bandeira=?
-                       AND parcelas=?
-                     LIMIT 1
-                    """,
-                    (f, maquineta, bandeira or "", int(parcelas or 1)),
-                ).fetchone()
-                if row and row[0]:
-                    return row[0]
-
-            # 2) por maquineta
-            for f in formas_try:
-                row = conn.execute(
-                    """
-                    SELECT banco_destino FROM taxas_maquinas
-                     WHERE UPPER(forma_pagamento)=?
-                       AND maquineta=?
-                       AND banco_destino IS NOT NULL AND TRIM(banco_destino)<>''
-                     LIMIT 1
-                    """,
-                    (f, maquineta),
-                ).fetchone()
-                if row and row[0]:
-                    return row[0]
-
-            # 3) qualquer da maquineta
-            row = conn.execute(
-                """
-                SELECT banco_destino FROM taxas_maquinas
-                 WHERE maquineta=?
-                   AND banco_destino IS NOT NULL AND TRIM(banco_destino)<>''
-                 LIMIT 1
-                """,
-                (maquineta,),
-            ).fetchone()
-            if row and row[0]:
-                return row[0]
-
-        return None
+        return indice_taxas(self.caminho_banco).banco_destino(forma, maquineta, bandeira, parcelas)
 
 
 # API pública explícita
@@ -9,6 +9,7 @@ Subpacotes e módulos
 - ledger ....... regras de negócio para lançamentos financeiros (dividido em mixins).
 - taxas ........ consultas e regras relacionadas às taxas de maquinetas.
 - vendas ....... serviços utilitários para vendas.
+- importador_extratos ... importação de extratos CSV/OFX (importar sob demanda).
 
 Observação:
     - Módulos de backup (`ledger_backup.py`) existem apenas para referência
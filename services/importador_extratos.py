@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo Importador de Extratos
+=============================
+
+Importa extratos bancários (CSV/OFX) e arquivos de liquidação de adquirentes
+(CSV) sem digitação pelos formulários de `lancamentos`.
+
+- **Streaming**: CSV via `pandas.read_csv(chunksize=...)`; OFX por um
+  tokenizador incremental de tags (SGML ou XML), lendo blocos de 64 KB.
+  A memória fica limitada pelo tamanho do lote, não pelo arquivo.
+- **Perfis** (`PerfilImportacao`): dizem o formato, as colunas de origem e o
+  destino (`movimentacoes_bancarias` ou `entrada`). Há perfis prontos em
+  `PERFIS`; outros podem ser montados pelo chamador.
+- **Idempotência**: `trans_uid` derivado com `shared.ids.hash_uid` (FITID/NSU
+  quando existe; senão data+valor+descrição+ordem no dia). Movimentações entram
+  com `ON CONFLICT(trans_uid) DO NOTHING` sobre `ux_mov_trans_uid` (criado pela
+  migração `shared.db_schema.garantir_trans_uid_unico`) ou, em bancos antigos
+  sem o índice, com `WHERE NOT EXISTS`; vendas passam por
+  `VendasService.registrar_vendas_lote`, com `id_externo` = NSU ou, sem ele,
+  o ordinal da venda entre as iguais do dia (`_OrdemNoDia`): vendas idênticas
+  no mesmo dia continuam distintas. Reimportar não duplica.
+- Inseridas/duplicadas vêm do `rowcount` do `executemany` (linhas gravadas
+  pelo INSERT, sem contar as dos triggers).
+- Cada lote é gravado numa transação própria (`conexao_escrita`); uma falha no
+  meio do arquivo pode ser retomada reimportando o mesmo arquivo.
+
+Uso:
+    from services.importador_extratos import importar_extrato
+    resumo = importar_extrato("extrato.ofx", "data/flowdash_data.db", "ofx", banco="Inter")
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from shared.db import conexao_escrita
+from shared.db_schema import trans_uid_unico
+from shared.ids import hash_uid, sanitize_plus
+from shared.schema_cache import colunas
+from utils.utils import agora_local_naive_str
+
+__all__ = ["PerfilImportacao", "ResumoImportacao", "PERFIS", "ler_lotes", "importar_extrato"]
+
+TAMANHO_LOTE = 5000
+MAX_ERROS_GUARDADOS = 50      # o resumo guarda só os primeiros (memória limitada)
+_BLOCO_OFX = 64 * 1024
+
+
+@dataclass(frozen=True)
+class PerfilImportacao:
+    """
+    Como ler um arquivo e para onde mandar as linhas.
+
+    `colunas` mapeia campo lógico -> coluna do CSV (ou tag do OFX). Campos:
+      - movimentacoes: data, valor, descricao, id (opcional), tipo (opcional)
+      - entrada: data, valor, forma, bandeira, parcelas, maquineta,
+        banco_destino, taxa, id (NSU) — os opcionais podem faltar
+    Valores negativos viram `saida` (com valor absoluto) em movimentações.
+    """
+    nome: str
+    formato: str = "csv"                  # "csv" | "ofx"
+    destino: str = "movimentacoes"        # "movimentacoes" | "entrada"
+    colunas: Dict[str, str] = field(default_factory=dict)
+    sep: str = ";"
+    encoding: str = "utf-8"
+    decimal: str = ","
+    milhar: Optional[str] = "."
+    formato_data: Optional[str] = "%d/%m/%Y"  # None = inferir
+    origem: str = "importacao"
+
+
+PERFIS: Dict[str, PerfilImportacao] = {
+    "ofx": PerfilImportacao(
+        nome="ofx",
+        formato="ofx",
+        encoding="latin-1",
+        colunas={"data": "DTPOSTED", "valor": "TRNAMT", "descricao": "MEMO", "id": "FITID", "tipo": "TRNTYPE"},
+        formato_data="%Y%m%d",
+        origem="importacao_ofx",
+    ),
+    "csv_extrato": PerfilImportacao(
+        nome="csv_extrato",
+        colunas={"data": "Data", "valor": "Valor", "descricao": "Descricao", "id": "Documento"},
+        origem="importacao_csv",
+    ),
+    "csv_adquirente": PerfilImportacao(
+        nome="csv_adquirente",
+        destino="entrada",
+        colunas={
+            "data": "Data", "valor": "Valor Bruto", "forma": "Forma", "bandeira": "Bandeira",
+            "parcelas": "Parcelas", "maquineta": "Maquineta", "id": "NSU",
+        },
+    ),
+}
+
+
+@dataclass
+class ResumoImportacao:
+    """Contadores de uma importação."""
+    lidas: int = 0
+    inseridas: int = 0
+    duplicadas: int = 0
+    invalidas: int = 0
+    erros: List[str] = field(default_factory=list)
+
+    def _erro(self, linha: int, msg: str) -> None:
+        self.invalidas += 1
+        if len(self.erros) < MAX_ERROS_GUARDADOS:
+            self.erros.append(f"linha {linha}: {msg}")
+
+
+# ============================== Leitura em lotes ==============================
+_TAG_RE = re.compile(r"<(/?)([A-Za-z0-9_.]+)>([^<]*)")
+
+
+def _registros_ofx(caminho: str, encoding: str) -> Iterator[Dict[str, str]]:
+    """Gera um dict por <STMTTRN>, lendo o arquivo em blocos."""
+    atual: Optional[Dict[str, str]] = None
+    resto = ""
+    with open(caminho, "r", encoding=encoding, errors="replace") as fh:
+        while True:
+            bloco = fh.read(_BLOCO_OFX)
+            texto = resto + bloco
+            # guarda o trecho a partir do último '<' (tag possivelmente cortada)
+            corte = texto.rfind("<") if bloco else len(texto)
+            if corte < 0:
+                corte = len(texto)
+            resto, texto = texto[corte:], texto[:corte]
+            for fecha, tag, valor in _TAG_RE.findall(texto):
+                tag = tag.upper()
+                if tag == "STMTTRN":
+                    if fecha and atual is not None:
+                        yield atual
+                        atual = None
+                    elif not fecha:
+                        atual = {}
+                elif atual is not None and not fecha and valor.strip():
+                    atual[tag] = valor.strip()
+            if not bloco:
+                break
+
+
+def ler_lotes(caminho: str, perfil: PerfilImportacao, tamanho_lote: int = TAMANHO_LOTE) -> Iterator[pd.DataFrame]:
+    """Lê o arquivo em DataFrames de até `tamanho_lote` linhas, com colunas = campos lógicos do perfil."""
+    inverso = {orig: logico for logico, orig in perfil.colunas.items()}
+    if perfil.formato == "ofx":
+        lote: List[Dict[str, str]] = []
+        for reg in _registros_ofx(caminho, perfil.encoding):
+            lote.append(reg)
+            if len(lote) >= tamanho_lote:
+                yield pd.DataFrame(lote).reindex(columns=list(inverso)).rename(columns=inverso)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote).reindex(columns=list(inverso)).rename(columns=inverso)
+        return
+
+    leitor = pd.read_csv(
+        caminho,
+        sep=perfil.sep,
+        encoding=perfil.encoding,
+        dtype=str,
+        keep_default_na=False,
+        usecols=lambda c: c.strip() in inverso,
+        chunksize=tamanho_lote,
+    )
+    for chunk in leitor:
+        chunk.columns = [c.strip() for c in chunk.columns]
+        yield chunk.reindex(columns=list(inverso)).rename(columns=inverso)
+
+
+# ============================== Normalização ==============================
+def _numero(s: pd.Series, perfil: PerfilImportacao) -> pd.Series:
+    txt = s.fillna("").astype(str).str.strip().str.replace(r"[R$\s]", "", regex=True)
+    if perfil.formato != "ofx":
+        if perfil.milhar:
+            txt = txt.str.replace(perfil.milhar, "", regex=False)
+        if perfil.decimal != ".":
+            txt = txt.str.replace(perfil.decimal, ".", regex=False)
+    return pd.to_numeric(txt, errors="coerce")
+
+
+def _data(s: pd.Series, perfil: PerfilImportacao) -> pd.Series:
+    txt = s.fillna("").astype(str).str.strip()
+    if perfil.formato == "ofx":
+        txt = txt.str[:8]  # DTPOSTED: YYYYMMDD[HHMMSS[.XXX]][TZ]
+    if perfil.formato_data:
+        dt = pd.to_datetime(txt, format=perfil.formato_data, errors="coerce")
+    else:
+        dt = pd.to_datetime(txt, errors="coerce", dayfirst=True, format="mixed")
+    return dt.dt.strftime("%Y-%m-%d")
+
+
+class _OrdemNoDia:
+    """
+    Ordinal de linhas repetidas (mesma data/valor/descrição) sem id próprio.
+    Zera quando a data muda: extratos vêm em ordem cronológica, então a memória
+    fica limitada a um dia e o ordinal é estável entre exportações.
+    """
+
+    def __init__(self) -> None:
+        self._dia: Optional[str] = None
+        self._vistos: Dict[str, int] = {}
+
+    def proximo(self, dia: str, chave: str) -> int:
+        if dia != self._dia:
+            self._dia, self._vistos = dia, {}
+        n = self._vistos.get(chave, 0)
+        self._vistos[chave] = n + 1
+        return n
+
+
+# ============================== Gravação ==============================
+def _gravar_movimentacoes(db_path: str, df: pd.DataFrame, perfil: PerfilImportacao, banco: str,
+                          usuario: str, inicio: int, ordem: _OrdemNoDia, resumo: ResumoImportacao) -> None:
+    datas = _data(df["data"], perfil).tolist()
+    valores = _numero(df["valor"], perfil).tolist()
+    descricoes = df["descricao"].fillna("").astype(str).map(sanitize_plus).tolist() if "descricao" in df else [""] * len(df)
+    ids = df["id"].fillna("").astype(str).str.strip().tolist() if "id" in df else [""] * len(df)
+    tipos = df["tipo"].fillna("").astype(str).str.upper().tolist() if "tipo" in df else [""] * len(df)
+
+    agora = agora_local_naive_str()
+    linhas = []
+    for k, (dia, valor, desc, ident, tipo) in enumerate(zip(datas, valores, descricoes, ids, tipos)):
+        if not isinstance(dia, str) or pd.isna(valor) or valor == 0:
+            resumo._erro(inicio + k, "data ou valor inválido")
+            continue
+        if ident:
+            uid = hash_uid("IMPORT_MOV", perfil.nome, sanitize_plus(banco, upper=True), ident)
+        else:
+            chave = f"{valor:.2f}|{desc.upper()}"
+            uid = hash_uid("IMPORT_MOV", perfil.nome, sanitize_plus(banco, upper=True), dia, chave,
+                           ordem.proximo(dia, chave))
+        saida = valor < 0 or tipo in ("DEBIT", "PAYMENT", "FEE", "SRVCHG")
+        obs = f"Importado ({perfil.nome}) • {desc}".strip(" •") if desc else f"Importado ({perfil.nome})"
+        linhas.append((dia, banco, "saida" if saida else "entrada", round(abs(float(valor)), 2),
+                       perfil.origem, obs, uid, usuario, agora))
+
+    if not linhas:
+        return
+    with conexao_escrita(db_path) as conn:
+        cols_exist = set(colunas(conn, "movimentacoes_bancarias"))
+        cols = ["data", "banco", "tipo", "valor", "origem", "observacao", "trans_uid", "usuario", "data_hora"]
+        manter = [i for i, c in enumerate(cols) if c in cols_exist]
+        cols_sql = ", ".join(f'"{cols[i]}"' for i in manter)
+        marcas = ", ".join("?" * len(manter))
+        if trans_uid_unico(conn):
+            cur = conn.executemany(
+                f"INSERT INTO movimentacoes_bancarias ({cols_sql}) VALUES ({marcas}) "
+                "ON CONFLICT(trans_uid) DO NOTHING",
+                ([linha[i] for i in manter] for linha in linhas),
+            )
+        else:
+            # banco antigo com trans_uid repetido (sem ux_mov_trans_uid)
+            cur = conn.executemany(
+                f"INSERT INTO movimentacoes_bancarias ({cols_sql}) SELECT {marcas} "
+                "WHERE NOT EXISTS (SELECT 1 FROM movimentacoes_bancarias WHERE trans_uid = ?)",
+                ([linha[i] for i in manter] + [linha[6]] for linha in linhas),
+            )
+        novas = max(cur.rowcount, 0)
+    resumo.inseridas += novas
+    resumo.duplicadas += len(linhas) - novas
+
+
+def _ids_vendas(lote: pd.DataFrame, perfil: PerfilImportacao, ordem: _OrdemNoDia) -> List[str]:
+    """NSU quando houver; senão `<perfil>#<n>`, n = ordinal entre vendas iguais no dia."""
+    campos = ["valor_bruto", "forma", "parcelas", "bandeira", "maquineta", "banco_destino"]
+    ids = []
+    for dia, nsu, *resto in zip(lote["data_venda"], lote["id_externo"], *(lote[c] for c in campos)):
+        nsu = "" if pd.isna(nsu) else str(nsu).strip()
+        if nsu or not isinstance(dia, str):
+            ids.append(nsu)
+            continue
+        chave = "|".join("" if pd.isna(v) else str(v).strip().upper() for v in resto)
+        ids.append(f"{perfil.nome}#{ordem.proximo(dia, chave)}")
+    return ids
+
+
+def _gravar_vendas(db_path: str, df: pd.DataFrame, perfil: PerfilImportacao, banco: Optional[str],
+                   usuario: str, inicio: int, ordem: _OrdemNoDia, resumo: ResumoImportacao) -> None:
+    from services.vendas import VendasService
+
+    lote = pd.DataFrame({
+        "data_venda": _data(df["data"], perfil),
+        "valor_bruto": _numero(df["valor"], perfil),
+        "forma": df.get("forma", pd.Series("", index=df.index)),
+        "parcelas": pd.to_numeric(df.get("parcelas", pd.Series(1, index=df.index)), errors="coerce").fillna(1),
+        "bandeira": df.get("bandeira", pd.Series("", index=df.index)),
+        "maquineta": df.get("maquineta", pd.Series("", index=df.index)),
+        "banco_destino": df.get("banco_destino", pd.Series("", index=df.index)).fillna("").replace("", banco or ""),
+        "taxa_percentual": _numero(df["taxa"], perfil) if "taxa" in df else 0.0,
+        "id_externo": df.get("id", pd.Series("", index=df.index)),
+    })
+    lote["id_externo"] = _ids_vendas(lote, perfil, ordem)
+    for r in VendasService(db_path).registrar_vendas_lote(lote, usuario=usuario, idempotente=True):
+        if r.status == "inserida":
+            resumo.inseridas += 1
+        elif r.status == "duplicada":
+            resumo.duplicadas += 1
+        else:
+            resumo._erro(inicio + r.indice, r.erro)
+
+
+def importar_extrato(
+    caminho: str,
+    db_path: str,
+    perfil: Union[str, PerfilImportacao],
+    *,
+    banco: Optional[str] = None,
+    usuario: str = "Sistema",
+    tamanho_lote: int = TAMANHO_LOTE,
+) -> ResumoImportacao:
+    """
+    Importa `caminho` no banco `db_path` segundo `perfil` (nome em `PERFIS` ou
+    instância). `banco` é obrigatório para extratos (movimentações) e, em vendas,
+    serve de `banco_destino` padrão.
+    """
+    if isinstance(perfil, str):
+        if perfil not in PERFIS:
+            raise ValueError(f"Perfil de importação desconhecido: {perfil!r} (use {sorted(PERFIS)})")
+        perfil = PERFIS[perfil]
+    if perfil.destino == "movimentacoes" and not (banco or "").strip():
+        raise ValueError("banco é obrigatório para importar extratos em movimentacoes_bancarias.")
+    if perfil.destino not in ("movimentacoes", "entrada"):
+        raise ValueError(f"Destino inválido no perfil {perfil.nome!r}: {perfil.destino!r}")
+
+    resumo = ResumoImportacao()
+    ordem = _OrdemNoDia()
+    for df in ler_lotes(caminho, perfil, tamanho_lote):
+        inicio = resumo.lidas + 1
+        resumo.lidas += len(df)
+        if perfil.destino == "movimentacoes":
+            _gravar_movimentacoes(db_path, df, perfil, banco.strip(), usuario, inicio, ordem, resumo)
+        else:
+            _gravar_vendas(db_path, df, perfil, banco, usuario, inicio, ordem, resumo)
+    return resumo
@@ -17,15 +17,15 @@ Responsabilidades:
 Dependências:
 - shared.db.get_conn (controle transacional feito pelo chamador deste mixin).
 - shared.ids.sanitize, uid_boleto_programado.
-- self.cap_repo, self.mov_repo, self._garantir_linha_saldos_caixas, self._garantir_linha_saldos_bancos,
+- self.cap_repo, self.mov_repo, self._garantir_linha_saldos_caixas,
   self._ajustar_banco_dynamic (expostos pela service/fachada que mistura este mixin).
 
 Notas de segurança:
 - SQL apenas com parâmetros (?); sem interpolar dados do usuário.
-- Nome de coluna para ajuste de banco é validado via whitelist interna.
+- O banco do ajuste é parâmetro de `saldos_bancos_mov`, não nome de coluna.
 
 Efeitos colaterais:
-- Escreve em `contas_a_pagar_mov`, `movimentacoes_bancarias`, `saida`, `saldos_caixas` e (dinâmica) `saldos_bancos`.
+- Escreve em `contas_a_pagar_mov`, `movimentacoes_bancarias`, `saida`, `saldos_caixas` e `saldos_bancos_mov`.
 """
 
 from __future__ import annotations
@@ -374,11 +374,6 @@ class BoletoMixin:
                     )
                 else:
                     # Bancos (PIX/DÉBITO)
-                    try:
-                        self._garantir_linha_saldos_bancos(conn, data_iso)
-                    except Exception:
-                        pass
-
                     self._ajustar_banco_dynamic(conn, banco_col=org, delta=-float(total_saida), data=data_iso)
 
                     # Saída (Banco)
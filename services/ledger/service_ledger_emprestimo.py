@@ -19,7 +19,7 @@ Dependências (expostas pela service/fachada que mistura este mixin):
 - self.db_path
 - self.cap_repo (proximo_obrigacao_id, registrar_lancamento, aplicar_pagamento_parcela, registrar_pagamento, obter_saldo_obrigacao)
 - self.mov_repo (ja_existe_transacao) [opcional]
-- self._garantir_linha_saldos_caixas, self._garantir_linha_saldos_bancos, self._ajustar_banco_dynamic
+- self._garantir_linha_saldos_caixas, self._ajustar_banco_dynamic
 """
 
 from __future__ import annotations
@@ -201,11 +201,6 @@ class EmprestimoLedgerMixin:
                     )
                 else:
                     # Bancos (PIX/DÉBITO)
-                    try:
-                        self._garantir_linha_saldos_bancos(conn, data_iso)
-                    except Exception:
-                        pass
-
                     self._ajustar_banco_dynamic(conn, banco_col=org, delta=-float(total_saida), data=data_iso)
 
                     # Saída (Banco)
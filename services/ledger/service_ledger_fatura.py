@@ -216,11 +216,6 @@ class _FaturaLedgerMixin:
                     )
                 else:
                     # Bancos
-                    try:
-                        self._garantir_linha_saldos_bancos(conn, data)
-                    except Exception:
-                        pass
-
                     self._ajustar_banco_dynamic(conn, banco_col=org, delta=-float(total_saida), data=data)
 
                     cur.execute(
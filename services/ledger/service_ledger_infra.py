@@ -2,8 +2,8 @@
 Infraestrutura do Ledger.
 
 Utilitários comuns para serviços do Ledger:
-- Garantir linhas em `saldos_caixas` e `saldos_bancos`.
-- Criar/ajustar colunas dinâmicas de bancos de forma segura.
+- Garantir linhas em `saldos_caixas`.
+- Ajustar o saldo do dia por banco (`saldos_bancos_mov`, via `shared.saldos_bancos`).
 - Helpers de data (somar meses preservando fim de mês; competência de cartão).
 - Helper para padronizar a coluna `observacao` (saídas).
 - Helper para registrar linhas padronizadas em `movimentacoes_bancarias`.
@@ -18,8 +18,8 @@ Dependências:
 - sqlite3 (conexão fornecida pelo chamador).
 
 Notas de segurança:
-- Nunca interpolar entrada do usuário diretamente em SQL.
-- Para colunas dinâmicas de bancos, validar o nome com whitelist e sempre quotar.
+- Nunca interpolar entrada do usuário diretamente em SQL (o banco é parâmetro,
+  não nome de coluna).
 """
 
 from __future__ import annotations
@@ -44,6 +44,9 @@ _PROJECT_ROOT = os.path.abspath(os.path.join(_CURRENT_DIR, "..", ".."))
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
+from shared.saldos_bancos import somar_saldo_banco  # noqa: E402
+from shared.schema_cache import garantir_coluna  # noqa: E402
+
 logger = logging.getLogger(__name__)
 
 __all__ = ["_InfraLedgerMixin", "log_mov_bancaria", "_fmt_obs_saida"]
@@ -53,7 +56,7 @@ class _InfraLedgerMixin:
     """Mixin com utilitários de infraestrutura para o Ledger."""
 
     # ------------------------------------------------------------------
-    # saldos_caixas / saldos_bancos
+    # saldos_caixas / saldos por banco
     # ------------------------------------------------------------------
     def _garantir_linha_saldos_caixas(self, conn: sqlite3.Connection, data: str) -> None:
         """Garante a existência da linha em `saldos_caixas` para a data.
@@ -73,38 +76,6 @@ class _InfraLedgerMixin:
             )
             logger.debug("Criada linha em saldos_caixas para data=%s", data)
 
-    def _garantir_linha_saldos_bancos(self, conn: sqlite3.Connection, data: str) -> None:
-        """Garante a existência da linha em `saldos_bancos` para a data.
-
-        Args:
-            conn (sqlite3.Connection): Conexão ativa com o banco SQLite.
-            data (str): Data alvo no formato 'YYYY-MM-DD'.
-        """
-        cur = conn.execute("SELECT 1 FROM saldos_bancos WHERE data = ? LIMIT 1", (data,))
-        if not cur.fetchone():
-            conn.execute("INSERT OR IGNORE INTO saldos_bancos (data) VALUES (?)", (data,))
-            logger.debug("Criada linha em saldos_bancos para data=%s", data)
-
-    # --------- validação segura de nome de coluna (bancos dinâmicos) --------
-    _COL_RE = re.compile(r"^[A-Za-z0-9_ ]{1,64}$")  # letras, números, underscore e espaço
-
-    def _validar_nome_coluna_banco(self, banco_col: str) -> str:
-        """Valida o nome da coluna de banco (whitelist) e retorna a versão segura.
-
-        Args:
-            banco_col (str): Nome da coluna a validar.
-
-        Returns:
-            str: Nome validado.
-
-        Raises:
-            ValueError: Se o nome não respeitar o padrão permitido.
-        """
-        banco_col = (banco_col or "").strip()
-        if not self._COL_RE.match(banco_col):
-            raise ValueError(f"Nome de coluna de banco inválido: {banco_col!r}")
-        return banco_col
-
     def _ajustar_banco_dynamic(
         self,
         conn: sqlite3.Connection,
@@ -112,35 +83,19 @@ class _InfraLedgerMixin:
         delta: float,
         data: str,
     ) -> None:
-        """Ajusta dinamicamente a coluna do banco em `saldos_bancos`.
+        """Soma `delta` no saldo do banco no dia (`saldos_bancos_mov`).
 
-        - Cria a coluna do banco se não existir (DEFAULT 0.0).
-        - Garante a linha do dia.
-        - Aplica o `delta` na coluna.
+        Uma linha por dia × banco (UPSERT em `shared.saldos_bancos`), sem
+        `ALTER TABLE` nem SQL montado com o nome do banco.
 
         Args:
             conn (sqlite3.Connection): Conexão ativa com o banco SQLite.
-            banco_col (str): Nome da coluna (validação por whitelist).
+            banco_col (str): Nome do banco.
             delta (float): Variação a ser aplicada (positiva/negativa).
             data (str): Data alvo no formato 'YYYY-MM-DD'.
         """
-        banco_col = self._validar_nome_coluna_banco(banco_col)
-
-        # garante existência da coluna
-        cols = [r[1] for r in conn.execute("PRAGMA table_info(saldos_bancos)").fetchall()]
-        if banco_col not in cols:
-            conn.execute(f'ALTER TABLE saldos_bancos ADD COLUMN "{banco_col}" REAL DEFAULT 0.0;')
-            logger.debug("Criada coluna dinâmica em saldos_bancos: %s", banco_col)
-
-        # garante a linha do dia
-        self._garantir_linha_saldos_bancos(conn, data)
-
-        # aplica o delta
-        conn.execute(
-            f'UPDATE saldos_bancos SET "{banco_col}" = COALESCE("{banco_col}",0) + ? WHERE data = ?',
-            (float(delta), data),
-        )
-        logger.debug("Ajustado banco_col=%s em %s com delta=%.2f", banco_col, data, float(delta))
+        somar_saldo_banco(conn, data, banco_col, float(delta))
+        logger.debug("Ajustado banco=%s em %s com delta=%.2f", banco_col, data, float(delta))
 
     # ------------------------------------------------------------------
     # data utils
@@ -379,11 +334,8 @@ def _ensure_mov_cols(cur: sqlite3.Cursor) -> None:
     Args:
         cur (sqlite3.Cursor): Cursor apontando para o banco atual.
     """
-    cols = {row[1] for row in cur.execute("PRAGMA table_info(movimentacoes_bancarias);").fetchall()}
-    if "usuario" not in cols:
-        cur.execute("ALTER TABLE movimentacoes_bancarias ADD COLUMN usuario TEXT;")
-    if "data_hora" not in cols:
-        cur.execute("ALTER TABLE movimentacoes_bancarias ADD COLUMN data_hora TEXT;")
+    garantir_coluna(cur, "movimentacoes_bancarias", "usuario", "TEXT")
+    garantir_coluna(cur, "movimentacoes_bancarias", "data_hora", "TEXT")
 
 
 def log_mov_bancaria(
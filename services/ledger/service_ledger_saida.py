@@ -355,7 +355,6 @@ class _SaidasLedgerMixin:
             id_saida = int(cur.lastrowid)
 
             # (2) Ajusta saldos de bancos
-            self._garantir_linha_saldos_bancos(conn, data)
             self._ajustar_banco_dynamic(conn, banco_col=banco_nome, delta=-float(valor), data=data)
 
             # (3) Log movimentação bancária
@@ -5,16 +5,249 @@ Módulo TaxaMaquinetaManager
 Gerencia a tabela `taxas_maquinas` no SQLite para configurar **taxas por
 maquineta/PSP** em diferentes combinações de forma de pagamento, bandeira
 e parcelas. Também suporta um **banco de destino** para a liquidação.
+
+Índice em memória
+-----------------
+`indice_taxas(db)` devolve um `IndiceTaxas` com a tabela inteira em dicts
+(chaves normalizadas em maiúsculas), carregado uma vez e reaproveitado enquanto
+`taxas_maquinas` não mudar (contador de `shared.data_version`, que também
+enxerga gravações de outros processos). Vendas, Fechamento e a UI de
+lançamentos consultam o índice em vez de um SELECT por venda; o
+`TaxaMaquinetaManager` o invalida a cada gravação.
+
+`resolver_taxas(df, db)` aplica o índice a um DataFrame de vendas inteiro
+(taxa, banco de destino e `valor_liquido`), para recálculos em lote.
 """
 
 from __future__ import annotations
 
+import os
 import sqlite3
-from typing import Iterable, Optional, Sequence, Tuple, Dict, Any
+from typing import Iterable, List, Optional, Sequence, Tuple, Dict, Any, Union
 
+import numpy as np
 import pandas as pd
+from shared.data_version import cache_por_tabelas
+from shared.db import conectar
+from shared.schema_cache import colunas
+
+__all__ = ["TaxaMaquinetaManager", "IndiceTaxas", "indice_taxas", "invalidar_indice_taxas", "resolver_taxas"]
+
+# (forma, maquineta, bandeira, parcelas); None = curinga (coluna NULL em bancos antigos)
+ChaveTaxa = Tuple[str, Optional[str], Optional[str], Optional[int]]
+
+# Ordem de preferência dos curingas (bandeira, parcelas, maquineta), como no
+# antigo ORDER BY de `services.vendas`: regra específica antes da genérica.
+_PADROES_CURINGA: Tuple[Tuple[bool, bool, bool], ...] = tuple(
+    (b, p, m) for b in (False, True) for p in (False, True) for m in (False, True)
+)
+
+
+def _norm_chave(v: Any) -> Optional[str]:
+    if v is None or (isinstance(v, float) and pd.isna(v)):
+        return None
+    return str(v).strip().upper()
+
+
+def _norm_parcelas(v: Any) -> Optional[int]:
+    if v is None or (isinstance(v, float) and pd.isna(v)):
+        return None
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return 1
+
+
+class IndiceTaxas:
+    """Taxas de `taxas_maquinas` indexadas por (forma, maquineta, bandeira, parcelas)."""
+
+    def __init__(self, linhas: Iterable[Tuple[Any, Any, Any, Any, Any, Any]]) -> None:
+        self._regras: Dict[ChaveTaxa, Tuple[float, str]] = {}
+        self._banco_forma_maq: Dict[Tuple[str, Optional[str]], str] = {}
+        self._banco_maq: Dict[Optional[str], str] = {}
+        self._tem_curinga = False
+        # linhas em ordem de rowid: em chaves repetidas vale a 1ª (como o LIMIT 1 de antes)
+        for forma, maq, band, parc, taxa, banco in linhas:
+            chave = (_norm_chave(forma) or "", _norm_chave(maq), _norm_chave(band), _norm_parcelas(parc))
+            self._tem_curinga = self._tem_curinga or None in chave[1:]
+            banco = (banco or "").strip() if isinstance(banco, str) else ""
+            self._regras.setdefault(chave, (float(taxa or 0.0), banco))
+            if banco:
+                self._banco_forma_maq.setdefault((chave[0], chave[1]), banco)
+                self._banco_maq.setdefault(chave[1], banco)
+
+    def __len__(self) -> int:
+        return len(self._regras)
+
+    def _chaves(self, forma: str, maquineta: Optional[str], bandeira: Optional[str],
+                parcelas: Optional[int]) -> List[ChaveTaxa]:
+        f = _norm_chave(forma) or ""
+        m = _norm_chave(maquineta) or ""
+        b = _norm_chave(bandeira) or ""
+        p = _norm_parcelas(parcelas) or 1
+        if not self._tem_curinga:
+            return [(f, m, b, p)]
+        return [(f, None if cm else m, None if cb else b, None if cp else p) for cb, cp, cm in _PADROES_CURINGA]
+
+    def buscar(self, forma: str, maquineta: Optional[str], bandeira: Optional[str],
+               parcelas: Optional[int]) -> Optional[Tuple[float, str]]:
+        """(taxa_percentual, banco_destino) da regra mais específica, ou None."""
+        for chave in self._chaves(forma, maquineta, bandeira, parcelas):
+            regra = self._regras.get(chave)
+            if regra is not None:
+                return regra
+        return None
+
+    def exata(self, forma: str, maquineta: Optional[str], bandeira: Optional[str],
+              parcelas: Optional[int]) -> Optional[Tuple[float, str]]:
+        """Somente a regra exata (sem curingas)."""
+        return self._regras.get(self._chaves(forma, maquineta, bandeira, parcelas)[0])
+
+    def taxa(self, forma: str, maquineta: Optional[str], bandeira: Optional[str],
+             parcelas: Optional[int]) -> float:
+        regra = self.buscar(forma, maquineta, bandeira, parcelas)
+        return regra[0] if regra else 0.0
+
+    def banco_destino(self, forma: str, maquineta: Optional[str], bandeira: Optional[str],
+                      parcelas: Optional[int]) -> Optional[str]:
+        """
+        Heurística de `banco_destino` (mesma ordem das consultas da UI):
+        regra exata -> (forma, maquineta) -> qualquer regra da maquineta;
+        LINK_PAGAMENTO tenta também CRÉDITO.
+        """
+        f = _norm_chave(forma) or ""
+        m = _norm_chave(maquineta) or ""
+        formas_try = [f, "CRÉDITO"] if f == "LINK_PAGAMENTO" else [f]
+        for ft in formas_try:
+            regra = self.exata(ft, m, bandeira, parcelas)
+            if regra and regra[1]:
+                return regra[1]
+        for ft in formas_try:
+            banco = self._banco_forma_maq.get((ft, m))
+            if banco:
+                return banco
+        return self._banco_maq.get(m) or None
+
+    def para_dataframe(self) -> pd.DataFrame:
+        """Regras como DataFrame (chaves normalizadas), base do `resolver_taxas`."""
+        dados = [(*k, t, b) for k, (t, b) in self._regras.items()]
+        return pd.DataFrame(dados, columns=["k_forma", "k_maq", "k_band", "k_parc", "taxa_percentual", "banco_destino"])
 
-__all__ = ["TaxaMaquinetaManager"]
+
+def _ler_linhas(conn: sqlite3.Connection) -> List[tuple]:
+    cols = {c.lower() for c in colunas(conn, "taxas_maquinas")}
+    if not cols:
+        return []
+    # bancos antigos tinham a coluna `forma` no lugar de `forma_pagamento`
+    forma = "COALESCE(forma_pagamento, forma)" if "forma" in cols else "forma_pagamento"
+    banco = "banco_destino" if "banco_destino" in cols else "NULL"
+    return conn.execute(
+        f"SELECT {forma}, maquineta, bandeira, parcelas, taxa_percentual, {banco} "
+        "FROM taxas_maquinas ORDER BY rowid"
+    ).fetchall()
+
+
+@cache_por_tabelas("taxas_maquinas", maxsize=8)
+def _indice_do_arquivo(db_path: str) -> IndiceTaxas:
+    with conectar(db_path) as conn:
+        return IndiceTaxas(_ler_linhas(conn))
+
+
+def indice_taxas(db: Union[str, sqlite3.Connection]) -> IndiceTaxas:
+    """
+    Índice de taxas do banco (caminho ou conexão). Com conexão em transação
+    aberta (ou banco em memória), lê pela própria conexão, sem cache.
+    """
+    if isinstance(db, sqlite3.Connection):
+        arquivo = ""
+        try:
+            if not db.in_transaction:
+                row = db.execute("SELECT file FROM pragma_database_list WHERE name = 'main'").fetchone()
+                arquivo = (row[0] or "") if row else ""
+        except sqlite3.Error:
+            arquivo = ""
+        if not arquivo:
+            try:
+                return IndiceTaxas(_ler_linhas(db))
+            except sqlite3.Error:
+                return IndiceTaxas(())
+        db = arquivo
+    try:
+        return _indice_do_arquivo(os.path.abspath(db))
+    except sqlite3.Error:
+        return IndiceTaxas(())
+
+
+def invalidar_indice_taxas() -> None:
+    """Descarta os índices em memória (o contador de versão já cobre gravações por SQL)."""
+    _indice_do_arquivo.clear()
+
+
+def resolver_taxas(
+    df: pd.DataFrame,
+    db: Union[str, sqlite3.Connection],
+    *,
+    col_forma: str = "Forma_de_Pagamento",
+    col_maquineta: str = "maquineta",
+    col_bandeira: str = "Bandeira",
+    col_parcelas: str = "Parcelas",
+    col_valor: Optional[str] = "Valor",
+) -> pd.DataFrame:
+    """
+    Versão vetorizada do cálculo de taxa por venda. Devolve uma cópia de `df`
+    com `taxa_percentual`, `banco_destino` (da regra encontrada; '' se nenhuma)
+    e, se houver `col_valor` (None desliga), `valor_liquido` recalculado.
+
+    Mesmas regras do `VendasService`: DINHEIRO e PIX sem maquineta têm taxa 0.
+    """
+    out = df.copy()
+    n = len(out)
+
+    def _col(nome: str) -> pd.Series:
+        s = out[nome] if nome in out.columns else pd.Series([None] * n, dtype=object)
+        return s.reset_index(drop=True)
+
+    # posições 0..n-1 (o índice de `df` pode ter repetidos)
+    chaves = pd.DataFrame({
+        "pos": range(n),
+        "k_forma": _col(col_forma).fillna("").astype(str).str.strip().str.upper(),
+        "k_maq": _col(col_maquineta).fillna("").astype(str).str.strip().str.upper(),
+        "k_band": _col(col_bandeira).fillna("").astype(str).str.strip().str.upper(),
+        "k_parc": pd.to_numeric(_col(col_parcelas), errors="coerce").fillna(1).astype("int64"),
+    })
+
+    regras = indice_taxas(db).para_dataframe()
+    taxa = np.zeros(n)
+    banco = np.full(n, "", dtype=object)
+    pendente = np.ones(n, dtype=bool)
+    for cb, cp, cm in _PADROES_CURINGA:
+        if regras.empty or not pendente.any():
+            break
+        sub, on = regras, ["k_forma"]
+        for curinga, col in ((cb, "k_band"), (cp, "k_parc"), (cm, "k_maq")):
+            sub = sub[sub[col].isna()] if curinga else sub[sub[col].notna()]
+            if not curinga:
+                on.append(col)
+        if sub.empty:
+            continue
+        if not cp:
+            sub = sub.astype({"k_parc": "int64"})
+        m = chaves[pendente].merge(sub[on + ["taxa_percentual", "banco_destino"]], on=on, how="inner")
+        if m.empty:
+            continue
+        pos = m["pos"].to_numpy()
+        taxa[pos] = m["taxa_percentual"].to_numpy(dtype=float)
+        banco[pos] = m["banco_destino"].to_numpy()
+        pendente[pos] = False
+
+    sem_taxa = ((chaves["k_forma"] == "DINHEIRO") | ((chaves["k_forma"] == "PIX") & (chaves["k_maq"] == ""))).to_numpy()
+    taxa[sem_taxa] = 0.0
+    out["taxa_percentual"] = taxa
+    out["banco_destino"] = banco
+    if col_valor and col_valor in out.columns:
+        valor = pd.to_numeric(out[col_valor], errors="coerce").fillna(0.0)
+        out["valor_liquido"] = (valor * (1 - out["taxa_percentual"] / 100.0)).round(2)
+    return out
 
 
 class TaxaMaquinetaManager:
@@ -29,9 +262,7 @@ class TaxaMaquinetaManager:
     # Infra
     # ------------------------------------------------------------------ #
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.caminho_banco)
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        return conectar(self.caminho_banco, pragmas=("foreign_keys = ON",))
 
     def _criar_tabela(self) -> None:
         with self._connect() as conn:
@@ -120,6 +351,7 @@ class TaxaMaquinetaManager:
                 (maq, frm, ban, par, tx, bco),
             )
             conn.commit()
+        invalidar_indice_taxas()
 
     def salvar_taxas_bulk(
         self,
@@ -152,6 +384,7 @@ class TaxaMaquinetaManager:
                 rows,
             )
             conn.commit()
+        invalidar_indice_taxas()
 
     def remover_taxa(
         self,
@@ -175,7 +408,8 @@ class TaxaMaquinetaManager:
                 (maq, frm, ban, par),
             )
             conn.commit()
-            return cur.rowcount
+        invalidar_indice_taxas()
+        return cur.rowcount
 
     def obter_taxa(
         self,
@@ -190,27 +424,17 @@ class TaxaMaquinetaManager:
         ban = self._norm(bandeira)
         par = self._valida_parcelas(parcelas)
 
-        with self._connect() as conn:
-            row = conn.execute(
-                """
-                SELECT maquineta, forma_pagamento, bandeira, parcelas, taxa_percentual, COALESCE(banco_destino,'')
-                  FROM taxas_maquinas
-                 WHERE maquineta=? AND forma_pagamento=? AND bandeira=? AND parcelas=?
-                 LIMIT 1
-                """,
-                (maq, frm, ban, par),
-            ).fetchone()
-
-        if not row:
+        regra = indice_taxas(self.caminho_banco).exata(frm, maq, ban, par)
+        if not regra:
             return None
 
         return {
-            "maquineta": row[0],
-            "forma_pagamento": row[1],
-            "bandeira": row[2],
-            "parcelas": int(row[3]),
-            "taxa_percentual": float(row[4]),
-            "banco_destino": row[5],
+            "maquineta": maq,
+            "forma_pagamento": frm,
+            "bandeira": ban,
+            "parcelas": par,
+            "taxa_percentual": float(regra[0]),
+            "banco_destino": regra[1],
         }
 
     # ------------------------------------------------------------------ #
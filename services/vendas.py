@@ -14,55 +14,40 @@ Regras de datas (alinhadas com o combinado):
 - `entrada.Data_Liq`    = **data em que o dinheiro cai**:
     • Dinheiro / PIX  → **mesmo dia** da data_referencia.
     • Débito / Crédito / Link de Pagamento → **D+1 útil** (usa Workalendar BR; fallback seg–sex).
+
+`registrar_vendas_lote` grava um lote inteiro (extrato do dia das maquinetas,
+migração de histórico) numa transação, com taxas/datas calculadas em lote e
+resultado de idempotência por linha.
 """
 
 from __future__ import annotations
 
-from typing import Optional, Tuple
-import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
 import sqlite3
-from datetime import datetime, date, timedelta
+from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
-from shared.db import get_conn
-from shared.ids import uid_venda_liquidacao, sanitize
+from shared.calendario_util import data_liquidacao, datas_liquidacao
+from shared.db import conexao_escrita, get_conn, faixa_iso
+from shared.ids import hash_uid, uid_venda_liquidacao, sanitize
+from shared.saldos_bancos import somar_saldo_banco
+from shared.schema_cache import colunas
+from services.taxas import indice_taxas, resolver_taxas
 from utils.utils import agora_local_naive_str  # <-- salvar sem fuso
 
-__all__ = ["VendasService"]
+__all__ = ["VendasService", "ResultadoVendaLote"]
+
+_FORMAS_VENDA = ("DINHEIRO", "PIX", "DÉBITO", "CRÉDITO", "LINK_PAGAMENTO")
 
 # -----------------------------------------------------------------------------#
 # Helpers de data (próximo dia útil)
 # -----------------------------------------------------------------------------#
-def _is_working_day(d: date) -> bool:
-    """Usa Workalendar BR-DF se disponível; senão Brasil; senão seg-sex."""
-    try:
-        from workalendar.registry import registry
-        cal_cls = registry.get("BR-DF")
-        if cal_cls:
-            return bool(cal_cls().is_working_day(d))
-    except Exception:
-        pass
-    try:
-        from workalendar.america import Brazil
-        return bool(Brazil().is_working_day(d))
-    except Exception:
-        pass
-    return d.weekday() < 5  # seg(0)..sex(4)
-
-def _proximo_dia_util(d: date) -> date:
-    while not _is_working_day(d):
-        d += timedelta(days=1)
-    return d
-
 def _liq_para_forma(data_venda_str: str, forma_upper: str) -> str:
-    """Calcula data de liquidação por forma."""
-    dv = pd.to_datetime(data_venda_str).date()
-    if forma_upper in ("DINHEIRO", "PIX"):
-        data_liq = dv
-    else:
-        data_liq = _proximo_dia_util(dv + timedelta(days=1))
-    return data_liq.isoformat()
+    """Calcula data de liquidação por forma (DINHEIRO/PIX = D; demais = D+1 útil)."""
+    return data_liquidacao(data_venda_str, forma_upper)
 
 # -----------------------------------------------------------------------------#
 # Seeds de caixa inicial (opcional)
@@ -100,33 +85,59 @@ def _resolver_taxa_percentual(
     parcelas: int,
     maquineta: Optional[str],
 ) -> float:
-    """Busca taxa na `taxas_maquinas`; retorna 0.0 se não encontrar."""
-    forma_u = (forma or "").upper()
-    params = [forma_u, bandeira, int(parcelas or 1), maquineta]
+    """Busca taxa no índice em memória de `taxas_maquinas`; retorna 0.0 se não encontrar."""
     try:
-        row = conn.execute(
-            """
-            SELECT COALESCE(taxa_percentual,0) AS taxa
-              FROM taxas_maquinas
-             WHERE UPPER(COALESCE(forma_pagamento, forma)) = ?
-               AND (bandeira  IS NULL OR bandeira  = ?)
-               AND (parcelas  IS NULL OR parcelas  = ?)
-               AND (maquineta IS NULL OR maquineta = ?)
-             ORDER BY 
-               CASE WHEN bandeira  IS NULL THEN 1 ELSE 0 END,
-               CASE WHEN parcelas  IS NULL THEN 1 ELSE 0 END,
-               CASE WHEN maquineta IS NULL THEN 1 ELSE 0 END
-             LIMIT 1
-            """,
-            params,
-        ).fetchone()
-        return float(row[0]) if row and row[0] is not None else 0.0
+        return indice_taxas(conn).taxa(forma, maquineta, bandeira, int(parcelas or 1))
     except Exception:
         return 0.0
 
+# -----------------------------------------------------------------------------#
+# Observação do log em movimentacoes_bancarias
+# -----------------------------------------------------------------------------#
+def _observacao_venda(
+    forma_u: str,
+    parcelas: int,
+    bandeira: Optional[str],
+    maquineta: Optional[str],
+    banco_destino: Optional[str],
+    valor_bruto: float,
+    taxa: float,
+    valor_liquido: float,
+) -> str:
+    """Texto de `observacao` do log da venda."""
+    if forma_u == "PIX" and not (maquineta and maquineta.strip()):
+        detalhe_meio = f"Direto — {banco_destino or '—'}"
+    elif forma_u == "DINHEIRO":
+        detalhe_meio = "Caixa"
+    else:
+        detalhe_meio = f"{(bandeira or '—')}/{(maquineta or '—')}"
+
+    return (
+        f"Lançamento VENDA {forma_u} {parcelas}x / "
+        f"{detalhe_meio} • Bruto R$ {valor_bruto:.2f} • "
+        f"Taxa {taxa:.2f}% -> Líquido R$ {valor_liquido:.2f}"
+    ).strip()
+
 # -----------------------------------------------------------------------------#
 # Serviço
 # -----------------------------------------------------------------------------#
+@dataclass(frozen=True)
+class ResultadoVendaLote:
+    """Resultado de uma linha de `registrar_vendas_lote`."""
+    indice: int                 # posição no lote
+    status: str                 # "inserida" | "duplicada" | "invalida"
+    venda_id: int = -1
+    mov_id: int = -1
+    trans_uid: str = ""
+    erro: str = ""
+
+
+# Chaves lógicas gravadas em `entrada` (o nome real da coluna pode variar na caixa)
+_CHAVES_ENTRADA = (
+    "Data", "Data_Liq", "Valor", "valor_liquido", "Forma_de_Pagamento", "Parcelas",
+    "Bandeira", "maquineta", "Banco_Destino", "Usuario", "created_at",
+)
+
 class VendasService:
     """Regras de negócio para registro de vendas."""
 
@@ -159,11 +170,11 @@ class VendasService:
             """
             SELECT id, caixa, caixa_2, caixa_vendas, caixa2_dia
               FROM saldos_caixas
-             WHERE DATE(data)=DATE(?)
+             WHERE data >= ? AND data < ?
              ORDER BY id DESC
              LIMIT 1
             """,
-            (data,),
+            faixa_iso(data),
         ).fetchone()
 
         # Totais da véspera
@@ -171,12 +182,11 @@ class VendasService:
             """
             SELECT caixa_total, caixa2_total
               FROM saldos_caixas
-             WHERE DATE(data) = (
-                SELECT MAX(DATE(data)) FROM saldos_caixas WHERE DATE(data) < DATE(?)
-             )
+             WHERE data < ?
+             ORDER BY data DESC
              LIMIT 1
             """,
-            (data,),
+            (faixa_iso(data)[0],),
         ).fetchone()
 
         if not dia:
@@ -239,31 +249,57 @@ class VendasService:
             (caixa_total, caixa2_total, dia_id),
         )
 
-    def _garantir_linha_saldos_bancos(self, conn: sqlite3.Connection, data: str) -> None:
-        cur = conn.execute("SELECT 1 FROM saldos_bancos WHERE DATE(data)=DATE(?) LIMIT 1", (data,))
-        if not cur.fetchone():
-            conn.execute("INSERT OR IGNORE INTO saldos_bancos (data) VALUES (DATE(?))", (data,))
-
-    _COL_RE = re.compile(r"^[A-Za-z0-9_ ]{1,64}$")
-
-    def _validar_nome_coluna_banco(self, banco_col: str) -> str:
-        banco_col = (banco_col or "").strip()
-        if not self._COL_RE.match(banco_col):
-            raise ValueError(f"Nome de banco/coluna inválido: {banco_col!r}")
-        return banco_col
-
-    def _ajustar_banco_dynamic(self, conn: sqlite3.Connection, banco_col: str, delta: float, data: str) -> None:
-        banco_col = self._validar_nome_coluna_banco(banco_col)
-        cols = pd.read_sql("PRAGMA table_info(saldos_bancos);", conn)["name"].tolist()
-        if banco_col not in cols:
-            conn.execute(f'ALTER TABLE saldos_bancos ADD COLUMN "{banco_col}" REAL DEFAULT 0.0;')
-        self._garantir_linha_saldos_bancos(conn, data)
+    def _somar_caixa_vendas(self, conn: sqlite3.Connection, data: str, valor: float) -> None:
+        """Soma `valor` em `caixa_vendas` do dia (criando a linha) e recalcula `caixa_total`."""
+        self._garantir_linha_saldos_caixas(conn, data)
+        conn.execute(
+            """
+            UPDATE saldos_caixas
+               SET caixa_vendas = COALESCE(caixa_vendas,0) + ?
+             WHERE data >= ? AND data < ?
+            """,
+            (float(valor), *faixa_iso(data)),
+        )
         conn.execute(
-            f'UPDATE saldos_bancos SET "{banco_col}" = COALESCE("{banco_col}", 0) + ? WHERE DATE(data)=DATE(?)',
-            (float(delta), data),
+            """
+            UPDATE saldos_caixas
+               SET caixa_total = COALESCE(caixa,0) + COALESCE(caixa_vendas,0)
+             WHERE data >= ? AND data < ?
+            """,
+            faixa_iso(data),
         )
 
+    def _ajustar_banco_dynamic(self, conn: sqlite3.Connection, banco_col: str, delta: float, data: str) -> None:
+        """Soma `delta` no saldo do banco no dia (`saldos_bancos_mov`, sem ALTER TABLE)."""
+        somar_saldo_banco(conn, data, banco_col, float(delta))
+
     # ============================= Insert em `entrada` =============================
+    def _colunas_entrada(self, conn: sqlite3.Connection) -> set:
+        """Colunas de `entrada`, criando as opcionais usadas pelas vendas se faltarem."""
+        colnames = set(colunas(conn, "entrada"))
+        for col, tipo in (("Usuario", "TEXT"), ("valor_liquido", "REAL"), ("maquineta", "TEXT"),
+                          ("created_at", "TEXT"), ("Data_Liq", "TEXT")):
+            if col not in colnames:
+                conn.execute(f'ALTER TABLE entrada ADD COLUMN "{col}" {tipo};'); colnames.add(col)
+        return colnames
+
+    @staticmethod
+    def _mapear_colunas_entrada(colnames: set) -> dict:
+        """Mapeia chaves lógicas -> colunas reais de `entrada` (case-insensitive); ignora as ausentes."""
+        col_map_lower = {c.lower(): c for c in colnames}
+        mapa = {}
+        for k in _CHAVES_ENTRADA:
+            real = col_map_lower.get(k.lower(), k)
+            if real in colnames:
+                mapa[k] = real
+        if "Data_Venda" in colnames:
+            mapa["Data_Venda"] = "Data_Venda"
+        if "Taxa_percentual" in colnames:
+            mapa["taxa_percentual"] = "Taxa_percentual"
+        elif "Taxa_Percentual" in colnames:
+            mapa["taxa_percentual"] = "Taxa_Percentual"
+        return mapa
+
     def _insert_entrada(
         self,
         conn: sqlite3.Connection,
@@ -281,20 +317,7 @@ class VendasService:
         usuario: str,
     ) -> int:
         """Insere venda na tabela `entrada` (compatível com colunas opcionais)."""
-        cols_df = pd.read_sql("PRAGMA table_info(entrada);", conn)
-        colnames = set(cols_df["name"].astype(str).tolist())
-
-        # colunas opcionais
-        if "Usuario" not in colnames:
-            conn.execute('ALTER TABLE entrada ADD COLUMN "Usuario" TEXT;'); colnames.add("Usuario")
-        if "valor_liquido" not in colnames:
-            conn.execute('ALTER TABLE entrada ADD COLUMN "valor_liquido" REAL;'); colnames.add("valor_liquido")
-        if "maquineta" not in colnames:
-            conn.execute('ALTER TABLE entrada ADD COLUMN "maquineta" TEXT;'); colnames.add("maquineta")
-        if "created_at" not in colnames:
-            conn.execute('ALTER TABLE entrada ADD COLUMN "created_at" TEXT;'); colnames.add("created_at")
-        if "Data_Liq" not in colnames:
-            conn.execute('ALTER TABLE entrada ADD COLUMN "Data_Liq" TEXT;'); colnames.add("Data_Liq")
+        colnames = self._colunas_entrada(conn)
 
         # >>> grava 'YYYY-MM-DD HH:MM:SS' sem timezone (Brasília)
         created_at_value = agora_local_naive_str()
@@ -317,12 +340,6 @@ class VendasService:
         if valor_liquido is not None:
             liquido = float(valor_liquido)
 
-        # [FIX] Normaliza chaves para garantir match com colnames (case sensitive no Python dict)
-        col_map_lower = {c.lower(): c for c in colnames}
-        
-        def _get_real_col(name):
-            return col_map_lower.get(name.lower(), name)
-
         to_insert_raw = {
             "Data": data_venda,
             "Data_Liq": data_liq,
@@ -335,21 +352,13 @@ class VendasService:
             "Banco_Destino": banco_destino or None,
             "Usuario": usuario,
             "created_at": created_at_value,
+            "Data_Venda": data_venda,
+            "taxa_percentual": float(taxa_eff),
         }
-        
-        # Mapeia chaves para as colunas reais do banco
-        to_insert = {}
-        for k, v in to_insert_raw.items():
-            real_key = _get_real_col(k)
-            if real_key in colnames:
-                to_insert[real_key] = v
 
-        if "Data_Venda" in colnames:
-            to_insert["Data_Venda"] = data_venda
-        if "Taxa_percentual" in colnames:
-            to_insert["Taxa_percentual"] = float(taxa_eff)
-        elif "Taxa_Percentual" in colnames:
-            to_insert["Taxa_Percentual"] = float(taxa_eff)
+        # Mapeia chaves para as colunas reais do banco
+        mapa = self._mapear_colunas_entrada(colnames)
+        to_insert = {real: to_insert_raw[k] for k, real in mapa.items()}
 
         names = list(to_insert.keys())
         values = list(to_insert.values())
@@ -427,7 +436,7 @@ class VendasService:
         forma_u = sanitize(forma or "").upper()
         if forma_u == "DEBITO":
             forma_u = "DÉBITO"
-        if forma_u not in ("DINHEIRO", "PIX", "DÉBITO", "CRÉDITO", "LINK_PAGAMENTO"):
+        if forma_u not in _FORMAS_VENDA:
             raise ValueError(f"Forma de pagamento inválida: {forma!r}")
 
         parcelas = int(parcelas or 1)
@@ -486,23 +495,7 @@ class VendasService:
 
             # 2) Atualiza saldos no dia de liquidação
             if forma_u == "DINHEIRO":
-                self._garantir_linha_saldos_caixas(conn, data_liq)
-                cur.execute(
-                    """
-                    UPDATE saldos_caixas
-                       SET caixa_vendas = COALESCE(caixa_vendas,0) + ?
-                     WHERE DATE(data)=DATE(?)
-                    """,
-                    (float(valor_liquido), data_liq),
-                )
-                cur.execute(
-                    """
-                    UPDATE saldos_caixas
-                       SET caixa_total = COALESCE(caixa,0) + COALESCE(caixa_vendas,0)
-                     WHERE DATE(data)=DATE(?)
-                    """,
-                    (data_liq,),
-                )
+                self._somar_caixa_vendas(conn, data_liq, float(valor_liquido))
                 banco_label = "Caixa_Vendas"
             else:
                 if not banco_destino:
@@ -510,28 +503,15 @@ class VendasService:
                 
                 # [ALTERAÇÃO] DESATIVADO UPDATE em saldos_bancos para evitar snapshots parciais.
                 # O sistema deve calcular dinamicamente a partir do último fechamento oficial (entrada + movs).
-                # self._garantir_linha_saldos_bancos(conn, data_liq)
                 # self._ajustar_banco_dynamic(conn, banco_col=banco_destino, delta=float(valor_liquido), data=data_liq)
                 
                 banco_label = banco_destino
 
             # 3) Log em movimentacoes_bancarias
-            if forma_u == "PIX" and not (maquineta and maquineta.strip()):
-                detalhe_meio = f"Direto — {banco_destino or '—'}"
-            elif forma_u in ("CRÉDITO", "DÉBITO", "LINK_PAGAMENTO"):
-                detalhe_meio = f"{(bandeira or '—')}/{(maquineta or '—')}"
-            elif forma_u == "DINHEIRO":
-                detalhe_meio = "Caixa"
-            else:
-                detalhe_meio = f"{(bandeira or '—')}/{(maquineta or '—')}"
-
-            obs = (
-                f"Lançamento VENDA {forma_u} {parcelas}x / "
-                f"{detalhe_meio} • Bruto R$ {float(valor_bruto):.2f} • "
-                f"Taxa {float(taxa_eff):.2f}% -> Líquido R$ {valor_liquido:.2f}"
-            ).strip()
+            obs = _observacao_venda(forma_u, parcelas, bandeira, maquineta, banco_destino,
+                                    float(valor_bruto), float(taxa_eff), valor_liquido)
 
-            cols_exist = {r[1] for r in conn.execute("PRAGMA table_info(movimentacoes_bancarias)")}
+            cols_exist = set(colunas(conn, "movimentacoes_bancarias"))
             payload = {
                 "data": data_liq,
                 "banco": banco_label,
@@ -558,3 +538,244 @@ class VendasService:
             conn.commit()
 
         return (int(venda_id), int(mov_id))
+
+    # ============================= Lote =============================
+    def registrar_vendas_lote(
+        self,
+        vendas: Union[pd.DataFrame, Iterable[Mapping[str, Any]]],
+        *,
+        usuario: str = "Sistema",
+        idempotente: bool = True,
+    ) -> List[ResultadoVendaLote]:
+        """
+        Registra várias vendas numa única transação (importação de extratos de
+        maquineta, migração de histórico).
+
+        Cada item aceita as mesmas chaves de `registrar_venda` (data_venda/data,
+        data_liq, valor_bruto/valor, forma/forma_pagamento, parcelas, bandeira,
+        maquineta, banco_destino, taxa_percentual/taxa, usuario) e, opcionalmente,
+        `id_externo` (NSU/código da transação), que entra no `trans_uid`.
+
+        - Validação, taxas (`resolver_taxas`), `Data_Liq` (`datas_liquidacao`) e
+          `valor_liquido` calculados em lote; `banco_destino` vazio é preenchido
+          pela regra de taxa encontrada.
+        - `entrada` e `movimentacoes_bancarias` gravadas com `executemany`;
+          `saldos_caixas` atualizado uma vez por dia de liquidação (DINHEIRO).
+          Como em `registrar_venda`, `saldos_bancos` não é tocado.
+        - `idempotente=True`: vendas com `id_externo` têm `trans_uid`
+          determinístico; as já gravadas (ou repetidas no próprio lote) voltam
+          como "duplicada" com os ids existentes. Sem `id_externo`, duas vendas
+          iguais no mesmo dia são legítimas, então a linha ganha um nonce, como
+          no lançamento unitário (quem precisa reimportar sem duplicar monta o
+          `id_externo`, ver `services.importador_extratos`). Com `False`, todas
+          as linhas ganham nonce.
+        - Linhas inválidas voltam como "invalida" (com `erro`) e não impedem as demais.
+
+        Retorna um `ResultadoVendaLote` por item, na ordem de entrada.
+        """
+        if isinstance(vendas, pd.DataFrame):
+            df = vendas.reset_index(drop=True)
+        else:
+            df = pd.DataFrame(list(vendas))
+        n = len(df)
+        if n == 0:
+            return []
+
+        def _col(*nomes: str) -> pd.Series:
+            for nome in nomes:
+                if nome in df.columns:
+                    return df[nome].astype(object)
+            return pd.Series([None] * n, dtype=object)
+
+        def _txt(*nomes: str) -> pd.Series:
+            return _col(*nomes).fillna("").astype(str).str.strip()
+
+        # ---------- normalização vetorizada ----------
+        dv = pd.to_datetime(_col("data_venda", "data", "Data"), errors="coerce", format="mixed")
+        liq_txt = _txt("data_liq", "data_liquidacao", "Data_Liq")
+        liq_inf = pd.to_datetime(liq_txt.where(liq_txt != ""), errors="coerce", format="mixed")
+        valor = pd.to_numeric(_col("valor_bruto", "valor", "Valor"), errors="coerce")
+        forma = _txt("forma", "forma_pagamento", "Forma_de_Pagamento").str.upper().replace(
+            {"DEBITO": "DÉBITO", "CREDITO": "CRÉDITO"}
+        )
+        parcelas = pd.to_numeric(_col("parcelas", "Parcelas"), errors="coerce").fillna(1)
+        bandeira = _txt("bandeira", "Bandeira")
+        maquineta = _txt("maquineta")
+        banco = _txt("banco_destino", "Banco_Destino")
+        taxa_inf = pd.to_numeric(_col("taxa_percentual", "taxa"), errors="coerce").fillna(0.0)
+        usuarios = _txt("usuario", "Usuario").replace("", sanitize(usuario) or "Sistema")
+        id_ext = _txt("id_externo", "nsu")
+
+        erros = pd.Series("", index=df.index, dtype=object)
+
+        def _marcar(mask: pd.Series, msg: str) -> None:
+            erros[mask.to_numpy() & (erros == "").to_numpy()] = msg
+
+        _marcar(dv.isna() | ((liq_txt != "") & liq_inf.isna()), "Datas inválidas; use YYYY-MM-DD.")
+        _marcar(~(valor > 0), "valor_bruto deve ser > 0.")
+        _marcar(~forma.isin(_FORMAS_VENDA), "Forma de pagamento inválida.")
+        _marcar(parcelas < 1, "parcelas deve ser >= 1.")
+        parcelas = parcelas.clip(lower=1).astype("int64")
+
+        data_venda = dv.dt.strftime("%Y-%m-%d")
+        data_liq = pd.Series(datas_liquidacao(data_venda.fillna(""), forma), dtype=object)
+        data_liq = liq_inf.dt.strftime("%Y-%m-%d").where(liq_txt != "", data_liq)
+
+        # ---------- taxas e banco de destino ----------
+        sem_taxa = (forma == "DINHEIRO") | ((forma == "PIX") & (maquineta == ""))
+        with conexao_escrita(self.db_path_like) as conn:
+            regras = resolver_taxas(
+                pd.DataFrame({"Forma_de_Pagamento": forma, "maquineta": maquineta,
+                              "Bandeira": bandeira, "Parcelas": parcelas}),
+                conn,
+                col_valor=None,
+            )
+            taxa = taxa_inf.where(taxa_inf != 0.0, regras["taxa_percentual"]).where(~sem_taxa, 0.0)
+            banco = banco.where(banco != "", regras["banco_destino"].fillna("").astype(str))
+            _marcar((forma != "DINHEIRO") & (banco == ""),
+                    "banco_destino é obrigatório para formas não-DINHEIRO (inclui PIX via banco).")
+            liquido = (valor.fillna(0.0) * (1.0 - taxa / 100.0)).round(2)
+
+            validos = (erros == "").to_numpy()
+            pos_validos = np.flatnonzero(validos)
+
+            # ---------- idempotência ----------
+            # listas Python: acesso por posição nos laços abaixo sem custo de Series.__getitem__
+            l_dv, l_liq, l_forma, l_band, l_maq, l_banco, l_usu = (
+                x.tolist() for x in (data_venda, data_liq, forma, bandeira, maquineta, banco, usuarios)
+            )
+            l_valor, l_taxa, l_liquido, l_parc = (
+                x.astype(float).tolist() for x in (valor, taxa, liquido, parcelas)
+            )
+            l_ext = id_ext.tolist()
+            uids = pd.Series("", index=df.index, dtype=object)
+            chaves = []
+            for i in pos_validos:
+                uid = uid_venda_liquidacao(
+                    l_dv[i], l_liq[i], l_valor[i], l_forma[i], int(l_parc[i]),
+                    l_band[i], l_maq[i], l_banco[i], l_taxa[i], l_usu[i],
+                )
+                chaves.append(hash_uid(uid, "EXT", l_ext[i]) if l_ext[i] else uid)
+            uids.iloc[pos_validos] = chaves
+
+            existentes: Dict[str, Tuple[int, int]] = {}
+            com_chave = validos & (id_ext != "").to_numpy() if idempotente else np.zeros(n, dtype=bool)
+            sem_chave = np.flatnonzero(validos & ~com_chave)
+            if len(sem_chave):
+                nonce = datetime.now().strftime("-%Y%m%d%H%M%S%f")
+                uids.iloc[sem_chave] = [f"{u}{nonce}-{i}" for u, i in zip(uids.iloc[sem_chave], sem_chave)]
+            repetida = np.zeros(n, dtype=bool)
+            if com_chave.any():
+                lista = uids[com_chave].tolist()
+                for k in range(0, len(lista), 500):
+                    bloco = lista[k:k + 500]
+                    for mov_id, venda_id, uid in conn.execute(
+                        f"""
+                        SELECT rowid, referencia_id, trans_uid FROM movimentacoes_bancarias
+                         WHERE trans_uid IN ({",".join("?" * len(bloco))})
+                        """,
+                        bloco,
+                    ):
+                        existentes[uid] = (int(venda_id or -1), int(mov_id))
+                repetida = com_chave & (
+                    uids.duplicated(keep="first").to_numpy() | uids.isin(list(existentes)).to_numpy()
+                )
+
+            novos = pos_validos[~repetida[pos_validos]]
+            ids_venda: Dict[int, int] = {}
+            ids_mov: Dict[str, int] = {}
+
+            if len(novos):
+                # ---------- entrada ----------
+                created_at = agora_local_naive_str()
+                dinheiro_ou_pix = sem_taxa.to_numpy()
+                logicos = {
+                    "Data": data_venda,
+                    "Data_Liq": data_liq,
+                    "Valor": valor.astype(float),
+                    "valor_liquido": liquido,
+                    "Forma_de_Pagamento": forma,
+                    "Parcelas": parcelas,
+                    "Bandeira": bandeira.where(bandeira != "", None),
+                    "maquineta": maquineta.where((maquineta != "") & ~dinheiro_ou_pix, None),
+                    "Banco_Destino": banco.where(banco != "", None),
+                    "Usuario": usuarios,
+                    "created_at": pd.Series(created_at, index=df.index),
+                    "Data_Venda": data_venda,
+                    "taxa_percentual": taxa.astype(float),
+                }
+                mapa = self._mapear_colunas_entrada(self._colunas_entrada(conn))
+                cols_sql = ", ".join(f'"{real}"' for real in mapa.values())
+                linhas = zip(*(logicos[k].iloc[novos].tolist() for k in mapa))
+
+                antes = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM entrada").fetchone()[0]
+                conn.executemany(
+                    f"INSERT INTO entrada ({cols_sql}) VALUES ({', '.join('?' * len(mapa))})", linhas
+                )
+                rowids = [r[0] for r in conn.execute(
+                    "SELECT rowid FROM entrada WHERE rowid > ? ORDER BY rowid", (antes,)
+                )]
+                ids_venda = dict(zip(novos.tolist(), rowids))
+
+                # ---------- movimentacoes_bancarias ----------
+                cols_exist = set(colunas(conn, "movimentacoes_bancarias"))
+                payload = ["data", "banco", "tipo", "valor", "origem", "observacao",
+                           "referencia_tabela", "referencia_id", "trans_uid"]
+                extras = [c for c in ("data_hora", "usuario") if c in cols_exist]
+                l_uid = uids.tolist()
+                movs = []
+                for i in novos.tolist():
+                    linha = [
+                        l_liq[i],
+                        "Caixa_Vendas" if l_forma[i] == "DINHEIRO" else l_banco[i],
+                        "entrada",
+                        l_liquido[i],
+                        "lancamentos",
+                        _observacao_venda(l_forma[i], int(l_parc[i]), l_band[i], l_maq[i], l_banco[i],
+                                          l_valor[i], l_taxa[i], l_liquido[i]),
+                        "entrada",
+                        ids_venda[i],
+                        l_uid[i],
+                    ]
+                    if "data_hora" in extras:
+                        linha.append(created_at)
+                    if "usuario" in extras:
+                        linha.append(l_usu[i])
+                    movs.append(linha)
+
+                antes = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM movimentacoes_bancarias").fetchone()[0]
+                cols_mov = payload + extras
+                cols_mov_sql = ", ".join(f'"{c}"' for c in cols_mov)
+                conn.executemany(
+                    f"INSERT INTO movimentacoes_bancarias ({cols_mov_sql}) VALUES ({', '.join('?' * len(cols_mov))})",
+                    movs,
+                )
+                ids_mov = {uid: int(rid) for rid, uid in conn.execute(
+                    "SELECT rowid, trans_uid FROM movimentacoes_bancarias WHERE rowid > ?", (antes,)
+                )}
+
+                # ---------- saldos_caixas: uma vez por dia ----------
+                eh_dinheiro = (forma.iloc[novos] == "DINHEIRO").to_numpy()
+                if eh_dinheiro.any():
+                    por_dia = liquido.iloc[novos[eh_dinheiro]].groupby(data_liq.iloc[novos[eh_dinheiro]]).sum()
+                    for dia, total in sorted(por_dia.items()):
+                        self._somar_caixa_vendas(conn, dia, round(float(total), 2))
+
+        # ---------- resultado por linha ----------
+        l_erro, l_uid = erros.tolist(), uids.tolist()
+        primeiro_da_chave: Dict[str, int] = {}
+        resultados: List[ResultadoVendaLote] = []
+        for i in range(n):
+            if l_erro[i]:
+                resultados.append(ResultadoVendaLote(i, "invalida", erro=l_erro[i]))
+                continue
+            uid = l_uid[i]
+            if i in ids_venda:
+                primeiro_da_chave.setdefault(uid, i)
+                resultados.append(ResultadoVendaLote(i, "inserida", ids_venda[i], ids_mov.get(uid, -1), uid))
+            else:
+                venda_id, mov_id = existentes.get(uid) or (
+                    ids_venda.get(primeiro_da_chave.get(uid, -1), -1), ids_mov.get(uid, -1)
+                )
+                resultados.append(ResultadoVendaLote(i, "duplicada", venda_id, mov_id, uid))
+        return resultados
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+shared.agregados
+================
+
+Tabelas **materializadas** de agregados diários, mantidas por triggers nas
+tabelas-base, para que dashboard/metas/PDV/DRE leiam algumas centenas de
+linhas em vez de todo o histórico de `entrada`/`saida`.
+
+Tabelas
+-------
+- `agg_vendas_dia`  (dia × usuario × forma × maquineta):
+  `valor` = Σ Valor, `valor_liquido` = Σ COALESCE(valor_liquido, Valor), `qtd`.
+- `agg_saidas_dia`  (dia × categoria × sub_categoria × origem_dinheiro × banco_saida):
+  `valor` = Σ Valor, `qtd`.
+
+Views mensais: `agg_vendas_mes` e `agg_saidas_mes` (mês 'YYYY-MM' sobre as diárias).
+
+As dimensões ausentes no banco (ex.: `maquineta` em bancos antigos) ficam como ''.
+Linhas sem data válida (`DATE(Data)` nulo) não entram nos agregados.
+
+Manutenção
+----------
+- `garantir_agregados(conn, verificar=False)`: etapa de migração (ver
+  `shared.db_schema`). Cria tabelas/views e acerta os triggers pelo DDL gravado
+  em `sqlite_master` (um trigger antigo, de outra definição, é trocado; sem
+  mudança, nada é escrito no esquema). Faz o backfill quando a tabela é nova ou
+  os triggers mudaram; com `verificar=True` também quando a contagem não bate
+  com a tabela-base (`tools/migrar_banco.py --verificar`).
+- `reconstruir_agregados(conn)`: acerta os triggers e repopula do zero.
+  Linha de comando: `python tools/migrar_banco.py --db ... --reconstruir-agregados`.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from shared.data_version import cache_por_tabelas
+from shared.tabela_derivada import colunas, contagens_batem, garantir, sincronizar_triggers, tabela_existe
+
+# Especificação de cada agregado: tabela-base, tabela/view/triggers gerados,
+# dimensões (coluna agregada, coluna na base) e medidas somadas.
+_VENDAS = {
+    "base": "entrada",
+    "agg": "agg_vendas_dia",
+    "view": "agg_vendas_mes",
+    "prefixo": "trg_agg_vendas",
+    "dims": (("usuario", "Usuario"), ("forma", "Forma_de_Pagamento"), ("maquineta", "maquineta")),
+    "medidas": ("valor", "valor_liquido"),
+}
+_SAIDAS = {
+    "base": "saida",
+    "agg": "agg_saidas_dia",
+    "view": "agg_saidas_mes",
+    "prefixo": "trg_agg_saidas",
+    "dims": (
+        ("categoria", "Categoria"),
+        ("sub_categoria", "Sub_Categoria"),
+        ("origem_dinheiro", "Origem_Dinheiro"),
+        ("banco_saida", "Banco_Saida"),
+    ),
+    "medidas": ("valor",),
+}
+_SPECS = (_VENDAS, _SAIDAS)
+
+
+def _expressoes(spec: dict, cols: Dict[str, str], r: str) -> Optional[Dict[str, str]]:
+    """
+    Expressões SQL (sobre o alias `r`: NEW/OLD ou o nome da tabela) para dia,
+    dimensões e medidas. None se faltar Data/Valor na tabela-base.
+    """
+    data, valor = cols.get("data"), cols.get("valor")
+    if not data or not valor:
+        return None
+    exp = {"dia": f'DATE({r}."{data}")'}
+    for dim, col_base in spec["dims"]:
+        real = cols.get(col_base.lower())
+        exp[dim] = f"COALESCE({r}.\"{real}\", '')" if real else "''"
+    exp["valor"] = f'COALESCE({r}."{valor}", 0)'
+    if "valor_liquido" in spec["medidas"]:
+        liq = cols.get("valor_liquido")
+        exp["valor_liquido"] = (
+            f'COALESCE({r}."{liq}", {r}."{valor}", 0)' if liq else exp["valor"]
+        )
+    return exp
+
+
+def _ddl_tabela(spec: dict) -> str:
+    dims = [d for d, _ in spec["dims"]]
+    cols = ["dia TEXT NOT NULL"] + [f"{d} TEXT NOT NULL DEFAULT ''" for d in dims]
+    cols += [f"{m} REAL NOT NULL DEFAULT 0" for m in spec["medidas"]]
+    cols.append("qtd INTEGER NOT NULL DEFAULT 0")
+    pk = ", ".join(["dia"] + dims)
+    return f'CREATE TABLE IF NOT EXISTS {spec["agg"]} ({", ".join(cols)}, PRIMARY KEY ({pk}));'
+
+
+def _ddl_view(spec: dict) -> str:
+    dims = [d for d, _ in spec["dims"]]
+    somas = ", ".join(f"SUM({m}) AS {m}" for m in spec["medidas"])
+    dims_sql = ", ".join(dims)
+    return (
+        f'CREATE VIEW IF NOT EXISTS {spec["view"]} AS '
+        f'SELECT substr(dia, 1, 7) AS mes, {dims_sql}, {somas}, SUM(qtd) AS qtd '
+        f'FROM {spec["agg"]} GROUP BY substr(dia, 1, 7), {dims_sql};'
+    )
+
+
+def _ddl_triggers(spec: dict, cols: Dict[str, str]) -> List[str]:
+    novo, velho = _expressoes(spec, cols, "NEW"), _expressoes(spec, cols, "OLD")
+    if novo is None or velho is None:
+        return []
+    agg, pre = spec["agg"], spec["prefixo"]
+    dims = [d for d, _ in spec["dims"]]
+    medidas = list(spec["medidas"])
+
+    def _somar(e: Dict[str, str]) -> str:
+        campos = ["dia"] + dims + medidas + ["qtd"]
+        valores = [e["dia"]] + [e[d] for d in dims] + [e[m] for m in medidas] + ["1"]
+        sets = ", ".join([f"{m} = {m} + excluded.{m}" for m in medidas] + ["qtd = qtd + 1"])
+        return (
+            f'INSERT INTO {agg} ({", ".join(campos)}) VALUES ({", ".join(valores)}) '
+            f'ON CONFLICT({", ".join(["dia"] + dims)}) DO UPDATE SET {sets};'
+        )
+
+    def _subtrair(e: Dict[str, str]) -> str:
+        chave = " AND ".join([f"dia = {e['dia']}"] + [f"{d} = {e[d]}" for d in dims])
+        sets = ", ".join([f"{m} = {m} - {e[m]}" for m in medidas] + ["qtd = qtd - 1"])
+        return (
+            f"UPDATE {agg} SET {sets} WHERE {chave}; "
+            f"DELETE FROM {agg} WHERE {chave} AND qtd <= 0;"
+        )
+
+    # UPDATE só reprocessa quando muda alguma coluna que afeta o agregado.
+    afetam = [cols["data"], cols["valor"]]
+    afetam += [cols[c.lower()] for _, c in spec["dims"] if c.lower() in cols]
+    if "valor_liquido" in medidas and "valor_liquido" in cols:
+        afetam.append(cols["valor_liquido"])
+    of_cols = ", ".join(f'"{c}"' for c in afetam)
+    base = spec["base"]
+    return [
+        f'CREATE TRIGGER {pre}_ai AFTER INSERT ON "{base}" '
+        f'WHEN {novo["dia"]} IS NOT NULL BEGIN {_somar(novo)} END;',
+        f'CREATE TRIGGER {pre}_ad AFTER DELETE ON "{base}" '
+        f'WHEN {velho["dia"]} IS NOT NULL BEGIN {_subtrair(velho)} END;',
+        f'CREATE TRIGGER {pre}_au_old AFTER UPDATE OF {of_cols} ON "{base}" '
+        f'WHEN {velho["dia"]} IS NOT NULL BEGIN {_subtrair(velho)} END;',
+        f'CREATE TRIGGER {pre}_au_new AFTER UPDATE OF {of_cols} ON "{base}" '
+        f'WHEN {novo["dia"]} IS NOT NULL BEGIN {_somar(novo)} END;',
+    ]
+
+
+def _sql_backfill(spec: dict, cols: Dict[str, str]) -> Optional[str]:
+    base = spec["base"]
+    e = _expressoes(spec, cols, f'"{base}"')
+    if e is None:
+        return None
+    dims = [d for d, _ in spec["dims"]]
+    medidas = list(spec["medidas"])
+    campos = ["dia"] + dims + medidas + ["qtd"]
+    sel = [f"{e['dia']} AS dia"] + [f"{e[d]} AS {d}" for d in dims]
+    sel += [f"SUM({e[m]}) AS {m}" for m in medidas] + ["COUNT(*) AS qtd"]
+    # Agrupa pelas expressões (não pelos aliases: `usuario` casaria com a coluna `Usuario` da base).
+    grupo = ", ".join([e["dia"]] + [e[d] for d in dims])
+    return (
+        f'INSERT INTO {spec["agg"]} ({", ".join(campos)}) '
+        f'SELECT {", ".join(sel)} FROM "{base}" WHERE {e["dia"]} IS NOT NULL GROUP BY {grupo};'
+    )
+
+
+def _sql_contagem(spec: dict, cols: Dict[str, str]) -> str:
+    return f'SELECT COUNT(*) FROM "{spec["base"]}" WHERE DATE("{cols["data"]}") IS NOT NULL'
+
+
+def _aplicar(conn: sqlite3.Connection, reconstruir: bool, verificar: bool = False) -> List[str]:
+    feitos: List[str] = []
+    for spec in _SPECS:
+        cols = colunas(conn, spec["base"])
+        if _expressoes(spec, cols, "NEW") is None:
+            sincronizar_triggers(conn, spec["prefixo"], [])   # base sem as colunas: nada a manter
+            continue
+        nova = not tabela_existe(conn, spec["agg"])
+        conn.execute(_ddl_tabela(spec))
+        conn.execute(_ddl_view(spec))
+        mudou = sincronizar_triggers(conn, spec["prefixo"], _ddl_triggers(spec, cols))
+        if verificar and not (nova or reconstruir or mudou):
+            mudou = not contagens_batem(conn, _sql_contagem(spec, cols), spec["agg"])
+        if nova or reconstruir or mudou:
+            conn.execute(f'DELETE FROM {spec["agg"]}')
+            conn.execute(_sql_backfill(spec, cols))
+        feitos.append(spec["agg"])
+    return feitos
+
+
+def garantir_agregados(conn: sqlite3.Connection, verificar: bool = False) -> List[str]:
+    """Cria (idempotente) agregados, views e triggers; repopula se necessário."""
+    # Tudo-ou-nada: um agregado sem trigger ficaria desatualizado sem ninguém notar.
+    # Ex.: SQLite sem UPSERT (< 3.24) ou banco somente-leitura: leitores caem na tabela-base.
+    return garantir(conn, "garantir_agregados",
+                    lambda: _aplicar(conn, reconstruir=False, verificar=verificar), [])
+
+
+def reconstruir_agregados(conn: sqlite3.Connection) -> List[str]:
+    """Acerta os triggers (com as colunas atuais) e repopula os agregados do zero."""
+    return _aplicar(conn, reconstruir=True)
+
+
+# ===================== Leitura =====================
+
+def _ler_agregado(db_path: str, tabela: str, sql: str, renomear: Dict[str, str]) -> Optional[pd.DataFrame]:
+    try:
+        conn = sqlite3.connect(db_path)
+    except Exception:
+        return None
+    try:
+        if not tabela_existe(conn, tabela):
+            return None
+        df = pd.read_sql(sql, conn)
+    except Exception:
+        return None
+    finally:
+        conn.close()
+    return df.rename(columns=renomear)
+
+
+@cache_por_tabelas("entrada")
+def carregar_vendas_dia(db_path: str) -> Optional[pd.DataFrame]:
+    """
+    Vendas agregadas por dia × usuário × forma × maquineta, com nomes de coluna
+    da tabela `entrada` (Data, Usuario, Forma_de_Pagamento, maquineta, Valor,
+    valor_liquido) + `qtd`. None se o agregado não existir neste banco.
+    """
+    return _ler_agregado(
+        db_path,
+        "agg_vendas_dia",
+        "SELECT dia, usuario, forma, maquineta, valor, valor_liquido, qtd FROM agg_vendas_dia ORDER BY dia",
+        {"dia": "Data", "usuario": "Usuario", "forma": "Forma_de_Pagamento", "valor": "Valor"},
+    )
+
+
+@cache_por_tabelas("saida")
+def carregar_saidas_dia(db_path: str) -> Optional[pd.DataFrame]:
+    """
+    Saídas agregadas por dia × categoria × subcategoria × origem × banco, com nomes
+    de coluna da tabela `saida` + `qtd`. None se o agregado não existir neste banco.
+    """
+    return _ler_agregado(
+        db_path,
+        "agg_saidas_dia",
+        "SELECT dia, categoria, sub_categoria, origem_dinheiro, banco_saida, valor, qtd "
+        "FROM agg_saidas_dia ORDER BY dia",
+        {
+            "dia": "Data",
+            "categoria": "Categoria",
+            "sub_categoria": "Sub_Categoria",
+            "origem_dinheiro": "Origem_Dinheiro",
+            "banco_saida": "Banco_Saida",
+            "valor": "Valor",
+        },
+    )
+
+
+__all__ = [
+    "garantir_agregados",
+    "reconstruir_agregados",
+    "carregar_vendas_dia",
+    "carregar_saidas_dia",
+]
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+shared.calendario_util
+======================
+
+Calendário de **dias úteis** (BR-DF) pré-calculado em memória, para as datas
+de liquidação (`Data_Liq`) e compensação D+N.
+
+Antes, cada venda instanciava um calendário Workalendar e andava dia a dia
+até achar o próximo dia útil. Aqui os anos cobertos são calculados uma vez
+por processo em três vetores NumPy indexados por "dias desde o início":
+
+- `util[i]`     — o dia é útil;
+- `ordinal[i]`  — quantos dias úteis existem até o dia `i` (inclusive);
+- `uteis[k]`    — índice do k-ésimo dia útil.
+
+Com eles, "próximo dia útil" e "N dias úteis depois" são consultas O(1), e as
+versões vetorizadas (`somar_dias_uteis_vetor`, `datas_liquidacao`) calculam a
+liquidação de milhares de vendas de uma vez (importações, backfills).
+
+Cobertura
+---------
+Por padrão `ANOS_ANTES` anos antes e `ANOS_DEPOIS` anos depois do ano atual;
+datas fora disso estendem a cobertura automaticamente (por ano inteiro).
+`precomputar(ano_inicio, ano_fim)` fixa uma faixa maior de antemão.
+
+Sem Workalendar instalado, só sábados e domingos são não úteis (mesmo fallback
+de antes). `materializar_calendario(conn)` grava a tabela `calendario_util`
+para backfills feitos em SQL.
+
+Uso
+---
+    from shared.calendario_util import somar_dias_uteis, datas_liquidacao
+
+    somar_dias_uteis(date(2025, 12, 24), 1)          # -> 2025-12-26
+    datas_liquidacao(df["Data"], df["Forma_de_Pagamento"])
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+ANOS_ANTES = 5
+ANOS_DEPOIS = 2
+_FOLGA_DIAS = 60   # além do último ano: garante "próximo útil" para o último dia coberto
+
+# Dias úteis somados à data da venda para a liquidação, por forma de pagamento
+# (formas não listadas: D+1 útil, como cartões e link).
+DIAS_LIQUIDACAO = {
+    "DINHEIRO": 0,
+    "PIX": 0,
+    "DÉBITO": 1,
+    "CRÉDITO": 1,
+    "LINK_PAGAMENTO": 1,
+}
+
+DataLike = Union[date, datetime, str, pd.Timestamp]
+
+_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class _Tabela:
+    inicio: date                 # dia de índice 0
+    ano_inicio: int
+    ano_fim: int                 # último ano coberto (a folga fica além dele)
+    util: np.ndarray             # bool,  1 por dia
+    ordinal: np.ndarray          # int32, dias úteis até o dia (inclusive)
+    uteis: np.ndarray            # int32, índices dos dias úteis
+
+    def cobre(self, d: date) -> bool:
+        return self.ano_inicio <= d.year <= self.ano_fim
+
+
+_TABELA: Optional[_Tabela] = None
+
+
+@lru_cache(maxsize=1)
+def _calendario():
+    """Calendário Workalendar (BR-DF; senão Brasil), importado só na 1ª construção."""
+    try:
+        from workalendar.registry import registry
+        cal_cls = registry.get("BR-DF")
+        if cal_cls:
+            return cal_cls()
+    except Exception:
+        pass
+    try:
+        from workalendar.america import Brazil
+        return Brazil()
+    except Exception:
+        return None
+
+
+def _construir(ano_inicio: int, ano_fim: int) -> _Tabela:
+    inicio = date(ano_inicio, 1, 1)
+    n = (date(ano_fim, 12, 31) - inicio).days + 1 + _FOLGA_DIAS
+    dias = np.arange(n)
+    util = ((dias + inicio.weekday()) % 7) < 5          # seg(0)..sex(4)
+    cal = _calendario()
+    if cal is not None:
+        try:
+            fim = inicio + timedelta(days=n - 1)
+            for ano in range(ano_inicio, fim.year + 1):
+                for feriado, _nome in cal.holidays(ano):
+                    i = (feriado - inicio).days
+                    if 0 <= i < n:
+                        util[i] = False
+        except Exception as e:
+            print(f"Erro ao carregar feriados (usando seg-sex): {e}")
+            util = ((dias + inicio.weekday()) % 7) < 5
+    ordinal = np.cumsum(util, dtype=np.int32)
+    uteis = np.flatnonzero(util).astype(np.int32)
+    return _Tabela(inicio, ano_inicio, ano_fim, util, ordinal, uteis)
+
+
+def precomputar(ano_inicio: Optional[int] = None, ano_fim: Optional[int] = None) -> None:
+    """Garante a cobertura de `ano_inicio..ano_fim` (padrão: faixa em torno do ano atual)."""
+    global _TABELA
+    hoje = date.today().year
+    a = hoje - ANOS_ANTES if ano_inicio is None else int(ano_inicio)
+    b = hoje + ANOS_DEPOIS if ano_fim is None else int(ano_fim)
+    with _LOCK:
+        atual = _TABELA
+        if atual is not None:
+            if atual.ano_inicio <= a and b <= atual.ano_fim:
+                return
+            a, b = min(a, atual.ano_inicio), max(b, atual.ano_fim)
+        _TABELA = _construir(a, b)
+
+
+def _tabela_para(primeira: date, ultima: date) -> _Tabela:
+    t = _TABELA
+    if t is None or not (t.cobre(primeira) and t.cobre(ultima)):
+        hoje = date.today().year
+        precomputar(min(primeira.year, hoje - ANOS_ANTES), max(ultima.year, hoje + ANOS_DEPOIS))
+        t = _TABELA
+    return t
+
+
+def _como_date(d: DataLike) -> date:
+    if isinstance(d, datetime):
+        return d.date()
+    if isinstance(d, date):
+        return d
+    return pd.to_datetime(d).date()
+
+
+def invalidar_calendario() -> None:
+    """Descarta a tabela em memória (ex.: após mudar a configuração de feriados)."""
+    global _TABELA
+    with _LOCK:
+        _TABELA = None
+    _calendario.cache_clear()
+
+
+# ================= CONSULTAS ESCALARES =================
+def eh_dia_util(d: DataLike) -> bool:
+    d = _como_date(d)
+    t = _tabela_para(d, d)
+    return bool(t.util[(d - t.inicio).days])
+
+
+def proximo_dia_util(d: DataLike) -> date:
+    """O próprio dia, se útil; senão o primeiro dia útil seguinte."""
+    d = _como_date(d)
+    t = _tabela_para(d, d)
+    i = (d - t.inicio).days
+    if t.util[i]:
+        return d
+    return t.inicio + timedelta(days=int(t.uteis[t.ordinal[i]]))
+
+
+def somar_dias_uteis(d: DataLike, dias: int) -> date:
+    """
+    Data `dias` dias úteis **depois** de `d` (D+N útil). `dias=0` devolve `d`.
+    Ex.: D+1 de uma sexta é a segunda seguinte (ou a terça, se for feriado).
+    """
+    d = _como_date(d)
+    dias = int(dias)
+    if dias <= 0:
+        return d
+    t = _tabela_para(d, d + timedelta(days=2 * dias + 31))
+    i = (d - t.inicio).days
+    return t.inicio + timedelta(days=int(t.uteis[t.ordinal[i] + dias - 1]))
+
+
+# ================= CONSULTAS VETORIZADAS =================
+def somar_dias_uteis_vetor(datas: Iterable[DataLike], dias: Union[int, Iterable[int]]) -> pd.DatetimeIndex:
+    """
+    Versão vetorizada de `somar_dias_uteis`: `datas` (qualquer iterável de
+    datas/strings) e `dias` escalar ou do mesmo tamanho. Datas inválidas -> NaT.
+    """
+    brutas = pd.Series(list(datas), dtype=object)
+    ts = pd.DatetimeIndex(pd.to_datetime(brutas, errors="coerce", format="mixed")).normalize()
+    n = np.broadcast_to(np.asarray(dias, dtype=np.int64), (len(ts),))
+    validos = ~ts.isna()
+    saida = np.full(len(ts), np.datetime64("NaT"), dtype="datetime64[ns]")
+    if not validos.any():
+        return pd.DatetimeIndex(saida)
+
+    dv = ts[validos]
+    nv = np.maximum(n[validos], 0)
+    primeira = dv.min().date()
+    ultima = (dv.max() + pd.Timedelta(days=int(2 * nv.max() + 31))).date()
+    t = _tabela_para(primeira, ultima)
+
+    base = np.datetime64(t.inicio, "D")
+    idx = (dv.values.astype("datetime64[D]") - base).astype(np.int64)
+    alvo = np.where(nv > 0, t.uteis[np.clip(t.ordinal[idx] + nv - 1, 0, len(t.uteis) - 1)], idx)
+    saida[validos] = (base + alvo).astype("datetime64[ns]")
+    return pd.DatetimeIndex(saida)
+
+
+def datas_liquidacao(datas: Iterable[DataLike], formas: Iterable[str]) -> List[Optional[str]]:
+    """
+    `Data_Liq` (ISO 'YYYY-MM-DD') para cada par (data da venda, forma):
+    DINHEIRO/PIX no próprio dia; demais formas no 1º dia útil seguinte
+    (ver `DIAS_LIQUIDACAO`). Datas inválidas -> None.
+    """
+    dias = [DIAS_LIQUIDACAO.get(str(f or "").strip().upper(), 1) for f in formas]
+    liq = somar_dias_uteis_vetor(datas, dias)
+    iso = liq.strftime("%Y-%m-%d")
+    return [None if nat else s for s, nat in zip(iso, liq.isna())]
+
+
+def data_liquidacao(data_venda: DataLike, forma: str) -> str:
+    """`Data_Liq` de uma venda (ISO)."""
+    dias = DIAS_LIQUIDACAO.get(str(forma or "").strip().upper(), 1)
+    return somar_dias_uteis(data_venda, dias).isoformat()
+
+
+# ================= TABELA SQL (opcional) =================
+def materializar_calendario(conn: sqlite3.Connection, ano_inicio: Optional[int] = None,
+                            ano_fim: Optional[int] = None) -> int:
+    """
+    Grava `calendario_util(data, util, proximo_util, ordinal_util)` para a faixa
+    pedida, permitindo backfills em SQL, p.ex.:
+        UPDATE entrada SET Data_Liq = (SELECT c2.data FROM calendario_util c
+          JOIN calendario_util c2 ON c2.util = 1 AND c2.ordinal_util = c.ordinal_util + 1
+          WHERE c.data = DATE(entrada.Data)) WHERE ...
+    Retorna o número de dias gravados.
+    """
+    precomputar(ano_inicio, ano_fim)
+    t = _TABELA
+    hoje = date.today().year
+    a = hoje - ANOS_ANTES if ano_inicio is None else int(ano_inicio)
+    b = hoje + ANOS_DEPOIS if ano_fim is None else int(ano_fim)
+    i0 = (date(a, 1, 1) - t.inicio).days
+    i1 = (date(b, 12, 31) - t.inicio).days + 1
+
+    linhas = []
+    for i in range(i0, i1):
+        d = t.inicio + timedelta(days=i)
+        prox = d if t.util[i] else t.inicio + timedelta(days=int(t.uteis[t.ordinal[i]]))
+        linhas.append((d.isoformat(), int(t.util[i]), prox.isoformat(), int(t.ordinal[i])))
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS calendario_util (
+            data TEXT PRIMARY KEY,        -- YYYY-MM-DD
+            util INTEGER NOT NULL,        -- 1 = dia útil
+            proximo_util TEXT NOT NULL,   -- o próprio dia, se útil
+            ordinal_util INTEGER NOT NULL -- nº de dias úteis até o dia (inclusive)
+        );
+    """)
+    # ordinal_util é relativo ao início da faixa: a tabela é sempre regravada inteira
+    conn.execute("DELETE FROM calendario_util")
+    conn.executemany(
+        "INSERT INTO calendario_util (data, util, proximo_util, ordinal_util) VALUES (?, ?, ?, ?)",
+        linhas,
+    )
+    conn.commit()
+    return len(linhas)
+
+
+__all__ = [
+    "DIAS_LIQUIDACAO",
+    "precomputar",
+    "invalidar_calendario",
+    "eh_dia_util",
+    "proximo_dia_util",
+    "somar_dias_uteis",
+    "somar_dias_uteis_vetor",
+    "datas_liquidacao",
+    "data_liquidacao",
+    "materializar_calendario",
+]
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+shared.data_version
+===================
+
+Cache em processo **invalidado por versão de dados**, substituindo o uso de
+`st.cache_data.clear()` (que apaga tudo) por invalidação seletiva por tabela.
+
+Como funciona
+-------------
+- Cada tabela monitorada ganha triggers AFTER INSERT/UPDATE/DELETE que
+  incrementam um contador em `tabelas_versao(tabela, versao)`.
+- Uma conexão "sonda" por arquivo de banco consulta `PRAGMA data_version`
+  (sem I/O). Os contadores só são relidos quando esse número muda, isto é,
+  quando outra conexão (deste ou de outro processo) fez commit.
+- Se o arquivo for substituído (outro inode) ou `invalidar_cache_banco()`
+  for chamado (o pull do Dropbox faz isso), a "geração" do banco é incrementada
+  e todas as entradas daquele banco expiram.
+- Tabelas sem trigger (ou inexistentes) caem no contador global de mudanças
+  do banco, ou seja: são invalidadas por qualquer commit (conservador).
+
+Uso
+---
+    from shared.data_version import cache_por_tabelas
+
+    @cache_por_tabelas("entrada", "mercadorias")
+    def _query_entradas(db_path: str, ini: str, fim: str) -> ...:
+        ...
+
+O primeiro argumento da função decorada deve ser o caminho do banco.
+"""
+
+from __future__ import annotations
+
+import copy
+import functools
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Tabelas com contador próprio (as demais usam o contador global do banco).
+TABELAS_MONITORADAS: Tuple[str, ...] = (
+    "entrada",
+    "saida",
+    "mercadorias",
+    "contas_a_pagar_mov",
+    "movimentacoes_bancarias",
+    "emprestimos_financiamentos",
+    "fatura_cartao_itens",
+    "saldos_caixas",
+    "saldos_bancos",
+    "saldos_bancos_mov",
+    "fechamento_caixa",
+    "correcao_caixa",
+    "dre_variaveis",
+    "metas",
+    "taxas_maquinas",
+    "bancos",
+)
+
+_TABELA_CONTADORES = "tabelas_versao"
+
+
+def _sql_triggers(tabela: str) -> str:
+    upsert = (
+        f"INSERT INTO {_TABELA_CONTADORES} (tabela, versao) VALUES ('{tabela}', 1) "
+        "ON CONFLICT(tabela) DO UPDATE SET versao = versao + 1;"
+    )
+    partes = []
+    for sufixo, evento in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
+        partes.append(
+            f'CREATE TRIGGER IF NOT EXISTS trg_versao_{tabela}_{sufixo} '
+            f'AFTER {evento} ON "{tabela}" BEGIN {upsert} END;'
+        )
+    return "\n".join(partes)
+
+
+def garantir_contadores_versao(db_path: str) -> Tuple[str, ...]:
+    """
+    Cria (idempotente) a tabela de contadores e os triggers nas tabelas monitoradas.
+    Retorna as tabelas efetivamente monitoradas neste banco.
+    """
+    conn = sqlite3.connect(db_path, timeout=5)
+    try:
+        existentes = {
+            r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+        }
+        alvo = tuple(t for t in TABELAS_MONITORADAS if t in existentes)
+        script = [
+            f"CREATE TABLE IF NOT EXISTS {_TABELA_CONTADORES} ("
+            "tabela TEXT PRIMARY KEY, versao INTEGER NOT NULL DEFAULT 0);"
+        ]
+        script.extend(_sql_triggers(t) for t in alvo)
+        conn.executescript("BEGIN;\n" + "\n".join(script) + "\nCOMMIT;")
+        return alvo
+    finally:
+        conn.close()
+
+
+class _EstadoBanco:
+    """Sonda de versão de um arquivo de banco (uma instância por caminho)."""
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.geracao = 0
+        self.mudancas = 0
+        self.identidade: Optional[Tuple[int, int]] = None
+        self.conn: Optional[sqlite3.Connection] = None
+        self.data_version: Optional[int] = None
+        self.contadores: Dict[str, int] = {}
+        self.monitoradas: Tuple[str, ...] = ()
+
+    def _identidade_arquivo(self) -> Optional[Tuple[int, int]]:
+        try:
+            st_ = os.stat(self.db_path)
+            return (st_.st_dev, st_.st_ino)
+        except OSError:
+            return None
+
+    def _reabrir(self) -> None:
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+        self.data_version = None
+        self.contadores = {}
+        self.geracao += 1
+        try:
+            self.monitoradas = garantir_contadores_versao(self.db_path)
+        except Exception:
+            self.monitoradas = ()
+        self.conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+
+    def invalidar(self) -> None:
+        with self.lock:
+            self.identidade = None
+
+    def versoes(self, tabelas: Iterable[str]) -> Tuple[Any, ...]:
+        with self.lock:
+            ident = self._identidade_arquivo()
+            if ident is None:
+                return (self.geracao, None)
+            if ident != self.identidade or self.conn is None:
+                self._reabrir()
+                self.identidade = ident
+
+            dv = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if dv != self.data_version:
+                try:
+                    rows = self.conn.execute(f"SELECT tabela, versao FROM {_TABELA_CONTADORES}").fetchall()
+                    self.contadores = {str(r[0]): int(r[1] or 0) for r in rows}
+                except sqlite3.Error:
+                    self.contadores = {}
+                self.data_version = dv
+                self.mudancas += 1
+
+            out: list = [self.geracao]
+            for t in tabelas:
+                if t in self.monitoradas:
+                    out.append(self.contadores.get(t, 0))
+                else:
+                    out.append(("*", self.mudancas))
+            return tuple(out)
+
+
+_ESTADOS: Dict[str, _EstadoBanco] = {}
+_ESTADOS_LOCK = threading.Lock()
+
+
+def _estado(db_path: str) -> _EstadoBanco:
+    chave = os.path.abspath(db_path)
+    with _ESTADOS_LOCK:
+        est = _ESTADOS.get(chave)
+        if est is None:
+            est = _ESTADOS[chave] = _EstadoBanco(chave)
+        return est
+
+
+def versao_tabelas(db_path: str, tabelas: Iterable[str]) -> Tuple[Any, ...]:
+    """Token barato (hashable) que muda sempre que alguma das `tabelas` mudar."""
+    return _estado(db_path).versoes(tuple(tabelas))
+
+
+def invalidar_cache_banco(db_path: str) -> None:
+    """Expira todas as entradas do banco (ex.: após substituir o arquivo via pull)."""
+    _estado(db_path).invalidar()
+
+
+def _copiar(valor: Any) -> Any:
+    # Protege o valor cacheado contra mutação pelo chamador (como o st.cache_data faz).
+    if type(valor).__module__.startswith("pandas"):
+        return valor.copy()
+    if isinstance(valor, (list, dict, set)):
+        return copy.copy(valor)
+    return valor
+
+
+def cache_por_tabelas(*tabelas: str,
+                      tabelas_de: Optional[Callable[..., Iterable[str]]] = None,
+                      maxsize: int = 256) -> Callable:
+    """
+    Decorator: cacheia o resultado enquanto as `tabelas` declaradas não mudarem.
+
+    - `tabelas_de(*args, **kwargs)` permite declarar dependências dinâmicas
+      (ex.: `_load_table(db_path, name)` depende de `name`).
+    - Argumentos não serializáveis via pickle desativam o cache para a chamada.
+    - A função decorada ganha `.clear()` para limpar apenas o seu cache.
+    """
+
+    def deco(fn: Callable) -> Callable:
+        entradas: "OrderedDict[Tuple[str, bytes], Tuple[Tuple[Any, ...], Any]]" = OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(db_path: str, *args, **kwargs):
+            try:
+                deps = tuple(tabelas) + tuple(tabelas_de(db_path, *args, **kwargs) if tabelas_de else ())
+                token = versao_tabelas(db_path, deps)
+                chave = (os.path.abspath(db_path), pickle.dumps((args, sorted(kwargs.items())), protocol=4))
+            except Exception:
+                return fn(db_path, *args, **kwargs)
+
+            with lock:
+                hit = entradas.get(chave)
+                if hit is not None and hit[0] == token:
+                    entradas.move_to_end(chave)
+                    return _copiar(hit[1])
+
+            valor = fn(db_path, *args, **kwargs)
+            with lock:
+                entradas[chave] = (token, valor)
+                entradas.move_to_end(chave)
+                while len(entradas) > maxsize:
+                    entradas.popitem(last=False)
+            return _copiar(valor)
+
+        def clear() -> None:
+            with lock:
+                entradas.clear()
+
+        wrapper.clear = clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return deco
+
+
+__all__ = [
+    "TABELAS_MONITORADAS",
+    "garantir_contadores_versao",
+    "versao_tabelas",
+    "invalidar_cache_banco",
+    "cache_por_tabelas",
+]
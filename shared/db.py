@@ -21,7 +21,11 @@ from __future__ import annotations
 
 import os
 import sqlite3
-from typing import Optional, Iterable
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, Optional, Iterable, Sequence, Tuple, Union
 
 # Acesso seguro ao session_state
 try:
@@ -95,23 +99,284 @@ def ensure_db_path_or_raise(prefer: Optional[str] = None) -> str:
     return p
 
 # ---------- conexão SQLite pronta para produção ----------
+#
+# Pool de conexões por thread. Abrir `sqlite3.connect` + PRAGMAs centenas de
+# vezes por render custa caro; aqui cada thread (o Streamlit roda cada rerun
+# numa thread) reaproveita suas conexões, por arquivo de banco e "perfil"
+# (detect_types/PRAGMAs/timeout).
+#
+# - Uma conexão entregue fica "em uso" até o chamador devolvê-la com
+#   `close()` ou ao sair de `with conectar(...) as conn:`. Chamadas aninhadas
+#   recebem conexões distintas, como antes. Enquanto em uso o pool guarda só
+#   uma referência fraca: conexão largada sem `close()` (exceção, `st.rerun()`)
+#   é fechada pelo GC como uma `sqlite3.connect` comum e libera a vaga.
+# - `close()` devolve ao pool: desfaz transação pendente (como o close real)
+#   sem fechar o arquivo.
+# - PRAGMAs por conexão rodam uma vez na criação; `journal_mode=WAL` (que é
+#   persistente no arquivo) roda uma vez por arquivo. PRAGMAs que o chamador
+#   possa ter alterado (`query_only`, `foreign_keys`) voltam ao estado de
+#   criação a cada reentrega, assim como row_factory/text_factory.
+# - Se o arquivo for substituído (pull do Dropbox => outro inode), as conexões
+#   antigas são descartadas.
+# - `conexao_escrita()` oferece um escritor único e serializado por processo.
+
+CACHE_STATEMENTS = 256          # statements preparados mantidos por conexão
+MAX_CONEXOES_POR_THREAD = 4     # por (arquivo, perfil); além disso, conexão avulsa
+
+_PRAGMAS_PADRAO = ("journal_mode=WAL", "busy_timeout=30000", "foreign_keys=ON", "synchronous=NORMAL")
+_DETECT_PADRAO = sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES
+
+_LOCAL = threading.local()
+_LOCK = threading.Lock()
+_WAL_OK: set = set()
+_STATS = {"abertas": 0, "reutilizadas": 0}
+_PRAGMAS_REPOSTOS = ("query_only", "foreign_keys")
+
+
+class _ConexaoPool(sqlite3.Connection):
+    """Conexão do pool: `close()` (ou o fim do `with`) devolve em vez de fechar."""
+
+    _ident: Optional[Tuple[int, int]] = None
+    _vaga: Optional[list] = None     # lista do pool que a guarda (None = avulsa)
+    _pragmas_base: Tuple = ()
+
+    def close(self) -> None:  # type: ignore[override]
+        try:
+            if self.in_transaction:
+                self.rollback()
+        except sqlite3.Error:
+            pass
+        finally:
+            self._devolver()
+
+    def __exit__(self, *exc):
+        try:
+            return super().__exit__(*exc)
+        finally:
+            self._devolver()
+
+    def _devolver(self) -> None:
+        """Troca a referência fraca da vaga pela conexão (volta a ficar ociosa)."""
+        for i, item in enumerate(self._vaga or ()):
+            if type(item) is weakref.ref and item() is self:
+                self._vaga[i] = self
+                return
+
+    def _fechar(self) -> None:
+        try:
+            super().close()
+        except sqlite3.Error:
+            pass
+
+
+def _identidade(db_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st_ = os.stat(db_path)
+        return (st_.st_dev, st_.st_ino)
+    except OSError:
+        return None
+
+
+def _estado_pragmas(conn: sqlite3.Connection) -> Tuple:
+    return tuple(conn.execute(f"PRAGMA {p};").fetchone()[0] for p in _PRAGMAS_REPOSTOS)
+
+
+def _repor_pragmas(conn: _ConexaoPool) -> None:
+    """Desfaz PRAGMAs alterados por um uso anterior (ex.: `query_only=ON`)."""
+    atual = _estado_pragmas(conn)
+    if atual != conn._pragmas_base:
+        for nome, valor in zip(_PRAGMAS_REPOSTOS, conn._pragmas_base):
+            conn.execute(f"PRAGMA {nome}={int(valor)};")
+
+
+def _pool_da_thread() -> Dict[tuple, list]:
+    """{perfil: [conexão ociosa | weakref de conexão em uso]} da thread atual."""
+    pool = getattr(_LOCAL, "pool", None)
+    if pool is None:
+        pool = _LOCAL.pool = {}
+    return pool
+
+
+def _aplicar_pragmas(conn: sqlite3.Connection, db_path: str, ident, pragmas: Sequence[str]) -> None:
+    for pragma in pragmas:
+        if pragma.replace(" ", "").lower() == "journal_mode=wal":
+            chave = (db_path, ident)
+            if chave in _WAL_OK:
+                continue
+            conn.execute(f"PRAGMA {pragma};")
+            with _LOCK:
+                _WAL_OK.add(chave)
+        else:
+            conn.execute(f"PRAGMA {pragma};")
+
+
+def conectar(
+    db_path: str,
+    *,
+    detect_types: int = 0,
+    row_factory=None,
+    pragmas: Sequence[str] = (),
+    timeout: float = 5.0,
+) -> sqlite3.Connection:
+    """
+    Conexão reaproveitada do pool da thread atual, equivalente a
+    `sqlite3.connect(db_path, timeout=timeout, detect_types=detect_types)`
+    seguida de `PRAGMA <p>` para cada item de `pragmas`.
+
+    Compatível com `with conectar(...) as conn:` e com `conn.close()`; um dos
+    dois devolve a conexão ao pool.
+    """
+    caminho = os.path.abspath(db_path)
+    ident = _identidade(caminho)
+    chave = (caminho, int(detect_types), tuple(pragmas), float(timeout))
+    lista = _pool_da_thread().setdefault(chave, [])
+
+    for i in range(len(lista) - 1, -1, -1):
+        em_uso = type(lista[i]) is weakref.ref
+        conn = lista[i]() if em_uso else lista[i]
+        if conn is None:
+            lista.pop(i)             # largada sem close(): o GC já a fechou
+            continue
+        if conn._ident != ident:
+            lista.pop(i)
+            conn._fechar()           # arquivo trocado: conexão aponta para o inode antigo
+            continue
+        if em_uso:
+            continue                 # ainda em uso por alguém nesta thread
+        if conn.in_transaction:
+            conn.rollback()          # largada no meio de uma transação (o close real faria isso)
+        _repor_pragmas(conn)
+        conn.row_factory = row_factory
+        conn.text_factory = str
+        if conn.isolation_level != "":
+            conn.isolation_level = ""
+        lista[i] = weakref.ref(conn)
+        with _LOCK:
+            _STATS["reutilizadas"] += 1
+        return conn
+
+    conn = sqlite3.connect(
+        caminho,
+        timeout=timeout,
+        detect_types=detect_types,
+        factory=_ConexaoPool,
+        cached_statements=CACHE_STATEMENTS,
+    )
+    conn._ident = ident
+    _aplicar_pragmas(conn, caminho, ident, pragmas)
+    conn._pragmas_base = _estado_pragmas(conn)
+    conn.row_factory = row_factory
+    with _LOCK:
+        _STATS["abertas"] += 1
+    if ident is not None and len(lista) < MAX_CONEXOES_POR_THREAD:
+        conn._vaga = lista
+        lista.append(weakref.ref(conn))
+    return conn
+
 
 def get_conn(prefer: Optional[str] = None) -> sqlite3.Connection:
     """
     Abre uma conexão SQLite com PRAGMAs padrão do projeto.
     `prefer` pode ser um caminho de banco para priorizar.
+    A conexão vem do pool da thread (ver `conectar`).
     """
     db_path = ensure_db_path_or_raise(prefer)
-    conn = sqlite3.connect(
+    return conectar(
         db_path,
+        detect_types=_DETECT_PADRAO,
+        row_factory=sqlite3.Row,
+        pragmas=_PRAGMAS_PADRAO,
         timeout=30,
-        detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
     )
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA busy_timeout=30000;")
-    conn.execute("PRAGMA foreign_keys=ON;")
-    conn.execute("PRAGMA synchronous=NORMAL;")
-    conn.row_factory = sqlite3.Row
-    return conn
 
-__all__ = ["get_db_path", "set_db_path_in_session", "ensure_db_path_or_raise", "get_conn"]
+
+_ESCRITORES: Dict[str, Tuple[sqlite3.Connection, "threading.RLock", Optional[Tuple[int, int]]]] = {}
+
+
+@contextmanager
+def conexao_escrita(prefer: Optional[str] = None) -> Iterator[sqlite3.Connection]:
+    """
+    Escritor único por arquivo de banco, serializado entre threads do processo.
+
+    Abre `BEGIN IMMEDIATE`, faz commit ao sair (rollback em exceção).
+    Reentrante na mesma thread: blocos aninhados participam da transação externa.
+    """
+    caminho = os.path.abspath(ensure_db_path_or_raise(prefer))
+    ident = _identidade(caminho)
+    with _LOCK:
+        atual = _ESCRITORES.get(caminho)
+        if atual is None or atual[2] != ident:
+            conn = sqlite3.connect(caminho, timeout=30, detect_types=_DETECT_PADRAO,
+                                   check_same_thread=False, isolation_level=None,
+                                   cached_statements=CACHE_STATEMENTS)
+            for pragma in _PRAGMAS_PADRAO:
+                conn.execute(f"PRAGMA {pragma};")
+            conn.row_factory = sqlite3.Row
+            # o escritor antigo (arquivo substituído) é liberado pelo GC
+            atual = _ESCRITORES[caminho] = (conn, threading.RLock(), ident)
+            _STATS["abertas"] += 1
+    conn, trava, _ = atual
+    with trava:
+        if conn.in_transaction:      # bloco aninhado
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+
+def estatisticas_conexoes(zerar: bool = False) -> Dict[str, int]:
+    """Contadores do pool (conexões abertas x reaproveitadas), para medir renders."""
+    with _LOCK:
+        out = dict(_STATS)
+        if zerar:
+            _STATS.update(abertas=0, reutilizadas=0)
+    return out
+
+# ---------- faixas de datas sargáveis ----------
+#
+# `DATE(col) BETWEEN ? AND ?` impede o uso de índice em `col`. Como as datas são
+# gravadas em ISO ('YYYY-MM-DD' ou 'YYYY-MM-DD HH:MM:SS'), a comparação textual
+# `col >= ini AND col < fim_exclusivo` seleciona exatamente as mesmas linhas e
+# permite index seek.
+
+DataLike = Union[str, date, datetime]
+
+def data_iso(d: DataLike) -> str:
+    """Normaliza date/datetime/str ('YYYY-MM-DD...') para 'YYYY-MM-DD'."""
+    if isinstance(d, datetime):
+        return d.date().isoformat()
+    if isinstance(d, date):
+        return d.isoformat()
+    if hasattr(d, "date") and callable(getattr(d, "date")):  # pandas.Timestamp
+        return d.date().isoformat()
+    return datetime.strptime(str(d).strip()[:10], "%Y-%m-%d").date().isoformat()
+
+def dia_seguinte_iso(d: DataLike) -> str:
+    """'YYYY-MM-DD' do dia seguinte a `d` (limite exclusivo de `DATE(col) <= d`)."""
+    return (date.fromisoformat(data_iso(d)) + timedelta(days=1)).isoformat()
+
+def faixa_iso(ini: DataLike, fim: Optional[DataLike] = None) -> Tuple[str, str]:
+    """
+    Par (ini, fim_exclusivo) para `col >= ? AND col < ?`.
+    Sem `fim`, representa o dia `ini` inteiro.
+    """
+    return data_iso(ini), dia_seguinte_iso(fim if fim is not None else ini)
+
+__all__ = [
+    "get_db_path",
+    "set_db_path_in_session",
+    "ensure_db_path_or_raise",
+    "get_conn",
+    "conectar",
+    "conexao_escrita",
+    "estatisticas_conexoes",
+    "data_iso",
+    "dia_seguinte_iso",
+    "faixa_iso",
+]
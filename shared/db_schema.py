@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+shared.db_schema
+================
+
+Migrações **idempotentes** de esquema aplicadas no boot (e após cada pull do
+banco), sem alterar colunas existentes nem o formato dos dados.
+
+Índices de datas
+----------------
+As consultas por dia/intervalo usam predicados de faixa
+(`Data >= ? AND Data < ?`, ver `shared.db.faixa_iso`), que só são eficientes
+se houver índice com a coluna de data à esquerda. Os índices abaixo são
+"cobrindo" (incluem as colunas somadas/filtradas), de modo que os agregados
+do dia/mês são respondidos apenas pelo índice, sem ler a tabela.
+
+Tabelas ou colunas ausentes no banco do usuário são simplesmente ignoradas.
+
+Agregados diários
+-----------------
+`agg_vendas_dia` / `agg_saidas_dia` mantidos por triggers (ver `shared.agregados`).
+
+Saldos por banco
+----------------
+`saldos_bancos` (uma coluna por banco) migrada para o formato longo
+`saldos_bancos_mov(data, banco_id, valor)`, com view de compatibilidade
+(ver `shared.saldos_bancos`).
+
+Saldo diário
+------------
+`saldo_diario` (fluxo acumulado por dia × conta de banco/caixa) mantido por
+triggers (ver `shared.saldo_diario`).
+
+Unicidade de `trans_uid`
+------------------------
+`ux_mov_trans_uid` (índice único em `movimentacoes_bancarias.trans_uid`), alvo
+do `ON CONFLICT` do importador de extratos. Bancos antigos com `trans_uid`
+repetido ficam sem o índice (aviso no log; nenhuma linha é apagada) e o
+importador usa `NOT EXISTS` no lugar.
+
+Dias com movimento
+------------------
+`dias_movimento` (dia → tem fechamento?) mantido por triggers para a trava de
+fechamento sequencial (ver `shared.dias_movimento`).
+
+Uso
+---
+    from shared.db_schema import aplicar_migracoes
+    aplicar_migracoes(caminho_banco)
+
+Ou via linha de comando: `python tools/migrar_banco.py --db data/flowdash_data.db`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from shared.agregados import garantir_agregados
+from shared.dias_movimento import garantir_dias_movimento
+from shared.saldo_diario import garantir_saldo_diario
+from shared.saldos_bancos import garantir_saldos_bancos
+
+logger = logging.getLogger(__name__)
+
+# (nome do índice, tabela, colunas) — a 1ª coluna é sempre a de data.
+INDICES_DATAS: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = (
+    ("idx_entrada_data_cov", "entrada", ("Data", "Forma_de_Pagamento", "Valor", "valor_liquido")),
+    ("idx_entrada_data_liq_cov", "entrada", ("Data_Liq", "Forma_de_Pagamento", "valor_liquido")),
+    ("idx_saida_data_cov", "saida", ("Data", "Categoria", "Sub_Categoria", "Valor")),
+    ("idx_saida_origem_data", "saida", ("Origem_Dinheiro", "Data", "Valor")),
+    ("idx_mercadorias_data", "mercadorias", ("Data",)),
+    ("idx_mercadorias_recebimento", "mercadorias", ("Recebimento",)),
+    ("idx_saldos_caixas_data", "saldos_caixas", ("data", "caixa_total", "caixa2_total")),
+    ("idx_fechamento_caixa_data", "fechamento_caixa", ("data",)),
+    ("idx_correcao_caixa_data", "correcao_caixa", ("data",)),
+    ("idx_mov_banco_tipo_data", "movimentacoes_bancarias", ("banco", "tipo", "data", "valor")),
+)
+
+
+def _colunas(conn: sqlite3.Connection, tabela: str) -> Set[str]:
+    try:
+        return {str(r[1]).lower() for r in conn.execute(f'PRAGMA table_info("{tabela}")').fetchall()}
+    except sqlite3.Error:
+        return set()
+
+
+def garantir_indices_datas(conn: sqlite3.Connection) -> List[str]:
+    """
+    Cria (IF NOT EXISTS) os índices de `INDICES_DATAS` cujas colunas existam.
+    Retorna os nomes dos índices presentes ao final.
+    """
+    criados: List[str] = []
+    cache_cols: Dict[str, Set[str]] = {}
+    for nome, tabela, cols in INDICES_DATAS:
+        if tabela not in cache_cols:
+            cache_cols[tabela] = _colunas(conn, tabela)
+        existentes = cache_cols[tabela]
+        if not existentes or not all(c.lower() in existentes for c in cols):
+            continue
+        cols_sql = ", ".join(f'"{c}"' for c in cols)
+        try:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {nome} ON "{tabela}" ({cols_sql})')
+            criados.append(nome)
+        except sqlite3.Error:
+            # Ex.: banco somente-leitura — as consultas continuam corretas, só mais lentas.
+            pass
+    return criados
+
+
+def trans_uid_unico(conn: sqlite3.Connection) -> bool:
+    """True se `movimentacoes_bancarias.trans_uid` tem índice/constraint UNIQUE (não parcial)."""
+    try:
+        for _seq, nome, unico, _origem, parcial in conn.execute(
+            "PRAGMA index_list(movimentacoes_bancarias)"
+        ).fetchall():
+            if not unico or parcial:
+                continue
+            cols = [str(r[2]).lower() for r in conn.execute(f'PRAGMA index_info("{nome}")').fetchall()]
+            if cols == ["trans_uid"]:
+                return True
+    except sqlite3.Error:
+        pass
+    return False
+
+
+def garantir_trans_uid_unico(conn: sqlite3.Connection) -> bool:
+    """
+    Cria `ux_mov_trans_uid` se ainda não houver unicidade em `trans_uid`.
+    Com valores repetidos no banco, não cria (registra aviso) e retorna False.
+    """
+    if "trans_uid" not in _colunas(conn, "movimentacoes_bancarias"):
+        return False
+    if trans_uid_unico(conn):
+        return True
+    repetidos = conn.execute(
+        "SELECT COUNT(*) FROM (SELECT 1 FROM movimentacoes_bancarias WHERE trans_uid IS NOT NULL "
+        "GROUP BY trans_uid HAVING COUNT(*) > 1)"
+    ).fetchone()[0]
+    if repetidos:
+        logger.warning(
+            "movimentacoes_bancarias: %d trans_uid repetido(s); ux_mov_trans_uid não criado "
+            "(o importador deduplica com NOT EXISTS).", repetidos,
+        )
+        return False
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_mov_trans_uid ON movimentacoes_bancarias(trans_uid)")
+    return True
+
+
+# Etapas de migração, na ordem de aplicação. Cada etapa recebe a conexão
+# (dentro de uma transação) e deve ser idempotente.
+MIGRACOES: Sequence[Tuple[str, Callable[[sqlite3.Connection], object]]] = (
+    ("indices_datas", garantir_indices_datas),
+    ("mov_trans_uid_unico", garantir_trans_uid_unico),
+    ("agregados_diarios", garantir_agregados),
+    ("saldos_bancos_longo", garantir_saldos_bancos),
+    ("saldo_diario", garantir_saldo_diario),
+    ("dias_movimento", garantir_dias_movimento),
+)
+
+_APLICADAS: Dict[str, Tuple[int, int]] = {}
+_LOCK = threading.Lock()
+
+
+def _identidade(db_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st_ = os.stat(db_path)
+        return (st_.st_dev, st_.st_ino)
+    except OSError:
+        return None
+
+
+def aplicar_migracoes(db_path: str, forcar: bool = False) -> bool:
+    """
+    Aplica `MIGRACOES` no banco, uma única vez por arquivo (um arquivo com outro
+    inode é migrado de novo; o pull restaura no mesmo arquivo e usa `forcar`).
+
+    Retorna True se as migrações rodaram nesta chamada.
+    Nunca levanta exceção: falhas só deixam o banco sem os índices.
+    """
+    chave = os.path.abspath(db_path)
+    ident = _identidade(chave)
+    if ident is None:
+        return False
+    with _LOCK:
+        if not forcar and _APLICADAS.get(chave) == ident:
+            return False
+        try:
+            conn = sqlite3.connect(chave, timeout=10)
+            try:
+                with conn:
+                    for _nome, etapa in MIGRACOES:
+                        etapa(conn)
+                try:
+                    conn.execute("PRAGMA optimize")
+                except sqlite3.Error:
+                    pass
+            finally:
+                conn.close()
+        except Exception:
+            return False
+        _APLICADAS[chave] = _identidade(chave) or ident
+        return True
+
+
+__all__ = [
+    "INDICES_DATAS",
+    "MIGRACOES",
+    "garantir_indices_datas",
+    "trans_uid_unico",
+    "garantir_trans_uid_unico",
+    "aplicar_migracoes",
+]
@@ -0,0 +1,709 @@
+# -*- coding: utf-8 -*-
+"""
+shared.db_sync
+==============
+
+Sincronização **incremental** (por páginas) do SQLite hospedado no Dropbox.
+
+Em vez de subir/baixar o arquivo inteiro a cada venda, o push envia apenas as
+páginas de 4 KiB (ou o `page_size` do banco) que mudaram desde o último sync,
+como um pequeno objeto "delta". De tempos em tempos um snapshot completo
+("base") é enviado e os deltas antigos são descartados.
+
+Layout remoto (a partir de `caminho_remoto`, ex.: /FlowDash/data/flowdash_data.db)
+-------------------------------------------------------------------------------
+    <caminho_remoto>                      -> snapshot base (arquivo SQLite completo)
+    <caminho_remoto>.sync/manifest.json   -> revisões: base + deltas + head
+    <caminho_remoto>.sync/delta-<rev>-<id>.bin
+
+O manifest é sempre o último objeto gravado (ponto de commit). Cada revisão
+registra o SHA-256 da imagem completa resultante; o pull confere esse hash e,
+em qualquer divergência, cai no download completo.
+
+Estado local (ao lado do banco)
+-------------------------------
+    <db>.sync.json     -> rev/sha do último sync e page_size
+    <db>.sync-paginas  -> hash curto (8 bytes) de cada página do último sync
+
+Consistência
+------------
+O push envia um snapshot feito com a API de backup do SQLite (inclui o `-wal`,
+não bloqueia quem grava). O pull também não troca o arquivo local: a imagem
+baixada é restaurada **dentro** do banco vivo pela mesma API
+(`restaurar_snapshot`), como uma transação comum. Conexões abertas (pool,
+sonda de versão, escritor) continuam válidas e enxergam o novo conteúdo; não
+há dois arquivos disputando o mesmo `-wal`/`-shm`.
+
+Conflitos
+---------
+Se o remoto avançou desde o nosso último sync, o push envia um snapshot base
+completo (mesma semântica "último a gravar vence" do upload integral).
+
+Transporte
+----------
+`ArmazenamentoRemoto` isola o Dropbox; `PastaLocal` grava numa pasta do disco e
+serve como dublê nos testes e em benchmarks:
+
+    from shared.db_sync import PastaLocal, SincronizadorDelta
+    sync = SincronizadorDelta(PastaLocal("/tmp/remoto"), "/FlowDash/flowdash_data.db", "data/flowdash_data.db")
+    sync.enviar(); sync.baixar()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Protocol, Tuple
+
+PAGE_SIZE_PADRAO = 4096
+MAX_DELTAS = 50              # após N deltas, o próximo push vira snapshot base
+FRACAO_MAX_DELTAS = 0.5      # ... ou quando os deltas somam > 50% do banco
+
+_MAGIC_DELTA = b"FDDELTA1"
+_CAB_DELTA = struct.Struct("<IIQ")   # page_size, n_paginas_final, n_paginas_no_delta
+_NUM_PAGINA = struct.Struct("<I")
+_TAM_HASH = 8
+
+
+# ===================== Transporte =====================
+
+class ArmazenamentoRemoto(Protocol):
+    """Operações mínimas de armazenamento usadas pelo sincronizador."""
+
+    def ler(self, caminho: str) -> Optional[bytes]:
+        """Conteúdo do objeto ou None se não existir."""
+
+    def gravar(self, caminho: str, dados: bytes) -> None:
+        """Cria/sobrescreve o objeto."""
+
+    def apagar(self, caminho: str) -> None:
+        """Remove o objeto (sem erro se não existir)."""
+
+    def versao(self, caminho: str) -> Optional[str]:
+        """Identificador barato da versão do objeto (None se não existir)."""
+
+    def enviar_arquivo(self, caminho: str, arquivo_local: str) -> None:
+        """Cria/sobrescreve o objeto a partir de um arquivo (streaming)."""
+
+    def baixar_arquivo(self, caminho: str, destino: str) -> bool:
+        """Grava o objeto em `destino` (streaming, atômico). False se não existir."""
+
+
+class PastaLocal:
+    """`ArmazenamentoRemoto` sobre uma pasta local (dublê do Dropbox)."""
+
+    def __init__(self, raiz: str) -> None:
+        self.raiz = os.path.abspath(raiz)
+
+    def _p(self, caminho: str) -> str:
+        return os.path.join(self.raiz, caminho.lstrip("/"))
+
+    def ler(self, caminho: str) -> Optional[bytes]:
+        try:
+            with open(self._p(caminho), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def gravar(self, caminho: str, dados: bytes) -> None:
+        p = self._p(caminho)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        tmp = p + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(dados)
+        os.replace(tmp, p)
+
+    def apagar(self, caminho: str) -> None:
+        try:
+            os.remove(self._p(caminho))
+        except FileNotFoundError:
+            pass
+
+    def versao(self, caminho: str) -> Optional[str]:
+        try:
+            st_ = os.stat(self._p(caminho))
+        except FileNotFoundError:
+            return None
+        return f"{st_.st_mtime_ns}:{st_.st_size}"
+
+    def enviar_arquivo(self, caminho: str, arquivo_local: str) -> None:
+        p = self._p(caminho)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        shutil.copyfile(arquivo_local, p + ".tmp")
+        os.replace(p + ".tmp", p)
+
+    def baixar_arquivo(self, caminho: str, destino: str) -> bool:
+        try:
+            shutil.copyfile(self._p(caminho), destino + ".tmp")
+        except FileNotFoundError:
+            return False
+        os.replace(destino + ".tmp", destino)
+        return True
+
+
+class DropboxRemoto:
+    """
+    `ArmazenamentoRemoto` sobre o SDK do Dropbox (ver shared.dropbox_client).
+
+    `comprimir` ("gzip"/"zstd") vale para os objetos pequenos (deltas e
+    manifest). O snapshot base segue sem compressão em `file_path`, para
+    continuar sendo um SQLite válido para clientes antigos.
+    """
+
+    def __init__(self, dbx, comprimir: Optional[str] = None) -> None:
+        self.dbx = dbx
+        self.comprimir = comprimir
+
+    def ler(self, caminho: str) -> Optional[bytes]:
+        from shared.dropbox_client import download_bytes
+
+        try:
+            return download_bytes(self.dbx, caminho, descomprimir=True)
+        except RuntimeError as e:
+            if e.__cause__ is not None and _nao_encontrado(e.__cause__):
+                return None
+            raise
+
+    def gravar(self, caminho: str, dados: bytes) -> None:
+        from shared.dropbox_client import upload_bytes
+
+        upload_bytes(self.dbx, caminho, dados, comprimir=self.comprimir)
+
+    def enviar_arquivo(self, caminho: str, arquivo_local: str) -> None:
+        from shared.dropbox_client import upload_arquivo
+
+        upload_arquivo(self.dbx, arquivo_local, caminho)
+
+    def baixar_arquivo(self, caminho: str, destino: str) -> bool:
+        from shared.dropbox_client import download_arquivo
+
+        try:
+            download_arquivo(self.dbx, caminho, destino)
+        except RuntimeError as e:
+            if e.__cause__ is not None and _nao_encontrado(e.__cause__):
+                return False
+            raise
+        return True
+
+    def apagar(self, caminho: str) -> None:
+        import dropbox
+
+        try:
+            self.dbx.files_delete_v2(caminho)
+        except dropbox.exceptions.ApiError as e:
+            if not _nao_encontrado(e):
+                raise RuntimeError(f"Falha ao apagar '{caminho}' do Dropbox: {e}")
+
+    def versao(self, caminho: str) -> Optional[str]:
+        import dropbox
+
+        try:
+            meta = self.dbx.files_get_metadata(caminho)
+        except dropbox.exceptions.ApiError as e:
+            if _nao_encontrado(e):
+                return None
+            raise RuntimeError(f"Falha ao consultar '{caminho}' no Dropbox: {e}")
+        return getattr(meta, "rev", None) or getattr(meta, "content_hash", None)
+
+
+def _nao_encontrado(err) -> bool:
+    try:
+        erro = err.error
+        if erro.is_path():
+            return erro.get_path().is_not_found()
+        if hasattr(erro, "is_path_lookup") and erro.is_path_lookup():
+            return erro.get_path_lookup().is_not_found()
+    except Exception:
+        pass
+    return "not_found" in str(err)
+
+
+# ===================== Páginas =====================
+
+def page_size_do_arquivo(caminho: str) -> int:
+    """Lê o page_size do cabeçalho SQLite (bytes 16-17); padrão 4096."""
+    try:
+        with open(caminho, "rb") as f:
+            cab = f.read(100)
+    except OSError:
+        return PAGE_SIZE_PADRAO
+    if len(cab) < 100 or not cab.startswith(b"SQLite format 3\x00"):
+        return PAGE_SIZE_PADRAO
+    ps = struct.unpack(">H", cab[16:18])[0]
+    return 65536 if ps == 1 else (ps or PAGE_SIZE_PADRAO)
+
+
+def _iter_paginas(caminho: str, page_size: int) -> Iterator[Tuple[int, bytes]]:
+    with open(caminho, "rb") as f:
+        n = 0
+        while True:
+            bloco = f.read(page_size)
+            if not bloco:
+                return
+            yield n, bloco
+            n += 1
+
+
+def _hash_pagina(bloco: bytes) -> bytes:
+    return hashlib.blake2b(bloco, digest_size=_TAM_HASH).digest()
+
+
+def sha256_arquivo(caminho: str) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def hashes_paginas(caminho: str, page_size: int) -> bytes:
+    """Concatenação dos hashes curtos de todas as páginas do arquivo."""
+    return b"".join(_hash_pagina(b) for _, b in _iter_paginas(caminho, page_size))
+
+
+def montar_delta(caminho: str, page_size: int, hashes_antigos: bytes) -> Tuple[bytes, bytes, int]:
+    """
+    Compara o arquivo com `hashes_antigos` e monta o delta.
+    Retorna (delta, hashes_novos, n_paginas_alteradas).
+    """
+    partes: List[bytes] = []
+    novos: List[bytes] = []
+    alteradas = 0
+    n_total = 0
+    for n, bloco in _iter_paginas(caminho, page_size):
+        h = _hash_pagina(bloco)
+        novos.append(h)
+        n_total = n + 1
+        antigo = hashes_antigos[n * _TAM_HASH:(n + 1) * _TAM_HASH]
+        if antigo != h:
+            partes.append(_NUM_PAGINA.pack(n) + bloco.ljust(page_size, b"\x00"))
+            alteradas += 1
+    cab = _MAGIC_DELTA + _CAB_DELTA.pack(page_size, n_total, alteradas)
+    return cab + b"".join(partes), b"".join(novos), alteradas
+
+
+def aplicar_delta(caminho: str, delta: bytes) -> None:
+    """Aplica o delta (in-place) no arquivo `caminho`."""
+    if not delta.startswith(_MAGIC_DELTA):
+        raise ValueError("delta inválido (cabeçalho)")
+    pos = len(_MAGIC_DELTA)
+    page_size, n_total, n = _CAB_DELTA.unpack_from(delta, pos)
+    pos += _CAB_DELTA.size
+    passo = _NUM_PAGINA.size + page_size
+    if len(delta) != pos + n * passo:
+        raise ValueError("delta inválido (tamanho)")
+    with open(caminho, "r+b") as f:
+        for _ in range(n):
+            (num,) = _NUM_PAGINA.unpack_from(delta, pos)
+            f.seek(num * page_size)
+            f.write(delta[pos + _NUM_PAGINA.size:pos + passo])
+            pos += passo
+        f.truncate(n_total * page_size)
+
+
+# ===================== Snapshot consistente =====================
+
+PAGINAS_POR_PASSO = 256      # 1 MiB por passo com páginas de 4 KiB
+
+
+def snapshot_consistente(origem: str, destino: str, paginas_por_passo: int = PAGINAS_POR_PASSO,
+                         progresso: Optional[Callable[[int, int], None]] = None) -> None:
+    """
+    Copia `origem` para `destino` com a API de backup do SQLite.
+
+    A cópia é feita em passos de `paginas_por_passo` páginas; entre um passo e
+    outro o lock de leitura é liberado, então vendas continuam sendo gravadas
+    (se a origem mudar no meio, o SQLite reinicia a cópia). O resultado inclui
+    os commits ainda no `-wal` e é byte a byte estável para o mesmo conteúdo,
+    o que mantém os deltas por página pequenos.
+    """
+    def _cb(_status: int, restantes: int, total: int) -> None:
+        if progresso is not None:
+            try:
+                progresso(total - restantes, total)
+            except Exception:
+                pass
+
+    src = sqlite3.connect(origem, timeout=30)
+    try:
+        dst = sqlite3.connect(destino)
+        try:
+            src.backup(dst, pages=int(paginas_por_passo), progress=_cb)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+
+def restaurar_snapshot(origem: str, destino: str, timeout: float = 30.0) -> None:
+    """
+    Copia `origem` para dentro de `destino` (banco em uso) com a API de backup.
+
+    A cópia roda num passo só, sob o lock de escrita do SQLite: leitores veem
+    o conteúdo antigo ou o novo, nunca uma mistura, e o `-wal`/`-shm` do
+    destino continuam coerentes com o arquivo. O snapshot de `destino` feito
+    em seguida é byte a byte igual a `origem` (o estado do sync continua
+    valendo). Com `destino` em WAL, os `page_size` precisam coincidir (senão o
+    SQLite recusa com SQLITE_READONLY e o pull falha sem tocar no banco).
+    """
+    src = sqlite3.connect(origem, timeout=timeout)
+    try:
+        dst = sqlite3.connect(destino, timeout=timeout)
+        try:
+            src.backup(dst, pages=-1)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+
+def checkpoint_truncate(caminho: str) -> None:
+    """
+    Melhor esforço: transfere o `-wal` para o arquivo principal e o zera, para
+    que o arquivo possa ser substituído sem um WAL antigo ao lado.
+    """
+    if not os.path.exists(caminho):
+        return
+    try:
+        conn = sqlite3.connect(caminho, timeout=5)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def _remover(caminho: str) -> None:
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+
+# ===================== Manifest / estado =====================
+
+@dataclass
+class Manifest:
+    page_size: int
+    base_rev: int
+    base_sha256: str
+    deltas: List[Dict] = field(default_factory=list)   # {rev, arquivo, sha256, tamanho}
+    head_rev: int = 0
+    head_sha256: str = ""
+
+    @classmethod
+    def de_bytes(cls, dados: bytes) -> "Manifest":
+        d = json.loads(dados.decode("utf-8"))
+        return cls(
+            page_size=int(d["page_size"]),
+            base_rev=int(d["base"]["rev"]),
+            base_sha256=str(d["base"]["sha256"]),
+            deltas=list(d.get("deltas") or []),
+            head_rev=int(d["head"]["rev"]),
+            head_sha256=str(d["head"]["sha256"]),
+        )
+
+    def para_bytes(self) -> bytes:
+        d = {
+            "versao": 1,
+            "page_size": self.page_size,
+            "base": {"rev": self.base_rev, "sha256": self.base_sha256},
+            "deltas": self.deltas,
+            "head": {"rev": self.head_rev, "sha256": self.head_sha256},
+        }
+        return json.dumps(d, indent=1).encode("utf-8")
+
+
+@dataclass
+class ResultadoSync:
+    """Resumo de uma operação (para logs/UI)."""
+    acao: str            # "nada" | "delta" | "base" | "completo" | "legado"
+    rev: int = 0
+    bytes_transferidos: int = 0
+    paginas: int = 0
+
+
+class SincronizadorDelta:
+    """
+    Push/pull incremental de um arquivo SQLite contra um `ArmazenamentoRemoto`.
+
+    O push nunca lê o `.db` "cru": a imagem enviada é um snapshot consistente
+    (`snapshot_consistente`, API de backup), que inclui o que ainda está no
+    `-wal` e não é rasgado por gravações concorrentes. `progresso(feito, total)`
+    recebe o andamento do snapshot, em páginas.
+    """
+
+    def __init__(self, remoto: ArmazenamentoRemoto, caminho_remoto: str, caminho_local: str,
+                 max_deltas: int = MAX_DELTAS, fracao_max_deltas: float = FRACAO_MAX_DELTAS,
+                 progresso: Optional[Callable[[int, int], None]] = None) -> None:
+        self.remoto = remoto
+        self.caminho_remoto = caminho_remoto
+        self.caminho_local = str(caminho_local)
+        self.max_deltas = int(max_deltas)
+        self.fracao_max_deltas = float(fracao_max_deltas)
+        self.progresso = progresso
+        self._dir_sync = caminho_remoto + ".sync"
+        self._manifest_path = self._dir_sync + "/manifest.json"
+
+    # ---------- estado local ----------
+    @property
+    def _estado_json(self) -> str:
+        return self.caminho_local + ".sync.json"
+
+    @property
+    def _estado_paginas(self) -> str:
+        return self.caminho_local + ".sync-paginas"
+
+    def _ler_estado(self) -> Tuple[Dict, bytes]:
+        try:
+            with open(self._estado_json, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self._estado_paginas, "rb") as f:
+                hashes = f.read()
+            return meta, hashes
+        except (OSError, ValueError):
+            return {}, b""
+
+    def _gravar_estado(self, meta: Dict, hashes: bytes) -> None:
+        with open(self._estado_paginas + ".tmp", "wb") as f:
+            f.write(hashes)
+        os.replace(self._estado_paginas + ".tmp", self._estado_paginas)
+        with open(self._estado_json + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(self._estado_json + ".tmp", self._estado_json)
+
+    def _estado_de_arquivo(self, arquivo: str, rev: int, sha: str, page_size: int, **extra) -> None:
+        self._gravar_estado(
+            {"rev": rev, "sha256": sha, "page_size": page_size, **extra},
+            hashes_paginas(arquivo, page_size),
+        )
+
+    def _ler_manifest(self) -> Optional[Manifest]:
+        dados = self.remoto.ler(self._manifest_path)
+        if not dados:
+            return None
+        try:
+            return Manifest.de_bytes(dados)
+        except (ValueError, KeyError):
+            return None
+
+    def _tmp_local(self) -> str:
+        pasta = os.path.dirname(os.path.abspath(self.caminho_local)) or "."
+        fd, tmp = tempfile.mkstemp(prefix=".sync-", suffix=".db", dir=pasta)
+        os.close(fd)
+        return tmp
+
+    def _snapshot(self) -> str:
+        """Snapshot consistente do banco local num temporário (o chamador apaga)."""
+        tmp = self._tmp_local()
+        try:
+            snapshot_consistente(self.caminho_local, tmp, progresso=self.progresso)
+        except BaseException:
+            _remover(tmp)
+            raise
+        return tmp
+
+    def _substituir_local(self, novo: str) -> None:
+        """
+        Leva o banco local ao conteúdo de `novo`. Sem banco local, só move o
+        arquivo; com banco (e possivelmente conexões abertas), restaura pela
+        API de backup em vez de trocar o arquivo por baixo delas.
+        """
+        if not os.path.exists(self.caminho_local):
+            os.replace(novo, self.caminho_local)
+            return
+        restaurar_snapshot(novo, self.caminho_local)
+
+    # ---------- push ----------
+    def enviar(self) -> ResultadoSync:
+        """Envia as páginas alteradas (ou um snapshot base, quando necessário)."""
+        if not os.path.exists(self.caminho_local):
+            raise FileNotFoundError(self.caminho_local)
+        snap = self._snapshot()
+        try:
+            return self._enviar_snapshot(snap)
+        finally:
+            _remover(snap)
+
+    def _enviar_snapshot(self, snap: str) -> ResultadoSync:
+        page_size = page_size_do_arquivo(snap)
+        man = self._ler_manifest()
+        estado, hashes = self._ler_estado()
+
+        sincronizado = (
+            man is not None
+            and estado.get("rev") == man.head_rev
+            and estado.get("sha256") == man.head_sha256
+            and int(estado.get("page_size") or 0) == man.page_size == page_size
+        )
+        if not sincronizado:
+            return self._enviar_base(man, snap)
+
+        delta, hashes_novos, alteradas = montar_delta(snap, page_size, hashes)
+        if alteradas == 0 and len(hashes_novos) == len(hashes):
+            return ResultadoSync("nada", rev=man.head_rev)
+
+        tam_deltas = sum(int(d.get("tamanho") or 0) for d in man.deltas) + len(delta)
+        tam_banco = os.path.getsize(snap)
+        if len(man.deltas) >= self.max_deltas or tam_deltas > self.fracao_max_deltas * tam_banco:
+            return self._enviar_base(man, snap)
+
+        sha = sha256_arquivo(snap)
+        rev = man.head_rev + 1
+        arquivo = f"delta-{rev:06d}-{uuid.uuid4().hex[:8]}.bin"
+        self.remoto.gravar(f"{self._dir_sync}/{arquivo}", delta)
+        man.deltas.append({"rev": rev, "arquivo": arquivo, "sha256": sha, "tamanho": len(delta)})
+        man.head_rev, man.head_sha256 = rev, sha
+        self.remoto.gravar(self._manifest_path, man.para_bytes())
+        self._gravar_estado({"rev": rev, "sha256": sha, "page_size": page_size}, hashes_novos)
+        return ResultadoSync("delta", rev=rev, bytes_transferidos=len(delta), paginas=alteradas)
+
+    def _enviar_base(self, man_antigo: Optional[Manifest], snap: str) -> ResultadoSync:
+        page_size = page_size_do_arquivo(snap)
+        sha = sha256_arquivo(snap)
+        tamanho = os.path.getsize(snap)
+        rev = (man_antigo.head_rev if man_antigo else 0) + 1
+        self.remoto.enviar_arquivo(self.caminho_remoto, snap)
+        man = Manifest(page_size=page_size, base_rev=rev, base_sha256=sha, head_rev=rev, head_sha256=sha)
+        self.remoto.gravar(self._manifest_path, man.para_bytes())
+        self._estado_de_arquivo(snap, rev, sha, page_size)
+        if man_antigo:
+            for d in man_antigo.deltas:
+                try:
+                    self.remoto.apagar(f"{self._dir_sync}/{d['arquivo']}")
+                except Exception:
+                    pass  # lixo remoto não impede o sync
+        return ResultadoSync("base", rev=rev, bytes_transferidos=tamanho)
+
+    # ---------- pull ----------
+    def ha_novidade(self) -> bool:
+        """True se o remoto tem revisão diferente da última sincronizada aqui."""
+        man = self._ler_manifest()
+        estado, _ = self._ler_estado()
+        if man is None:
+            versao = self.remoto.versao(self.caminho_remoto)
+            return versao is not None and versao != estado.get("versao_legado")
+        return not (estado.get("rev") == man.head_rev and estado.get("sha256") == man.head_sha256)
+
+    def baixar(self, forcar: bool = False) -> ResultadoSync:
+        """
+        Traz o arquivo local para a revisão head do remoto.
+        Aplica só os deltas faltantes quando o banco local não mudou desde a
+        revisão registrada; senão baixa base + deltas.
+        """
+        man = self._ler_manifest()
+        if man is None:
+            return self._baixar_legado(forcar)
+
+        estado, _ = self._ler_estado()
+        local_ok = os.path.exists(self.caminho_local)
+        if (not forcar and local_ok and estado.get("rev") == man.head_rev
+                and estado.get("sha256") == man.head_sha256):
+            return ResultadoSync("nada", rev=man.head_rev)
+
+        rev_local = int(estado.get("rev") or -1)
+        incremental = (
+            not forcar
+            and local_ok
+            and man.base_rev <= rev_local < man.head_rev
+            and (rev_local == man.base_rev or any(int(d["rev"]) == rev_local for d in man.deltas))
+        )
+        if incremental:
+            try:
+                res = self._aplicar_deltas(man, rev_local, estado.get("sha256"))
+                if res is not None:
+                    return res
+            except (ValueError, OSError, RuntimeError, sqlite3.Error):
+                pass  # qualquer inconsistência: baixa tudo
+        return self._baixar_completo(man)
+
+    def _aplicar_deltas(self, man: Manifest, rev_local: int, sha_local: Optional[str]) -> Optional[ResultadoSync]:
+        # O snapshot do banco local só coincide com a revisão registrada se
+        # não houve gravação local depois do último sync.
+        tmp = self._snapshot()
+        try:
+            if sha256_arquivo(tmp) != sha_local:
+                return None
+            total = 0
+            for d in man.deltas:
+                if int(d["rev"]) <= rev_local:
+                    continue
+                dados = self.remoto.ler(f"{self._dir_sync}/{d['arquivo']}")
+                if dados is None:
+                    raise RuntimeError(f"delta ausente: {d['arquivo']}")
+                aplicar_delta(tmp, dados)
+                total += len(dados)
+            if sha256_arquivo(tmp) != man.head_sha256:
+                raise ValueError("hash final não confere")
+            self._estado_de_arquivo(tmp, man.head_rev, man.head_sha256, man.page_size)
+            self._substituir_local(tmp)
+        finally:
+            _remover(tmp)
+        return ResultadoSync("delta", rev=man.head_rev, bytes_transferidos=total)
+
+    def _baixar_completo(self, man: Manifest) -> ResultadoSync:
+        tmp = self._tmp_local()
+        try:
+            if not self.remoto.baixar_arquivo(self.caminho_remoto, tmp):
+                raise RuntimeError(f"snapshot base ausente: {self.caminho_remoto}")
+            if sha256_arquivo(tmp) != man.base_sha256:
+                raise RuntimeError("snapshot base não confere com o manifest (push em andamento?)")
+            total = os.path.getsize(tmp)
+            for d in man.deltas:
+                dados = self.remoto.ler(f"{self._dir_sync}/{d['arquivo']}")
+                if dados is None:
+                    raise RuntimeError(f"delta ausente: {d['arquivo']}")
+                aplicar_delta(tmp, dados)
+                total += len(dados)
+            if sha256_arquivo(tmp) != man.head_sha256:
+                raise RuntimeError("hash final não confere com o manifest")
+            self._estado_de_arquivo(tmp, man.head_rev, man.head_sha256, man.page_size)
+            self._substituir_local(tmp)
+        finally:
+            _remover(tmp)
+        return ResultadoSync("completo", rev=man.head_rev, bytes_transferidos=total)
+
+    def _baixar_legado(self, forcar: bool) -> ResultadoSync:
+        """Remoto ainda sem manifest: download integral (comportamento antigo)."""
+        estado, _ = self._ler_estado()
+        versao = self.remoto.versao(self.caminho_remoto)
+        if versao is None:
+            raise RuntimeError(f"arquivo remoto não encontrado: {self.caminho_remoto}")
+        if not forcar and os.path.exists(self.caminho_local) and versao == estado.get("versao_legado"):
+            return ResultadoSync("nada")
+        tmp = self._tmp_local()
+        try:
+            if not self.remoto.baixar_arquivo(self.caminho_remoto, tmp):
+                raise RuntimeError(f"arquivo remoto não encontrado: {self.caminho_remoto}")
+            sha, total = sha256_arquivo(tmp), os.path.getsize(tmp)
+            page_size = page_size_do_arquivo(tmp)
+            self._estado_de_arquivo(tmp, 0, sha, page_size, versao_legado=versao)
+            self._substituir_local(tmp)
+        finally:
+            _remover(tmp)
+        return ResultadoSync("legado", bytes_transferidos=total)
+
+
+__all__ = [
+    "ArmazenamentoRemoto",
+    "PastaLocal",
+    "DropboxRemoto",
+    "Manifest",
+    "ResultadoSync",
+    "SincronizadorDelta",
+    "montar_delta",
+    "aplicar_delta",
+    "hashes_paginas",
+    "page_size_do_arquivo",
+    "snapshot_consistente",
+    "restaurar_snapshot",
+    "checkpoint_truncate",
+]
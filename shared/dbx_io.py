@@ -7,14 +7,22 @@ Resumo
 Wrap simples para baixar/subir o arquivo do banco usando o cliente com
 refresh token (shared.dropbox_client). Mantém nomes de funções claros:
 
-    - baixar_db_para_local() -> str (caminho local do DB)
-    - enviar_db_local() -> None
+    - baixar_db_para_local(forcar=False) -> str (caminho local do DB)
+    - enviar_db_local(progresso=None) -> None
+    - atualizar_db_local() -> bool (True se o arquivo local mudou)
+
+A transferência é incremental (ver shared.db_sync): o push envia só as
+páginas alteradas e o pull aplica apenas os deltas que faltam. O snapshot
+completo continua em `dropbox.file_path`, então clientes antigos seguem
+conseguindo baixar o banco.
 
 Dependências
 ------------
 - shared/dropbox_client.py
+- shared/db_sync.py
 - streamlit.secrets['dropbox'] com:
-    app_key, app_secret, refresh_token, file_path, force_download (opcional)
+    app_key, app_secret, refresh_token, file_path, force_download (opcional),
+    compression (opcional: "gzip" | "zstd" | "nenhum")
 
 Segurança
 ---------
@@ -23,9 +31,12 @@ Segurança
 
 from __future__ import annotations
 import pathlib
+from typing import Callable, Optional
+
 import streamlit as st
 
-from shared.dropbox_client import get_dbx, download_bytes, upload_bytes
+from shared.dropbox_client import get_dbx
+from shared.db_sync import DropboxRemoto, ResultadoSync, SincronizadorDelta
 
 
 def _local_db_path() -> pathlib.Path:
@@ -35,27 +46,41 @@ def _local_db_path() -> pathlib.Path:
     return p
 
 
-def baixar_db_para_local() -> str:
+def _sincronizador(progresso: Optional[Callable[[int, int], None]] = None) -> SincronizadorDelta:
+    cfg = st.secrets["dropbox"]
+    file_path = cfg["file_path"]
+    # Compressão dos deltas/manifest: "gzip" (padrão), "zstd" ou "nenhum".
+    comprimir = str(cfg.get("compression", "gzip") or "nenhum")
+    return SincronizadorDelta(DropboxRemoto(get_dbx(), comprimir=comprimir), file_path,
+                              str(_local_db_path()), progresso=progresso)
+
+
+def baixar_db_para_local(forcar: bool = False) -> str:
     """
-    Baixa o DB do Dropbox para o caminho local e retorna o caminho como string.
+    Traz o DB do Dropbox para o caminho local e retorna o caminho como string.
     Respeita o caminho remoto definido em secrets: dropbox.file_path.
+    Sem `forcar`, só transfere o que mudou desde o último sync.
     """
-    file_path = st.secrets["dropbox"]["file_path"]
-    dbx = get_dbx()
-    data = download_bytes(dbx, file_path)
-
-    dst = _local_db_path()
-    dst.write_bytes(data)
-    return str(dst)
+    _sincronizador().baixar(forcar=forcar)
+    return str(_local_db_path())
 
 
-def enviar_db_local() -> None:
+def atualizar_db_local() -> bool:
     """
-    Lê o DB local e envia para o caminho remoto no Dropbox (overwrite).
+    Pull incremental. Retorna True se o arquivo local foi substituído
+    (o chamador deve invalidar caches/reaplicar migrações).
     """
-    file_path = st.secrets["dropbox"]["file_path"]
-    src = _local_db_path()
-    data = src.read_bytes()
+    res: ResultadoSync = _sincronizador().baixar()
+    return res.acao != "nada"
 
-    dbx = get_dbx()
-    upload_bytes(dbx, file_path, data)
+
+def enviar_db_local(progresso: Optional[Callable[[int, int], None]] = None) -> None:
+    """
+    Envia o DB local para o Dropbox (apenas as páginas alteradas; snapshot
+    completo quando o remoto mudou por fora ou os deltas acumulados ficam grandes).
+
+    A imagem enviada é um snapshot consistente feito pela API de backup do
+    SQLite (inclui o `-wal`, não pausa as vendas); `progresso(feito, total)`
+    recebe o andamento em páginas.
+    """
+    _sincronizador(progresso).enviar()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+shared.dias_movimento
+=====================
+
+Registro dos **dias com movimento** (e se já foram fechados), mantido por
+triggers, para a trava de fechamento sequencial
+(`flowdash_pages.fechamento.lock_manager`).
+
+A verificação de pendência roda a cada lançamento e precisava do último dia
+com movimento em `entrada`, `saida`, `correcao_caixa` e
+`movimentacoes_bancarias` — um `MAX(data)` sobre as quatro tabelas (a de
+movimentações sem índice com a data à esquerda) — e depois uma busca em
+`fechamento_caixa`. Aqui é uma busca pela chave primária:
+
+    SELECT data, tem_fechamento FROM dias_movimento
+     WHERE data < :hoje ORDER BY data DESC LIMIT 1
+
+Tabela
+------
+`dias_movimento(data, tem_fechamento, qtd)` — `data` 'YYYY-MM-DD' (PK),
+`tem_fechamento` 1 se há linha em `fechamento_caixa` no dia, `qtd` = linhas das
+quatro tabelas no dia (o dia sai da tabela quando chega a zero, p.ex. estorno).
+
+Triggers
+--------
+- INSERT/DELETE/UPDATE da data nas quatro tabelas ajustam `qtd` do dia;
+- INSERT/DELETE/UPDATE da data em `fechamento_caixa` (o salvamento do
+  fechamento) ajustam `tem_fechamento`.
+Linhas sem data válida (`DATE(data)` nulo) não contam, como antes.
+
+Manutenção
+----------
+- `garantir_dias_movimento(conn, verificar=False)`: etapa de migração (ver
+  `shared.db_schema`). Compara o DDL dos triggers com `sqlite_master` e só
+  refaz os que mudaram, sem escrever no esquema quando nada mudou; popula na
+  criação da tabela ou após trocar triggers. Conferir as contagens exige
+  varrer as quatro tabelas, por isso só com `verificar=True`
+  (`tools/migrar_banco.py --verificar`).
+- `reconstruir_dias_movimento(conn)`: repopula do zero.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import List, Optional, Tuple
+
+from shared.tabela_derivada import (
+    colunas,
+    contagens_batem,
+    garantir,
+    sincronizar_triggers,
+    tabela_existe,
+    triggers_presentes,
+)
+
+# Tabelas cujo lançamento marca o dia como "com movimento".
+TABELAS_MOVIMENTO = ("entrada", "saida", "correcao_caixa", "movimentacoes_bancarias")
+
+_FECHAMENTO = "fechamento_caixa"
+_PREFIXO = "trg_dias_mov"
+
+_DDL_TABELA = (
+    "CREATE TABLE IF NOT EXISTS dias_movimento ("
+    "data TEXT PRIMARY KEY, "
+    "tem_fechamento INTEGER NOT NULL DEFAULT 0, "
+    "qtd INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID;"
+)
+
+
+def _bases(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
+    """(tabela, coluna de data) das tabelas de movimento presentes no banco."""
+    bases = []
+    for tabela in TABELAS_MOVIMENTO:
+        col = colunas(conn, tabela).get("data")
+        if col:
+            bases.append((tabela, col))
+    return bases
+
+
+# ===================== Triggers =====================
+
+def _sql_fechado(conn: sqlite3.Connection, dia: str) -> str:
+    col = colunas(conn, _FECHAMENTO).get("data")
+    if not col:
+        return "0"
+    return (
+        f'EXISTS (SELECT 1 FROM {_FECHAMENTO} WHERE "{col}" >= {dia} '
+        f"AND \"{col}\" < DATE({dia}, '+1 day'))"
+    )
+
+
+def _sql_somar(conn: sqlite3.Connection, dia: str) -> str:
+    return (
+        f"INSERT INTO dias_movimento (data, tem_fechamento, qtd) "
+        f"SELECT {dia}, {_sql_fechado(conn, dia)}, 1 WHERE {dia} IS NOT NULL "
+        f"ON CONFLICT(data) DO UPDATE SET qtd = qtd + 1;"
+    )
+
+
+def _sql_subtrair(dia: str) -> str:
+    return (
+        f"UPDATE dias_movimento SET qtd = qtd - 1 WHERE data = {dia}; "
+        f"DELETE FROM dias_movimento WHERE data = {dia} AND qtd <= 0;"
+    )
+
+
+def _ddl_triggers(conn: sqlite3.Connection) -> List[str]:
+    ddls = []
+    for tabela, col in _bases(conn):
+        novo, velho = f'DATE(NEW."{col}")', f'DATE(OLD."{col}")'
+        p = f"{_PREFIXO}_{tabela}"
+        ddls += [
+            f'CREATE TRIGGER {p}_ai AFTER INSERT ON "{tabela}" BEGIN {_sql_somar(conn, novo)} END;',
+            f'CREATE TRIGGER {p}_ad AFTER DELETE ON "{tabela}" BEGIN {_sql_subtrair(velho)} END;',
+            f'CREATE TRIGGER {p}_au AFTER UPDATE OF "{col}" ON "{tabela}" '
+            f"WHEN {novo} IS NOT {velho} "
+            f"BEGIN {_sql_subtrair(velho)} {_sql_somar(conn, novo)} END;",
+        ]
+    col = colunas(conn, _FECHAMENTO).get("data")
+    if col:
+        novo, velho = f'DATE(NEW."{col}")', f'DATE(OLD."{col}")'
+        p = f"{_PREFIXO}_{_FECHAMENTO}"
+        marcar = f"UPDATE dias_movimento SET tem_fechamento = 1 WHERE data = {novo};"
+        recalcular = f"UPDATE dias_movimento SET tem_fechamento = {_sql_fechado(conn, velho)} WHERE data = {velho};"
+        ddls += [
+            f"CREATE TRIGGER {p}_ai AFTER INSERT ON {_FECHAMENTO} BEGIN {marcar} END;",
+            f"CREATE TRIGGER {p}_ad AFTER DELETE ON {_FECHAMENTO} BEGIN {recalcular} END;",
+            f'CREATE TRIGGER {p}_au AFTER UPDATE OF "{col}" ON {_FECHAMENTO} '
+            f"WHEN {novo} IS NOT {velho} BEGIN {recalcular} {marcar} END;",
+        ]
+    return ddls
+
+
+# ===================== Backfill =====================
+
+def _sql_dias(bases: List[Tuple[str, str]]) -> str:
+    return " UNION ALL ".join(f'SELECT DATE("{col}") AS d FROM "{tabela}"' for tabela, col in bases)
+
+
+def _repopular(conn: sqlite3.Connection, bases: List[Tuple[str, str]]) -> None:
+    conn.execute("DELETE FROM dias_movimento")
+    if not bases:
+        return
+    col = colunas(conn, _FECHAMENTO).get("data")
+    fechado = (
+        f'd IN (SELECT DATE("{col}") FROM {_FECHAMENTO} WHERE DATE("{col}") IS NOT NULL)' if col else "0"
+    )
+    conn.execute(
+        f"INSERT INTO dias_movimento (data, tem_fechamento, qtd) "
+        f"SELECT d, {fechado}, COUNT(*) FROM ({_sql_dias(bases)}) WHERE d IS NOT NULL GROUP BY d"
+    )
+
+
+def _sql_contagem(bases: List[Tuple[str, str]]) -> str:
+    if not bases:
+        return "SELECT 0"
+    return f"SELECT COUNT(*) FROM ({_sql_dias(bases)}) WHERE d IS NOT NULL"
+
+
+def _aplicar(conn: sqlite3.Connection, reconstruir: bool, verificar: bool = False) -> List[str]:
+    bases = _bases(conn)
+    nova = not tabela_existe(conn, "dias_movimento")
+    conn.execute(_DDL_TABELA)
+    # triggers refletem as tabelas/colunas atuais (ex.: fechamento_caixa criada depois)
+    mudou = sincronizar_triggers(conn, _PREFIXO, _ddl_triggers(conn))
+    if verificar and not (nova or reconstruir or mudou):
+        mudou = not contagens_batem(conn, _sql_contagem(bases), "dias_movimento")
+    if nova or reconstruir or mudou:
+        _repopular(conn, bases)
+    return [t for t, _ in bases]
+
+
+def garantir_dias_movimento(conn: sqlite3.Connection, verificar: bool = False) -> List[str]:
+    """Cria (idempotente) a tabela e os triggers; `verificar=True` também confere as contagens."""
+    # Ex.: SQLite sem UPSERT (< 3.24) ou banco somente-leitura: a trava usa as tabelas-base.
+    return garantir(conn, "garantir_dias_movimento",
+                    lambda: _aplicar(conn, reconstruir=False, verificar=verificar), [])
+
+
+def reconstruir_dias_movimento(conn: sqlite3.Connection) -> List[str]:
+    """Sincroniza os triggers e repopula `dias_movimento` do zero."""
+    return _aplicar(conn, reconstruir=True)
+
+
+# ===================== Leitura =====================
+
+def disponivel(conn: sqlite3.Connection) -> bool:
+    """True se o banco tem `dias_movimento` com triggers ativos."""
+    return triggers_presentes(conn, _PREFIXO)
+
+
+def ultimo_dia_antes(conn: sqlite3.Connection, data_iso: str) -> Optional[Tuple[str, bool]]:
+    """(dia, fechado) do último dia com movimento antes de `data_iso`; None se não houver."""
+    row = conn.execute(
+        "SELECT data, tem_fechamento FROM dias_movimento WHERE data < ? ORDER BY data DESC LIMIT 1",
+        (str(data_iso)[:10],),
+    ).fetchone()
+    return (str(row[0]), bool(row[1])) if row else None
+
+
+__all__ = [
+    "TABELAS_MOVIMENTO",
+    "garantir_dias_movimento",
+    "reconstruir_dias_movimento",
+    "disponivel",
+    "ultimo_dia_antes",
+]
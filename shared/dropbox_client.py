@@ -13,6 +13,27 @@ Expõe utilitários:
   - get_dbx(): retorna um cliente autenticado (com refresh automático)
   - download_bytes(dbx, path): baixa bytes de um arquivo
   - upload_bytes(dbx, path, data): envia bytes para um arquivo (overwrite)
+  - upload_arquivo(dbx, caminho_local, path): upload em blocos (sessão), retomável
+  - download_arquivo(dbx, path, destino): download em streaming + rename atômico
+
+Transferência de arquivos grandes
+---------------------------------
+`upload_arquivo`/`download_arquivo` usam memória constante (um bloco por vez),
+independentemente do tamanho do banco:
+- Upload via *upload sessions* (blocos de `CHUNK_UPLOAD` lidos do disco); o
+  offset confirmado é salvo num estado por **caminho de destino no Dropbox**
+  (pasta temporária do sistema, ver `_estado_upload`), com a assinatura do
+  conteúdo (tamanho + SHA-256). Uma chamada interrompida para o mesmo destino
+  e o mesmo conteúdo — ex.: um novo snapshot idêntico do banco — continua de
+  onde parou. O estado é apagado no sucesso e quando a API recusa o upload.
+  Offsets divergentes informados pela API são corrigidos automaticamente.
+- Compressão opcional do payload ("gzip" ou "zstd" — este exige o pacote
+  `zstandard`; sem ele cai para gzip). O download detecta o formato pelos
+  bytes mágicos e descomprime em streaming.
+- Download grava em arquivo temporário na mesma pasta e faz `os.replace`;
+  quedas no meio do stream são retomadas com `Range` na mesma revisão (o
+  `files_download` do SDK não aceita headers: usa um clone do cliente com o
+  header, como o próprio SDK faz em `with_path_root`).
 
 Dependências
 ------------
@@ -36,12 +57,31 @@ Notas
 """
 
 from __future__ import annotations
-from typing import Optional
+from typing import Callable, Iterator, Optional
+import hashlib
 import io
+import json
+import os
+import tempfile
+import time
+import zlib
 
 import streamlit as st
 import dropbox
-from dropbox.files import WriteMode
+from dropbox.files import CommitInfo, UploadSessionCursor, WriteMode
+
+try:  # opcional: compressão zstd
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+CHUNK_UPLOAD = 8 * 1024 * 1024       # bloco das upload sessions (múltiplo de 4 MiB)
+CHUNK_DOWNLOAD = 1024 * 1024
+LIMITE_UPLOAD_SIMPLES = 150 * 1024 * 1024   # files_upload não aceita acima disso
+TENTATIVAS = 4
+
+_MAGIC_GZIP = b"\x1f\x8b"
+_MAGIC_ZSTD = b"\x28\xb5\x2f\xfd"
 
 
 class DropboxConfigError(RuntimeError):
@@ -85,21 +125,34 @@ def get_dbx() -> dropbox.Dropbox:
     return dbx
 
 
-def download_bytes(dbx: dropbox.Dropbox, path: str) -> bytes:
+def download_bytes(dbx: dropbox.Dropbox, path: str, descomprimir: bool = False) -> bytes:
     """
     Baixa um arquivo do Dropbox e retorna seus bytes.
+    Com `descomprimir=True`, payloads gzip/zstd são descomprimidos.
     """
     try:
         meta, resp = dbx.files_download(path)
-        return resp.content
+        data = resp.content
     except dropbox.exceptions.ApiError as e:
-        raise RuntimeError(f"Falha ao baixar '{path}' do Dropbox: {e}")
+        raise RuntimeError(f"Falha ao baixar '{path}' do Dropbox: {e}") from e
+    if descomprimir:
+        d = _descompressor(data[:4])
+        if d is not None:
+            data = d.decompress(data) + d.flush()
+    return data
 
 
-def upload_bytes(dbx: dropbox.Dropbox, path: str, data: bytes) -> None:
+def upload_bytes(dbx: dropbox.Dropbox, path: str, data: bytes, comprimir: Optional[str] = None) -> None:
     """
-    Envia bytes para o Dropbox (overwrite).
+    Envia bytes para o Dropbox (overwrite). Acima do limite do endpoint
+    simples, usa upload session em blocos.
     """
+    if comprimir:
+        c = _compressor(comprimir)
+        data = c.compress(data) + c.flush()
+    if len(data) > LIMITE_UPLOAD_SIMPLES:
+        _upload_sessao(dbx, path, lambda pular: _fatiar(io.BytesIO(data), CHUNK_UPLOAD, pular), None)
+        return
     try:
         dbx.files_upload(
             data,
@@ -109,3 +162,299 @@ def upload_bytes(dbx: dropbox.Dropbox, path: str, data: bytes) -> None:
         )
     except dropbox.exceptions.ApiError as e:
         raise RuntimeError(f"Falha ao enviar '{path}' ao Dropbox: {e}")
+
+
+# ----------------------------------------------------------------------------
+# Compressão (streaming)
+# ----------------------------------------------------------------------------
+class _Identidade:
+    def compress(self, b: bytes) -> bytes:
+        return b
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _ZstdDescompressor:
+    def __init__(self) -> None:
+        self._d = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, b: bytes) -> bytes:
+        return self._d.decompress(b)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def _compressor(metodo: Optional[str]):
+    """Compressor incremental (compress/flush). Saída determinística (retomável)."""
+    metodo = (metodo or "").strip().lower()
+    if not metodo or metodo == "nenhum":
+        return _Identidade()
+    if metodo == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    if metodo in ("gzip", "zstd"):
+        # wbits=31 -> cabeçalho gzip com mtime=0 (mesma entrada => mesmos bytes)
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    raise ValueError(f"Compressão desconhecida: {metodo!r} (use 'gzip' ou 'zstd').")
+
+
+def _descompressor(inicio: bytes):
+    """Descompressor conforme os bytes mágicos; None se o payload não é comprimido."""
+    if inicio.startswith(_MAGIC_GZIP):
+        return zlib.decompressobj(47)
+    if inicio.startswith(_MAGIC_ZSTD):
+        if zstandard is None:
+            raise RuntimeError("Payload zstd recebido, mas o pacote 'zstandard' não está instalado.")
+        return _ZstdDescompressor()
+    return None
+
+
+def _fatiar(f, tamanho: int, pular: int = 0, metodo: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Lê `f` em streaming, (opcionalmente) comprime e emite blocos de exatamente
+    `tamanho` bytes (o último pode ser menor). Os primeiros `pular` bytes do
+    payload são descartados (retomada).
+    """
+    comp = _compressor(metodo)
+    buf = bytearray()
+    fim = False
+    while not fim:
+        bruto = f.read(tamanho)
+        if bruto:
+            buf += comp.compress(bruto)
+        else:
+            buf += comp.flush()
+            fim = True
+        if pular:
+            corte = min(pular, len(buf))
+            del buf[:corte]
+            pular -= corte
+        while len(buf) >= tamanho:
+            with memoryview(buf) as mv:
+                bloco = bytes(mv[:tamanho])
+            del buf[:tamanho]
+            yield bloco
+    if buf:
+        yield bytes(buf)
+
+
+# ----------------------------------------------------------------------------
+# Upload em blocos (upload session), retomável
+# ----------------------------------------------------------------------------
+class _OffsetIncorreto(Exception):
+    def __init__(self, correto: int) -> None:
+        super().__init__(correto)
+        self.correto = int(correto)
+
+
+def _offset_correto(err: dropbox.exceptions.ApiError) -> Optional[int]:
+    e = err.error
+    try:
+        if hasattr(e, "is_lookup_failed") and e.is_lookup_failed():
+            e = e.get_lookup_failed()
+        if hasattr(e, "is_incorrect_offset") and e.is_incorrect_offset():
+            return int(e.get_incorrect_offset().correct_offset)
+    except Exception:
+        pass
+    return None
+
+
+def _sessao_invalida(err: dropbox.exceptions.ApiError) -> bool:
+    e = err.error
+    try:
+        if hasattr(e, "is_lookup_failed") and e.is_lookup_failed():
+            e = e.get_lookup_failed()
+        return bool(e.is_not_found() or e.is_closed())
+    except Exception:
+        return False
+
+
+def _com_retentativas(fn: Callable[[], object], tentativas: int = TENTATIVAS):
+    """Repete falhas de rede/5xx com backoff; offset divergente vira `_OffsetIncorreto`."""
+    espera = 1.0
+    for i in range(tentativas):
+        try:
+            return fn()
+        except dropbox.exceptions.ApiError as e:
+            correto = _offset_correto(e)
+            if correto is not None:
+                raise _OffsetIncorreto(correto)
+            raise
+        except (dropbox.exceptions.InternalServerError, dropbox.exceptions.RateLimitError,
+                ConnectionError, OSError) as e:
+            if i == tentativas - 1:
+                raise
+            atraso = getattr(e, "backoff", None) or espera
+            time.sleep(float(atraso))
+            espera = min(espera * 2, 30.0)
+    return None
+
+
+def _upload_sessao(dbx: dropbox.Dropbox, path: str, gerar: Callable[[int], Iterator[bytes]],
+                   retomada: Optional[str], assinatura: Optional[dict] = None):
+    """
+    Núcleo do upload em blocos. `gerar(pular)` produz o payload a partir do
+    offset `pular`. `retomada` é o arquivo onde a sessão/offset são salvos.
+    """
+    commit = CommitInfo(path=path, mode=WriteMode("overwrite"), mute=True)
+    sessao_id, offset = None, 0
+    if retomada:
+        try:
+            with open(retomada, "r", encoding="utf-8") as f:
+                salvo = json.load(f)
+            if salvo.get("path") == path and salvo.get("assinatura") == assinatura:
+                sessao_id, offset = salvo["session_id"], int(salvo["offset"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _salvar() -> None:
+        if not retomada:
+            return
+        with open(retomada + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"path": path, "assinatura": assinatura, "session_id": sessao_id, "offset": offset}, f)
+        os.replace(retomada + ".tmp", retomada)
+
+    try:
+        while True:
+            if sessao_id is None:
+                sessao_id = _com_retentativas(lambda: dbx.files_upload_session_start(b"")).session_id
+                offset = 0
+                _salvar()
+            blocos = gerar(offset)
+            atual = next(blocos, b"")
+            try:
+                while True:
+                    prox = next(blocos, None)
+                    cursor = UploadSessionCursor(session_id=sessao_id, offset=offset)
+                    if prox is None:
+                        meta = _com_retentativas(
+                            lambda: dbx.files_upload_session_finish(atual, cursor, commit))
+                        _remover_estado(retomada)
+                        return meta
+                    _com_retentativas(lambda: dbx.files_upload_session_append_v2(atual, cursor))
+                    offset += len(atual)
+                    _salvar()
+                    atual = prox
+            except _OffsetIncorreto as e:
+                offset = e.correto       # servidor já tem (ou não tem) parte dos bytes
+                _salvar()
+            except dropbox.exceptions.ApiError as e:
+                if not _sessao_invalida(e):
+                    raise
+                sessao_id = None         # sessão expirada/fechada: recomeça
+    except dropbox.exceptions.ApiError as e:
+        _remover_estado(retomada)    # recusado pela API: não há o que retomar
+        raise RuntimeError(f"Falha ao enviar '{path}' ao Dropbox: {e}") from e
+
+
+def _remover_estado(retomada: Optional[str]) -> None:
+    if not retomada:
+        return
+    for p in (retomada, retomada + ".tmp"):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+def _estado_upload(path: str) -> str:
+    """Arquivo de estado da sessão de upload para o destino `path` no Dropbox."""
+    chave = hashlib.sha1(path.lower().encode("utf-8")).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"flowdash-upload-{chave}.json")
+
+
+def _sha256_arquivo(caminho: str) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(CHUNK_DOWNLOAD), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def upload_arquivo(dbx: dropbox.Dropbox, caminho_local: str, path: str,
+                   comprimir: Optional[str] = None, chunk: int = CHUNK_UPLOAD):
+    """
+    Envia um arquivo do disco em blocos (memória constante), sobrescrevendo
+    `path`. Retomável: se interrompido, a próxima chamada para o mesmo destino
+    com o mesmo conteúdo (tamanho/SHA-256/compressão) continua do último offset
+    confirmado, ainda que venha de outro arquivo local (snapshot temporário).
+    Retorna o FileMetadata do Dropbox.
+    """
+    assinatura = {"tamanho": os.path.getsize(caminho_local), "sha256": _sha256_arquivo(caminho_local),
+                  "comprimir": (comprimir or ""), "chunk": int(chunk)}
+
+    def _gerar(pular: int) -> Iterator[bytes]:
+        with open(caminho_local, "rb") as f:
+            yield from _fatiar(f, int(chunk), pular, comprimir)
+
+    return _upload_sessao(dbx, path, _gerar, _estado_upload(path), assinatura)
+
+
+# ----------------------------------------------------------------------------
+# Download em streaming
+# ----------------------------------------------------------------------------
+def _com_range(dbx: dropbox.Dropbox, inicio: int) -> dropbox.Dropbox:
+    """Clone do cliente que envia `Range: bytes=<inicio>-` em cada requisição."""
+    headers = dict(getattr(dbx, "_headers", None) or {})
+    headers["Range"] = f"bytes={int(inicio)}-"
+    return dbx.clone(headers=headers)
+
+
+def download_arquivo(dbx: dropbox.Dropbox, path: str, destino: str,
+                     descomprimir: bool = True, chunk: int = CHUNK_DOWNLOAD):
+    """
+    Baixa `path` para `destino` em streaming (memória constante): grava num
+    temporário da mesma pasta e troca com `os.replace` só no final. Quedas no
+    meio do stream são retomadas (header Range) na mesma revisão.
+    Retorna o FileMetadata do Dropbox.
+    """
+    pasta = os.path.dirname(os.path.abspath(destino)) or "."
+    os.makedirs(pasta, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".download-", suffix=".tmp", dir=pasta)
+    recebidos = 0
+    meta = None
+    desc = None
+    detectado = not descomprimir
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for tentativa in range(TENTATIVAS):
+                try:
+                    if meta is None:
+                        meta, resp = dbx.files_download(path)
+                    else:
+                        meta, resp = _com_range(dbx, recebidos).files_download(f"rev:{meta.rev}")
+                        if resp.status_code != 206:
+                            # servidor ignorou o Range: recomeça do zero
+                            out.seek(0)
+                            out.truncate()
+                            recebidos, desc, detectado = 0, None, not descomprimir
+                    try:
+                        for bloco in resp.iter_content(chunk_size=chunk):
+                            if not bloco:
+                                continue
+                            recebidos += len(bloco)
+                            if not detectado:
+                                desc = _descompressor(bloco[:4])
+                                detectado = True
+                            out.write(desc.decompress(bloco) if desc is not None else bloco)
+                    finally:
+                        resp.close()
+                    break
+                except dropbox.exceptions.ApiError:
+                    raise
+                except (ConnectionError, OSError, dropbox.exceptions.InternalServerError) as e:
+                    if meta is None or tentativa == TENTATIVAS - 1:
+                        raise RuntimeError(f"Falha ao baixar '{path}' do Dropbox: {e}")
+                    time.sleep(min(2 ** tentativa, 30))
+            if desc is not None:
+                out.write(desc.flush())
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, destino)
+    except dropbox.exceptions.ApiError as e:
+        raise RuntimeError(f"Falha ao baixar '{path}' do Dropbox: {e}") from e
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return meta
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+shared.lazy_imports
+===================
+
+Adiamento de imports pesados (plotly, prophet, bcb, sidrapy, workalendar...)
+para o primeiro uso, reduzindo o *cold start* do Streamlit e do PDV: quem só
+registra uma venda não paga pelo import das bibliotecas do Dashboard.
+
+- `modulo_tardio("plotly.graph_objects")` devolve um módulo-procurador cujo
+  primeiro acesso a atributo faz o import real, sob trava (o
+  `importlib.util.LazyLoader` não é seguro entre threads antes do
+  CPython 3.12.3, e o Streamlit roda cada sessão numa thread).
+  Atenção: anotações avaliadas na definição (`-> go.Figure`) já contam como
+  acesso — use `from __future__ import annotations` no módulo.
+- `getattr_tardio(__name__, {...})` gera o `__getattr__` (PEP 562) de um
+  pacote, para que `__init__.py` reexporte submódulos/funções sem importá-los.
+- `disponivel("prophet")` verifica se o pacote existe sem importá-lo.
+
+Para medir o efeito: `python tools/perfil_imports.py`.
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+from typing import Callable, Dict
+
+_LOCK = threading.RLock()
+
+
+def disponivel(nome: str) -> bool:
+    """True se o módulo pode ser importado (sem executá-lo)."""
+    if nome in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(nome) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class _ModuloTardio(ModuleType):
+    """Repassa os atributos ao módulo real, importado (uma vez, sob `_LOCK`) no primeiro acesso."""
+
+    def __getattr__(self, atributo: str):
+        real = self.__dict__.get("_modulo_real")
+        if real is None:
+            with _LOCK:
+                real = self.__dict__.get("_modulo_real")
+                if real is None:
+                    real = self.__dict__["_modulo_real"] = importlib.import_module(self.__name__)
+        return getattr(real, atributo)
+
+
+def modulo_tardio(nome: str) -> ModuleType:
+    """
+    Módulo `nome` sem executá-lo: o import real acontece no primeiro acesso a
+    atributo (já importado, devolve o próprio módulo). Levanta ImportError se
+    o módulo não existir.
+    """
+    with _LOCK:
+        mod = sys.modules.get(nome)
+        if mod is not None:
+            return mod
+        spec = importlib.util.find_spec(nome)
+        if spec is None or spec.loader is None:
+            raise ImportError(f"Módulo não encontrado: {nome}")
+        return _ModuloTardio(nome)
+
+
+def getattr_tardio(pacote: str, exports: Dict[str, str]) -> Callable[[str], object]:
+    """
+    `__getattr__` para o `__init__.py` de `pacote`.
+
+    `exports` mapeia nome -> "modulo" (submódulo inteiro) ou "modulo:atributo",
+    com módulos relativos ao pacote quando começam com ".". O valor resolvido
+    fica no namespace do pacote, então o custo é pago uma única vez.
+    """
+    def __getattr__(nome: str):
+        alvo = exports.get(nome)
+        if alvo is None:
+            raise AttributeError(f"module {pacote!r} has no attribute {nome!r}")
+        modulo, _, atributo = alvo.partition(":")
+        mod = importlib.import_module(modulo, pacote)
+        valor = getattr(mod, atributo) if atributo else mod
+        setattr(sys.modules[pacote], nome, valor)
+        return valor
+
+    return __getattr__
+
+
+__all__ = ["disponivel", "modulo_tardio", "getattr_tardio"]
@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""
+shared.saldo_diario
+===================
+
+Razão de **saldo corrido** por dia e conta, mantido por triggers nas
+tabelas-base, para que saldo de banco/caixa em qualquer data seja uma leitura
+indexada em vez de somar o histórico desde o último fechamento (ou desde
+2000-01-01, quando não há fechamento).
+
+Tabela
+------
+`saldo_diario` (tipo × conta × dia → abertura, entradas, saidas, fechamento, qtd)
+
+- `tipo`: 'banco' (bancos) ou 'caixa' ('Caixa' / 'Caixa 2').
+- `fechamento` é o **acumulado dos fluxos** até o dia (não o saldo "real"):
+  o saldo numa data é o checkpoint oficial (`fechamento_caixa` /
+  `saldos_caixas`) + `fechamento(data) - fechamento(checkpoint)`.
+  Ver `delta(...)`; os fluxos são os mesmos de `flowdash_pages.finance_logic`.
+- Só existem linhas nos dias com movimento; a consulta "até a data" pega a
+  última linha `dia <= data` pela chave primária.
+
+Fontes (uma por regra de fluxo, cada uma com seus triggers):
+- entrada → banco: `COALESCE(banco_destino, banco pela maquineta)` em
+  `DATE(COALESCE(Data_Liq, Data))`, valor líquido (só se houver `banco_destino`;
+  sem a coluna, as vendas vêm das movimentações de origem venda/entrada/pix).
+- entrada → caixa: vendas em DINHEIRO no dia da venda (valor bruto).
+- saida → banco (coluna banco/conta/banco_saida) e → caixa (`origem_dinheiro`).
+- movimentacoes_bancarias → banco e → caixa, excluindo origens já contadas.
+
+Um INSERT/DELETE/UPDATE na base ajusta a linha do dia e desloca
+`abertura`/`fechamento` dos dias seguintes da mesma conta (lançamento
+retroativo custa uma linha por dia posterior com movimento).
+
+Manutenção
+----------
+- `garantir_saldo_diario(conn, verificar=False)`: etapa de migração (ver
+  `shared.db_schema`). Só mexe num trigger se o DDL gerado com as colunas
+  atuais diferir do gravado em `sqlite_master` (DROP/CREATE muda o
+  `schema_version` e invalida os caches de esquema); popula na criação da
+  tabela ou quando os triggers mudaram. A conferência de contagens (varre as
+  bases) só roda com `verificar=True` (`tools/migrar_banco.py --verificar`).
+- `reconstruir_saldo_diario(conn, desde=None)`: recalcula a partir de uma data
+  (correções). Linha de comando:
+  `python tools/migrar_banco.py --db ... --reconstruir-saldos [AAAA-MM-DD]`.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from shared.tabela_derivada import (
+    colunas,
+    contagens_batem,
+    garantir,
+    sincronizar_triggers,
+    tabela_existe,
+    triggers_presentes,
+)
+
+# Banco presumido pela maquineta quando `entrada.banco_destino` é NULL
+# (ordem importa: 1º padrão que casar).
+BANCO_POR_MAQUINETA = (
+    ("INFINITE", "InfinitePay"),
+    ("INTER", "Inter"),
+    ("BRADESCO", "Bradesco"),
+    ("PAG", "PagBank"),
+    ("MERCADO", "Mercado Pago"),
+    ("STONE", "Stone"),
+    ("TON", "Stone"),
+)
+
+CAIXAS = ("Caixa", "Caixa 2")
+
+# Origens de movimentacoes_bancarias já contadas por outras fontes
+ORIGENS_VENDA = ("venda", "entrada", "pix")
+ORIGENS_MOV_ENTRADA_EXCLUIDAS = ("entrada", "venda", "saida", "pix", "lancamentos")
+ORIGENS_MOV_SAIDA_EXCLUIDAS = ("saida", "saidas")
+_ORIGENS_CAIXA_ENTRADA_EXCLUIDAS = ("entrada", "venda", "saida", "pix")
+
+_PREFIXO = "trg_saldo_diario"
+
+_DDL_TABELA = (
+    "CREATE TABLE IF NOT EXISTS saldo_diario ("
+    "tipo TEXT NOT NULL, conta TEXT NOT NULL, dia TEXT NOT NULL, "
+    "abertura REAL NOT NULL DEFAULT 0, entradas REAL NOT NULL DEFAULT 0, "
+    "saidas REAL NOT NULL DEFAULT 0, fechamento REAL NOT NULL DEFAULT 0, "
+    "qtd INTEGER NOT NULL DEFAULT 0, "
+    "PRIMARY KEY (tipo, conta, dia)) WITHOUT ROWID;"
+)
+
+DataLike = Union[str, date]
+
+
+def _lista_sql(valores: Iterable[str]) -> str:
+    return ", ".join("'" + v.replace("'", "''") + "'" for v in valores)
+
+
+# ===================== Fontes de fluxo =====================
+# Cada fonte devolve, para o alias `r` (NEW/OLD ou nome da tabela), as
+# expressões SQL de conta, dia, entrada, saída e a condição da linha contar.
+
+def _fonte_entrada_banco(cols: Dict[str, str], r: str) -> Optional[Dict[str, str]]:
+    data, valor, bd = cols.get("data"), cols.get("valor"), cols.get("banco_destino")
+    if not (data and valor and bd):
+        return None
+    maq = cols.get("maquineta")
+    caso = (
+        "CASE " + " ".join(f"WHEN UPPER({r}.\"{maq}\") LIKE '%{p}%' THEN '{b}'" for p, b in BANCO_POR_MAQUINETA)
+        + " ELSE NULL END"
+    ) if maq else "NULL"
+    liq_data = cols.get("data_liq")
+    dia = f'DATE(COALESCE({r}."{liq_data}", {r}."{data}"))' if liq_data else f'DATE({r}."{data}")'
+    liq = cols.get("valor_liquido")
+    conta = f'COALESCE({r}."{bd}", {caso})'
+    return {
+        "tipo": "'banco'",
+        "conta": conta,
+        "dia": dia,
+        "entrada": f'COALESCE({r}."{liq}", {r}."{valor}", 0)' if liq else f'COALESCE({r}."{valor}", 0)',
+        "saida": "0",
+        "cond": f"{conta} IS NOT NULL AND {dia} IS NOT NULL",
+    }
+
+
+def _fonte_entrada_caixa(cols: Dict[str, str], r: str) -> Optional[Dict[str, str]]:
+    data, valor, forma = cols.get("data"), cols.get("valor"), cols.get("forma_de_pagamento")
+    if not (data and valor and forma):
+        return None
+    dia = f'DATE({r}."{data}")'
+    return {
+        "tipo": "'caixa'",
+        "conta": "'Caixa'",
+        "dia": dia,
+        "entrada": f'COALESCE({r}."{valor}", 0)',
+        "saida": "0",
+        "cond": f"UPPER({r}.\"{forma}\") = 'DINHEIRO' AND {dia} IS NOT NULL",
+    }
+
+
+def _fonte_saida_banco(cols: Dict[str, str], r: str) -> Optional[Dict[str, str]]:
+    data, valor = cols.get("data"), cols.get("valor")
+    col = next((cols[c] for c in ("banco", "conta", "banco_saida") if c in cols), None)
+    if not (data and valor and col):
+        return None
+    dia = f'DATE({r}."{data}")'
+    return {
+        "tipo": "'banco'",
+        "conta": f'{r}."{col}"',
+        "dia": dia,
+        "entrada": "0",
+        "saida": f'COALESCE({r}."{valor}", 0)',
+        "cond": f'{r}."{col}" IS NOT NULL AND {dia} IS NOT NULL',
+    }
+
+
+def _fonte_saida_caixa(cols: Dict[str, str], r: str) -> Optional[Dict[str, str]]:
+    data, valor, origem = cols.get("data"), cols.get("valor"), cols.get("origem_dinheiro")
+    if not (data and valor and origem):
+        return None
+    dia = f'DATE({r}."{data}")'
+    return {
+        "tipo": "'caixa'",
+        "conta": f'{r}."{origem}"',
+        "dia": dia,
+        "entrada": "0",
+        "saida": f'COALESCE({r}."{valor}", 0)',
+        "cond": f'{r}."{origem}" IN ({_lista_sql(CAIXAS)}) AND {dia} IS NOT NULL',
+    }
+
+
+def _fonte_mov(tipo: str, vendas_por_mov: bool) -> Callable[[Dict[str, str], str], Optional[Dict[str, str]]]:
+    def fonte(cols: Dict[str, str], r: str) -> Optional[Dict[str, str]]:
+        if not all(c in cols for c in ("data", "banco", "tipo", "valor")):
+            return None
+        origem = f"LOWER(COALESCE({r}.\"{cols['origem']}\", ''))" if "origem" in cols else "''"
+        banco, t = f'{r}."{cols["banco"]}"', f'{r}."{cols["tipo"]}"'
+        if tipo == "caixa":
+            conta_ok = f"{banco} IN ({_lista_sql(CAIXAS)})"
+            ent_ok = f"{origem} NOT IN ({_lista_sql(_ORIGENS_CAIXA_ENTRADA_EXCLUIDAS)})"
+            sai_ok = f"{origem} <> 'saida'"
+        else:
+            conta_ok = f"{banco} IS NOT NULL AND UPPER(TRIM({banco})) NOT IN ('CAIXA', 'CAIXA 2')"
+            ent_ok = f"{origem} NOT IN ({_lista_sql(ORIGENS_MOV_ENTRADA_EXCLUIDAS)})"
+            if vendas_por_mov:
+                ent_ok = f"({ent_ok} OR {origem} IN ({_lista_sql(ORIGENS_VENDA)}))"
+            sai_ok = f"{origem} NOT IN ({_lista_sql(ORIGENS_MOV_SAIDA_EXCLUIDAS)})"
+        ent = f"{t} = 'entrada' AND {ent_ok}"
+        sai = f"{t} = 'saida' AND {sai_ok}"
+        valor = f'COALESCE({r}."{cols["valor"]}", 0)'
+        dia = f'DATE({r}."{cols["data"]}")'
+        return {
+            "tipo": f"'{tipo}'",
+            "conta": banco,
+            "dia": dia,
+            "entrada": f"CASE WHEN {ent} THEN {valor} ELSE 0 END",
+            "saida": f"CASE WHEN {sai} THEN {valor} ELSE 0 END",
+            "cond": f"{conta_ok} AND {dia} IS NOT NULL AND (({ent}) OR ({sai}))",
+        }
+    return fonte
+
+
+def _fontes(conn: sqlite3.Connection) -> List[tuple]:
+    """(nome, tabela-base, colunas, fonte) das fontes aplicáveis a este banco."""
+    cols = {t: colunas(conn, t) for t in ("entrada", "saida", "movimentacoes_bancarias")}
+    vendas_por_mov = "banco_destino" not in cols["entrada"]
+    candidatas = (
+        ("ent_banco", "entrada", _fonte_entrada_banco),
+        ("ent_caixa", "entrada", _fonte_entrada_caixa),
+        ("sai_banco", "saida", _fonte_saida_banco),
+        ("sai_caixa", "saida", _fonte_saida_caixa),
+        ("mov_banco", "movimentacoes_bancarias", _fonte_mov("banco", vendas_por_mov)),
+        ("mov_caixa", "movimentacoes_bancarias", _fonte_mov("caixa", False)),
+    )
+    return [(n, b, cols[b], f) for n, b, f in candidatas if f(cols[b], "NEW") is not None]
+
+
+# ===================== Triggers =====================
+
+def _aplicar_sql(e: Dict[str, str], sinal: str) -> str:
+    """Corpo de trigger: soma (sinal '+') ou estorna (sinal '-') a linha `e`."""
+    chave = f"tipo = {e['tipo']} AND conta = {e['conta']}"
+    liquido = f"({e['entrada']}) - ({e['saida']})"
+    sql = (
+        # garante a linha do dia, abrindo com o fechamento do último dia anterior
+        f"INSERT INTO saldo_diario (tipo, conta, dia, abertura, fechamento) "
+        f"SELECT {e['tipo']}, {e['conta']}, {e['dia']}, x, x FROM (SELECT COALESCE(("
+        f"SELECT fechamento FROM saldo_diario WHERE {chave} AND dia < {e['dia']} "
+        f"ORDER BY dia DESC LIMIT 1), 0) AS x) WHERE 1 "
+        f"ON CONFLICT(tipo, conta, dia) DO NOTHING; "
+        f"UPDATE saldo_diario SET entradas = entradas {sinal} ({e['entrada']}), "
+        f"saidas = saidas {sinal} ({e['saida']}), fechamento = fechamento {sinal} ({liquido}), "
+        f"qtd = qtd {sinal} 1 WHERE {chave} AND dia = {e['dia']}; "
+        f"UPDATE saldo_diario SET abertura = abertura {sinal} ({liquido}), "
+        f"fechamento = fechamento {sinal} ({liquido}) WHERE {chave} AND dia > {e['dia']};"
+    )
+    if sinal == "-":
+        # sem contribuições, a linha tem fluxo zero: o dia anterior já responde por ela
+        sql += f" DELETE FROM saldo_diario WHERE {chave} AND dia = {e['dia']} AND qtd <= 0;"
+    return sql
+
+
+def _ddl_triggers(nome: str, base: str, cols: Dict[str, str], fonte) -> List[str]:
+    novo, velho = fonte(cols, "NEW"), fonte(cols, "OLD")
+    pre = f"{_PREFIXO}_{nome}"
+    return [
+        f'CREATE TRIGGER {pre}_ai AFTER INSERT ON "{base}" '
+        f'WHEN {novo["cond"]} BEGIN {_aplicar_sql(novo, "+")} END;',
+        f'CREATE TRIGGER {pre}_ad AFTER DELETE ON "{base}" '
+        f'WHEN {velho["cond"]} BEGIN {_aplicar_sql(velho, "-")} END;',
+        f'CREATE TRIGGER {pre}_au_old AFTER UPDATE ON "{base}" '
+        f'WHEN {velho["cond"]} BEGIN {_aplicar_sql(velho, "-")} END;',
+        f'CREATE TRIGGER {pre}_au_new AFTER UPDATE ON "{base}" '
+        f'WHEN {novo["cond"]} BEGIN {_aplicar_sql(novo, "+")} END;',
+    ]
+
+
+# ===================== Backfill =====================
+
+def _sql_fluxos(fontes: List[tuple], desde: Optional[str]) -> str:
+    """SELECT (tipo, conta, dia, e, s, n) agrupado, unindo todas as fontes."""
+    partes = []
+    for _nome, base, cols, fonte in fontes:
+        e = fonte(cols, f'"{base}"')
+        filtro = e["cond"] + (f" AND {e['dia']} >= '{desde}'" if desde else "")
+        partes.append(
+            f"SELECT {e['tipo']} AS tipo, {e['conta']} AS conta, {e['dia']} AS dia, "
+            f"{e['entrada']} AS e, {e['saida']} AS s FROM \"{base}\" WHERE {filtro}"
+        )
+    return (
+        f"SELECT tipo, conta, dia, SUM(e) AS e, SUM(s) AS s, COUNT(*) AS n "
+        f"FROM ({' UNION ALL '.join(partes)}) GROUP BY tipo, conta, dia"
+    )
+
+
+def _repopular(conn: sqlite3.Connection, fontes: List[tuple], desde: Optional[str]) -> None:
+    if desde:
+        conn.execute("DELETE FROM saldo_diario WHERE dia >= ?", (desde,))
+    else:
+        conn.execute("DELETE FROM saldo_diario")
+    if not fontes:
+        return
+    # base = fechamento do último dia mantido (< desde) de cada conta
+    conn.execute(
+        f"WITH f AS ({_sql_fluxos(fontes, desde)}), "
+        f"b AS (SELECT tipo, conta, fechamento FROM saldo_diario s "
+        f"      WHERE dia = (SELECT MAX(dia) FROM saldo_diario s2 WHERE s2.tipo = s.tipo AND s2.conta = s.conta)), "
+        f"c AS (SELECT f.tipo, f.conta, f.dia, f.e, f.s, f.n, COALESCE(b.fechamento, 0) "
+        f"      + SUM(f.e - f.s) OVER (PARTITION BY f.tipo, f.conta ORDER BY f.dia) AS fech "
+        f"      FROM f LEFT JOIN b ON b.tipo = f.tipo AND b.conta = f.conta) "
+        f"INSERT INTO saldo_diario (tipo, conta, dia, abertura, entradas, saidas, fechamento, qtd) "
+        f"SELECT tipo, conta, dia, fech - (e - s), e, s, fech, n FROM c"
+    )
+
+
+def _aplicar(conn: sqlite3.Connection, reconstruir: bool, desde: Optional[str] = None,
+             verificar: bool = False) -> List[str]:
+    fontes = _fontes(conn)
+    nova = not tabela_existe(conn, "saldo_diario")
+    conn.execute(_DDL_TABELA)
+    # triggers refletem as colunas atuais (ex.: banco_destino criado depois);
+    # se mudaram, a tabela foi mantida por outras regras e é refeita
+    mudou = sincronizar_triggers(
+        conn, _PREFIXO, [ddl for nome, base, cols, fonte in fontes for ddl in _ddl_triggers(nome, base, cols, fonte)]
+    )
+    if reconstruir:
+        _repopular(conn, fontes, desde)
+    elif nova or mudou or (verificar and fontes and not contagens_batem(
+            conn, f"SELECT COALESCE(SUM(n), 0) FROM ({_sql_fluxos(fontes, None)})", "saldo_diario")):
+        _repopular(conn, fontes, None)
+    return [n for n, *_ in fontes]
+
+
+def garantir_saldo_diario(conn: sqlite3.Connection, verificar: bool = False) -> List[str]:
+    """
+    Cria (idempotente) a tabela e os triggers; popula na criação ou se os
+    triggers mudaram. `verificar=True` confere as contagens com as bases e
+    repopula se divergirem.
+    """
+    # Ex.: SQLite sem UPSERT/window functions ou banco somente-leitura: leitores usam as bases.
+    return garantir(conn, "garantir_saldo_diario",
+                    lambda: _aplicar(conn, reconstruir=False, verificar=verificar), [])
+
+
+def reconstruir_saldo_diario(conn: sqlite3.Connection, desde: Optional[DataLike] = None) -> List[str]:
+    """
+    Sincroniza os triggers e recalcula `saldo_diario` a partir de `desde` (inclusive;
+    None = tudo). Os dias anteriores são mantidos e servem de base.
+    """
+    d = desde.isoformat() if isinstance(desde, date) else (str(desde)[:10] if desde else None)
+    return _aplicar(conn, reconstruir=True, desde=d)
+
+
+# ===================== Leitura =====================
+
+def disponivel(conn: sqlite3.Connection) -> bool:
+    """True se o banco tem `saldo_diario` com triggers ativos."""
+    return triggers_presentes(conn, _PREFIXO)
+
+
+def acumulado_em(conn: sqlite3.Connection, tipo: str, conta: str, dia: DataLike) -> float:
+    """Fluxo acumulado da conta até `dia` (inclusive): uma busca pela chave primária."""
+    d = dia.isoformat() if isinstance(dia, date) else str(dia)[:10]
+    row = conn.execute(
+        "SELECT fechamento FROM saldo_diario WHERE tipo = ? AND conta = ? AND dia <= ? "
+        "ORDER BY dia DESC LIMIT 1",
+        (tipo, conta, d),
+    ).fetchone()
+    return float(row[0] or 0.0) if row else 0.0
+
+
+def delta(conn: sqlite3.Connection, tipo: str, contas: Iterable[str], inicio: DataLike,
+          fim: DataLike) -> Optional[Dict[str, float]]:
+    """
+    Fluxo líquido de cada conta em (inicio, fim]. None se `saldo_diario` não
+    estiver disponível neste banco (o chamador soma pelas tabelas-base).
+    """
+    if not disponivel(conn):
+        return None
+    return {c: acumulado_em(conn, tipo, c, fim) - acumulado_em(conn, tipo, c, inicio) for c in contas}
+
+
+__all__ = [
+    "BANCO_POR_MAQUINETA",
+    "CAIXAS",
+    "garantir_saldo_diario",
+    "reconstruir_saldo_diario",
+    "disponivel",
+    "acumulado_em",
+    "delta",
+]
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+shared.saldos_bancos
+====================
+
+Saldos por banco em formato **longo**: `saldos_bancos_mov(data, banco_id, valor)`,
+uma linha por dia × banco.
+
+Antes, `saldos_bancos` tinha uma coluna por banco, criada em tempo de execução
+(`ALTER TABLE saldos_bancos ADD COLUMN ...`) por vendas, Ledger, depósitos,
+transferências, cadastros e fechamento, sempre com SQL montado pelo nome da
+coluna. Cada ALTER muda o `schema_version` (invalida todas as instruções
+preparadas e o `shared.schema_cache`) e trava o banco inteiro. Agora:
+
+- `saldos_bancos_contas(id, nome)` dá um id estável a cada banco (independe de
+  `bancos_cadastrados`, de onde bancos podem ser excluídos sem perder o histórico);
+- `saldos_bancos_mov` tem índice único `(banco_id, data)`: somar no dia é um
+  UPSERT e as somas por banco são um único GROUP BY indexado;
+- `saldos_bancos` passa a ser uma **VIEW** que pivota de volta (uma coluna por
+  banco, 0.0 sem lançamento) para os leitores legados (`SELECT * FROM
+  saldos_bancos`, DRE, Livro Caixa). Ela só é recriada quando surge um banco novo.
+
+Escritas vão sempre pelas funções abaixo (a view não aceita INSERT/UPDATE).
+
+Migração
+--------
+`garantir_saldos_bancos(conn)` (etapa de `shared.db_schema.MIGRACOES`): cria as
+tabelas; se `saldos_bancos` ainda for a tabela larga, copia as colunas de
+bancos para o formato longo, renomeia a tabela para `saldos_bancos_legado`
+(cópia de segurança, não é mais lida) e cria a view. As funções de escrita
+chamam a migração sozinhas em bancos ainda não migrados.
+
+Uso
+---
+    from shared.saldos_bancos import somar_saldo_banco, definir_saldos_dia
+
+    somar_saldo_banco(conn, "2025-10-03", "Inter", 150.0)        # soma no dia
+    definir_saldos_dia(conn, "2025-10-03", {"Inter": 1200.0})     # snapshot do fechamento
+    somar_por_banco(conn, fim="2025-10-31")                       # {banco: soma}
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import date
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from shared.schema_cache import tem_tabela
+
+DataLike = Union[str, date]
+
+_TABELA = "saldos_bancos_mov"
+_CONTAS = "saldos_bancos_contas"
+_VIEW = "saldos_bancos"
+_LEGADO = "saldos_bancos_legado"
+
+# Colunas da tabela larga que não são bancos.
+_COLUNAS_NAO_BANCO = ("data", "id", "total", "saldo_total")
+
+_DDL = (
+    f"CREATE TABLE IF NOT EXISTS {_CONTAS} ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+    "nome TEXT NOT NULL UNIQUE COLLATE NOCASE);",
+    f"CREATE TABLE IF NOT EXISTS {_TABELA} ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+    "data TEXT NOT NULL, "
+    f"banco_id INTEGER NOT NULL REFERENCES {_CONTAS}(id), "
+    "valor REAL NOT NULL DEFAULT 0);",
+    f"CREATE UNIQUE INDEX IF NOT EXISTS ux_saldos_bancos_mov_banco_data ON {_TABELA} (banco_id, data);",
+    f"CREATE INDEX IF NOT EXISTS idx_saldos_bancos_mov_data ON {_TABELA} (data, banco_id, valor);",
+)
+
+
+def _q(nome: str) -> str:
+    return '"' + str(nome).replace('"', '""') + '"'
+
+
+def _dia(d: DataLike) -> str:
+    return d.isoformat() if isinstance(d, date) else str(d).strip()[:10]
+
+
+def _tipo(conn: sqlite3.Connection, nome: str) -> Optional[str]:
+    row = conn.execute(
+        "SELECT type FROM sqlite_master WHERE name = ? COLLATE NOCASE AND type IN ('table', 'view')", (nome,)
+    ).fetchone()
+    return str(row[0]) if row else None
+
+
+# ===================== View de compatibilidade =====================
+
+def _contas(conn: sqlite3.Connection) -> List[Tuple[int, str]]:
+    linhas = conn.execute(f"SELECT id, nome FROM {_CONTAS} ORDER BY id").fetchall()
+    return [(int(i), str(n)) for i, n in linhas if str(n).lower() not in _COLUNAS_NAO_BANCO]
+
+
+def _recriar_view(conn: sqlite3.Connection) -> bool:
+    """(Re)cria a view pivotada se as colunas não baterem com os bancos. True se recriou."""
+    tipo = _tipo(conn, _VIEW)
+    if tipo == "table":
+        return False  # ainda é a tabela larga: a migração cuida
+    contas = _contas(conn)
+    esperado = ["data"] + [n for _, n in contas]
+    if tipo == "view":
+        atual = [str(r[1]) for r in conn.execute(f"PRAGMA table_info({_VIEW})").fetchall()]
+        if atual == esperado:
+            return False
+        conn.execute(f"DROP VIEW {_VIEW}")
+    cols = "".join(f", TOTAL(CASE WHEN banco_id = {i} THEN valor END) AS {_q(n)}" for i, n in contas)
+    conn.execute(f"CREATE VIEW {_VIEW} AS SELECT data{cols} FROM {_TABELA} GROUP BY data")
+    return True
+
+
+# ===================== Migração =====================
+
+def _migrar_tabela_larga(conn: sqlite3.Connection) -> None:
+    cols = [str(r[1]) for r in conn.execute(f"PRAGMA table_info({_VIEW})").fetchall()]
+    col_data = next((c for c in cols if c.lower() == "data"), None)
+    bancos = [c for c in cols if c.lower() not in _COLUNAS_NAO_BANCO]
+    if col_data and bancos:
+        ids = garantir_bancos(conn, bancos, recriar_view=False)
+        d = _q(col_data)
+        for nome in bancos:
+            c = _q(nome)
+            conn.execute(
+                f"INSERT INTO {_TABELA} (data, banco_id, valor) "
+                f"SELECT COALESCE(DATE({d}), {d}) AS dia, ?, TOTAL({c}) FROM {_VIEW} "
+                f"WHERE {d} IS NOT NULL AND {c} IS NOT NULL GROUP BY dia "
+                "ON CONFLICT(banco_id, data) DO UPDATE SET valor = valor + excluded.valor",
+                (ids[nome.strip()],),
+            )
+    # contadores de `shared.data_version` da tabela antiga (a view não tem triggers)
+    for sufixo in ("ai", "au", "ad"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_versao_{_VIEW}_{sufixo}")
+    destino, n = _LEGADO, 1
+    while _tipo(conn, destino) is not None:
+        n += 1
+        destino = f"{_LEGADO}_{n}"
+    conn.execute(f"ALTER TABLE {_VIEW} RENAME TO {destino}")
+
+
+def _aplicar(conn: sqlite3.Connection) -> bool:
+    for ddl in _DDL:
+        conn.execute(ddl)
+    if _tipo(conn, _VIEW) == "table":
+        _migrar_tabela_larga(conn)
+    _recriar_view(conn)
+    return True
+
+
+def garantir_saldos_bancos(conn: sqlite3.Connection) -> bool:
+    """Cria (idempotente) as tabelas longas e a view; migra a tabela larga se existir."""
+    conn.execute("SAVEPOINT garantir_saldos_bancos")
+    try:
+        feito = _aplicar(conn)
+    except sqlite3.Error:
+        # Ex.: banco somente-leitura: a tabela larga continua como estava.
+        conn.execute("ROLLBACK TO garantir_saldos_bancos")
+        feito = False
+    conn.execute("RELEASE garantir_saldos_bancos")
+    return feito
+
+
+def _preparar(conn: sqlite3.Connection) -> None:
+    if not tem_tabela(conn, _TABELA):
+        garantir_saldos_bancos(conn)
+
+
+# ===================== Escrita =====================
+
+def _ids(conn: sqlite3.Connection, nomes: List[str]) -> Dict[str, int]:
+    if not nomes:
+        return {}
+    marcas = ", ".join("?" * len(nomes))
+    linhas = conn.execute(f"SELECT nome, id FROM {_CONTAS} WHERE nome IN ({marcas})", nomes).fetchall()
+    por_nome = {str(n).lower(): int(i) for n, i in linhas}
+    return {n: por_nome[n.lower()] for n in nomes if n.lower() in por_nome}
+
+
+def garantir_bancos(conn: sqlite3.Connection, nomes: Iterable[str], *,
+                    recriar_view: bool = True) -> Dict[str, int]:
+    """
+    Registra os bancos que faltarem (sem ALTER TABLE) e devolve {nome: banco_id}.
+    A view só é recriada quando algum banco é novo.
+    """
+    nomes = list(dict.fromkeys(str(n).strip() for n in nomes if n and str(n).strip()))
+    ids = _ids(conn, nomes)
+    faltantes = [n for n in nomes if n not in ids]
+    if faltantes:
+        conn.executemany(f"INSERT OR IGNORE INTO {_CONTAS} (nome) VALUES (?)", [(n,) for n in faltantes])
+        if recriar_view:
+            _recriar_view(conn)
+        ids = _ids(conn, nomes)
+    return ids
+
+
+def sincronizar_bancos(conn: sqlite3.Connection, nomes: Iterable[str]) -> Dict[str, int]:
+    """
+    `garantir_bancos` em bancos possivelmente não migrados (usado nas telas).
+    Confirma a transação se foi esta chamada que a abriu (conexões do pool não
+    podem ficar com a escrita pendente).
+    """
+    ja_em_transacao = conn.in_transaction
+    _preparar(conn)
+    ids = garantir_bancos(conn, nomes)
+    if not ja_em_transacao and conn.in_transaction:
+        conn.commit()
+    return ids
+
+
+def somar_saldo_banco(conn: sqlite3.Connection, data: DataLike, banco: str, valor: float) -> int:
+    """
+    Soma `valor` (positivo ou negativo) no saldo do banco no dia e devolve o id
+    da linha (dia × banco) em `saldos_bancos_mov`.
+    """
+    _preparar(conn)
+    banco = str(banco or "").strip()
+    if not banco:
+        raise ValueError("Banco não informado para saldos_bancos.")
+    banco_id = garantir_bancos(conn, [banco])[banco]
+    dia = _dia(data)
+    conn.execute(
+        f"INSERT INTO {_TABELA} (data, banco_id, valor) VALUES (?, ?, ?) "
+        "ON CONFLICT(banco_id, data) DO UPDATE SET valor = valor + excluded.valor",
+        (dia, banco_id, float(valor)),
+    )
+    row = conn.execute(f"SELECT id FROM {_TABELA} WHERE banco_id = ? AND data = ?", (banco_id, dia)).fetchone()
+    return int(row[0])
+
+
+def definir_saldos_dia(conn: sqlite3.Connection, data: DataLike, valores: Mapping[str, float]) -> None:
+    """Substitui os saldos do dia pelos valores absolutos informados (snapshot do fechamento)."""
+    _preparar(conn)
+    dia = _dia(data)
+    ids = garantir_bancos(conn, valores.keys())
+    conn.execute(f"DELETE FROM {_TABELA} WHERE data = ?", (dia,))
+    conn.executemany(
+        f"INSERT INTO {_TABELA} (data, banco_id, valor) VALUES (?, ?, ?) "
+        "ON CONFLICT(banco_id, data) DO UPDATE SET valor = excluded.valor",
+        [(dia, ids[str(b).strip()], float(v or 0.0)) for b, v in valores.items() if str(b).strip() in ids],
+    )
+
+
+# ===================== Leitura =====================
+
+def saldos_do_dia(conn: sqlite3.Connection, data: DataLike) -> Dict[str, float]:
+    """{banco: valor} lançados no dia (só bancos com linha)."""
+    if not tem_tabela(conn, _TABELA):
+        return {}
+    linhas = conn.execute(
+        f"SELECT c.nome, m.valor FROM {_TABELA} AS m JOIN {_CONTAS} AS c ON c.id = m.banco_id "
+        "WHERE m.data = ?",
+        (_dia(data),),
+    ).fetchall()
+    return {str(n): float(v or 0.0) for n, v in linhas}
+
+
+def somar_por_banco(conn: sqlite3.Connection, inicio: Optional[DataLike] = None,
+                    fim: Optional[DataLike] = None) -> Dict[str, float]:
+    """{banco: soma} em [inicio, fim] (limites opcionais e inclusivos): um GROUP BY indexado."""
+    if not tem_tabela(conn, _TABELA):
+        return {}
+    filtros, params = [], []
+    if inicio is not None:
+        filtros.append("m.data >= ?")
+        params.append(_dia(inicio))
+    if fim is not None:
+        filtros.append("m.data <= ?")
+        params.append(_dia(fim))
+    where = f"WHERE {' AND '.join(filtros)} " if filtros else ""
+    linhas = conn.execute(
+        f"SELECT c.nome, TOTAL(m.valor) FROM {_TABELA} AS m JOIN {_CONTAS} AS c ON c.id = m.banco_id "
+        f"{where}GROUP BY m.banco_id",
+        params,
+    ).fetchall()
+    return {str(n): float(v) for n, v in linhas}
+
+
+__all__ = [
+    "garantir_saldos_bancos",
+    "garantir_bancos",
+    "sincronizar_bancos",
+    "somar_saldo_banco",
+    "definir_saldos_dia",
+    "saldos_do_dia",
+    "somar_por_banco",
+]
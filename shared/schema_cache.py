@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+shared.schema_cache
+===================
+
+Registro em memória dos **metadados de esquema** (tabelas e colunas), para os
+caminhos de código que se adaptam a colunas opcionais/dinâmicas.
+
+Antes, cada venda/saída/consulta fazia `PRAGMA table_info(...)` (às vezes via
+`pd.read_sql`, montando um DataFrame) só para saber se uma coluna existe.
+Aqui o esquema inteiro é lido **uma vez** por arquivo de banco e por
+`PRAGMA schema_version` — contador que o SQLite incrementa a cada
+CREATE/ALTER/DROP — e as perguntas seguintes são respondidas do dicionário.
+
+- Cada consulta custa um único `SELECT` sobre `pragma_schema_version`; se o
+  número mudou (ALTER feito por esta ou outra conexão), o esquema é relido.
+- Esquemas lidos dentro de uma transação não são guardados: um ALTER ainda não
+  confirmado pode ser desfeito e o número reaproveitado por outro DDL.
+- A chave inclui a identidade do arquivo (`st_dev`, `st_ino`): um arquivo
+  trocado no mesmo caminho recomeça o `schema_version` e poderia casar com um
+  número antigo. Restauração no mesmo inode (pull do sync) chama
+  `invalidar_esquema`.
+- Bancos em memória (`:memory:`) não são cacheados.
+
+Uso
+---
+    from shared.schema_cache import colunas, tem_coluna, garantir_coluna
+
+    if tem_coluna(conn, "entrada", "valor_liquido"):
+        ...
+    garantir_coluna(conn, "movimentacoes_bancarias", "usuario", "TEXT")
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple, Union
+
+ConexaoOuCursor = Union[sqlite3.Connection, sqlite3.Cursor]
+
+# tabela (minúsculas) -> (nome real, colunas na ordem do cid)
+_Esquema = Dict[str, Tuple[str, Tuple[str, ...]]]
+
+_LOCK = threading.Lock()
+# (arquivo, (st_dev, st_ino)) -> (schema_version, esquema)
+_CACHE: Dict[Tuple[str, Optional[Tuple[int, int]]], Tuple[int, _Esquema]] = {}
+_STATS = {"leituras": 0, "acertos": 0}
+
+_SQL_VERSAO = (
+    "SELECT (SELECT file FROM pragma_database_list WHERE name = 'main'), "
+    "(SELECT schema_version FROM pragma_schema_version)"
+)
+_SQL_ESQUEMA = (
+    "SELECT m.name, p.name FROM sqlite_master AS m "
+    "JOIN pragma_table_info(m.name) AS p "
+    "WHERE m.type IN ('table', 'view') ORDER BY m.name, p.cid"
+)
+
+
+def _conexao(obj: ConexaoOuCursor) -> sqlite3.Connection:
+    return obj.connection if isinstance(obj, sqlite3.Cursor) else obj
+
+
+def _identidade(db_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st_ = os.stat(db_path)
+        return (st_.st_dev, st_.st_ino)
+    except OSError:
+        return None
+
+
+def _ler_esquema(conn: sqlite3.Connection) -> _Esquema:
+    tabelas: Dict[str, Tuple[str, list]] = {}
+    try:
+        linhas = conn.execute(_SQL_ESQUEMA).fetchall()
+    except sqlite3.Error:
+        # Ex.: view apontando para tabela inexistente derruba o JOIN — lê tabela a tabela.
+        linhas = []
+        for (tabela,) in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')").fetchall():
+            try:
+                linhas += [(tabela, r[1]) for r in conn.execute(f'PRAGMA table_info("{tabela}")').fetchall()]
+            except sqlite3.Error:
+                pass
+    for tabela, coluna in linhas:
+        tabela = str(tabela)
+        tabelas.setdefault(tabela.lower(), (tabela, []))[1].append(str(coluna))
+    return {k: (nome, tuple(cols)) for k, (nome, cols) in tabelas.items()}
+
+
+def esquema(obj: ConexaoOuCursor) -> _Esquema:
+    """Esquema atual do banco `main` da conexão (ou cursor), do cache quando possível."""
+    conn = _conexao(obj)
+    arquivo, versao = conn.execute(_SQL_VERSAO).fetchone()
+    chave = None
+    if arquivo:
+        caminho = os.path.abspath(arquivo)
+        chave = (caminho, _identidade(caminho))
+    versao = int(versao or 0)
+
+    if chave:
+        with _LOCK:
+            atual = _CACHE.get(chave)
+            if atual is not None and atual[0] == versao:
+                _STATS["acertos"] += 1
+                return atual[1]
+
+    dados = _ler_esquema(conn)
+    with _LOCK:
+        _STATS["leituras"] += 1
+        if chave and not conn.in_transaction:
+            _CACHE[chave] = (versao, dados)
+    return dados
+
+
+def tem_tabela(obj: ConexaoOuCursor, tabela: str) -> bool:
+    """True se a tabela/view existe (comparação sem diferenciar maiúsculas)."""
+    return str(tabela).lower() in esquema(obj)
+
+
+def colunas(obj: ConexaoOuCursor, tabela: str) -> Tuple[str, ...]:
+    """Colunas da tabela com os nomes reais, na ordem do `PRAGMA table_info`; vazio se não existir."""
+    item = esquema(obj).get(str(tabela).lower())
+    return item[1] if item else ()
+
+
+def mapa_colunas(obj: ConexaoOuCursor, tabela: str) -> Dict[str, str]:
+    """{nome_em_minúsculas: nome_real} das colunas da tabela."""
+    return {c.lower(): c for c in colunas(obj, tabela)}
+
+
+def tem_coluna(obj: ConexaoOuCursor, tabela: str, coluna: str) -> bool:
+    """True se a coluna existe (o SQLite não diferencia maiúsculas em nomes de colunas)."""
+    return str(coluna).lower() in mapa_colunas(obj, tabela)
+
+
+def garantir_coluna(obj: ConexaoOuCursor, tabela: str, coluna: str, tipo: str = "TEXT") -> bool:
+    """
+    Cria a coluna com `ALTER TABLE ... ADD COLUMN` se ainda não existir.
+    Retorna True se a coluna foi criada. O ALTER muda o `schema_version`,
+    o que invalida o cache automaticamente.
+    """
+    if tem_coluna(obj, tabela, coluna):
+        return False
+    _conexao(obj).execute(f'ALTER TABLE "{tabela}" ADD COLUMN "{coluna}" {tipo};')
+    return True
+
+
+def invalidar_esquema(db_path: Optional[str] = None) -> None:
+    """Descarta o esquema cacheado de `db_path` (ou de todos). Útil após trocar o arquivo."""
+    with _LOCK:
+        if db_path is None:
+            _CACHE.clear()
+        else:
+            caminho = os.path.abspath(db_path)
+            for chave in [k for k in _CACHE if k[0] == caminho]:
+                del _CACHE[chave]
+
+
+def estatisticas_esquema(zerar: bool = False) -> Dict[str, int]:
+    """Contadores de leituras completas do esquema e de acertos no cache."""
+    with _LOCK:
+        out = dict(_STATS)
+        if zerar:
+            _STATS.update(leituras=0, acertos=0)
+    return out
+
+
+__all__ = [
+    "esquema",
+    "tem_tabela",
+    "colunas",
+    "mapa_colunas",
+    "tem_coluna",
+    "garantir_coluna",
+    "invalidar_esquema",
+    "estatisticas_esquema",
+]
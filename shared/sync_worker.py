@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+shared.sync_worker
+==================
+
+Serviço de sincronização com o Dropbox em **thread de fundo**, para que a
+renderização das páginas nunca espere pela rede.
+
+- Um único serviço por processo e por arquivo de banco
+  (`obter_servico_sync`, via `st.cache_resource`), compartilhado entre sessões.
+- `solicitar_push()` apenas marca o banco como "sujo"; o envio ocorre depois de
+  uma janela de *debounce* (várias gravações seguidas viram um único upload),
+  com teto de espera para não adiar indefinidamente.
+- `solicitar_pull()` agenda um pull. Pushes pendentes são enviados antes do
+  pull, para que gravações locais não sejam sobrescritas.
+- Falhas são repetidas com *backoff* exponencial; o estado (último sync,
+  pendências, último erro) fica em `status()` e pode ser exibido com
+  `exibir_status_sidebar()`.
+
+As operações de rede são injetadas (`enviar(progresso)`, `baixar(forcar)`), o
+que permite usar o serviço com `shared.db_sync.PastaLocal` fora do Streamlit.
+
+Uso
+---
+    from shared.sync_worker import obter_servico_sync
+
+    servico = obter_servico_sync(caminho_banco)
+    servico.solicitar_pull()
+    ...
+    servico.solicitar_push()      # ao final do script
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, List, Optional, Tuple
+
+import streamlit as st
+
+DEBOUNCE_SEGUNDOS = 3.0      # silêncio mínimo após a última gravação
+ESPERA_MAXIMA_PUSH = 30.0    # ... mas nunca segura um push por mais que isso
+BACKOFF_INICIAL = 2.0
+BACKOFF_MAXIMO = 300.0
+
+
+@dataclass(frozen=True)
+class StatusSync:
+    """Foto do estado do serviço (para UI/logs)."""
+    ativo: bool = False
+    push_pendente: bool = False
+    pull_pendente: bool = False
+    em_andamento: str = ""               # "", "push" ou "pull"
+    progresso: float = 0.0               # 0..1 do snapshot em andamento (push)
+    ultimo_push_ts: float = 0.0
+    ultimo_pull_ts: float = 0.0
+    ultima_duracao: float = 0.0
+    pushes: int = 0
+    pulls_com_mudanca: int = 0           # "geração": cresce a cada pull que trocou o arquivo
+    falhas_seguidas: int = 0
+    ultimo_erro: str = ""
+    proxima_tentativa_ts: float = 0.0
+
+
+class ServicoSync:
+    """Fila de push/pull executada por uma thread daemon."""
+
+    def __init__(
+        self,
+        db_path: str,
+        enviar: Callable[[Callable[[int, int], None]], object],
+        baixar: Callable[[bool], bool],
+        ao_trocar_arquivo: Optional[Callable[[str], None]] = None,
+        debounce: float = DEBOUNCE_SEGUNDOS,
+        espera_maxima: float = ESPERA_MAXIMA_PUSH,
+        backoff_inicial: float = BACKOFF_INICIAL,
+        backoff_maximo: float = BACKOFF_MAXIMO,
+    ) -> None:
+        self.db_path = str(db_path)
+        self._enviar = enviar
+        self._baixar = baixar
+        self._ao_trocar_arquivo = ao_trocar_arquivo
+        self.debounce = float(debounce)
+        self.espera_maxima = float(espera_maxima)
+        self.backoff_inicial = float(backoff_inicial)
+        self.backoff_maximo = float(backoff_maximo)
+
+        self._cond = threading.Condition()
+        self._status = StatusSync()
+        self._sujo_desde = 0.0           # 1ª gravação ainda não enviada
+        self._ultima_gravacao = 0.0      # última solicitação de push
+        self._pull_forcado = False
+        self._mtime_sincronizado = self._mtime()
+        self._parar = False
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- API ----------
+    def iniciar(self) -> "ServicoSync":
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._parar = False
+                self._thread = threading.Thread(
+                    target=self._loop, name=f"flowdash-sync:{os.path.basename(self.db_path)}", daemon=True
+                )
+                self._thread.start()
+                self._status = replace(self._status, ativo=True)
+        return self
+
+    def parar(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._parar = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._cond:
+            self._status = replace(self._status, ativo=False)
+
+    def solicitar_push(self) -> bool:
+        """Marca o banco para envio se o arquivo mudou desde o último sync. Não bloqueia."""
+        mtime = self._mtime()
+        with self._cond:
+            if mtime <= self._mtime_sincronizado + 1e-6 and not self._status.push_pendente:
+                return False
+            agora = time.time()
+            if not self._sujo_desde:
+                self._sujo_desde = agora
+            self._ultima_gravacao = agora
+            self._status = replace(self._status, push_pendente=True)
+            self._cond.notify_all()
+        return True
+
+    def solicitar_pull(self, forcar: bool = False) -> None:
+        """Agenda um pull (executado após eventuais pushes pendentes). Não bloqueia."""
+        self.solicitar_push()  # gravação local ainda não enviada sobe antes do pull
+        with self._cond:
+            self._pull_forcado = self._pull_forcado or bool(forcar)
+            self._status = replace(self._status, pull_pendente=True)
+            self._cond.notify_all()
+
+    def status(self) -> StatusSync:
+        with self._cond:
+            return self._status
+
+    def aguardar_ocioso(self, timeout: float = 30.0) -> bool:
+        """Espera a fila esvaziar (útil em scripts/testes). Retorna False no timeout."""
+        limite = time.time() + timeout
+        with self._cond:
+            while self._status.push_pendente or self._status.pull_pendente or self._status.em_andamento:
+                restante = limite - time.time()
+                if restante <= 0:
+                    return False
+                self._cond.wait(min(restante, 0.2))
+        return True
+
+    # ---------- thread ----------
+    def _mtime(self) -> float:
+        # Em WAL os commits só tocam o `-wal` até o próximo checkpoint.
+        maior = 0.0
+        for caminho in (self.db_path, self.db_path + "-wal"):
+            try:
+                maior = max(maior, os.path.getmtime(caminho))
+            except OSError:
+                pass
+        return maior
+
+    def _registrar_progresso(self, feito: int, total: int) -> None:
+        with self._cond:
+            self._status = replace(self._status, progresso=(feito / total) if total else 1.0)
+
+    def _proxima_acao(self, agora: float) -> Tuple[str, float]:
+        """Retorna (ação, segundos_de_espera). Chamado com o lock."""
+        s = self._status
+        if s.proxima_tentativa_ts > agora:
+            return "", s.proxima_tentativa_ts - agora
+        if s.push_pendente:
+            pronto_em = min(self._ultima_gravacao + self.debounce, self._sujo_desde + self.espera_maxima)
+            # pull pendente não espera o debounce: as gravações locais sobem antes dele
+            if s.pull_pendente or pronto_em <= agora:
+                return "push", 0.0
+            return "", pronto_em - agora
+        if s.pull_pendente:
+            return "pull", 0.0
+        return "", 60.0
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._parar:
+                        return
+                    acao, espera = self._proxima_acao(time.time())
+                    if acao:
+                        break
+                    self._cond.wait(espera)
+                forcar = self._pull_forcado
+                if acao == "push":
+                    # gravações feitas durante o envio geram um novo ciclo
+                    self._sujo_desde = 0.0
+                    mtime_antes = self._mtime()
+                    self._status = replace(self._status, push_pendente=False, em_andamento="push", progresso=0.0)
+                else:
+                    self._pull_forcado = False
+                    self._status = replace(self._status, pull_pendente=False, em_andamento="pull")
+                self._cond.notify_all()
+
+            inicio = time.time()
+            erro = ""
+            mudou = False
+            try:
+                if acao == "push":
+                    self._enviar(self._registrar_progresso)
+                else:
+                    mudou = bool(self._baixar(forcar))
+                    if mudou and self._ao_trocar_arquivo is not None:
+                        self._ao_trocar_arquivo(self.db_path)
+            except Exception as e:  # rede/credenciais: tenta de novo mais tarde
+                erro = f"{type(e).__name__}: {e}"
+
+            fim = time.time()
+            with self._cond:
+                s = self._status
+                if erro:
+                    falhas = s.falhas_seguidas + 1
+                    atraso = min(self.backoff_inicial * (2 ** (falhas - 1)), self.backoff_maximo)
+                    s = replace(s, falhas_seguidas=falhas, ultimo_erro=erro, proxima_tentativa_ts=fim + atraso)
+                    if acao == "push":
+                        s = replace(s, push_pendente=True)
+                        self._sujo_desde = self._sujo_desde or inicio
+                    else:
+                        s = replace(s, pull_pendente=True)
+                        self._pull_forcado = self._pull_forcado or forcar
+                else:
+                    s = replace(s, falhas_seguidas=0, ultimo_erro="", proxima_tentativa_ts=0.0)
+                    if acao == "push":
+                        self._mtime_sincronizado = max(self._mtime_sincronizado, mtime_antes)
+                        s = replace(s, ultimo_push_ts=fim, pushes=s.pushes + 1)
+                    else:
+                        if mudou:
+                            self._mtime_sincronizado = self._mtime()
+                        s = replace(s, ultimo_pull_ts=fim,
+                                    pulls_com_mudanca=s.pulls_com_mudanca + (1 if mudou else 0))
+                self._status = replace(s, em_andamento="", ultima_duracao=fim - inicio)
+                self._cond.notify_all()
+
+
+def _ao_trocar_arquivo_padrao(db_path: str) -> None:
+    from shared.data_version import invalidar_cache_banco
+    from shared.db_schema import aplicar_migracoes
+    from shared.schema_cache import invalidar_esquema
+
+    invalidar_cache_banco(db_path)
+    invalidar_esquema(db_path)
+    # o pull restaura o conteúdo no mesmo arquivo (mesmo inode): força a migração
+    aplicar_migracoes(db_path, forcar=True)
+
+
+def _criar_servico_dropbox(db_path: str) -> ServicoSync:
+    from shared.dbx_io import atualizar_db_local, baixar_db_para_local, enviar_db_local
+
+    def _baixar(forcar: bool) -> bool:
+        if forcar:
+            baixar_db_para_local(forcar=True)
+            return True
+        return atualizar_db_local()
+
+    return ServicoSync(db_path, enviar=enviar_db_local, baixar=_baixar,
+                       ao_trocar_arquivo=_ao_trocar_arquivo_padrao).iniciar()
+
+
+@st.cache_resource(show_spinner=False)
+def obter_servico_sync(db_path: str) -> ServicoSync:
+    """Serviço único (por processo) para o banco `db_path`, já iniciado."""
+    return _criar_servico_dropbox(db_path)
+
+
+def _fmt_ts(ts: float) -> str:
+    if not ts:
+        return "—"
+    seg = max(0, int(time.time() - ts))
+    if seg < 60:
+        return f"há {seg}s"
+    if seg < 3600:
+        return f"há {seg // 60} min"
+    return time.strftime("%d/%m %H:%M", time.localtime(ts))
+
+
+def linhas_status(s: StatusSync) -> List[str]:
+    """Texto curto do status para a sidebar."""
+    if s.em_andamento == "push":
+        estado = f"⏫ enviando… {s.progresso:.0%}"
+    elif s.em_andamento == "pull":
+        estado = "⏬ baixando…"
+    elif s.falhas_seguidas:
+        espera = max(0, int(s.proxima_tentativa_ts - time.time()))
+        estado = f"⚠️ falhou ({s.falhas_seguidas}x) — nova tentativa em {espera}s"
+    elif s.push_pendente:
+        estado = "🕒 alterações aguardando envio"
+    else:
+        estado = "✅ sincronizado"
+    linhas = [
+        f"☁️ **Dropbox:** {estado}",
+        f"Último envio: {_fmt_ts(s.ultimo_push_ts)} · Último pull: {_fmt_ts(s.ultimo_pull_ts)}",
+    ]
+    if s.ultimo_erro:
+        linhas.append(f"Erro: `{s.ultimo_erro[:120]}`")
+    return linhas
+
+
+def exibir_status_sidebar(servico: Optional[ServicoSync]) -> None:
+    """Mostra o status de sincronização na sidebar (sem bloquear)."""
+    if servico is None:
+        return
+    st.sidebar.caption("  \n".join(linhas_status(servico.status())))
+
+
+__all__ = [
+    "StatusSync",
+    "ServicoSync",
+    "obter_servico_sync",
+    "linhas_status",
+    "exibir_status_sidebar",
+]
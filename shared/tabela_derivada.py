@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+shared.tabela_derivada
+======================
+
+Peças comuns das **tabelas mantidas por triggers** (`shared.agregados`,
+`shared.saldo_diario`, `shared.dias_movimento`).
+
+- `colunas` / `tabela_existe`: metadados via `shared.schema_cache` (sem
+  `PRAGMA table_info` por chamada).
+- `sincronizar_triggers`: compara o DDL gerado com o gravado em `sqlite_master`
+  e só remove/cria os triggers que mudaram. DROP/CREATE alteram o
+  `schema_version` (e invalidam os caches de esquema), então uma migração sem
+  mudanças não escreve no esquema.
+- `triggers_presentes`: base do `disponivel()` de cada módulo.
+- `contagens_batem`: compara o total de linhas-base com `SUM(qtd)` da tabela
+  derivada. Varre as bases; os módulos só chamam na conferência explícita.
+- `garantir`: roda a etapa de migração num SAVEPOINT; em erro do SQLite
+  (versão sem UPSERT/window functions, banco somente-leitura) desfaz só a etapa.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Callable, Dict, Iterable, TypeVar
+
+from shared.schema_cache import mapa_colunas
+
+T = TypeVar("T")
+
+
+def colunas(conn: sqlite3.Connection, tabela: str) -> Dict[str, str]:
+    """Mapa minúsculo → nome real das colunas de `tabela` (vazio se não existir)."""
+    try:
+        return mapa_colunas(conn, tabela)
+    except sqlite3.Error:
+        return {}
+
+
+def tabela_existe(conn: sqlite3.Connection, nome: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (nome,)).fetchone()
+    return bool(row)
+
+
+def sincronizar_triggers(conn: sqlite3.Connection, prefixo: str, ddls: Iterable[str]) -> bool:
+    """
+    Deixa no banco exatamente os triggers `<prefixo>_*` de `ddls` (`CREATE TRIGGER <nome> ...`).
+    Retorna True se algum foi removido ou criado.
+    """
+    esperados = {ddl.split()[2]: ddl.strip().rstrip(";") for ddl in ddls}
+    atuais = dict(conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND name LIKE ?", (f"{prefixo}_%",)
+    ).fetchall())
+    obsoletos = [n for n, sql in atuais.items() if esperados.get(n) != sql]
+    novos = [sql for n, sql in esperados.items() if atuais.get(n) != sql]
+    for nome in obsoletos:
+        conn.execute(f'DROP TRIGGER IF EXISTS "{nome}"')
+    for sql in novos:
+        conn.execute(sql)
+    return bool(obsoletos or novos)
+
+
+def contagens_batem(conn: sqlite3.Connection, sql_base: str, tabela: str) -> bool:
+    """`sql_base` devolve o total de linhas-base (uma linha, um valor); compara com `SUM(qtd)` de `tabela`."""
+    base_n = conn.execute(sql_base).fetchone()[0]
+    tab_n = conn.execute(f"SELECT COALESCE(SUM(qtd), 0) FROM {tabela}").fetchone()[0]
+    return int(base_n or 0) == int(tab_n or 0)
+
+
+def triggers_presentes(conn: sqlite3.Connection, prefixo: str) -> bool:
+    """True se há triggers `<prefixo>_*` no banco."""
+    try:
+        return bool(conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='trigger' AND name LIKE ? LIMIT 1", (f"{prefixo}_%",)
+        ).fetchone())
+    except sqlite3.Error:
+        return False
+
+
+def garantir(conn: sqlite3.Connection, nome: str, etapa: Callable[[], T], padrao: T) -> T:
+    """Executa `etapa()` no SAVEPOINT `nome`; em `sqlite3.Error` desfaz a etapa e retorna `padrao`."""
+    conn.execute(f"SAVEPOINT {nome}")
+    try:
+        feito = etapa()
+    except sqlite3.Error:
+        conn.execute(f"ROLLBACK TO {nome}")
+        feito = padrao
+    conn.execute(f"RELEASE {nome}")
+    return feito
+
+
+__all__ = [
+    "colunas",
+    "tabela_existe",
+    "sincronizar_triggers",
+    "contagens_batem",
+    "triggers_presentes",
+    "garantir",
+]
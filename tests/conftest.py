@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Configuração comum dos testes.
+
+- Coloca a raiz do projeto no `sys.path` (como `tools/migrar_banco.py`).
+- `banco_template`: cópia descartável de `data/flowdash_template.db`.
+"""
+from __future__ import annotations
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RAIZ))
+
+
+@pytest.fixture
+def banco_template(tmp_path: Path) -> str:
+    destino = tmp_path / "flowdash_teste.db"
+    shutil.copy(RAIZ / "data" / "flowdash_template.db", destino)
+    return str(destino)
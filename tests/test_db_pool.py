@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""`shared.db.conectar`: reaproveitamento e devolução das conexões do pool."""
+from __future__ import annotations
+
+import gc
+
+from shared.db import MAX_CONEXOES_POR_THREAD, conectar, estatisticas_conexoes
+
+
+def test_close_devolve_ao_pool(banco_template):
+    conn = conectar(banco_template)
+    conn.close()
+    estatisticas_conexoes(zerar=True)
+
+    with conectar(banco_template) as outra:
+        assert outra is conn
+    assert estatisticas_conexoes()["reutilizadas"] == 1
+
+
+def test_conexao_largada_sem_close_libera_a_vaga(banco_template):
+    def _largar():
+        conn = conectar(banco_template)
+        conn.execute("SELECT 1")          # sem close(): como um st.rerun() no meio da página
+
+    for _ in range(MAX_CONEXOES_POR_THREAD + 2):
+        _largar()
+    gc.collect()
+    estatisticas_conexoes(zerar=True)
+
+    conn = conectar(banco_template)
+    conn.close()
+    with conectar(banco_template) as outra:
+        assert outra is conn
+    assert estatisticas_conexoes()["reutilizadas"] == 1
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""`importar_extrato`: vendas sem NSU iguais no mesmo dia e reimportação."""
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from services.importador_extratos import importar_extrato  # noqa: E402
+
+CSV_ADQUIRENTE = (
+    "Data;Valor Bruto;Forma;Bandeira;Parcelas;Maquineta;NSU\n"
+    "03/03/2025;10,00;DINHEIRO;;1;;\n"
+    "03/03/2025;10,00;DINHEIRO;;1;;\n"
+    "03/03/2025;25,00;DINHEIRO;;1;;\n"
+)
+
+
+def test_vendas_iguais_sem_nsu_entram_e_reimportacao_nao_duplica(banco_template, tmp_path):
+    arquivo = tmp_path / "adquirente.csv"
+    arquivo.write_text(CSV_ADQUIRENTE, encoding="utf-8")
+
+    primeira = importar_extrato(str(arquivo), banco_template, "csv_adquirente", banco="Inter")
+    segunda = importar_extrato(str(arquivo), banco_template, "csv_adquirente", banco="Inter")
+
+    assert (primeira.lidas, primeira.inseridas, primeira.duplicadas) == (3, 3, 0)
+    assert (segunda.inseridas, segunda.duplicadas) == (0, 3)
+    with sqlite3.connect(banco_template) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM entrada").fetchone()[0] == 3
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""`PrevisorNumpy`: o `yhat` fica dentro da própria faixa de confiança."""
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from flowdash_pages.dashboard.previsores import PrevisorNumpy  # noqa: E402
+
+
+def _serie(rng, meses: int) -> pd.DataFrame:
+    t = np.arange(meses)
+    y = (1000 + rng.normal(0, 30) * t + 200 * np.sin(2 * np.pi * t / 12)
+         + rng.normal(0, rng.uniform(20, 300), meses))
+    return pd.DataFrame({"ds": pd.date_range("2021-01-01", periods=meses, freq="MS"), "y": y})
+
+
+@pytest.mark.parametrize("semente", range(40))
+def test_yhat_dentro_da_faixa(semente):
+    rng = np.random.default_rng(semente)
+    df = _serie(rng, int(rng.integers(6, 48)))
+
+    prev = PrevisorNumpy().prever(df, meses_futuro=6)
+
+    assert len(prev) == len(df) + 7
+    assert (prev["yhat_lower"] <= prev["yhat"]).all()
+    assert (prev["yhat"] <= prev["yhat_upper"]).all()
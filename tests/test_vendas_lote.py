@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""`VendasService.registrar_vendas_lote`: idempotência por `id_externo`."""
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from services.vendas import VendasService  # noqa: E402
+
+VENDA = {"data_venda": "2025-03-03", "valor_bruto": 10.0, "forma": "DINHEIRO"}
+
+
+def test_vendas_identicas_sem_id_externo_sao_gravadas(banco_template):
+    resultados = VendasService(banco_template).registrar_vendas_lote([VENDA, dict(VENDA)])
+
+    assert [r.status for r in resultados] == ["inserida", "inserida"]
+    assert resultados[0].venda_id != resultados[1].venda_id
+
+
+def test_id_externo_repetido_vira_duplicada(banco_template):
+    servico = VendasService(banco_template)
+    venda = dict(VENDA, id_externo="NSU-1")
+
+    primeiro = servico.registrar_vendas_lote([venda, dict(venda)])
+    reimportado = servico.registrar_vendas_lote([venda])
+
+    assert [r.status for r in primeiro] == ["inserida", "duplicada"]
+    assert reimportado[0].status == "duplicada"
+    assert reimportado[0].venda_id == primeiro[0].venda_id
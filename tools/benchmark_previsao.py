@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Backtest dos previsores mensais (`flowdash_pages.dashboard.previsores`).
+
+Roda *rolling-origin* sobre a série mensal de vendas: para cada origem o
+modelo é treinado com os meses anteriores e comparado com os `h` meses
+seguintes. Cada (backend, horizonte) roda num processo próprio, em paralelo,
+e o relatório traz precisão (MAPE, cobertura do intervalo) ao lado do custo
+(tempo de ajuste e pico de memória do processo).
+
+A série vem do banco (`entrada`, meses fechados) ou de um gerador sintético
+determinístico — este último serve para CI (`--mape-maximo` faz o script
+retornar 1 se algum backend passar do limite).
+
+Uso:
+    python tools/benchmark_previsao.py --sintetico
+    python tools/benchmark_previsao.py --db data/flowdash_data.db --horizontes 1,3,6
+    python tools/benchmark_previsao.py --sintetico --backends numpy --mape-maximo 15 --json saida.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import resource
+import sqlite3
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from flowdash_pages.dashboard.previsores import obter_previsor, previsores_disponiveis  # noqa: E402
+
+MIN_TREINO = 24
+
+
+def serie_sintetica(meses: int = 60, semente: int = 42) -> pd.DataFrame:
+    """Tendência + sazonalidade anual + ruído (fixo pela semente)."""
+    rng = np.random.default_rng(semente)
+    t = np.arange(meses)
+    y = 30000 + 250 * t + 6000 * np.sin(2 * np.pi * (t - 2) / 12) + rng.normal(0, 1500, meses)
+    ds = pd.date_range("2022-01-01", periods=meses, freq="MS")
+    return pd.DataFrame({"ds": ds, "y": np.maximum(y, 0).round(2)})
+
+
+def serie_do_banco(db: Path) -> pd.DataFrame:
+    """Total mensal de `entrada` (a partir de 2022, meses fechados), como no dashboard."""
+    with sqlite3.connect(str(db)) as conn:
+        rows = conn.execute(
+            "SELECT substr(Data, 1, 7) AS mes, SUM(COALESCE(Valor, 0)) FROM entrada "
+            "WHERE Data >= '2022-01-01' GROUP BY mes ORDER BY mes"
+        ).fetchall()
+    df = pd.DataFrame(rows, columns=["mes", "y"])
+    df["ds"] = pd.to_datetime(df["mes"] + "-01", errors="coerce")
+    df = df.dropna(subset=["ds"]).set_index("ds")["y"].astype(float).resample("MS").sum().reset_index()
+    df = df[df["ds"] < pd.Timestamp.now().normalize().replace(day=1)]
+    positivos = df.index[df["y"] > 0]
+    return df.loc[positivos.min():].reset_index(drop=True) if len(positivos) else df
+
+
+def _regressores_do_banco(db: Optional[str], serie: pd.DataFrame, horizonte: int) -> Optional[pd.DataFrame]:
+    if not db:
+        return None
+    from flowdash_pages.dashboard.macro_series import carregar_regressores
+    return carregar_regressores(db, serie["ds"].min(), horizonte)
+
+
+def _avaliar(backend: str, serie: pd.DataFrame, horizonte: int, origens: List[int],
+             db: Optional[str]) -> Dict:
+    """Executado no processo filho: todos os ajustes de um (backend, horizonte)."""
+    previsor = obter_previsor(backend)
+    regressores = _regressores_do_banco(db, serie, horizonte)
+    erros, dentro, tempos = [], [], []
+    tracemalloc.start()
+    for o in origens:
+        treino = serie.iloc[:o].reset_index(drop=True)
+        real = serie["y"].to_numpy()[o:o + horizonte]
+        t0 = time.perf_counter()
+        prev = previsor.prever(treino, horizonte - 1, regressores)
+        tempos.append(time.perf_counter() - t0)
+        fut = prev[prev["ds"] > treino["ds"].max()].head(horizonte)
+        yhat, inf, sup = (fut[c].to_numpy() for c in ("yhat", "yhat_lower", "yhat_upper"))
+        ok = real != 0
+        erros.extend(np.abs(yhat[ok] - real[ok]) / np.abs(real[ok]))
+        dentro.extend((real >= inf) & (real <= sup))
+    _, pico_py = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "backend": backend,
+        "horizonte": horizonte,
+        "origens": len(origens),
+        "mape_pct": float(np.mean(erros) * 100) if erros else float("nan"),
+        "cobertura_pct": float(np.mean(dentro) * 100) if dentro else float("nan"),
+        "ajuste_medio_ms": float(np.mean(tempos) * 1000) if tempos else 0.0,
+        "ajuste_total_s": float(np.sum(tempos)),
+        "pico_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "pico_python_mb": pico_py / 2 ** 20,
+    }
+
+
+def executar(serie: pd.DataFrame, backends: List[str], horizontes: List[int], max_origens: int,
+             processos: int, db: Optional[str] = None) -> List[Dict]:
+    """Um job por (backend, horizonte); cada job em processo novo (memória medida isoladamente)."""
+    jobs = []
+    for h in horizontes:
+        ultimas = list(range(MIN_TREINO, len(serie) - h + 1))
+        origens = ultimas[-max_origens:] if max_origens > 0 else ultimas
+        if not origens:
+            continue
+        jobs.extend((b, h, origens) for b in backends)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=ctx, max_tasks_per_child=1) as pool:
+        futs = [pool.submit(_avaliar, b, serie, h, o, db) for b, h, o in jobs]
+        return [f.result() for f in futs]
+
+
+def _imprimir(resultados: List[Dict], n_meses: int, fonte: str) -> None:
+    print(f"📈 Backtest rolling-origin — {fonte}: {n_meses} meses (treino mínimo {MIN_TREINO})")
+    cab = f"{'backend':<10}{'h':>3}{'orig':>6}{'MAPE%':>9}{'cob%':>8}{'ms/ajuste':>11}{'RSS MB':>9}{'py MB':>8}"
+    print(cab)
+    print("-" * len(cab))
+    for r in sorted(resultados, key=lambda r: (r["horizonte"], r["backend"])):
+        print(f"{r['backend']:<10}{r['horizonte']:>3}{r['origens']:>6}{r['mape_pct']:>9.2f}"
+              f"{r['cobertura_pct']:>8.1f}{r['ajuste_medio_ms']:>11.1f}{r['pico_rss_mb']:>9.1f}"
+              f"{r['pico_python_mb']:>8.1f}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    fonte = ap.add_mutually_exclusive_group()
+    fonte.add_argument("--db", help="Caminho do .db (série de `entrada`)")
+    fonte.add_argument("--sintetico", action="store_true", help="Série sintética determinística (padrão sem --db)")
+    ap.add_argument("--meses", type=int, default=60, help="Tamanho da série sintética")
+    ap.add_argument("--semente", type=int, default=42)
+    ap.add_argument("--backends", default="", help="Lista separada por vírgula (padrão: todos os disponíveis)")
+    ap.add_argument("--horizontes", default="1,3,6", help="Horizontes em meses, ex.: 1,3,6,12")
+    ap.add_argument("--origens", type=int, default=12, help="Máximo de origens por horizonte (0 = todas)")
+    ap.add_argument("--processos", type=int, default=max(1, (multiprocessing.cpu_count() or 2) - 1))
+    ap.add_argument("--json", help="Grava os resultados neste arquivo")
+    ap.add_argument("--mape-maximo", type=float, help="Falha (código 1) se algum MAPE passar deste valor")
+    args = ap.parse_args()
+
+    if args.db:
+        db = Path(args.db).expanduser().resolve()
+        if not db.exists():
+            print(f"❌ Banco não encontrado: {db}", file=sys.stderr)
+            return 2
+        serie, fonte_txt, db_str = serie_do_banco(db), str(db), str(db)
+    else:
+        serie, fonte_txt, db_str = serie_sintetica(args.meses, args.semente), "sintética", None
+
+    disponiveis = previsores_disponiveis()
+    backends = [b.strip().lower() for b in args.backends.split(",") if b.strip()] or list(disponiveis)
+    faltando = [b for b in backends if b not in disponiveis]
+    if faltando:
+        print(f"❌ Backend(s) indisponível(is): {', '.join(faltando)}", file=sys.stderr)
+        return 2
+    horizontes = [int(h) for h in args.horizontes.split(",") if h.strip()]
+
+    if len(serie) < MIN_TREINO + min(horizontes):
+        print(f"❌ Série curta demais: {len(serie)} meses", file=sys.stderr)
+        return 2
+
+    try:
+        resultados = executar(serie, backends, horizontes, args.origens, args.processos, db_str)
+    except Exception as e:
+        print(f"❌ Erro no backtest: {e}", file=sys.stderr)
+        return 1
+
+    _imprimir(resultados, len(serie), fonte_txt)
+    if args.json:
+        Path(args.json).write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.mape_maximo is not None:
+        ruins = [r for r in resultados if not r["mape_pct"] <= args.mape_maximo]
+        if ruins:
+            for r in ruins:
+                print(f"❌ {r['backend']} h={r['horizonte']}: MAPE {r['mape_pct']:.2f}% > {args.mape_maximo}%",
+                      file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
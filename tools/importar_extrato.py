@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Importa um extrato bancário (CSV/OFX) ou arquivo de liquidação de adquirente
+(CSV) no banco do FlowDash, via `services.importador_extratos`.
+
+Lê o arquivo em lotes (memória limitada) e é idempotente: reimportar o mesmo
+arquivo (ou um período sobreposto) não duplica lançamentos.
+
+Uso:
+    python tools/importar_extrato.py --db data/flowdash_data.db --perfil ofx --banco Inter extrato.ofx
+    python tools/importar_extrato.py --db data/flowdash_data.db --perfil csv_adquirente vendas_maquineta.csv
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.importador_extratos import PERFIS, TAMANHO_LOTE, importar_extrato  # noqa: E402
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("arquivo", help="Arquivo CSV/OFX a importar")
+    ap.add_argument("--db", required=True, help="Caminho do .db (ex.: data/flowdash_data.db)")
+    ap.add_argument("--perfil", required=True, choices=sorted(PERFIS), help="Perfil de leitura/destino")
+    ap.add_argument("--banco", help="Banco do extrato (obrigatório para extratos; padrão de banco_destino em vendas)")
+    ap.add_argument("--usuario", default="Sistema", help="Usuário gravado nos lançamentos")
+    ap.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="Linhas por transação")
+    args = ap.parse_args()
+
+    arquivo = Path(args.arquivo).expanduser().resolve()
+    db = Path(args.db).expanduser().resolve()
+    for p in (arquivo, db):
+        if not p.exists():
+            print(f"❌ Arquivo não encontrado: {p}", file=sys.stderr)
+            return 2
+
+    t0 = time.perf_counter()
+    try:
+        resumo = importar_extrato(str(arquivo), str(db), args.perfil, banco=args.banco,
+                                  usuario=args.usuario, tamanho_lote=args.lote)
+    except Exception as e:
+        print(f"❌ Erro na importação: {e}", file=sys.stderr)
+        return 1
+
+    print(f"✅ {arquivo.name} → {db.name} ({args.perfil}) em {time.perf_counter() - t0:.1f}s")
+    print(f"   lidas: {resumo.lidas} | inseridas: {resumo.inseridas} | "
+          f"já existentes: {resumo.duplicadas} | inválidas: {resumo.invalidas}")
+    for erro in resumo.erros:
+        print(f"   ⚠️ {erro}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
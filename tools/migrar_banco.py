@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Aplica as migrações idempotentes de `shared.db_schema` (índices de datas etc.)
+em um banco SQLite do FlowDash.
+
+O app já aplica as migrações no boot; este script serve para bancos fora do
+app (cópias locais, template, restaurações).
+
+Uso:
+    python tools/migrar_banco.py --db data/flowdash_data.db
+    python tools/migrar_banco.py --db data/flowdash_data.db --reconstruir-agregados
+    python tools/migrar_banco.py --db data/flowdash_data.db --reconstruir-saldos 2025-01-01
+    python tools/migrar_banco.py --db data/flowdash_data.db --verificar
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from shared.agregados import garantir_agregados, reconstruir_agregados  # noqa: E402
+from shared.db_schema import INDICES_DATAS, aplicar_migracoes  # noqa: E402
+from shared.dias_movimento import garantir_dias_movimento  # noqa: E402
+from shared.saldo_diario import garantir_saldo_diario, reconstruir_saldo_diario  # noqa: E402
+
+
+def _indices_presentes(db: Path) -> set[str]:
+    with sqlite3.connect(str(db)) as conn:
+        return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True, help="Caminho do .db (ex.: data/flowdash_data.db)")
+    ap.add_argument(
+        "--reconstruir-agregados",
+        action="store_true",
+        help="Recria triggers e repopula agg_vendas_dia/agg_saidas_dia a partir das tabelas-base",
+    )
+    ap.add_argument(
+        "--reconstruir-saldos",
+        nargs="?",
+        const="",
+        metavar="AAAA-MM-DD",
+        help="Recria triggers e recalcula saldo_diario a partir da data (sem data: tudo)",
+    )
+    ap.add_argument(
+        "--verificar",
+        action="store_true",
+        help="Confere as tabelas mantidas por triggers com as tabelas-base e repopula se divergirem",
+    )
+    args = ap.parse_args()
+
+    db = Path(args.db).expanduser().resolve()
+    if not db.exists():
+        print(f"❌ Banco não encontrado: {db}", file=sys.stderr)
+        return 2
+
+    try:
+        antes = _indices_presentes(db)
+        aplicar_migracoes(str(db), forcar=True)
+        depois = _indices_presentes(db)
+        reconstruidos = []
+        if args.reconstruir_agregados:
+            conn = sqlite3.connect(str(db))
+            try:
+                with conn:
+                    reconstruidos = reconstruir_agregados(conn)
+            finally:
+                conn.close()
+        if args.reconstruir_saldos is not None:
+            conn = sqlite3.connect(str(db))
+            try:
+                with conn:
+                    reconstruir_saldo_diario(conn, args.reconstruir_saldos or None)
+            finally:
+                conn.close()
+        if args.verificar:
+            conn = sqlite3.connect(str(db))
+            try:
+                with conn:
+                    garantir_agregados(conn, verificar=True)
+                    garantir_saldo_diario(conn, verificar=True)
+                    garantir_dias_movimento(conn, verificar=True)
+            finally:
+                conn.close()
+    except Exception as e:
+        print(f"❌ Erro aplicando migrações: {e}", file=sys.stderr)
+        return 1
+
+    print(f"✅ Migrações aplicadas em: {db}")
+    for nome, tabela, _cols in INDICES_DATAS:
+        if nome in depois:
+            marca = "novo" if nome not in antes else "ok"
+            print(f"   - {nome} ({tabela}) [{marca}]")
+        else:
+            print(f"   - {nome} ({tabela}) [ignorado: tabela/coluna ausente]")
+    for agg in reconstruidos:
+        print(f"🔁 Agregado reconstruído: {agg}")
+    if args.reconstruir_saldos is not None:
+        print(f"🔁 saldo_diario recalculado desde: {args.reconstruir_saldos or 'o início'}")
+    if args.verificar:
+        print("🔎 Tabelas mantidas por triggers conferidas com as tabelas-base")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Custo de import de cada página do FlowDash (`main.ROTAS`) e do PDV.
+
+Cada módulo é importado num interpretador novo com `python -X importtime`,
+então o número é o *cold start* real daquela página (sem cache de módulos
+já carregados por outra). O relatório traz o tempo cumulativo do módulo e as
+dependências mais caras abaixo dele — útil para achar quem puxou plotly,
+prophet, workalendar etc. para uma página que não precisa deles.
+
+Uso:
+    python tools/perfil_imports.py
+    python tools/perfil_imports.py --top 8 --modulos services.vendas,pdv_app
+    python tools/perfil_imports.py --json perfil.json --limite-ms 1500
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+RAIZ = Path(__file__).resolve().parents[1]
+EXTRAS = ("services.vendas",)   # caminho do PDV (pdv_app executa Streamlit ao importar)
+
+
+def modulos_das_rotas(main_py: Path = RAIZ / "main.py") -> Dict[str, List[str]]:
+    """{modulo: [rótulos]} lendo o dicionário `ROTAS` por AST (sem executar o main)."""
+    arvore = ast.parse(main_py.read_text(encoding="utf-8"))
+    for no in ast.walk(arvore):
+        if isinstance(no, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "ROTAS" for t in no.targets):
+            rotas = ast.literal_eval(no.value)
+            saida: Dict[str, List[str]] = {}
+            for rotulo, modulo in rotas.items():
+                saida.setdefault(modulo, []).append(rotulo)
+            return saida
+    raise RuntimeError("ROTAS não encontrado em main.py")
+
+
+def _importtime(modulo: str) -> Tuple[List[Tuple[int, int, str]], str]:
+    """Roda o import isolado; devolve linhas (self_us, cumulativo_us, nome) e o erro, se houver."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(RAIZ), os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=str(RAIZ), env=env, capture_output=True, text=True,
+    )
+    linhas = []
+    for ln in proc.stderr.splitlines():
+        if not ln.startswith("import time:") or "self [us]" in ln:
+            continue
+        try:
+            self_us, cum_us, nome = ln[len("import time:"):].split("|", 2)
+            linhas.append((int(self_us), int(cum_us), nome.rstrip()))
+        except ValueError:
+            continue
+    erro = ""
+    if proc.returncode != 0:
+        erro = (proc.stderr.strip().splitlines() or ["erro desconhecido"])[-1]
+    return linhas, erro
+
+
+def perfilar(modulo: str, top: int = 5) -> Dict:
+    linhas, erro = _importtime(modulo)
+    total_us = next((cum for _, cum, nome in reversed(linhas) if nome.strip() == modulo), 0)
+    # custo por pacote externo: maior cumulativo entre os módulos de mesma raiz
+    propria = modulo.split(".")[0]
+    por_raiz: Dict[str, int] = {}
+    for _, cum, nome in linhas:
+        raiz = nome.strip().split(".")[0]
+        if raiz != propria:
+            por_raiz[raiz] = max(por_raiz.get(raiz, 0), cum)
+    pesados = sorted(por_raiz.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {
+        "modulo": modulo,
+        "total_ms": total_us / 1000,
+        "modulos_carregados": len(linhas),
+        "mais_pesados": [{"pacote": p, "ms": us / 1000} for p, us in pesados],
+        "erro": erro,
+    }
+
+
+def _imprimir(resultados: List[Dict], rotulos: Dict[str, List[str]]) -> None:
+    print(f"⏱️  Custo de import (cold start) — {sys.executable}")
+    cab = f"{'módulo':<52}{'ms':>9}{'mods':>6}  mais pesados"
+    print(cab)
+    print("-" * (len(cab) + 30))
+    for r in sorted(resultados, key=lambda r: r["total_ms"], reverse=True):
+        pesados = ", ".join(f"{p['pacote']} {p['ms']:.0f}" for p in r["mais_pesados"])
+        print(f"{r['modulo']:<52}{r['total_ms']:>9.1f}{r['modulos_carregados']:>6}  {pesados}")
+        if r["erro"]:
+            print(f"{'':<52}  ⚠️  {r['erro']}")
+        nomes = rotulos.get(r["modulo"])
+        if nomes:
+            print(f"{'':<52}  ↳ {', '.join(nomes)}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modulos", default="", help="Lista separada por vírgula (padrão: ROTAS + services.vendas)")
+    ap.add_argument("--top", type=int, default=5, help="Dependências mais caras listadas por módulo")
+    ap.add_argument("--json", help="Grava os resultados neste arquivo")
+    ap.add_argument("--limite-ms", type=float, help="Falha (código 1) se algum módulo passar deste tempo")
+    args = ap.parse_args()
+
+    rotulos = modulos_das_rotas()
+    modulos = [m.strip() for m in args.modulos.split(",") if m.strip()] or [*rotulos, *EXTRAS]
+
+    resultados = [perfilar(m, args.top) for m in modulos]
+    _imprimir(resultados, rotulos)
+    if args.json:
+        Path(args.json).write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.limite_ms is not None:
+        lentos = [r for r in resultados if r["total_ms"] > args.limite_ms]
+        for r in lentos:
+            print(f"❌ {r['modulo']}: {r['total_ms']:.0f} ms > {args.limite_ms:.0f} ms", file=sys.stderr)
+        if lentos:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())